@@ -0,0 +1,37 @@
+// Load src/docbuddy/static/core.js into a minimal browser-like sandbox and
+// return window.DocBuddy. Shared by the benchmarks in this directory.
+'use strict';
+var fs = require('fs');
+var path = require('path');
+var vm = require('vm');
+
+module.exports = function loadDocBuddy(overrides) {
+  var store = {};
+  var el = function() { return { style: {}, appendChild: function() {}, setAttribute: function() {}, addEventListener: function() {} }; };
+  var sandbox = Object.assign({
+    console: { log: function() {}, warn: function() {}, debug: function() {}, error: console.error },
+    localStorage: {
+      getItem: function(k) { return k in store ? store[k] : null; },
+      setItem: function(k, v) { store[k] = String(v); },
+      removeItem: function(k) { delete store[k]; }
+    },
+    document: { addEventListener: function() {}, createElement: el, getElementById: function() { return null; }, head: el(), body: el() },
+    location: { origin: 'http://localhost', href: 'http://localhost/docs' },
+    navigator: { onLine: true },
+    fetch: function() { return Promise.reject(new Error('offline')); },
+    addEventListener: function() {},
+    dispatchEvent: function() {},
+    CustomEvent: function(type, init) { this.type = type; this.detail = init && init.detail; },
+    setTimeout: setTimeout,
+    clearTimeout: clearTimeout,
+    performance: require('perf_hooks').performance,
+    AbortController: AbortController,
+    TextDecoder: TextDecoder,
+    TextEncoder: TextEncoder
+  }, overrides || {});
+  sandbox.window = sandbox;
+  vm.createContext(sandbox);
+  var src = fs.readFileSync(path.join(__dirname, '..', 'src', 'docbuddy', 'static', 'core.js'), 'utf8');
+  vm.runInContext(src, sandbox, { filename: 'core.js' });
+  return sandbox.DocBuddy;
+};
@@ -0,0 +1,166 @@
+#!/usr/bin/env node
+// Prompt prefix-cache benchmark: runs the same agent session twice against a
+// local vLLM-compatible stub that models automatic prefix caching, once with
+// the legacy prompt layout (per-turn iteration counter inside the system
+// prompt) and once with the stable layout (buildStaticSystemPrompt +
+// withSessionNotes + withTurnNote), and reports the cache-hit ratio.
+//
+//   node benchmarks/prefix_cache.js [turns]
+//
+// The stub renders messages with a simple chat template, splits the prompt
+// into 16-token blocks (~4 characters per token) and reports a block as
+// cached when the same prefix was seen before, like vLLM's block hashing.
+// Usage is returned with prompt_tokens_details.cached_tokens.
+'use strict';
+var http = require('http');
+var crypto = require('crypto');
+var loadDocBuddy = require('./load_core');
+
+var TURNS = parseInt(process.argv[2], 10) || 12;
+var BLOCK_CHARS = 16 * 4;
+
+function startStub() {
+  var cache = new Set();
+  var server = http.createServer(function(req, res) {
+    var raw = '';
+    req.on('data', function(c) { raw += c; });
+    req.on('end', function() {
+      var body = JSON.parse(raw);
+      var prompt = (body.tools ? '<|tools|>\n' + JSON.stringify(body.tools) + '\n' : '') +
+        body.messages.map(function(m) {
+          return '<|' + m.role + '|>\n' + (m.content || '') + (m.tool_calls ? JSON.stringify(m.tool_calls) : '');
+        }).join('\n') + '\n<|assistant|>\n';
+      var blocks = Math.floor(prompt.length / BLOCK_CHARS);
+      var hash = '';
+      var hits = 0;
+      var missed = false;
+      for (var b = 0; b < blocks; b++) {
+        hash = crypto.createHash('sha1').update(hash + prompt.slice(b * BLOCK_CHARS, (b + 1) * BLOCK_CHARS)).digest('hex');
+        if (!missed && cache.has(hash)) hits++;
+        else missed = true;
+        cache.add(hash);
+      }
+      var promptTokens = Math.ceil(prompt.length / 4);
+      var usage = {
+        prompt_tokens: promptTokens,
+        completion_tokens: 4,
+        total_tokens: promptTokens + 4,
+        prompt_tokens_details: { cached_tokens: hits * 16 }
+      };
+      res.writeHead(200, { 'Content-Type': 'text/event-stream' });
+      res.write('data: ' + JSON.stringify({ choices: [{ index: 0, delta: { content: 'Done.' }, finish_reason: null }] }) + '\n\n');
+      res.write('data: ' + JSON.stringify({ choices: [{ index: 0, delta: {}, finish_reason: 'stop' }] }) + '\n\n');
+      res.write('data: ' + JSON.stringify({ choices: [], usage: usage }) + '\n\n');
+      res.end('data: [DONE]\n\n');
+    });
+  });
+  return new Promise(function(resolve) {
+    server.listen(0, '127.0.0.1', function() { resolve(server); });
+  });
+}
+
+// An API big enough that the schema context dominates the prompt
+function buildSchema() {
+  var paths = {};
+  ['invoices', 'customers', 'payments', 'refunds', 'subscriptions', 'products', 'coupons', 'webhooks'].forEach(function(r) {
+    paths['/' + r] = {
+      get: { operationId: 'list_' + r, summary: 'List ' + r + ' with filtering and pagination', parameters: [
+        { name: 'limit', 'in': 'query', schema: { type: 'integer' } },
+        { name: 'cursor', 'in': 'query', schema: { type: 'string' } }
+      ] },
+      post: { operationId: 'create_' + r, summary: 'Create a new entry in ' + r }
+    };
+    paths['/' + r + '/{id}'] = {
+      get: { operationId: 'get_' + r, summary: 'Fetch one of ' + r + ' by id' },
+      patch: { operationId: 'update_' + r, summary: 'Update fields on one of ' + r },
+      'delete': { operationId: 'delete_' + r, summary: 'Delete one of ' + r }
+    };
+  });
+  return { openapi: '3.0.0', info: { title: 'Billing API', version: '1.0.0', description: 'Invoices, payments and subscriptions.' }, paths: paths };
+}
+
+var TOOL_INSTRUCTION = 'Use the `api_request` tool via native tool calling when executing API calls. Do NOT output tool calls as JSON text — the system handles tool execution automatically. If a tool call returns an error, you may retry with corrected parameters (up to 3 times).';
+var ACT_NOTE = 'You are currently in ACT mode. Execute the plan using available tools. Be autonomous — call tools, process results, and iterate until the task is complete. Signal each step clearly.';
+
+// The layout agent.js used before: mode text and the iteration counter were
+// appended to the system prompt, then (with tools on) the tool section was
+// regex-replaced, which also cut the mode text off again.
+function legacyMessages(DB, schema, history, i, withTools) {
+  var system = DB.getSystemPromptForPreset('agent', schema) + '\n\n' + ACT_NOTE + ' Current iteration: ' + (i + 1) + '/20.';
+  if (withTools) system = system.replace(/## Tool Calling Instructions[\s\S]*$/, '').trimEnd() + '\n\n' + TOOL_INSTRUCTION;
+  return [{ role: 'system', content: system }].concat(history);
+}
+
+function stableMessages(DB, schema, history, i, withTools) {
+  var system = DB.withSessionNotes(DB.buildStaticSystemPrompt('agent', schema, null, withTools ? TOOL_INSTRUCTION : null), [ACT_NOTE]);
+  return DB.withTurnNote([{ role: 'system', content: system }].concat(history), 'Agent iteration ' + (i + 1) + '/20');
+}
+
+function runSession(DB, url, schema, layout, withTools) {
+  var history = [{ role: 'user', content: 'Find overdue invoices for ACME and send each one a reminder.' }];
+  var tools = withTools ? [DB.buildApiRequestTool(schema)] : undefined;
+  var totals = { prompt: 0, cached: 0 };
+  var turn = function(i) {
+    if (i >= TURNS) return Promise.resolve(totals);
+    var payload = { model: 'stub', stream: true, messages: layout(DB, schema, history, i, withTools), tools: tools };
+    return new Promise(function(resolve, reject) {
+      DB.streamLLMCompletion(url, payload, { 'Content-Type': 'application/json' }, null, {
+        onContent: function() {},
+        onDone: function() {},
+        onAbort: function() { reject(new Error('aborted')); },
+        onNetworkError: function(err) { reject(err); },
+        onToolCalls: function() {},
+        onStats: function(stats) {
+          totals.prompt += stats.promptTokens;
+          totals.cached += stats.cachedTokens || 0;
+          resolve();
+        }
+      });
+    }).then(function() {
+      // Each agent step adds a tool call and its result to the history
+      var id = 'call_' + i;
+      history.push({ role: 'assistant', content: null, tool_calls: [{ id: id, type: 'function', function: { name: 'api_request', arguments: JSON.stringify({ method: 'POST', path: '/invoices/{id}/remind', path_params: { id: 100 + i } }) } }] });
+      history.push({ role: 'tool', tool_call_id: id, content: 'Status: 200 OK\n\n{"id": ' + (100 + i) + ', "reminded": true}' });
+      return turn(i + 1);
+    });
+  };
+  return turn(0);
+}
+
+function measure(schema, layout, withTools) {
+  // A fresh DocBuddy and stub cache per run keeps the runs independent
+  return startStub().then(function(server) {
+    var url = 'http://127.0.0.1:' + server.address().port + '/v1/chat/completions';
+    var DB = loadDocBuddy({ fetch: fetch, Response: Response, Headers: Headers });
+    DB.saveToStorage({ provider: 'vllm', modelId: 'stub' });
+    return runSession(DB, url, schema, layout, withTools).then(function(totals) {
+      server.close();
+      return totals;
+    });
+  });
+}
+
+function report(label, t) {
+  console.log('  ' + label + ': ' + t.cached + ' of ' + t.prompt + ' prompt tokens served from cache (' +
+    (t.cached / t.prompt * 100).toFixed(1) + '%)');
+}
+
+var schema = buildSchema();
+var runs = [
+  ['tools on ', true],
+  ['tools off', false]
+];
+console.log('Agent session, ' + TURNS + ' turns');
+runs.reduce(function(chain, run) {
+  return chain.then(function() {
+    return measure(schema, legacyMessages, run[1]).then(function(t) {
+      report(run[0] + ' legacy layout', t);
+      return measure(schema, stableMessages, run[1]);
+    }).then(function(t) {
+      report(run[0] + ' stable layout', t);
+    });
+  });
+}, Promise.resolve()).catch(function(err) {
+  console.error(err);
+  process.exit(1);
+});
@@ -0,0 +1,92 @@
+#!/usr/bin/env node
+// Route matching benchmark: segment-trie index (DocBuddy.matchRoute) vs a
+// naive scan that tests every path template's regex in turn.
+//
+//   node benchmarks/route_index.js [pathCount] [lookups]
+//
+// Loads src/docbuddy/static/core.js with a minimal browser shim; no
+// dependencies beyond Node 18+.
+'use strict';
+var loadDocBuddy = require('./load_core');
+
+var PATH_COUNT = parseInt(process.argv[2], 10) || 2000;
+var LOOKUPS = parseInt(process.argv[3], 10) || 20000;
+
+// A REST-shaped schema: resources with collection, item and action routes,
+// nested one level under a parent resource.
+function buildSchema(count) {
+  var paths = {};
+  var actions = ['remind', 'archive', 'restore', 'export'];
+  for (var r = 0; Object.keys(paths).length < count; r++) {
+    var res = '/api/v1/resource' + r;
+    var op = function(id) { return { get: { operationId: id }, post: { operationId: id + '_post' } }; };
+    paths[res] = op('list' + r);
+    paths[res + '/{id}'] = op('get' + r);
+    actions.forEach(function(a) { paths[res + '/{id}/' + a] = op(a + r); });
+    paths[res + '/{id}/items/{itemId}'] = op('item' + r);
+  }
+  var trimmed = {};
+  Object.keys(paths).slice(0, count).forEach(function(k) { trimmed[k] = paths[k]; });
+  return { openapi: '3.0.0', paths: trimmed };
+}
+
+function buildNaive(schema) {
+  return Object.keys(schema.paths).map(function(template) {
+    var re = new RegExp('^' + template.replace(/[.*+?^$()|[\]\\]/g, '\\$&').replace(/\{[^}]+\}/g, '[^/]+') + '$');
+    return { re: re, template: template, item: schema.paths[template] };
+  });
+}
+
+function naiveMatch(table, method, p) {
+  var m = method.toLowerCase();
+  for (var i = 0; i < table.length; i++) {
+    if (table[i].item[m] && table[i].re.test(p)) return table[i];
+  }
+  return null;
+}
+
+function time(fn) {
+  var start = process.hrtime.bigint();
+  var result = fn();
+  return { ms: Number(process.hrtime.bigint() - start) / 1e6, result: result };
+}
+
+var DB = loadDocBuddy();
+var schema = buildSchema(PATH_COUNT);
+var templates = Object.keys(schema.paths);
+var queries = [];
+for (var i = 0; i < 1000; i++) {
+  var t = templates[(i * 7919) % templates.length];
+  queries.push(t.replace(/\{[^}]+\}/g, String(1000 + i)));
+}
+
+var naiveBuild = time(function() { return buildNaive(schema); });
+var trieBuild = time(function() { return DB.buildRouteIndex(schema); });
+var naiveTable = naiveBuild.result;
+var index = trieBuild.result;
+
+// Both matchers must agree before timing means anything
+queries.forEach(function(q) {
+  var a = naiveMatch(naiveTable, 'GET', q);
+  var b = DB.matchRoute(index, 'GET', q);
+  if (!a || !b || a.template !== b.path) throw new Error('Mismatch for ' + q);
+});
+
+function run(label, fn) {
+  var n = LOOKUPS;
+  fn(queries[0]);
+  var r = time(function() {
+    var hits = 0;
+    for (var j = 0; j < n; j++) if (fn(queries[j % queries.length])) hits++;
+    return hits;
+  });
+  console.log(label + ': ' + r.ms.toFixed(1) + ' ms for ' + n + ' lookups (' +
+    (r.ms * 1000 / n).toFixed(3) + ' µs/lookup)');
+  return r.ms;
+}
+
+console.log('Schema: ' + templates.length + ' paths');
+console.log('Build: naive ' + naiveBuild.ms.toFixed(1) + ' ms, trie ' + trieBuild.ms.toFixed(1) + ' ms');
+var naiveMs = run('Naive regex scan', function(q) { return naiveMatch(naiveTable, 'GET', q); });
+var trieMs = run('Segment trie    ', function(q) { return DB.matchRoute(index, 'GET', q); });
+console.log('Speedup: ' + (naiveMs / trieMs).toFixed(1) + 'x');
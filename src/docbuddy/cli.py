@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-"""CLI entry point for launching DocBuddy standalone webpage."""
+"""CLI entry point for launching DocBuddy standalone webpage and running workflows."""
 
 import argparse
 import functools
@@ -10,6 +10,8 @@ import threading
 import time
 import webbrowser
 
+from . import runner
+
 
 def _pkg_dir() -> pathlib.Path:
     """Return the directory that contains standalone.html and static/."""
@@ -21,7 +23,11 @@ def main() -> None:
     parser = argparse.ArgumentParser(
         prog="docbuddy",
         description="Launch the DocBuddy standalone AI-enhanced API documentation page.",
-        epilog="Example: docbuddy --host 127.0.0.1 --port 9000",
+        epilog=(
+            "Example: docbuddy --host 127.0.0.1 --port 9000\n"
+            "         docbuddy run-workflow workflow.json --openapi http://localhost:8000/openapi.json"
+        ),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
     )
     parser.add_argument(
         "--host",
@@ -37,8 +43,19 @@ def main() -> None:
         help="Port to run the server on (default: 8008)",
     )
 
+    subparsers = parser.add_subparsers(dest="command")
+    run_parser = subparsers.add_parser(
+        "run-workflow",
+        help="Run an exported workflow headlessly and write JSONL results",
+        description="Run a DocBuddy workflow against an OpenAI-compatible endpoint without a browser.",
+    )
+    runner.add_arguments(run_parser)
+
     args = parser.parse_args()
 
+    if args.command == "run-workflow":
+        sys.exit(runner.run_from_args(args))
+
     # Locate the package directory using __file__ – this is the most reliable
     # way to find the installed package assets regardless of Python version,
     # install method (editable, wheel, sdist), or platform.
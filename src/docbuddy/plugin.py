@@ -28,6 +28,16 @@ _llm_apps: weakref.WeakSet = weakref.WeakSet()
 # Module-level Jinja2 environment (reused across requests)
 _jinja_env = Environment(loader=FileSystemLoader(str(_TEMPLATES_DIR)), autoescape=True)
 
+# Supported page boot modes (see the ``boot_mode`` argument of get_swagger_ui_html)
+BOOT_MODES = ("standard", "chat-first")
+
+
+def _check_boot_mode(boot_mode: str) -> None:
+    if boot_mode not in BOOT_MODES:
+        raise ValueError(
+            f"Unknown boot_mode {boot_mode!r}; expected one of {', '.join(BOOT_MODES)}"
+        )
+
 
 def get_swagger_ui_html(
     *,
@@ -40,6 +50,7 @@ def get_swagger_ui_html(
     theme_css_url: str = "/docbuddy-static/themes/light-theme.css",
     debug: bool = False,
     version: Optional[str] = None,
+    boot_mode: str = "standard",
 ) -> HTMLResponse:
     """Return an HTMLResponse with the custom Swagger UI + LLM settings panel.
 
@@ -57,7 +68,17 @@ def get_swagger_ui_html(
         debug: If True, disables template caching for development.
         version: Version string to display in the UI (defaults to the installed
             package version).
+        boot_mode: ``"standard"`` renders the API explorer on page load.
+            ``"chat-first"`` paints a lightweight chat shell at once, loads the
+            Swagger UI scripts deferred and opens on the Chat tab; the OpenAPI
+            spec is handed to the API explorer when its tab is first opened or
+            the page is idle.
+
+    Raises:
+        ValueError: If ``boot_mode`` is not one of :data:`BOOT_MODES`.
     """
+    _check_boot_mode(boot_mode)
+
     # Use a fresh (uncached) environment per debug call to avoid mutating the
     # shared singleton; non-debug requests share the cached module-level env.
     env = (
@@ -81,6 +102,7 @@ def get_swagger_ui_html(
         swagger_css_sri=swagger_css_sri,
         theme_css_url=theme_css_url,
         version=version or pkg_version,
+        boot_mode=boot_mode,
     )
     return HTMLResponse(html)
 
@@ -98,6 +120,7 @@ def setup_docs(
     theme_css_url: str = "/docbuddy-static/themes/light-theme.css",
     debug: bool = False,
     version: Optional[str] = None,
+    boot_mode: str = "standard",
 ) -> None:
     """Mount the LLM-enhanced Swagger UI docs on a FastAPI application.
 
@@ -123,7 +146,13 @@ def setup_docs(
         debug: If True, enables debug mode with template auto-reload (default False).
         version: Version string to display in the UI (defaults to the installed
             package version).
+        boot_mode: ``"standard"`` (default) or ``"chat-first"``; see
+            :func:`get_swagger_ui_html`.
+
+    Raises:
+        ValueError: If ``boot_mode`` is not one of :data:`BOOT_MODES`.
     """
+    _check_boot_mode(boot_mode)
     resolved_title = title or f"{app.title} – LLM Docs"
     resolved_openapi_url = openapi_url or app.openapi_url or "/openapi.json"
 
@@ -173,4 +202,5 @@ def setup_docs(
             theme_css_url=theme_css_url,
             debug=debug,
             version=version,
+            boot_mode=boot_mode,
         )
@@ -0,0 +1,1076 @@
+"""Headless workflow runner: execute exported DocBuddy workflows without a browser.
+
+The runner mirrors the Workflow panel in ``static/workflow.js``: blocks form a
+dependency graph (a block without ``dependsOn`` follows the previous block),
+each block sees only its ancestors' history, and ``api_request`` tool calls are
+executed against the target API. Many workflow instances (one per input row)
+run concurrently on asyncio, sharing pooled keep-alive connections.
+
+Only the standard library is used so the CLI keeps working with the package's
+runtime dependencies alone.
+"""
+
+import argparse
+import asyncio
+import csv
+import http.client
+import io
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+_PACKAGE_DIR = Path(__file__).parent
+_PROMPT_CONFIG_PATH = _PACKAGE_DIR / "static" / "system-prompt-config.json"
+
+# Tool output is truncated to the same length as in the browser workflow panel
+MAX_TOOL_OUTPUT = 4000
+
+_TEMPLATE_VAR_RE = re.compile(r"\{\{\s*([A-Za-z_][\w.-]*)\s*\}\}")
+_BODY_METHODS = {"POST", "PUT", "PATCH"}
+_HTTP_METHODS = ["get", "post", "put", "patch", "delete", "head", "options"]
+_TOOL_METHODS = ["get", "post", "put", "patch", "delete"]
+
+
+@dataclass
+class RunnerConfig:
+    """Settings for a headless workflow run.
+
+    Attributes:
+        base_url: OpenAI-compatible LLM endpoint, e.g. ``http://localhost:11434/v1``.
+        model: Model identifier sent with every completion request.
+        api_key: Optional bearer token for the LLM endpoint.
+        temperature: Sampling temperature.
+        max_tokens: Maximum completion tokens per block.
+        preset: System prompt preset name from ``system-prompt-config.json``.
+        api_base_url: Base URL of the target API for tool calls.
+        tool_api_key: Optional bearer token for the target API.
+        enable_tools: Whether blocks may call the ``api_request`` tool.
+        concurrency: Maximum number of workflow instances running at once.
+        block_concurrency: Maximum number of blocks running at once per instance.
+        timeout: Per-request timeout in seconds.
+    """
+
+    base_url: str
+    model: str = "llama3"
+    api_key: str = ""
+    temperature: float = 0.7
+    max_tokens: int = 4096
+    preset: str = "api_assistant"
+    api_base_url: str = ""
+    tool_api_key: str = ""
+    enable_tools: bool = True
+    concurrency: int = 4
+    block_concurrency: int = 3
+    timeout: float = 120.0
+
+
+# ── Loading workflows and inputs ──────────────────────────────────────────────
+
+
+def load_workflow(data: Any) -> List[Dict[str, Any]]:
+    """Normalize a saved or exported workflow into a list of blocks.
+
+    Accepts the panel's saved format (``{"blocks": [{"id", "content", ...}]}``)
+    and the "Export" format (``[{"block": 1, "prompt": ..., "dependsOn": [..]}]``).
+
+    Args:
+        data: Parsed JSON of the workflow file.
+
+    Returns:
+        Blocks as dicts with ``id``, ``content``, ``enableTools`` and
+        ``dependsOn`` (a list of block ids, or ``None`` for the default chain).
+
+    Raises:
+        ValueError: If the data is not a recognised workflow format.
+    """
+    if isinstance(data, dict) and isinstance(data.get("blocks"), list):
+        blocks = []
+        for i, raw in enumerate(data["blocks"]):
+            if not isinstance(raw, dict):
+                raise ValueError(f"Workflow block {i + 1} is not an object")
+            depends_on = raw.get("dependsOn")
+            blocks.append(
+                {
+                    "id": str(raw.get("id") or f"block-{i + 1}"),
+                    "content": raw.get("content") or "",
+                    "enableTools": raw.get("enableTools") is not False,
+                    "dependsOn": [str(d) for d in depends_on]
+                    if isinstance(depends_on, list)
+                    else None,
+                }
+            )
+        return blocks
+
+    if isinstance(data, list):
+        blocks = []
+        for i, raw in enumerate(data):
+            if not isinstance(raw, dict) or "prompt" not in raw:
+                raise ValueError(f"Exported workflow entry {i + 1} has no 'prompt'")
+            depends_on = raw.get("dependsOn")
+            blocks.append(
+                {
+                    "id": f"block-{raw.get('block', i + 1)}",
+                    "content": raw.get("prompt") or "",
+                    "enableTools": True,
+                    "dependsOn": [f"block-{d}" for d in depends_on]
+                    if isinstance(depends_on, list)
+                    else None,
+                }
+            )
+        return blocks
+
+    raise ValueError(
+        "Unrecognised workflow format: expected {'blocks': [...]} or an exported list"
+    )
+
+
+def parse_input_table(text: str) -> List[Dict[str, Any]]:
+    """Parse workflow inputs: a JSON array of objects, or CSV with a header row.
+
+    Raises:
+        ValueError: If the inputs cannot be parsed.
+    """
+    trimmed = text.strip()
+    if not trimmed:
+        return []
+    if trimmed[0] in "[{":
+        data = json.loads(trimmed)
+        if isinstance(data, dict) and isinstance(data.get("rows"), list):
+            data = data["rows"]
+        if not isinstance(data, list):
+            raise ValueError("JSON input must be an array of objects")
+        for i, row in enumerate(data):
+            if not isinstance(row, dict):
+                raise ValueError(f"JSON row {i + 1} is not an object")
+        return data
+
+    reader = csv.reader(io.StringIO(trimmed))
+    rows = [r for r in reader if not (len(r) == 1 and not r[0].strip()) and r]
+    columns = [h.strip() for h in rows[0]]
+    for idx, col in enumerate(columns):
+        if not col:
+            raise ValueError(f"CSV header column {idx + 1} is empty")
+        if columns.index(col) != idx:
+            raise ValueError(f'Duplicate CSV column "{col}"')
+    return [
+        {col: (cells[i] if i < len(cells) else "") for i, col in enumerate(columns)}
+        for cells in rows[1:]
+    ]
+
+
+def render_template(template: str, variables: Dict[str, Any]) -> str:
+    """Replace ``{{name}}`` placeholders; unknown names are left untouched."""
+
+    def substitute(match: "re.Match[str]") -> str:
+        name = match.group(1)
+        if name not in variables:
+            return match.group(0)
+        value = variables[name]
+        if value is None:
+            return ""
+        if isinstance(value, (dict, list, bool)):
+            return json.dumps(value)
+        return str(value)
+
+    return _TEMPLATE_VAR_RE.sub(substitute, template or "")
+
+
+# ── Dependency graph ──────────────────────────────────────────────────────────
+
+
+def resolve_dependencies(blocks: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """Return each block's direct dependencies.
+
+    Blocks without an explicit list depend on the previous block. Only earlier
+    blocks may be referenced, which keeps the graph acyclic.
+    """
+    position = {b["id"]: i for i, b in enumerate(blocks)}
+    deps: Dict[str, List[str]] = {}
+    for i, block in enumerate(blocks):
+        explicit = block.get("dependsOn")
+        if isinstance(explicit, list):
+            deps[block["id"]] = [
+                d for d in explicit if d in position and position[d] < i
+            ]
+        else:
+            deps[block["id"]] = [blocks[i - 1]["id"]] if i > 0 else []
+    return deps
+
+
+def collect_ancestors(
+    blocks: List[Dict[str, Any]], deps: Dict[str, List[str]], block_id: str
+) -> List[str]:
+    """Return the ids of all transitive ancestors of a block, in block order."""
+    seen = set()
+    stack = list(deps.get(block_id, []))
+    while stack:
+        current = stack.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        stack.extend(deps.get(current, []))
+    return [b["id"] for b in blocks if b["id"] in seen]
+
+
+def critical_path(
+    blocks: List[Dict[str, Any]],
+    deps: Dict[str, List[str]],
+    durations: Dict[str, float],
+) -> List[str]:
+    """Return the longest duration-weighted chain of block ids."""
+    finish: Dict[str, float] = {}
+    via: Dict[str, Optional[str]] = {}
+    end: Optional[str] = None
+    for block in blocks:
+        bid = block["id"]
+        if bid not in durations:
+            continue
+        start, via[bid] = 0.0, None
+        for dep in deps[bid]:
+            if dep in finish and finish[dep] > start:
+                start, via[bid] = finish[dep], dep
+        finish[bid] = start + durations[bid]
+        if end is None or finish[bid] > finish[end]:
+            end = bid
+    path: List[str] = []
+    node = end
+    while node is not None:
+        path.insert(0, node)
+        node = via[node]
+    return path
+
+
+# ── Prompt and tool builders (ports of core.js) ───────────────────────────────
+
+
+def build_openapi_context(schema: Dict[str, Any]) -> str:
+    """Summarize an OpenAPI schema for the system prompt (port of ``buildOpenApiContext``)."""
+    if not isinstance(schema, dict):
+        return ""
+    lines: List[str] = []
+    info = schema.get("info") or {}
+    lines.append("# API Information")
+    lines.append("## " + (info.get("title") or "Untitled API"))
+    lines.append("Version: " + str(info.get("version") or "N/A"))
+    if info.get("description"):
+        lines += ["", "### Description", info["description"]]
+
+    servers = schema.get("servers") or []
+    if servers:
+        lines += ["", "### Base URLs"]
+        for server in servers:
+            url = server.get("url") or ""
+            desc = server.get("description") or ""
+            lines.append(f"- {url} ({desc})" if desc else f"- {url}")
+
+    paths = schema.get("paths") or {}
+    components_schemas = (schema.get("components") or {}).get("schemas") or {}
+    if paths:
+        lines += ["", "# API Endpoints"]
+        for path, path_item in paths.items():
+            if not isinstance(path_item, dict):
+                continue
+            lines += ["", f"## `{path}`"]
+            for method in _HTTP_METHODS:
+                operation = path_item.get(method)
+                if not isinstance(operation, dict):
+                    continue
+                lines.append("### " + method.upper())
+                if operation.get("summary"):
+                    lines.append("**Summary:** " + operation["summary"])
+                if operation.get("description"):
+                    lines.append("**Description:** " + operation["description"])
+                if operation.get("tags"):
+                    lines.append("**Tags:** " + ", ".join(operation["tags"]))
+
+                params = [
+                    p for p in operation.get("parameters") or [] if isinstance(p, dict)
+                ]
+                if params:
+                    lines += ["", "**Parameters:**"]
+                    for param in params:
+                        required = (
+                            "[required]" if param.get("required") else "[optional]"
+                        )
+                        lines.append(
+                            f"- `{param.get('name', 'unknown')}` ({param.get('in', 'query')}, {required})"
+                            f" - {param.get('description', '')}"
+                        )
+
+                content = ((operation.get("requestBody") or {}).get("content")) or {}
+                if content:
+                    lines += ["", "**Request Body:**"]
+                    for content_type, media_type in content.items():
+                        schema_def = (media_type or {}).get("schema") or {}
+                        if not isinstance(schema_def, dict):
+                            continue
+                        lines.append(f"- Content-Type: `{content_type}`")
+                        resolved = schema_def
+                        ref = schema_def.get("$ref")
+                        if isinstance(ref, str):
+                            ref_name = ref.replace("#/components/schemas/", "")
+                            if ref_name in components_schemas:
+                                resolved = components_schemas[ref_name]
+                                lines.append(f"- Schema: `{ref_name}`")
+                        if resolved.get("type") == "object" or resolved.get(
+                            "properties"
+                        ):
+                            required_fields = resolved.get("required") or []
+                            for prop_name in list(
+                                (resolved.get("properties") or {}).keys()
+                            )[:10]:
+                                prop = resolved["properties"][prop_name] or {}
+                                prop_type = prop.get("type") or "any"
+                                if prop_type == "array" and prop.get("items"):
+                                    item_ref = (
+                                        prop["items"].get("$ref") or ""
+                                    ).replace("#/components/schemas/", "")
+                                    prop_type = f"array[{item_ref or prop['items'].get('type') or 'object'}]"
+                                req = (
+                                    "required"
+                                    if prop_name in required_fields
+                                    else "optional"
+                                )
+                                desc = prop.get("description") or ""
+                                lines.append(
+                                    f"  - `{prop_name}` ({prop_type}, {req})"
+                                    + (f": {desc}" if desc else "")
+                                )
+
+                responses = operation.get("responses") or {}
+                if responses:
+                    lines += ["", "**Responses:**"]
+                    for status_code in sorted(responses):
+                        response = responses[status_code]
+                        if isinstance(response, dict):
+                            lines.append(
+                                f"- `{status_code}`: {response.get('description') or 'No description'}"
+                            )
+
+    if components_schemas:
+        lines += ["", "# Data Models (Schemas)"]
+        for schema_name in list(components_schemas.keys())[:20]:
+            schema_def = components_schemas[schema_name]
+            if not isinstance(schema_def, dict):
+                continue
+            lines += ["", f"## `{schema_name}`"]
+            if schema_def.get("description"):
+                lines.append(f"*{schema_def['description']}*")
+            props = schema_def.get("properties") or {}
+            if props:
+                lines += ["", "**Properties:**"]
+                required_fields = schema_def.get("required") or []
+                for prop_name in list(props.keys())[:10]:
+                    prop = props[prop_name]
+                    if not isinstance(prop, dict):
+                        continue
+                    req = "[required]" if prop_name in required_fields else "[optional]"
+                    lines.append(
+                        f"- `{prop_name}` ({prop.get('type') or 'any'}, {req}): {prop.get('description') or ''}"
+                    )
+
+    return "\n".join(lines)
+
+
+def build_api_request_tool(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the ``api_request`` tool definition (port of ``buildApiRequestTool``)."""
+    endpoints = []
+    for path, path_item in (schema.get("paths") or {}).items():
+        if not isinstance(path_item, dict):
+            continue
+        for method in _TOOL_METHODS:
+            operation = path_item.get(method)
+            if not isinstance(operation, dict):
+                continue
+            desc = f"{method.upper()} {path}"
+            if operation.get("summary"):
+                desc += " — " + operation["summary"]
+            endpoints.append(desc)
+
+    endpoint_list = (
+        ("\n" + "\n".join("- " + e for e in endpoints))
+        if endpoints
+        else "No endpoints found."
+    )
+    return {
+        "type": "function",
+        "function": {
+            "name": "api_request",
+            "description": "Execute an HTTP request against the API. Available endpoints:"
+            + endpoint_list,
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "method": {
+                        "type": "string",
+                        "enum": sorted(m.upper() for m in _TOOL_METHODS),
+                        "description": "HTTP method",
+                    },
+                    "path": {
+                        "type": "string",
+                        "description": "API endpoint path, e.g. /users/{id}",
+                    },
+                    "query_params": {
+                        "type": "object",
+                        "description": "Query string parameters as key-value pairs",
+                        "additionalProperties": True,
+                    },
+                    "path_params": {
+                        "type": "object",
+                        "description": "Path parameters to substitute in the URL template",
+                        "additionalProperties": True,
+                    },
+                    "body": {
+                        "type": "object",
+                        "description": "JSON request body (for POST/PUT/PATCH requests)",
+                        "additionalProperties": True,
+                    },
+                },
+                "required": ["method", "path"],
+            },
+        },
+    }
+
+
+def build_system_prompt(
+    preset: str, schema: Optional[Dict[str, Any]], tools_enabled: bool
+) -> str:
+    """Build a workflow block's system prompt the same way the panel does."""
+    try:
+        config = json.loads(_PROMPT_CONFIG_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        config = {}
+    presets = config.get("presets") or {}
+    prompt = (presets.get(preset) or presets.get("api_assistant") or {}).get(
+        "prompt"
+    ) or ("You are a helpful API assistant.\n\n{openapi_context}")
+    if "{openapi_context}" in prompt and schema:
+        prompt = prompt.replace(
+            "{openapi_context}", "\n\n" + build_openapi_context(schema) + "\n"
+        )
+
+    if tools_enabled:
+        prompt = re.sub(r"## Tool Calling Instructions[\s\S]*$", "", prompt).rstrip()
+        prompt += (
+            "\n\nUse the `api_request` tool via native tool calling when the user asks to call an API "
+            "endpoint. Do NOT output tool calls as JSON text — the system handles tool execution automatically."
+        )
+    return (
+        prompt
+        + "\n\nYou are executing a multi-step workflow. Be concise. Execute each instruction precisely."
+    )
+
+
+def resolve_api_base_url(
+    schema: Dict[str, Any], openapi_source: str, override: str = ""
+) -> str:
+    """Resolve the target API base URL for tool calls.
+
+    Follows the standalone order used in ``resolveApiBaseUrl``: explicit
+    override, Swagger 2.0 ``host``/``basePath``, OpenAPI ``servers``, then the
+    origin of the schema URL.
+    """
+    if override:
+        return override.rstrip("/")
+
+    source_origin = ""
+    if openapi_source.startswith(("http://", "https://")):
+        parsed = urllib.parse.urlsplit(openapi_source)
+        source_origin = f"{parsed.scheme}://{parsed.netloc}"
+
+    if schema.get("swagger"):
+        host = schema.get("host") or urllib.parse.urlsplit(source_origin).netloc
+        if host:
+            schemes = schema.get("schemes") or []
+            scheme = "https" if not schemes or "https" in schemes else schemes[0]
+            base = f"{scheme}://{host}"
+            if schema.get("basePath") and schema["basePath"] != "/":
+                base += schema["basePath"].rstrip("/")
+            return base
+
+    servers = schema.get("servers") or []
+    for server in servers:
+        url = (server.get("url") or "").strip()
+        if url.startswith(("http://", "https://")):
+            return url.rstrip("/")
+    if servers and source_origin:
+        first = (servers[0].get("url") or "").strip()
+        if first:
+            return (
+                source_origin + (first if first.startswith("/") else "/" + first)
+            ).rstrip("/")
+
+    return source_origin
+
+
+def build_tool_request(
+    args: Dict[str, Any], api_base_url: str, api_key: str = ""
+) -> Tuple[Optional[Tuple[str, str, Dict[str, str], Optional[bytes]]], Optional[str]]:
+    """Build ``(method, url, headers, body)`` for an ``api_request`` call.
+
+    Returns:
+        ``(request, None)`` on success or ``(None, error_message)`` when the
+        call is rejected (same rules as ``buildToolRequest`` in core.js).
+    """
+    method = str(args.get("method") or "GET").upper()
+    url = args.get("path") or ""
+    try:
+        url = urllib.parse.unquote(url, errors="strict")
+    except UnicodeDecodeError:
+        pass
+    if not url or not url.startswith("/"):
+        return None, "Tool call path must be a relative URL starting with /"
+
+    for key, value in (args.get("path_params") or {}).items():
+        url = url.replace("{" + str(key) + "}", urllib.parse.quote(str(value), safe=""))
+    if ".." in url:
+        return None, 'Tool call path must not contain ".."'
+
+    query = args.get("query_params") or {}
+    if query:
+        url += ("&" if "?" in url else "?") + urllib.parse.urlencode(
+            {k: str(v) for k, v in query.items()}, quote_via=urllib.parse.quote
+        )
+
+    headers: Dict[str, str] = {}
+    if api_key.strip():
+        headers["Authorization"] = "Bearer " + api_key.strip()
+    body = None
+    if method in _BODY_METHODS:
+        headers["Content-Type"] = "application/json"
+        body = json.dumps(args.get("body") or {}).encode("utf-8")
+    return (method, api_base_url + url, headers, body), None
+
+
+def build_curl_command(method: str, url: str, body: Optional[bytes]) -> str:
+    """Return a curl command for a tool call, as shown in workflow block output."""
+    cmd = f"curl -X {method} '{url}'"
+    cmd += " \\\n  -H 'Content-Type: application/json'"
+    if body and body != b"{}":
+        cmd += " \\\n  -d '" + json.dumps(json.loads(body), indent=2) + "'"
+    return cmd
+
+
+# ── Pooled HTTP ───────────────────────────────────────────────────────────────
+
+
+class ConnectionPool:
+    """Thread-safe pool of keep-alive ``http.client`` connections per origin.
+
+    Connections are checked out for the duration of one request, so concurrent
+    workflow instances reuse TCP (and TLS) sessions instead of reconnecting
+    for every LLM or API call.
+    """
+
+    def __init__(self, max_per_origin: int = 8, timeout: float = 120.0) -> None:
+        self._max_per_origin = max_per_origin
+        self._timeout = timeout
+        self._idle: Dict[
+            Tuple[str, str, int], "queue.LifoQueue[http.client.HTTPConnection]"
+        ] = {}
+        self._lock = threading.Lock()
+
+    def _origin(self, url: str) -> Tuple[Tuple[str, str, int], str]:
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Unsupported URL: {url}")
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+        return (parts.scheme, parts.hostname, port), target
+
+    def _idle_queue(
+        self, origin: Tuple[str, str, int]
+    ) -> "queue.LifoQueue[http.client.HTTPConnection]":
+        with self._lock:
+            if origin not in self._idle:
+                self._idle[origin] = queue.LifoQueue(maxsize=self._max_per_origin)
+            return self._idle[origin]
+
+    def _new_connection(
+        self, origin: Tuple[str, str, int]
+    ) -> http.client.HTTPConnection:
+        scheme, host, port = origin
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=self._timeout)
+        return http.client.HTTPConnection(host, port, timeout=self._timeout)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        body: Optional[bytes] = None,
+    ) -> Tuple[int, str, bytes]:
+        """Perform a blocking request and return ``(status, reason, body)``."""
+        origin, target = self._origin(url)
+        idle = self._idle_queue(origin)
+        try:
+            conn, reused = idle.get_nowait(), True
+        except queue.Empty:
+            conn, reused = self._new_connection(origin), False
+
+        try:
+            conn.request(method, target, body=body, headers=headers or {})
+            response = conn.getresponse()
+            data = response.read()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            conn.close()
+            if not reused:
+                raise
+            # The server closed an idle keep-alive connection; retry once on a fresh one
+            conn = self._new_connection(origin)
+            conn.request(method, target, body=body, headers=headers or {})
+            response = conn.getresponse()
+            data = response.read()
+        except Exception:
+            conn.close()
+            raise
+
+        if response.will_close:
+            conn.close()
+        else:
+            try:
+                idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+        return response.status, response.reason, data
+
+    def close(self) -> None:
+        """Close all idle connections."""
+        with self._lock:
+            queues = list(self._idle.values())
+            self._idle = {}
+        for idle in queues:
+            while True:
+                try:
+                    idle.get_nowait().close()
+                except queue.Empty:
+                    break
+
+
+class AsyncHttp:
+    """Run pooled blocking requests on a thread executor for asyncio callers."""
+
+    def __init__(self, pool: ConnectionPool, max_workers: int) -> None:
+        self._pool = pool
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="docbuddy-http"
+        )
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        body: Optional[bytes] = None,
+    ) -> Tuple[int, str, bytes]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, self._pool.request, method, url, headers, body
+        )
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+        self._pool.close()
+
+
+# ── Execution ─────────────────────────────────────────────────────────────────
+
+
+class WorkflowRunner:
+    """Run workflow instances concurrently and report per-block results.
+
+    Args:
+        config: Runner settings.
+        schema: The target API's OpenAPI schema.
+        http_client: Async HTTP client shared by all instances.
+        emit: Called with one JSON-serializable record per finished block and
+            per finished instance.
+    """
+
+    def __init__(
+        self,
+        config: RunnerConfig,
+        schema: Dict[str, Any],
+        http_client: AsyncHttp,
+        emit: Callable[[Dict[str, Any]], None],
+    ) -> None:
+        self.config = config
+        self.schema = schema
+        self.http = http_client
+        self.emit = emit
+        self._tool = build_api_request_tool(schema) if schema else None
+        self._prompts = {
+            flag: build_system_prompt(config.preset, schema, flag)
+            for flag in (True, False)
+        }
+
+    async def _complete(
+        self, messages: List[Dict[str, Any]], tools_enabled: bool
+    ) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {
+            "model": self.config.model,
+            "messages": messages,
+            "max_tokens": self.config.max_tokens,
+            "temperature": self.config.temperature,
+            "stream": False,
+        }
+        if tools_enabled and self._tool:
+            payload["tools"] = [self._tool]
+            payload["tool_choice"] = "auto"
+        headers = {"Content-Type": "application/json"}
+        if self.config.api_key:
+            headers["Authorization"] = "Bearer " + self.config.api_key
+        status, reason, body = await self.http.request(
+            "POST",
+            self.config.base_url.rstrip("/") + "/chat/completions",
+            headers,
+            json.dumps(payload).encode("utf-8"),
+        )
+        text = body.decode("utf-8", errors="replace")
+        if status >= 400:
+            raise RuntimeError(
+                f"HTTP {status}: {reason}" + (f" - {text}" if text else "")
+            )
+        data = json.loads(text)
+        if data.get("error"):
+            error = data["error"]
+            raise RuntimeError(
+                error
+                if isinstance(error, str)
+                else error.get("message") or json.dumps(error)
+            )
+        return (data.get("choices") or [{}])[0].get("message") or {}
+
+    async def _execute_tool(self, tool_call: Dict[str, Any]) -> Tuple[str, str]:
+        try:
+            args = json.loads(
+                (tool_call.get("function") or {}).get("arguments") or "{}"
+            )
+        except ValueError:
+            args = {}
+        if not isinstance(args, dict):
+            args = {}
+        request, error = build_tool_request(
+            args, self.config.api_base_url, self.config.tool_api_key
+        )
+        if error or request is None:
+            return "", "Error: " + (error or "invalid tool call")
+        method, url, headers, body = request
+        curl = build_curl_command(method, url, body)
+        try:
+            status, reason, data = await self.http.request(method, url, headers, body)
+        except (OSError, ValueError, http.client.HTTPException) as exc:
+            # ValueError: the pool only accepts absolute http(s) URLs
+            return curl, f"Error: {exc}"
+        text = data.decode("utf-8", errors="replace")
+        return curl, f"Status: {status} {reason}\n\n{text[:MAX_TOOL_OUTPUT]}"
+
+    async def run_block(
+        self, block: Dict[str, Any], history: List[Dict[str, Any]]
+    ) -> Tuple[str, List[Dict[str, Any]], int]:
+        """Run one block; return ``(output, history_slice, tool_call_count)``."""
+        tools_enabled = self.config.enable_tools and block.get("enableTools", True)
+        user_message = {"role": "user", "content": block["content"]}
+        messages = [
+            {
+                "role": "system",
+                "content": self._prompts[bool(tools_enabled and self._tool)],
+            }
+        ]
+        messages += history + [user_message]
+
+        message = await self._complete(messages, bool(tools_enabled))
+        output = message.get("content") or ""
+        tool_messages: List[Dict[str, Any]] = []
+        tool_calls = message.get("tool_calls") or []
+        if tool_calls:
+            tool_messages.append(
+                {"role": "assistant", "content": None, "tool_calls": tool_calls}
+            )
+            # Tool calls within a block run sequentially, as in the panel
+            for tool_call in tool_calls:
+                curl, result = await self._execute_tool(tool_call)
+                tool_messages.append(
+                    {
+                        "role": "tool",
+                        "tool_call_id": tool_call.get("id", ""),
+                        "content": result,
+                    }
+                )
+                output += (
+                    ("\n\n[Tool Call]\n" + curl if curl else "")
+                    + "\n\n[Tool Result]\n"
+                    + result
+                )
+        history_slice = (
+            [user_message] + tool_messages + [{"role": "assistant", "content": output}]
+        )
+        return output, history_slice, len(tool_calls)
+
+    async def run_instance(
+        self, blocks: List[Dict[str, Any]], row: int, variables: Dict[str, Any]
+    ) -> bool:
+        """Run every block of one workflow instance; return True if all succeeded."""
+        deps = resolve_dependencies(blocks)
+        rendered = [
+            dict(b, content=render_template(b["content"], variables)) for b in blocks
+        ]
+        histories: Dict[str, List[Dict[str, Any]]] = {}
+        durations: Dict[str, float] = {}
+        done: Dict[str, asyncio.Future] = {
+            b["id"]: asyncio.get_running_loop().create_future() for b in blocks
+        }
+        semaphore = asyncio.Semaphore(max(1, self.config.block_concurrency))
+        failed = False
+        started_at = time.monotonic()
+
+        async def run_node(index: int, block: Dict[str, Any]) -> None:
+            nonlocal failed
+            try:
+                for dep in deps[block["id"]]:
+                    await done[dep]
+                history: List[Dict[str, Any]] = []
+                for ancestor in collect_ancestors(rendered, deps, block["id"]):
+                    history += histories.get(ancestor, [])
+                async with semaphore:
+                    block_start = time.monotonic()
+                    record: Dict[str, Any] = {
+                        "type": "block",
+                        "row": row,
+                        "block": index + 1,
+                        "id": block["id"],
+                    }
+                    try:
+                        output, history_slice, tool_count = await self.run_block(
+                            block, history
+                        )
+                        histories[block["id"]] = history_slice
+                        record.update(
+                            status="done", output=output, tool_calls=tool_count
+                        )
+                    except Exception as exc:  # noqa: BLE001 - reported per block, run continues
+                        failed = True
+                        output = f"Error: {exc}"
+                        histories[block["id"]] = [
+                            {"role": "user", "content": block["content"]},
+                            {"role": "assistant", "content": output},
+                        ]
+                        record.update(status="error", output=output, tool_calls=0)
+                    durations[block["id"]] = (time.monotonic() - block_start) * 1000
+                    record["duration_ms"] = round(durations[block["id"]], 1)
+                    record["prompt"] = block["content"]
+                    self.emit(record)
+            finally:
+                if not done[block["id"]].done():
+                    done[block["id"]].set_result(None)
+
+        await asyncio.gather(*(run_node(i, b) for i, b in enumerate(rendered)))
+        self.emit(
+            {
+                "type": "instance",
+                "row": row,
+                "inputs": variables,
+                "status": "error" if failed else "done",
+                "duration_ms": round((time.monotonic() - started_at) * 1000, 1),
+                "critical_path": [
+                    next(i + 1 for i, b in enumerate(blocks) if b["id"] == bid)
+                    for bid in critical_path(rendered, deps, durations)
+                ],
+            }
+        )
+        return not failed
+
+    async def run(
+        self, blocks: List[Dict[str, Any]], rows: List[Dict[str, Any]]
+    ) -> bool:
+        """Run one instance per input row (a single instance when there are none)."""
+        semaphore = asyncio.Semaphore(max(1, self.config.concurrency))
+
+        async def bounded(row: int, variables: Dict[str, Any]) -> bool:
+            async with semaphore:
+                return await self.run_instance(blocks, row, variables)
+
+        results = await asyncio.gather(
+            *(bounded(i + 1, v) for i, v in enumerate(rows or [{}]))
+        )
+        return all(results)
+
+
+# ── CLI ───────────────────────────────────────────────────────────────────────
+
+
+def _load_openapi(source: str, pool: ConnectionPool) -> Dict[str, Any]:
+    if source.startswith(("http://", "https://")):
+        status, reason, body = pool.request(
+            "GET", source, {"Accept": "application/json"}
+        )
+        if status >= 400:
+            raise ValueError(f"Could not fetch OpenAPI schema: HTTP {status} {reason}")
+        return json.loads(body.decode("utf-8"))
+    return json.loads(Path(source).read_text(encoding="utf-8"))
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Register the ``run-workflow`` arguments on ``parser``."""
+    parser.add_argument(
+        "workflow",
+        help="Workflow JSON (saved panel workflow or an export from the Workflow tab)",
+    )
+    parser.add_argument(
+        "--openapi", required=True, help="OpenAPI schema URL or file path"
+    )
+    parser.add_argument(
+        "--inputs",
+        help="CSV or JSON file with one row per workflow instance ({{column}} placeholders)",
+    )
+    parser.add_argument(
+        "--output", "-o", help="Write JSONL results to this file (default: stdout)"
+    )
+    parser.add_argument(
+        "--base-url",
+        default=os.environ.get("DOCBUDDY_LLM_BASE_URL", "http://localhost:11434/v1"),
+        help="OpenAI-compatible LLM endpoint (default: $DOCBUDDY_LLM_BASE_URL or http://localhost:11434/v1)",
+    )
+    parser.add_argument(
+        "--model",
+        default=os.environ.get("DOCBUDDY_LLM_MODEL", "llama3"),
+        help="Model id",
+    )
+    parser.add_argument(
+        "--api-key",
+        default=os.environ.get("DOCBUDDY_LLM_API_KEY", ""),
+        help="LLM API key (default: $DOCBUDDY_LLM_API_KEY)",
+    )
+    parser.add_argument(
+        "--temperature",
+        type=float,
+        default=0.7,
+        help="Sampling temperature (default: 0.7)",
+    )
+    parser.add_argument(
+        "--max-tokens",
+        type=int,
+        default=4096,
+        help="Max completion tokens per block (default: 4096)",
+    )
+    parser.add_argument(
+        "--preset",
+        default="api_assistant",
+        help="System prompt preset (default: api_assistant)",
+    )
+    parser.add_argument(
+        "--api-base-url",
+        default="",
+        help="Target API base URL for tool calls (default: from the schema)",
+    )
+    parser.add_argument(
+        "--tool-api-key",
+        default=os.environ.get("DOCBUDDY_TOOL_API_KEY", ""),
+        help="Bearer token for the target API (default: $DOCBUDDY_TOOL_API_KEY)",
+    )
+    parser.add_argument(
+        "--no-tools", action="store_true", help="Disable api_request tool calling"
+    )
+    parser.add_argument(
+        "--concurrency",
+        "-c",
+        type=int,
+        default=4,
+        help="Workflow instances in parallel (default: 4)",
+    )
+    parser.add_argument(
+        "--block-concurrency",
+        type=int,
+        default=3,
+        help="Blocks in parallel per instance (default: 3)",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=120.0,
+        help="Per-request timeout in seconds (default: 120)",
+    )
+
+
+def run_from_args(args: argparse.Namespace) -> int:
+    """Execute ``docbuddy run-workflow``; return the process exit code."""
+    try:
+        blocks = load_workflow(
+            json.loads(Path(args.workflow).read_text(encoding="utf-8"))
+        )
+        rows = (
+            parse_input_table(Path(args.inputs).read_text(encoding="utf-8"))
+            if args.inputs
+            else []
+        )
+    except (OSError, ValueError) as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 2
+
+    pool = ConnectionPool(
+        max_per_origin=max(args.concurrency * args.block_concurrency, 1),
+        timeout=args.timeout,
+    )
+    try:
+        schema = _load_openapi(args.openapi, pool)
+    except (OSError, ValueError, http.client.HTTPException) as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 2
+
+    api_base_url = resolve_api_base_url(schema, args.openapi, args.api_base_url)
+    uses_tools = not args.no_tools and any(b.get("enableTools", True) for b in blocks)
+    if uses_tools and not api_base_url:
+        print(
+            "Error: could not determine the API base URL from the OpenAPI schema; "
+            "pass --api-base-url (or --no-tools)",
+            file=sys.stderr,
+        )
+        return 2
+
+    config = RunnerConfig(
+        base_url=args.base_url,
+        model=args.model,
+        api_key=args.api_key,
+        temperature=args.temperature,
+        max_tokens=args.max_tokens,
+        preset=args.preset,
+        api_base_url=api_base_url,
+        tool_api_key=args.tool_api_key,
+        enable_tools=not args.no_tools,
+        concurrency=args.concurrency,
+        block_concurrency=args.block_concurrency,
+        timeout=args.timeout,
+    )
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    write_lock = threading.Lock()
+
+    def emit(record: Dict[str, Any]) -> None:
+        with write_lock:
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+
+    http_client = AsyncHttp(
+        pool, max_workers=max(config.concurrency * config.block_concurrency, 1) + 2
+    )
+    try:
+        ok = asyncio.run(
+            WorkflowRunner(config, schema, http_client, emit).run(blocks, rows)
+        )
+    finally:
+        http_client.close()
+        if out is not sys.stdout:
+            out.close()
+    return 0 if ok else 1
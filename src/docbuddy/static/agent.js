@@ -59,18 +59,31 @@
           DB.saveAgentHistory(history);
         }, 500);
 
+        // History written by another docs tab; ignored mid-stream
+        this._onHistorySync = function(e) {
+          if (e.detail.panel === 'agent' && !this.state.isTyping) {
+            this.setState({ agentHistory: e.detail.messages });
+          }
+        }.bind(this);
+
         DB.initMarked();
       }
 
       componentDidMount() {
         this.fetchOpenApiSchema();
+        window.addEventListener('docbuddy-history-sync', this._onHistorySync);
       }
 
       componentWillUnmount() {
+        window.removeEventListener('docbuddy-history-sync', this._onHistorySync);
         if (this._currentCancelToken) {
           this._currentCancelToken.abort();
           this._currentCancelToken = null;
         }
+        if (this._toolCallController) {
+          this._toolCallController.abort();
+          this._toolCallController = null;
+        }
         if (this._copyTimeoutId) {
           clearTimeout(this._copyTimeoutId);
           this._copyTimeoutId = null;
@@ -121,6 +134,9 @@
         if (this._currentCancelToken) {
           this._currentCancelToken.abort();
         }
+        if (this._toolCallController) {
+          this._toolCallController.abort();
+        }
       }
 
       handleContinue() {
@@ -159,6 +175,7 @@
 
         var toolCallId = s.pendingToolCall.id;
         var toolCallName = (s.pendingToolCall.function && s.pendingToolCall.function.name) || 'api_request';
+        var toolFunction = DB.apiArgsToToolFunction(toolCallName, executedArgs);
 
         // Linear history: update the in-history assistant tool_calls message in place
         // with the user's edited arguments. No out-of-band buffers, no race with
@@ -169,14 +186,12 @@
             var matches = m.tool_calls.some(function(tc) { return tc.id === toolCallId; });
             if (!matches) return m;
             return Object.assign({}, m, {
-              _displayContent: 'Tool call: ' + toolCallName + '(' + executedArgs.method + ' ' + executedArgs.path + ')',
+              _displayContent: 'Tool call: ' + toolFunction.name + '(' + executedArgs.method + ' ' + executedArgs.path + ')',
               _toolArgs: executedArgs,
               tool_calls: m.tool_calls.map(function(tc) {
                 if (tc.id !== toolCallId) return tc;
                 return Object.assign({}, tc, {
-                  function: Object.assign({}, tc.function, {
-                    arguments: JSON.stringify(executedArgs)
-                  })
+                  function: Object.assign({}, tc.function, toolFunction)
                 });
               })
             });
@@ -192,67 +207,7 @@
         var self = this;
         var s = this.state;
 
-        var url = s.editPath;
-
-        try { url = decodeURIComponent(url); } catch (e) { console.warn('Failed to decode URL component:', e); }
-        if (!url || !/^\//.test(url)) {
-          console.error('[Agent Tool Call] Rejected invalid path:', url);
-          var rejectObj = { status: 0, statusText: 'Blocked', body: 'Tool call path must be a relative URL starting with /' };
-          self.setState({ toolCallResponse: rejectObj });
-          self.sendToolResult(rejectObj);
-          return;
-        }
-
-        try {
-          var pathParams = JSON.parse(s.editPathParams || '{}');
-          Object.keys(pathParams).forEach(function(key) {
-            url = url.replace('{' + key + '}', encodeURIComponent(pathParams[key]));
-          });
-          if (/\.\./.test(url)) {
-            console.error('[Agent Tool Call] Rejected path with ".." after param substitution:', url);
-            var rejectObj = { status: 0, statusText: 'Blocked', body: 'Tool call path must not contain ".."' };
-            self.setState({ toolCallResponse: rejectObj });
-            self.sendToolResult(rejectObj);
-            return;
-          }
-        } catch (e) { console.warn('Failed to apply path params:', e); }
-
-        try {
-          var queryParams = JSON.parse(s.editQueryParams || '{}');
-          var queryKeys = Object.keys(queryParams);
-          if (queryKeys.length > 0) {
-            var qs = queryKeys.map(function(k) {
-              return encodeURIComponent(k) + '=' + encodeURIComponent(queryParams[k]);
-            }).join('&');
-            url += (url.indexOf('?') >= 0 ? '&' : '?') + qs;
-          }
-        } catch (e) { console.warn('Failed to parse query params:', e); }
-
-        // Use the new resolveApiBaseUrl function which handles:
-        // 1. User-configured API Base URL (highest priority)
-        // 2. OpenAPI schema servers array
-        // 3. Auto-detect from loaded schema URL
-        // 4. Fallback to page origin (for local development)
-        var apiBaseUrl = DB.resolveApiBaseUrl(DB._cachedOpenapiSchema);
-        url = apiBaseUrl + url;
-
-        var fetchHeaders = {};
-        var toolSettings = DB.loadToolSettings();
-        var toolApiKey = toolSettings.apiKey && typeof toolSettings.apiKey === 'string' ? toolSettings.apiKey.trim() : '';
-        if (toolApiKey) {
-          fetchHeaders['Authorization'] = 'Bearer ' + toolApiKey;
-        }
-
         var hasBody = (s.editMethod === 'POST' || s.editMethod === 'PUT' || s.editMethod === 'PATCH') && s.editBody;
-        if (hasBody) {
-          fetchHeaders['Content-Type'] = 'application/json';
-        }
-
-        var fetchOpts = {
-          method: s.editMethod,
-          headers: fetchHeaders,
-        };
-
         if (hasBody) {
           try {
             JSON.parse(s.editBody);
@@ -262,26 +217,46 @@
             self.sendToolResult(parseErrObj);
             return;
           }
-          fetchOpts.body = s.editBody;
         }
 
         self.setState({ toolCallResponse: { status: 'loading', body: '' } });
         window.dispatchEvent(new CustomEvent('docbuddy-agent-streaming', { detail: { streaming: true } }));
 
-        fetch(url, fetchOpts)
-          .then(function(res) {
-            return res.text().then(function(text) {
-              var responseObj = { status: res.status, statusText: res.statusText, body: text };
-              self.setState({ toolCallResponse: responseObj });
-              self.sendToolResult(responseObj);
-            });
-          })
-          .catch(function(err) {
-            var responseObj = { status: 0, statusText: 'Network Error', body: err.message };
-            console.error('[Agent Tool Call Error]', err.message);
-            self.setState({ toolCallResponse: responseObj });
-            self.sendToolResult(responseObj);
+        // Reuse the speculative GET started while the model was still streaming
+        // when the executed arguments are unchanged; otherwise fetch now.
+        var signal = self._toolCallController ? self._toolCallController.signal : undefined;
+        var pending = DB.claimSpeculativeToolCall(self._speculativeTools, s.pendingToolCall, executedArgs) ||
+          DB.executeToolRequest(executedArgs, signal);
+
+        pending.then(function(responseObj) {
+          self.setState({ toolCallResponse: responseObj });
+          self.sendToolResult(responseObj);
+        }, function(err) {
+          if (err && err.name === 'AbortError') {
+            self._cancelToolCalls();
+          } else {
+            console.error('[Tool Call Error]', err && err.message);
+          }
+        });
+      }
+
+      // Answer every cancelled tool call (including queued ones) with a tool
+      // message so the history still pairs each call with a result.
+      _cancelToolCalls() {
+        var self = this;
+        var s = this.state;
+        var calls = (s.pendingToolCall ? [s.pendingToolCall] : []).concat(s.pendingToolCallQueue || []);
+        calls.forEach(function(tc) {
+          self.addMessage({
+            role: 'tool',
+            content: 'Error: the request was cancelled by the user',
+            tool_call_id: tc.id,
+            messageId: DB.generateMessageId(),
+            _displayContent: 'Tool call cancelled'
           });
+        });
+        this.setState({ pendingToolCall: null, pendingToolCallQueue: [], toolCallResponse: null, isTyping: false });
+        window.dispatchEvent(new CustomEvent('docbuddy-agent-streaming', { detail: { streaming: false } }));
       }
 
       sendToolResult(responseObj) {
@@ -316,18 +291,25 @@
         }
 
         var toolCallId = s.pendingToolCall ? s.pendingToolCall.id : 'call_unknown';
+        DB.recordToolCallOutcome(s.pendingToolCall && s.pendingToolCall.function && s.pendingToolCall.function.name, responseObj);
         var isError = responseObj.status < 200 || responseObj.status >= 300;
         var remainingQueue = (s.pendingToolCallQueue || []).slice();
 
-        var body = responseObj.body || '';
-        var resultContent = 'Status: ' + responseObj.status + ' ' + (responseObj.statusText || '') + '\n\n' + body;
+        var resultContent = DB.formatToolResult(responseObj);
+        var truncation = responseObj.truncation && responseObj.truncation.reason ? responseObj.truncation : null;
+        var truncationNote = DB.describeTruncation(truncation);
 
         var toolResultMsg = {
           role: 'tool',
           content: resultContent,
           tool_call_id: toolCallId,
           messageId: DB.generateMessageId(),
-          _displayContent: 'Tool result: Status ' + responseObj.status
+          _displayContent: (responseObj.validationErrors
+            ? 'Tool call rejected: ' + responseObj.validationErrors.length + ' invalid argument(s), request not sent'
+            : 'Tool result: Status ' + responseObj.status) + (truncationNote ? ' · ' + truncationNote : '') +
+            (responseObj.compaction ? ' · ' + DB.describeCompaction(responseObj.compaction) : ''),
+          _truncation: truncation,
+          _compaction: responseObj.compaction || null
         };
 
         // Linear history: handleExecuteToolCall already wrote the assistant
@@ -339,8 +321,7 @@
           // More tool calls from the same LLM response — advance the queue and execute
           // the next one. Do NOT re-stream until all tool results have been collected.
           var nextTc = remainingQueue[0];
-          var nextArgs = {};
-          try { nextArgs = JSON.parse(nextTc.function.arguments || '{}'); } catch (e) {}
+          var nextArgs = DB.toolCallToApiArgs(nextTc);
           self.setState({
             pendingToolCall: nextTc,
             pendingToolCallQueue: remainingQueue.slice(1),
@@ -446,22 +427,24 @@
         });
       }
 
-      _streamWithPrompt(apiMessages, streamMsgId, fullSchema, settings, toolSettings, selectedPreset) {
+      // `forceRole` re-runs a step under another model role (see onDone below)
+      _streamWithPrompt(apiMessages, streamMsgId, fullSchema, settings, toolSettings, selectedPreset, forceRole) {
         var self = this;
 
-        var systemPrompt = DB.getSystemPromptForPreset(selectedPreset, fullSchema);
-
-        // Append mode context
-        if (self.state.mode === 'plan') {
-          systemPrompt += "\n\nYou are currently in PLAN mode. Focus on understanding the user's request, asking clarification questions if needed, and proposing a clear step-by-step plan. Do NOT execute tools yet — wait for the user to switch to Act mode or approve the plan.";
-        } else {
-          systemPrompt += "\n\nYou are currently in ACT mode. Execute the plan using available tools. Be autonomous — call tools, process results, and iterate until the task is complete. Signal each step clearly. Current iteration: " + (self.state.iterationCount + 1) + "/" + MAX_AGENT_ITERATIONS + ".";
-        }
-
-        if (toolSettings.enableTools) {
-          systemPrompt = systemPrompt.replace(/## Tool Calling Instructions[\s\S]*$/, '').trimEnd();
-          systemPrompt += "\n\nUse the `api_request` tool via native tool calling when executing API calls. Do NOT output tool calls as JSON text — the system handles tool execution automatically. If a tool call returns an error, you may retry with corrected parameters (up to 3 times).";
-        }
+        var toolInstruction = toolSettings.enableTools
+          ? "Use " + DB.describeApiTools(toolSettings) + " via native tool calling when executing API calls. Do NOT output tool calls as JSON text — the system handles tool execution automatically. If a tool call returns an error, you may retry with corrected parameters (up to 3 times)."
+          : null;
+
+        // Mode context goes after the static prompt; the iteration counter
+        // changes every turn, so it rides on the newest message instead.
+        var modeNote = self.state.mode === 'plan'
+          ? "You are currently in PLAN mode. Focus on understanding the user's request, asking clarification questions if needed, and proposing a clear step-by-step plan. Do NOT execute tools yet — wait for the user to switch to Act mode or approve the plan."
+          : "You are currently in ACT mode. Execute the plan using available tools. Be autonomous — call tools, process results, and iterate until the task is complete. Signal each step clearly.";
+        var turnNote = self.state.mode === 'plan' ? null : "Agent iteration " + (self.state.iterationCount + 1) + "/" + MAX_AGENT_ITERATIONS;
+        var systemPrompt = DB.withSessionNotes(
+          DB.buildStaticSystemPrompt(selectedPreset, fullSchema, null, toolInstruction),
+          [modeNote]
+        );
 
         var messagesEl = null;
         var scrollToBottom = function() {
@@ -472,6 +455,9 @@
         self.addMessage({ role: 'assistant', content: '', messageId: streamMsgId });
 
         self._currentCancelToken = new AbortController();
+        self._speculativeTools = {};
+        // Tool calls from this stream (speculative or not) share its abort signal
+        self._toolCallController = self._currentCancelToken;
         self.setState({ isTyping: true });
         window.dispatchEvent(new CustomEvent('docbuddy-agent-streaming', { detail: { streaming: true } }));
 
@@ -501,18 +487,35 @@
           setTimeout(scrollToBottom, 30);
         };
 
-        var messages = [{ role: 'system', content: systemPrompt }].concat(apiMessages);
+        var tools = toolSettings.enableTools && fullSchema && self.state.mode === 'act' ? DB.buildToolsForTurn(fullSchema, apiMessages, toolSettings) : null;
+
+        // Tool-argument steps run on the fast model. Its prose is held back,
+        // since models often write a short preamble before calling a tool;
+        // only if its stream ends without a tool call does the step re-run on
+        // the strong model as the final synthesis. Tools stay in that payload
+        // so the strong model can still call an API. After a tool result with
+        // the iteration budget spent, the step goes straight to the strong
+        // model, and a further call stops at the iteration ceiling.
+        var role = forceRole || DB.classifyAgentStep(
+          self.state.mode, !!tools, apiMessages[apiMessages.length - 1],
+          self.state.iterationCount >= MAX_AGENT_ITERATIONS
+        );
+        var model = DB.modelForRole(settings, role);
+        var holdContent = role === 'tool' && DB.routesToSeparateModel(settings, 'tool');
+        var controller = self._currentCancelToken;
+        var roleSettings = Object.assign({}, settings, { modelId: model });
+        var messages = DB.withTurnNote(DB.fitContextWindow('agent', systemPrompt, apiMessages, roleSettings, tools), turnNote);
 
         var payload = {
           messages: messages,
-          model: settings.modelId || "llama3",
+          model: model,
           max_tokens: settings.maxTokens != null && settings.maxTokens !== '' ? parseInt(settings.maxTokens) : 4096,
           temperature: settings.temperature != null && settings.temperature !== '' ? parseFloat(settings.temperature) : 0.7,
           stream: true,
         };
 
-        if (toolSettings.enableTools && fullSchema && self.state.mode === 'act') {
-          payload.tools = [DB.buildApiRequestTool(fullSchema)];
+        if (tools) {
+          payload.tools = tools;
           payload.tool_choice = "auto";
         }
 
@@ -529,9 +532,11 @@
           baseUrl + "/chat/completions",
           payload,
           fetchHeaders,
-          self._currentCancelToken.signal,
+          controller.signal,
           {
+            role: role,
             onContent: function(delta, accum) {
+              if (holdContent) return;
               self.setState(function(prev) {
                 var history = prev.agentHistory || [];
                 if (history.length > 0 && history[history.length - 1].role === 'assistant' &&
@@ -548,10 +553,14 @@
               });
               scrollToBottom();
             },
+            onToolCallReady: function(toolCall) {
+              if (toolSettings.autoExecute && self.state.mode === 'act') {
+                DB.speculateToolCall(self._speculativeTools, toolCall, controller.signal);
+              }
+            },
             onToolCalls: function(toolCallsList) {
               var tc = toolCallsList[0];
-              var args = {};
-              try { args = JSON.parse(tc.function.arguments || '{}'); } catch (e) { args = {}; }
+              var args = DB.toolCallToApiArgs(tc);
 
               var assistantToolMsg = {
                 role: 'assistant',
@@ -562,7 +571,7 @@
                 // Pre-populate display fields so the curl command and method/path
                 // badge render correctly before the user edits or executes the call.
                 _toolArgs: args,
-                _displayContent: 'Tool call: api_request(' + (args.method || 'GET') + ' ' + (args.path || '') + ')',
+                _displayContent: 'Tool call: ' + tc.function.name + '(' + (args.method || 'GET') + ' ' + (args.path || '') + ')',
                 messageId: streamMsgId
               };
 
@@ -597,7 +606,13 @@
               window.dispatchEvent(new CustomEvent('docbuddy-agent-streaming', { detail: { streaming: false } }));
               self._currentCancelToken = null;
             },
-            onDone: function(accum) { finalize(accum, true); },
+            onDone: function(accum) {
+              if (holdContent) {
+                self._streamWithPrompt(apiMessages, streamMsgId, fullSchema, settings, toolSettings, selectedPreset, 'final');
+                return;
+              }
+              finalize(accum, true);
+            },
             onAbort: function(accum) { finalize(accum, true); },
             onNetworkError: function(err, accum) {
               if (err.name === 'AbortError') {
@@ -610,6 +625,9 @@
               if (typeof console !== 'undefined' && console && typeof console.error === 'function') {
                 console.error('Error processing streaming chunk:', data, e);
               }
+            },
+            onStats: function(stats) {
+              self._attachStats(streamMsgId, stats);
             }
           }
         );
@@ -666,6 +684,7 @@
 
       clearHistory() {
         DB.saveAgentHistory([]);
+        DB.saveContextSummary('agent', null);
         this.setState({ agentHistory: [], iterationCount: 0 });
       }
 
@@ -697,6 +716,22 @@
         };
       }
 
+      // Store token/latency stats on the assistant message they belong to
+      _attachStats(messageId, stats) {
+        var self = this;
+        self.setState(function(prev) {
+          var found = false;
+          var updated = (prev.agentHistory || []).map(function(m) {
+            if (m.messageId !== messageId || m.role !== 'assistant') return m;
+            found = true;
+            return Object.assign({}, m, { _stats: stats });
+          });
+          if (!found) return {};
+          self._debouncedSaveAgentHistory(updated);
+          return { agentHistory: updated };
+        });
+      }
+
       renderMessage(msg, idx) {
         var self = this;
         var isUser = msg.role === 'user';
@@ -747,7 +782,7 @@
                       fontSize: "12px", fontWeight: "600", color: "#f59e0b",
                       background: "rgba(245, 158, 11, 0.1)", padding: "2px 8px", borderRadius: "4px"
                     }
-                  }, "api_request"),
+                  }, msg.tool_calls[0].function.name || "api_request"),
                   React.createElement("span", {
                     style: {
                       background: tcMethod === 'POST' ? '#f59e0b' : '#10b981',
@@ -764,7 +799,8 @@
                   text: curlCommand,
                   language: "shell",
                   messageId: msg.messageId
-                })
+                }),
+                DB.renderLlmStats(React, msg._stats)
               )
             )
           );
@@ -860,7 +896,8 @@
               msg._errorInfo
                 ? this._renderErrorInChat(msg._errorInfo)
                 : this.formatMessageContent(msg.content, isStreamingThisMessage)
-            )
+            ),
+            isUser ? null : DB.renderLlmStats(React, msg._stats)
           )
         );
       }
@@ -936,7 +973,7 @@
           "div",
           { style: panelStyle },
           React.createElement("div", { style: headerStyle },
-            React.createElement("span", null, "api_request"),
+            React.createElement("span", null, (s.pendingToolCall.function && s.pendingToolCall.function.name) || "api_request"),
             React.createElement("span", { style: { color: "var(--theme-text-secondary)", fontWeight: "400", fontSize: "12px" } },
               s.editMethod + " " + s.editPath
             )
@@ -14,8 +14,9 @@
     return class ChatPanel extends React.Component {
       constructor(props) {
         super(props);
+        this._bootDraft = DB.takeBootDraft();
         this.state = {
-          input: "",
+          input: this._bootDraft.text,
           isTyping: false,
           isProcessingToolCall: false,
           chatHistory: DB.loadChatHistory(),
@@ -48,18 +49,36 @@
           DB.saveChatHistory(history);
         }, 500);
 
+        // History written by another docs tab; ignored mid-stream
+        this._onHistorySync = function(e) {
+          if (e.detail.panel === 'chat' && !this.state.isTyping) {
+            this.setState({ chatHistory: e.detail.messages });
+          }
+        }.bind(this);
+
         DB.initMarked();
       }
 
       componentDidMount() {
         this.fetchOpenApiSchema();
+        window.addEventListener('docbuddy-history-sync', this._onHistorySync);
+        if (this._bootDraft.focused) {
+          var input = document.querySelector('.llm-chat-input-area textarea');
+          if (input) input.focus();
+        }
+        DB.markBoot('chat-interactive');
       }
 
       componentWillUnmount() {
+        window.removeEventListener('docbuddy-history-sync', this._onHistorySync);
         if (this._currentCancelToken) {
           this._currentCancelToken.abort();
           this._currentCancelToken = null;
         }
+        if (this._toolCallController) {
+          this._toolCallController.abort();
+          this._toolCallController = null;
+        }
         if (this._copyTimeoutId) {
           clearTimeout(this._copyTimeoutId);
           this._copyTimeoutId = null;
@@ -104,6 +123,9 @@
         if (this._currentCancelToken) {
           this._currentCancelToken.abort();
         }
+        if (this._toolCallController) {
+          this._toolCallController.abort();
+        }
       }
 
       handleExecuteToolCall() {
@@ -122,84 +144,21 @@
 
         if (self._pendingToolCallMsg) {
           var toolMsg = Object.assign({}, self._pendingToolCallMsg, {
-            _displayContent: 'Tool call: api_request(' + executedArgs.method + ' ' + executedArgs.path + ')',
             _toolArgs: executedArgs
           });
           if (toolMsg.tool_calls && toolMsg.tool_calls.length > 0) {
             toolMsg.tool_calls = toolMsg.tool_calls.map(function(tc) {
               return Object.assign({}, tc, {
-                function: Object.assign({}, tc.function, {
-                  arguments: JSON.stringify(executedArgs)
-                })
+                function: Object.assign({}, tc.function, DB.apiArgsToToolFunction(tc.function.name, executedArgs))
               });
             });
+            toolMsg._displayContent = 'Tool call: ' + toolMsg.tool_calls[0].function.name + '(' + executedArgs.method + ' ' + executedArgs.path + ')';
           }
           self.addMessage(toolMsg);
           self._pendingToolCallMsg = null;
         }
 
-        var url = s.editPath;
-
-        try { url = decodeURIComponent(url); } catch (e) {}
-        if (!url || !/^\//.test(url)) {
-          console.error('[Tool Call] Rejected invalid path:', url);
-          var rejectObj = { status: 0, statusText: 'Blocked', body: 'Tool call path must be a relative URL starting with /' };
-          self.setState({ toolCallResponse: rejectObj });
-          self.sendToolResult(rejectObj);
-          return;
-        }
-
-        try {
-          var pathParams = JSON.parse(s.editPathParams || '{}');
-          Object.keys(pathParams).forEach(function(key) {
-            url = url.replace('{' + key + '}', encodeURIComponent(pathParams[key]));
-          });
-          // Re-validate after path params substitution to prevent bypass via path param values
-          if (/\.\./.test(url)) {
-            console.error('[Tool Call] Rejected path with ".." after param substitution:', url);
-            var rejectObj = { status: 0, statusText: 'Blocked', body: 'Tool call path must not contain ".."' };
-            self.setState({ toolCallResponse: rejectObj });
-            self.sendToolResult(rejectObj);
-            return;
-          }
-        } catch (e) { console.warn('Failed to apply path params:', e); }
-
-        try {
-          var queryParams = JSON.parse(s.editQueryParams || '{}');
-          var queryKeys = Object.keys(queryParams);
-          if (queryKeys.length > 0) {
-            var qs = queryKeys.map(function(k) {
-              return encodeURIComponent(k) + '=' + encodeURIComponent(queryParams[k]);
-            }).join('&');
-            url += (url.indexOf('?') >= 0 ? '&' : '?') + qs;
-          }
-        } catch (e) { console.warn('Failed to parse query params:', e); }
-
-        // Use the new resolveApiBaseUrl function which handles:
-        // 1. User-configured API Base URL (highest priority)
-        // 2. OpenAPI schema servers array
-        // 3. Auto-detect from loaded schema URL
-        // 4. Fallback to page origin (for local development)
-        var apiBaseUrl = DB.resolveApiBaseUrl(DB._cachedOpenapiSchema);
-        url = apiBaseUrl + url;
-
-        var fetchHeaders = {};
-        var toolSettings = DB.loadToolSettings();
-        var toolApiKey = toolSettings.apiKey && typeof toolSettings.apiKey === 'string' ? toolSettings.apiKey.trim() : '';
-        if (toolApiKey) {
-          fetchHeaders['Authorization'] = 'Bearer ' + toolApiKey;
-        }
-
         var hasBody = (s.editMethod === 'POST' || s.editMethod === 'PUT' || s.editMethod === 'PATCH') && s.editBody;
-        if (hasBody) {
-          fetchHeaders['Content-Type'] = 'application/json';
-        }
-
-        var fetchOpts = {
-          method: s.editMethod,
-          headers: fetchHeaders,
-        };
-
         if (hasBody) {
           try {
             JSON.parse(s.editBody);
@@ -209,25 +168,42 @@
             self.sendToolResult(parseErrObj);
             return;
           }
-          fetchOpts.body = s.editBody;
         }
 
         self.setState({ toolCallResponse: { status: 'loading', body: '' } });
 
-        fetch(url, fetchOpts)
-          .then(function(res) {
-            return res.text().then(function(text) {
-              var responseObj = { status: res.status, statusText: res.statusText, body: text };
-              self.setState({ toolCallResponse: responseObj });
-              self.sendToolResult(responseObj);
-            });
-          })
-          .catch(function(err) {
-            var responseObj = { status: 0, statusText: 'Network Error', body: err.message };
-            console.error('[Tool Call Error]', err.message);
-            self.setState({ toolCallResponse: responseObj });
-            self.sendToolResult(responseObj);
+        // Reuse the speculative GET started while the model was still streaming
+        // when the executed arguments are unchanged; otherwise fetch now.
+        var signal = self._toolCallController ? self._toolCallController.signal : undefined;
+        var pending = DB.claimSpeculativeToolCall(self._speculativeTools, s.pendingToolCall, executedArgs) ||
+          DB.executeToolRequest(executedArgs, signal);
+
+        pending.then(function(responseObj) {
+          self.setState({ toolCallResponse: responseObj });
+          self.sendToolResult(responseObj);
+        }, function(err) {
+          if (err && err.name === 'AbortError') {
+            self._cancelToolCalls();
+          } else {
+            console.error('[Tool Call Error]', err && err.message);
+          }
+        });
+      }
+
+      // Answer a cancelled tool call with a tool message so the history still
+      // pairs every tool call with a result, and leave the tool-call UI.
+      _cancelToolCalls() {
+        var s = this.state;
+        if (s.pendingToolCall) {
+          this.addMessage({
+            role: 'tool',
+            content: 'Error: the request was cancelled by the user',
+            tool_call_id: s.pendingToolCall.id,
+            messageId: DB.generateMessageId(),
+            _displayContent: 'Tool call cancelled'
           });
+        }
+        this.setState({ pendingToolCall: null, toolCallResponse: null, isTyping: false });
       }
 
       sendToolResult(responseObj) {
@@ -249,16 +225,23 @@
         }
 
         var toolCallId = s.pendingToolCall ? s.pendingToolCall.id : 'call_unknown';
+        DB.recordToolCallOutcome(s.pendingToolCall && s.pendingToolCall.function && s.pendingToolCall.function.name, responseObj);
 
-        var body = responseObj.body || '';
-        var resultContent = 'Status: ' + responseObj.status + ' ' + (responseObj.statusText || '') + '\n\n' + body;
+        var resultContent = DB.formatToolResult(responseObj);
+        var truncation = responseObj.truncation && responseObj.truncation.reason ? responseObj.truncation : null;
+        var truncationNote = DB.describeTruncation(truncation);
 
         var toolResultMsg = {
           role: 'tool',
           content: resultContent,
           tool_call_id: toolCallId,
           messageId: DB.generateMessageId(),
-          _displayContent: 'Tool result: Status ' + responseObj.status
+          _displayContent: (responseObj.validationErrors
+            ? 'Tool call rejected: ' + responseObj.validationErrors.length + ' invalid argument(s), request not sent'
+            : 'Tool result: Status ' + responseObj.status) + (truncationNote ? ' · ' + truncationNote : '') +
+            (responseObj.compaction ? ' · ' + DB.describeCompaction(responseObj.compaction) : ''),
+          _truncation: truncation,
+          _compaction: responseObj.compaction || null
         };
 
         var currentHistory = (self.state.chatHistory || []).slice();
@@ -422,12 +405,10 @@
       _streamWithPrompt(apiMessages, streamMsgId, fullSchema, settings, toolSettings, selectedPreset, customPromptText) {
         var self = this;
 
-        var systemPrompt = DB.getSystemPromptForPreset(selectedPreset, fullSchema, customPromptText);
-
-        if (toolSettings.enableTools) {
-          systemPrompt = systemPrompt.replace(/## Tool Calling Instructions[\s\S]*$/, '').trimEnd();
-          systemPrompt += "\n\nUse the `api_request` tool via native tool calling when the user asks to call an API endpoint. Do NOT output tool calls as JSON text — the system handles tool execution automatically. If a tool call returns an error, you may retry with corrected parameters (up to 3 times).";
-        }
+        var toolInstruction = toolSettings.enableTools
+          ? "Use " + DB.describeApiTools(toolSettings) + " via native tool calling when the user asks to call an API endpoint. Do NOT output tool calls as JSON text — the system handles tool execution automatically. If a tool call returns an error, you may retry with corrected parameters (up to 3 times)."
+          : null;
+        var systemPrompt = DB.buildStaticSystemPrompt(selectedPreset, fullSchema, customPromptText, toolInstruction);
 
         var chatMessagesEl = null;
         var scrollToBottom = function() {
@@ -438,6 +419,9 @@
         self.addMessage({ role: 'assistant', content: '', messageId: streamMsgId });
 
         self._currentCancelToken = new AbortController();
+        self._speculativeTools = {};
+        // Tool calls from this stream (speculative or not) share its abort signal
+        self._toolCallController = self._currentCancelToken;
         self.setState({ isTyping: true });
         window.dispatchEvent(new CustomEvent('docbuddy-chat-streaming', { detail: { streaming: true } }));
 
@@ -468,7 +452,8 @@
           setTimeout(scrollToBottom, 30);
         };
 
-        var messages = [{ role: 'system', content: systemPrompt }].concat(apiMessages);
+        var tools = toolSettings.enableTools && fullSchema ? DB.buildToolsForTurn(fullSchema, apiMessages, toolSettings) : null;
+        var messages = DB.fitContextWindow('chat', systemPrompt, apiMessages, settings, tools);
 
         var payload = {
           messages: messages,
@@ -478,8 +463,8 @@
           stream: true,
         };
 
-        if (toolSettings.enableTools && fullSchema) {
-          payload.tools = [DB.buildApiRequestTool(fullSchema)];
+        if (tools) {
+          payload.tools = tools;
           payload.tool_choice = "auto";
         }
 
@@ -515,10 +500,14 @@
               });
               scrollToBottom();
             },
+            onToolCallReady: function(toolCall) {
+              if (toolSettings.autoExecute) {
+                DB.speculateToolCall(self._speculativeTools, toolCall, self._currentCancelToken.signal);
+              }
+            },
             onToolCalls: function(toolCallsList) {
               var tc = toolCallsList[0];
-              var args = {};
-              try { args = JSON.parse(tc.function.arguments || '{}'); } catch (e) { args = {}; }
+              var args = DB.toolCallToApiArgs(tc);
 
               var assistantToolMsg = {
                 role: 'assistant',
@@ -566,6 +555,9 @@
               if (typeof console !== 'undefined' && console && typeof console.error === 'function') {
                 console.error('Error processing streaming chunk:', data, e);
               }
+            },
+            onStats: function(stats) {
+              self._attachStats(streamMsgId, stats);
             }
           }
         );
@@ -624,9 +616,30 @@
 
       clearHistory() {
         DB.saveChatHistory([]);
+        DB.saveContextSummary('chat', null);
         this.setState({ chatHistory: [] });
       }
 
+      // Store token/latency stats on the assistant message they belong to
+      _attachStats(messageId, stats) {
+        var self = this;
+        // A tool call awaiting confirmation is not in the history yet
+        if (self._pendingToolCallMsg && self._pendingToolCallMsg.messageId === messageId) {
+          self._pendingToolCallMsg = Object.assign({}, self._pendingToolCallMsg, { _stats: stats });
+        }
+        self.setState(function(prev) {
+          var found = false;
+          var updated = (prev.chatHistory || []).map(function(m) {
+            if (m.messageId !== messageId || m.role !== 'assistant') return m;
+            found = true;
+            return Object.assign({}, m, { _stats: stats });
+          });
+          if (!found) return {};
+          self._debouncedSaveChatHistory(updated);
+          return { chatHistory: updated };
+        });
+      }
+
       renderMessage(msg, idx) {
         var React = system.React;
         var self = this;
@@ -674,7 +687,7 @@
                       padding: "2px 8px",
                       borderRadius: "4px"
                     }
-                  }, "api_request"),
+                  }, msg.tool_calls[0].function.name || "api_request"),
                   React.createElement("span", {
                     style: {
                       background: tcMethod === 'POST' ? '#f59e0b' : '#10b981',
@@ -695,7 +708,8 @@
                   text: curlCommand,
                   language: "shell",
                   messageId: msg.messageId
-                })
+                }),
+                DB.renderLlmStats(React, msg._stats)
               )
             )
           );
@@ -791,7 +805,8 @@
               msg._errorInfo
                 ? this._renderErrorInChat(msg._errorInfo)
                 : this.formatMessageContent(msg.content, isStreamingThisMessage)
-            )
+            ),
+            isUser ? null : DB.renderLlmStats(React, msg._stats)
           )
         );
       }
@@ -849,7 +864,7 @@
           "div",
           { style: panelStyle },
           React.createElement("div", { style: headerStyle },
-            React.createElement("span", null, "api_request"),
+            React.createElement("span", null, (s.pendingToolCall.function && s.pendingToolCall.function.name) || "api_request"),
             React.createElement("span", { style: { color: "var(--theme-text-secondary)", fontWeight: "400", fontSize: "12px" } },
               s.editMethod + " " + s.editPath
             )
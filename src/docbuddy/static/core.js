@@ -258,7 +258,7 @@
     if (presetName === 'custom' && customPromptText) {
       var customPrompt = customPromptText;
       if (customPrompt.includes('{openapi_context}') && openapiSchema) {
-        var ctx = buildOpenApiContext(openapiSchema);
+        var ctx = getOpenApiContext(openapiSchema);
         customPrompt = customPrompt.replace('{openapi_context}', '\n\n' + ctx + '\n');
       }
       return customPrompt;
@@ -279,7 +279,7 @@
     var prompt = preset.prompt || '';
 
     if (prompt.includes('{openapi_context}') && openapiSchema) {
-      var context = buildOpenApiContext(openapiSchema);
+      var context = getOpenApiContext(openapiSchema);
       prompt = prompt.replace('{openapi_context}', '\n\n' + context + '\n');
     }
 
@@ -287,16 +287,85 @@
   }
   DocBuddy.getSystemPromptForPreset = getSystemPromptForPreset;
 
+  // ── Prefix-cache friendly prompt assembly ─────────────────────────────────
+  // vLLM prefix caching, llama.cpp cache_prompt and Ollama's KV reuse only
+  // help while the start of the prompt is byte-identical between requests.
+  // Requests are laid out from most to least stable:
+  //   1. static system prompt — preset + schema context + tool instructions,
+  //      built once per (preset, schema, tool instruction) and reused verbatim
+  //   2. session notes — text that changes rarely (agent mode, workflow
+  //      instructions, conversation summary), appended after the static part
+  //   3. history, oldest first
+  //   4. turn note — per-request text (e.g. the agent's iteration counter),
+  //      attached to the newest message so it never shifts the cached prefix
+  var _staticPromptCache = {};
+
+  /**
+   * The system prompt for a preset with its tool-calling section replaced by
+   * `toolInstruction` (or left as is when null). Memoized, so every turn gets
+   * the exact same string.
+   */
+  function buildStaticSystemPrompt(presetName, schema, customPromptText, toolInstruction) {
+    // Presets change once system-prompt-config.json has loaded
+    var key = [
+      presetName, SYSTEM_PROMPT_CONFIG ? 'config' : 'defaults', getSchemaHash(schema),
+      hashString(customPromptText || ''), toolInstruction || ''
+    ].join('|');
+    if (_staticPromptCache[key] != null) return _staticPromptCache[key];
+    var prompt = getSystemPromptForPreset(presetName, schema, customPromptText);
+    if (toolInstruction) {
+      prompt = prompt.replace(/## Tool Calling Instructions[\s\S]*$/, '').trimEnd() + '\n\n' + toolInstruction;
+    }
+    if (Object.keys(_staticPromptCache).length > 20) _staticPromptCache = {};
+    _staticPromptCache[key] = prompt;
+    return prompt;
+  }
+  DocBuddy.buildStaticSystemPrompt = buildStaticSystemPrompt;
+
+  /** Static prompt followed by the non-empty session notes, in order. */
+  function withSessionNotes(staticPrompt, notes) {
+    var extra = (notes || []).filter(function(n) { return n; });
+    return extra.length ? staticPrompt + '\n\n' + extra.join('\n\n') : staticPrompt;
+  }
+  DocBuddy.withSessionNotes = withSessionNotes;
+
+  /**
+   * Attach a per-turn note to the newest message of an assembled request
+   * (a copy; history itself is not changed).
+   */
+  function withTurnNote(messages, note) {
+    if (!note || !messages.length) return messages;
+    var last = messages[messages.length - 1];
+    if (last.role === 'system') return messages.concat([{ role: 'user', content: '[' + note + ']' }]);
+    var patched = Object.assign({}, last, { content: (last.content == null ? '' : last.content) + '\n\n[' + note + ']' });
+    return messages.slice(0, -1).concat([patched]);
+  }
+  DocBuddy.withTurnNote = withTurnNote;
+
   // ── LLM Provider configurations ─────────────────────────────────────────────
   var LLM_PROVIDERS = {
-    ollama: { name: 'Ollama', url: 'http://localhost:11434/v1' },
-    lmstudio: { name: 'LM Studio', url: 'http://localhost:1234/v1' },
-    vllm: { name: 'vLLM', url: 'http://localhost:8000/v1' },
-    custom: { name: 'Custom', url: '' }
+    ollama: { name: 'Ollama', url: 'http://localhost:11434/v1', guidedDecoding: 'format', adapter: 'ollama' },
+    lmstudio: { name: 'LM Studio', url: 'http://localhost:1234/v1', guidedDecoding: 'json_schema' },
+    vllm: { name: 'vLLM', url: 'http://localhost:8000/v1', guidedDecoding: 'guided_json' },
+    llamacpp: { name: 'llama.cpp', url: 'http://localhost:8080/v1', guidedDecoding: 'json_schema', adapter: 'llamacpp' },
+    custom: { name: 'Custom', url: '', guidedDecoding: 'json_schema' }
   };
   DocBuddy.LLM_PROVIDERS = LLM_PROVIDERS;
 
   // ── Build OpenAPI context from schema (for system prompt) ──────────────────
+  // Memoized per schema hash; tabs attaching to a shared schema receive the
+  // built text along with it (see Cross-tab sharing)
+  var _openApiContext = { hash: null, text: '' };
+
+  function getOpenApiContext(schema) {
+    var hash = getSchemaHash(schema);
+    if (_openApiContext.hash !== hash) {
+      _openApiContext = { hash: hash, text: buildOpenApiContext(schema) };
+    }
+    return _openApiContext.text;
+  }
+  DocBuddy.getOpenApiContext = getOpenApiContext;
+
   function buildOpenApiContext(schema) {
     if (!schema || typeof schema !== 'object') return '';
 
@@ -572,1117 +641,4661 @@
   }
   DocBuddy.buildApiRequestTool = buildApiRequestTool;
 
-  // ── Markdown parser initialization (marked.js) ────────────────────────────
-  var marked = (typeof window.marked !== 'undefined') ? window.marked : null;
-  function initMarked() {
-    if (!marked && typeof window.marked !== 'undefined') {
-      marked = window.marked;
-    }
-    return marked;
+  // ── Typed per-operation tools ─────────────────────────────────────────────
+  // Optional alternative to the generic api_request tool: one function per
+  // operation with its real parameter names and body schema, so the model
+  // does not have to guess them. Only the top-k operations most relevant to
+  // the recent conversation are sent each turn, plus api_request as a
+  // fallback when some operations were left out.
+  var TYPED_TOOL_INLINE_DEPTH = 4;
+  var DEFAULT_TYPED_TOOL_TOP_K = 8;
+  var _typedToolIndex = { hash: '', tools: [], byName: {} };
+
+  // Function-calling APIs take self-contained JSON schema: inline $refs,
+  // cutting recursion off at a fixed depth.
+  function inlineSchema(root, node, depth) {
+    node = resolveSchemaRef(root, node);
+    if (!node) return {};
+    if (depth >= TYPED_TOOL_INLINE_DEPTH) return node.type === 'array' ? { type: 'array' } : { type: node.type || 'object' };
+    var out = {};
+    Object.keys(node).forEach(function(k) {
+      var v = node[k];
+      if (k === 'properties' && v && typeof v === 'object') {
+        out.properties = {};
+        Object.keys(v).forEach(function(p) { out.properties[p] = inlineSchema(root, v[p], depth + 1); });
+      } else if ((k === 'items' || k === 'additionalProperties') && v && typeof v === 'object') {
+        out[k] = inlineSchema(root, v, depth + 1);
+      } else if ((k === 'allOf' || k === 'anyOf' || k === 'oneOf') && Array.isArray(v)) {
+        out[k] = v.map(function(sub) { return inlineSchema(root, sub, depth + 1); });
+      } else if (k === 'nullable' || k === 'example' || k === 'examples' || k === 'xml' || k === 'readOnly' || k === 'writeOnly' || k === 'discriminator') {
+        // Not JSON schema, or irrelevant to a request
+      } else {
+        out[k] = v;
+      }
+    });
+    return out;
   }
-  DocBuddy.initMarked = initMarked;
 
-  // ── Parse Markdown safely ─────────────────────────────────────────────────
-  function _escapeHtml(text) {
-    return text.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;').replace(/"/g, '&quot;').replace(/'/g, '&#39;').replace(/\n/g, '<br>');
+  function typedToolName(operationId, method, path, taken) {
+    var base = operationId || (method + '_' + path.replace(/\{([^}]+)\}/g, 'by_$1'));
+    base = base.replace(/[^A-Za-z0-9_-]+/g, '_').replace(/^_+|_+$/g, '').slice(0, 60) || method;
+    var name = base;
+    for (var n = 2; taken[name] || name === 'api_request'; n++) name = base.slice(0, 60) + '_' + n;
+    return name;
   }
 
-  // Register DOMPurify hook to force rel="noopener noreferrer" on links
-  // with target="_blank" (prevents tabnapping via window.opener) while
-  // preserving any existing rel directives (e.g., "nofollow").
-  var _domPurifyHooksRegistered = false;
-  function _ensureDomPurifyHooks() {
-    if (_domPurifyHooksRegistered || typeof DOMPurify === 'undefined') return;
-    DOMPurify.addHook('afterSanitizeAttributes', function(node) {
-      if (node.tagName === 'A') {
-        var target = node.getAttribute('target');
-        if (target && target.toLowerCase() === '_blank') {
-          var existingRel = node.getAttribute('rel') || '';
-          var tokens = existingRel ? existingRel.split(/\s+/) : [];
-          var relSet = {};
-          for (var i = 0; i < tokens.length; i++) {
-            if (tokens[i]) {
-              relSet[tokens[i]] = true;
-            }
-          }
-          relSet.noopener = true;
-          relSet.noreferrer = true;
-          var combined = [];
-          for (var key in relSet) {
-            if (Object.prototype.hasOwnProperty.call(relSet, key)) {
-              combined.push(key);
-            }
-          }
-          node.setAttribute('rel', combined.join(' '));
+  function buildTypedToolIndex(schema) {
+    var tools = [];
+    var byName = {};
+    var paths = schema.paths || {};
+    Object.keys(paths).forEach(function(path) {
+      var pathItem = paths[path];
+      if (!pathItem || typeof pathItem !== 'object') return;
+      ['get', 'post', 'put', 'patch', 'delete'].forEach(function(method) {
+        var op = pathItem[method];
+        if (!op || typeof op !== 'object') return;
+        var name = typedToolName(op.operationId, method, path, byName);
+        var properties = {};
+        var required = [];
+        var params = {};
+        (pathItem.parameters || []).concat(op.parameters || []).forEach(function(p) {
+          p = resolveSchemaRef(schema, p);
+          if (!p || !p.name || (p['in'] !== 'path' && p['in'] !== 'query')) return;
+          params[p.name] = p['in'];
+          var prop = inlineSchema(schema, p.schema || { type: 'string' }, 1);
+          if (p.description) prop.description = p.description;
+          properties[p.name] = prop;
+          if ((p.required || p['in'] === 'path') && required.indexOf(p.name) < 0) required.push(p.name);
+        });
+        var bodyKey = null;
+        var requestBody = resolveSchemaRef(schema, op.requestBody);
+        var media = requestBody && requestBody.content && requestBody.content['application/json'];
+        if (media) {
+          bodyKey = params.body ? 'request_body' : 'body';
+          properties[bodyKey] = inlineSchema(schema, media.schema || { type: 'object' }, 1);
+          properties[bodyKey].description = properties[bodyKey].description || 'JSON request body';
+          if (requestBody.required) required.push(bodyKey);
         }
-      }
+        var summary = op.summary || op.description || '';
+        var tool = {
+          type: 'function',
+          function: {
+            name: name,
+            description: method.toUpperCase() + ' ' + path + (summary ? ' — ' + String(summary).slice(0, 300) : ''),
+            parameters: { type: 'object', properties: properties, required: required }
+          }
+        };
+        var searchText = [name, path, summary, op.description || '', (op.tags || []).join(' ')].join(' ');
+        tools.push({ tool: tool, terms: tokenizeForSearch(searchText) });
+        byName[name] = { method: method.toUpperCase(), path: path, params: params, bodyKey: bodyKey };
+      });
     });
-    _domPurifyHooksRegistered = true;
+    return { tools: tools, byName: byName };
   }
 
-  function parseMarkdown(text) {
-    if (!text || typeof text !== 'string') return '';
-    if (typeof DOMPurify === 'undefined') {
-      console.error('DOMPurify not loaded — refusing to render markdown. Falling back to plain text.');
-      return _escapeHtml(text);
+  function getTypedToolIndex(schema) {
+    var hash = getSchemaHash(schema);
+    if (_typedToolIndex.hash !== hash) {
+      var built = buildTypedToolIndex(schema);
+      _typedToolIndex = { hash: hash, tools: built.tools, byName: built.byName };
     }
-    _ensureDomPurifyHooks();
-    try {
-      if (marked) {
-        var html = marked.parse(text);
-        var sanitized = DOMPurify.sanitize(html, {
-          ALLOWED_TAGS: ['p', 'br', 'strong', 'b', 'em', 'i', 'u', 'a', 'code', 'pre',
-            'blockquote', 'ul', 'ol', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
-            'table', 'thead', 'tbody', 'tr', 'th', 'td', 'hr', 'span', 'div', 'del', 'sup', 'sub'],
-          ALLOWED_ATTR: ['href', 'target', 'rel', 'class', 'id', 'alt', 'title'],
-          ALLOW_DATA_ATTR: false
+    return _typedToolIndex;
+  }
+
+  // camelCase and snake_case split into words, plurals folded
+  function tokenizeForSearch(text) {
+    return String(text || '')
+      .replace(/([a-z])([A-Z])/g, '$1 $2')
+      .toLowerCase()
+      .split(/[^a-z0-9]+/)
+      .filter(function(t) { return t.length > 1; })
+      .map(function(t) { return t.length > 3 ? t.replace(/(ies)$/, 'y').replace(/s$/, '') : t; });
+  }
+
+  /**
+   * Pick the k operations whose names, paths, summaries and tags best match
+   * `queryText` (IDF-weighted term overlap), returned in schema order.
+   */
+  function selectTypedTools(schema, queryText, k) {
+    var index = getTypedToolIndex(schema);
+    var entries = index.tools;
+    k = k > 0 ? k : DEFAULT_TYPED_TOOL_TOP_K;
+    if (entries.length <= k) return entries.map(function(e) { return e.tool; });
+    var df = {};
+    entries.forEach(function(e) {
+      var seen = {};
+      e.terms.forEach(function(t) { if (!seen[t]) { seen[t] = true; df[t] = (df[t] || 0) + 1; } });
+    });
+    var query = {};
+    tokenizeForSearch(queryText).forEach(function(t) { query[t] = true; });
+    return entries
+      .map(function(e, i) {
+        var score = 0;
+        var counted = {};
+        e.terms.forEach(function(t) {
+          if (query[t] && !counted[t]) {
+            counted[t] = true;
+            score += Math.log(1 + entries.length / df[t]);
+          }
         });
-        if (/<script[\s>]/i.test(sanitized) || /\bon[a-z]+\s*=/i.test(sanitized)) {
-          console.error('DOMPurify produced suspicious output — falling back to plain text');
-          return _escapeHtml(text);
-        }
-        return sanitized;
-      }
-    } catch (e) {
-      console.error('Markdown parsing error:', e);
-    }
-    return _escapeHtml(text);
+        return { tool: e.tool, score: score, i: i };
+      })
+      .sort(function(a, b) { return b.score - a.score || a.i - b.i; })
+      .slice(0, k)
+      // Schema order, not score order: the same selection serializes the same
+      .sort(function(a, b) { return a.i - b.i; })
+      .map(function(e) { return e.tool; });
   }
-  DocBuddy.parseMarkdown = parseMarkdown;
+  DocBuddy.selectTypedTools = selectTypedTools;
 
-  // ── Theme default configurations ─────────────────────────────────────────────
-  var THEME_DEFINITIONS = {
-    dark: {
-      name: 'Dark',
-      primary: '#1d4ed8',
-      primaryHover: '#1e40af',
-      secondary: '#2d3748',
-      accent: '#718096',
-      background: '#0f172a',
-      panelBg: '#1f2937',
-      headerBg: '#111827',
-      borderColor: '#4a5568',
-      textPrimary: '#f7fafc',
-      textSecondary: '#cbd5e0',
-      inputBg: '#1f2937',
-    },
-    light: {
-      name: 'Light',
-      primary: '#2563eb',
-      primaryHover: '#1d4ed8',
-      secondary: '#e2e8f0',
-      accent: '#718096',
-      background: '#f7fafc',
-      panelBg: '#ffffff',
-      headerBg: '#edf2f7',
-      borderColor: '#cbd5e0',
-      textPrimary: '#1a202c',
-      textSecondary: '#4a5568',
-      inputBg: '#f7fafc',
+  /**
+   * Tools for one LLM turn. In 'typed' mode, the top-k typed operations for
+   * the latest user messages (plus api_request when operations were left
+   * out); otherwise the single generic api_request tool.
+   */
+  function buildToolsForTurn(schema, messages, toolSettings) {
+    if (!schema) return null;
+    if (!toolSettings || toolSettings.toolMode !== 'typed') return [buildApiRequestTool(schema)];
+    var queryText = (messages || [])
+      .filter(function(m) { return m && m.role === 'user' && typeof m.content === 'string'; })
+      .slice(-3)
+      .map(function(m) { return m.content; })
+      .join('\n');
+    var k = parseInt(toolSettings.toolTopK, 10) || DEFAULT_TYPED_TOOL_TOP_K;
+    var tools = selectTypedTools(schema, queryText, k);
+    if (getTypedToolIndex(schema).tools.length > tools.length) tools = tools.concat([buildApiRequestTool(schema)]);
+    return tools;
+  }
+  DocBuddy.buildToolsForTurn = buildToolsForTurn;
+
+  /** How the system prompt refers to the API tools for the current mode. */
+  function describeApiTools(toolSettings) {
+    return toolSettings && toolSettings.toolMode === 'typed'
+      ? 'the per-operation API tools (or `api_request` if none of them fits)'
+      : 'the `api_request` tool';
+  }
+  DocBuddy.describeApiTools = describeApiTools;
+
+  function parseToolArguments(toolCall) {
+    var raw = toolCall && toolCall.function ? toolCall.function.arguments : null;
+    try {
+      var parsed = JSON.parse(raw || '{}');
+      return parsed && typeof parsed === 'object' && !Array.isArray(parsed) ? parsed : {};
+    } catch (e) {
+      return {};
     }
-  };
-  DocBuddy.THEME_DEFINITIONS = THEME_DEFINITIONS;
+  }
 
-  // ── Storage keys ──────────────────────────────────────────────────────────
-  var THEME_STORAGE_KEY = "docbuddy-theme";
-  var SETTINGS_STORAGE_KEY = "docbuddy-settings";
-  var CHAT_HISTORY_KEY = "docbuddy-chat-history";
-  var TOOL_SETTINGS_KEY = "docbuddy-tool-settings";
-  var WORKFLOW_STORAGE_KEY = 'docbuddy-workflow';
-  var AGENT_HISTORY_KEY = 'docbuddy-agent-history';
-  var API_BASE_URL_KEY = "docbuddy-api-base-url";
-  var AUTO_DETECT_API_URL_KEY = "docbuddy-auto-detect-api-url";
+  /**
+   * api_request-style arguments ({ method, path, path_params, query_params,
+   * body }) for any tool call, typed or generic. Unknown arguments of a typed
+   * call are passed as query parameters.
+   */
+  function toolCallToApiArgs(toolCall) {
+    var args = parseToolArguments(toolCall);
+    var name = toolCall && toolCall.function ? toolCall.function.name : 'api_request';
+    var schema = DocBuddy._cachedOpenapiSchema;
+    var entry = name && name !== 'api_request' && schema ? getTypedToolIndex(schema).byName[name] : null;
+    if (!entry) return args;
+    var apiArgs = { method: entry.method, path: entry.path, path_params: {}, query_params: {} };
+    Object.keys(args).forEach(function(key) {
+      if (key === entry.bodyKey) apiArgs.body = args[key];
+      else if (entry.params[key] === 'path') apiArgs.path_params[key] = args[key];
+      else apiArgs.query_params[key] = args[key];
+    });
+    return apiArgs;
+  }
+  DocBuddy.toolCallToApiArgs = toolCallToApiArgs;
 
-  // ── In-memory cache for OpenAPI schema ────────────────────────────────────
-  DocBuddy._cachedOpenapiSchema = null;
-  DocBuddy._openapiSchemaFetchPromise = null;
-  DocBuddy._schemaFetchUrl = null;
-  DocBuddy._schemaFetchFailed = false;
+  /**
+   * The reverse of toolCallToApiArgs, for writing edited arguments back into
+   * the tool call in history. Returns the tool call's { name, arguments };
+   * an edit that no longer targets the typed operation becomes api_request.
+   */
+  function apiArgsToToolFunction(name, apiArgs) {
+    var schema = DocBuddy._cachedOpenapiSchema;
+    var entry = name && name !== 'api_request' && schema ? getTypedToolIndex(schema).byName[name] : null;
+    if (!entry || entry.method !== String(apiArgs.method || '').toUpperCase() || entry.path !== apiArgs.path) {
+      return { name: 'api_request', arguments: JSON.stringify(apiArgs) };
+    }
+    var out = Object.assign({}, apiArgs.query_params || {}, apiArgs.path_params || {});
+    if (entry.bodyKey && apiArgs.body !== undefined) out[entry.bodyKey] = apiArgs.body;
+    return { name: name, arguments: JSON.stringify(out) };
+  }
+  DocBuddy.apiArgsToToolFunction = apiArgsToToolFunction;
 
-  function ensureOpenapiSchemaCached(onDone) {
-    var targetUrl = window.DOCBUDDY_OPENAPI_URL || "/openapi.json";
-    if (DocBuddy._cachedOpenapiSchema) {
-      if (DocBuddy._schemaFetchUrl === targetUrl) {
-        // Cache hit — same URL, return immediately
-        if (onDone) onDone(DocBuddy._cachedOpenapiSchema);
-        return;
-      }
-      // URL changed — invalidate stale cache
-      DocBuddy._cachedOpenapiSchema = null;
-      DocBuddy._openapiSchemaFetchPromise = null;
-      DocBuddy._schemaFetchFailed = false;
+  // ── Deterministic JSON serialization (sorted object keys) ─────────────────
+  function stableStringify(value) {
+    if (value === null || typeof value !== 'object') {
+      return JSON.stringify(value === undefined ? null : value);
     }
-    // Negative cache: if a previous fetch for this URL failed, don't retry
-    if (DocBuddy._schemaFetchFailed && DocBuddy._schemaFetchUrl === targetUrl) {
-      return;
+    if (Array.isArray(value)) {
+      return '[' + value.map(stableStringify).join(',') + ']';
     }
-    if (!DocBuddy._openapiSchemaFetchPromise) {
-      var fetchUrl = targetUrl;
-      DocBuddy._schemaFetchUrl = fetchUrl;
-      DocBuddy._schemaFetchFailed = false;
-      DocBuddy._openapiSchemaFetchPromise = fetch(fetchUrl)
-        .then(function(res) {
-          if (!res.ok) throw new Error('HTTP ' + res.status);
-          return res.json();
-        })
-        .then(function(schema) {
-          // Only cache if this fetch is still current (prevents race conditions)
-          if (DocBuddy._schemaFetchUrl === fetchUrl) {
-            DocBuddy._cachedOpenapiSchema = schema;
-            DocBuddy._openapiSchemaFetchPromise = null;
-          }
-          return schema;
-        })
-        .catch(function(err) {
-          if (DocBuddy._schemaFetchUrl === fetchUrl) {
-            DocBuddy._schemaFetchFailed = true;
-            DocBuddy._openapiSchemaFetchPromise = null;
-          }
-          console.warn('Failed to fetch OpenAPI schema:', err);
-        });
+    var keys = Object.keys(value).filter(function(k) { return value[k] !== undefined; }).sort();
+    return '{' + keys.map(function(k) {
+      return JSON.stringify(k) + ':' + stableStringify(value[k]);
+    }).join(',') + '}';
+  }
+  DocBuddy.stableStringify = stableStringify;
+
+  // ── Content hashing for cache keys (cyrb53; not for security) ─────────────
+  function hashString(str) {
+    var h1 = 0xdeadbeef, h2 = 0x41c6ce57;
+    for (var i = 0; i < str.length; i++) {
+      var ch = str.charCodeAt(i);
+      h1 = Math.imul(h1 ^ ch, 2654435761);
+      h2 = Math.imul(h2 ^ ch, 1597334677);
     }
-    if (onDone) {
-      DocBuddy._openapiSchemaFetchPromise.then(onDone).catch(function() {});
+    h1 = Math.imul(h1 ^ (h1 >>> 16), 2246822507) ^ Math.imul(h2 ^ (h2 >>> 13), 3266489909);
+    h2 = Math.imul(h2 ^ (h2 >>> 16), 2246822507) ^ Math.imul(h1 ^ (h1 >>> 13), 3266489909);
+    return (4294967296 * (2097151 & h2) + (h1 >>> 0)).toString(16);
+  }
+  DocBuddy.hashString = hashString;
+
+  // Hash of the OpenAPI schema, memoized per schema object
+  var _hashedSchema = null;
+  var _schemaHash = '';
+  function getSchemaHash(schema) {
+    if (!schema) return '';
+    if (schema !== _hashedSchema) {
+      _hashedSchema = schema;
+      _schemaHash = hashString(stableStringify(schema));
     }
+    return _schemaHash;
   }
-  DocBuddy.ensureOpenapiSchemaCached = ensureOpenapiSchemaCached;
+  DocBuddy.getSchemaHash = getSchemaHash;
+
+  // ── {{variable}} templating ────────────────────────────────────────────────
+  var TEMPLATE_VAR_RE = /\{\{\s*([A-Za-z_][\w.-]*)\s*\}\}/g;
+
+  // Replace {{name}} placeholders with values from `vars`. Unknown names are
+  // left untouched so missing columns stay visible in the rendered prompt.
+  function renderTemplate(template, vars) {
+    return String(template || '').replace(TEMPLATE_VAR_RE, function(match, name) {
+      if (!vars || !Object.prototype.hasOwnProperty.call(vars, name)) return match;
+      var value = vars[name];
+      if (value == null) return '';
+      return typeof value === 'object' ? JSON.stringify(value) : String(value);
+    });
+  }
+  DocBuddy.renderTemplate = renderTemplate;
 
-  // ── Theme loading/saving functions ─────────────────────────────────────────
-  function loadTheme() {
-    try {
-      var raw = localStorage.getItem(THEME_STORAGE_KEY);
-      if (raw) {
-        var parsed = JSON.parse(raw);
-        if (parsed.theme && THEME_DEFINITIONS[parsed.theme]) {
-          return parsed;
-        }
-      }
-    } catch (e) {
-      console.warn('Failed to load theme from localStorage:', e);
+  function extractTemplateVariables(template) {
+    var names = [];
+    String(template || '').replace(TEMPLATE_VAR_RE, function(match, name) {
+      if (names.indexOf(name) < 0) names.push(name);
+      return match;
+    });
+    return names;
+  }
+  DocBuddy.extractTemplateVariables = extractTemplateVariables;
+
+  // ── Network log ───────────────────────────────────────────────────────────
+  // Outgoing requests (LLM completions, /models probes, api_request tool
+  // calls, schema fetches and Swagger "Try it out" executions) are logged with
+  // Resource Timing data for the Network panel and HAR export. Times are
+  // performance.now() milliseconds, the same clock Resource Timing uses.
+  var NETWORK_LOG_LIMIT = 500;
+  var NETWORK_BODY_LIMIT = 64 * 1024;
+  var REDACTED_HEADERS = { authorization: true, 'x-api-key': true, cookie: true };
+  var _networkLog = [];
+  var _networkSeq = 0;
+  // Recent resource timings not yet matched to a log entry
+  var _resourceTimings = [];
+
+  function headersToObject(headers) {
+    var out = {};
+    if (!headers) return out;
+    if (typeof headers.forEach === 'function' && !Array.isArray(headers)) {
+      headers.forEach(function(value, name) { out[name] = value; });
+    } else {
+      Object.keys(headers).forEach(function(name) { out[name] = String(headers[name]); });
     }
-    return { theme: 'light', customColors: {} };
+    return out;
   }
-  DocBuddy.loadTheme = loadTheme;
 
-  function saveTheme(themeData) {
-    try {
-      localStorage.setItem(THEME_STORAGE_KEY, JSON.stringify(themeData));
-    } catch (e) {
-      // ignore
-    }
+  function redactHeaders(headers) {
+    var out = {};
+    Object.keys(headers).forEach(function(name) {
+      out[name] = REDACTED_HEADERS[name.toLowerCase()] ? '[redacted]' : headers[name];
+    });
+    return out;
   }
-  DocBuddy.saveTheme = saveTheme;
 
-  function loadFromStorage() {
+  function absoluteUrl(url) {
     try {
-      var raw = localStorage.getItem(SETTINGS_STORAGE_KEY);
-      return raw ? JSON.parse(raw) : {};
+      return new URL(url, window.location.href).href;
     } catch (e) {
-      return {};
+      return String(url);
     }
   }
-  DocBuddy.loadFromStorage = loadFromStorage;
 
-  function saveToStorage(state) {
-    try {
-      localStorage.setItem(SETTINGS_STORAGE_KEY, JSON.stringify(state));
-    } catch (e) {
-      // ignore
+  function notifyNetworkLog(entry) {
+    window.dispatchEvent(new CustomEvent('docbuddy-network', { detail: entry }));
+  }
+
+  // Attach the resource timing for the same URL that started closest to the
+  // entry. fetch() stamps startTime synchronously, so direct fetches match
+  // within a few ms; Swagger builds its request asynchronously first.
+  function matchResourceTiming(entry) {
+    if (entry.timing || !entry.url) return false;
+    var maxDelay = entry.kind === 'swagger' ? 2000 : 50;
+    var best = -1;
+    for (var i = 0; i < _resourceTimings.length; i++) {
+      var rt = _resourceTimings[i];
+      var delta = rt.startTime - entry.startTime;
+      if (rt.name !== entry.url || delta < -5 || delta > maxDelay) continue;
+      if (best < 0 || rt.startTime < _resourceTimings[best].startTime) best = i;
     }
+    if (best < 0) return false;
+    var rt = _resourceTimings.splice(best, 1)[0];
+    entry.timing = {
+      startTime: rt.startTime,
+      fetchStart: rt.fetchStart,
+      domainLookupStart: rt.domainLookupStart,
+      domainLookupEnd: rt.domainLookupEnd,
+      connectStart: rt.connectStart,
+      secureConnectionStart: rt.secureConnectionStart,
+      connectEnd: rt.connectEnd,
+      requestStart: rt.requestStart,
+      responseStart: rt.responseStart,
+      responseEnd: rt.responseEnd,
+      transferSize: rt.transferSize || 0,
+      encodedBodySize: rt.encodedBodySize || 0
+    };
+    entry.endTime = rt.responseEnd;
+    return true;
   }
-  DocBuddy.saveToStorage = saveToStorage;
 
-  function loadChatHistory() {
+  if (typeof PerformanceObserver !== 'undefined') {
     try {
-      var raw = localStorage.getItem(CHAT_HISTORY_KEY);
-      return raw ? JSON.parse(raw) : [];
+      new PerformanceObserver(function(list) {
+        list.getEntries().forEach(function(rt) {
+          if (rt.initiatorType === 'fetch' || rt.initiatorType === 'xmlhttprequest') _resourceTimings.push(rt);
+        });
+        if (_resourceTimings.length > 200) _resourceTimings.splice(0, _resourceTimings.length - 200);
+        _networkLog.forEach(function(entry) {
+          if (matchResourceTiming(entry)) notifyNetworkLog(entry);
+        });
+      }).observe({ type: 'resource', buffered: false });
     } catch (e) {
-      return [];
+      // Resource Timing unavailable — entries fall back to fetch-level timing
     }
   }
-  DocBuddy.loadChatHistory = loadChatHistory;
 
-  function saveChatHistory(messages) {
-    try {
-      localStorage.setItem(CHAT_HISTORY_KEY, JSON.stringify(messages.slice(-20)));
-    } catch (e) {
-      // ignore
-    }
+  /**
+   * Start a network log entry. `kind` is one of 'llm', 'models', 'tool',
+   * 'schema' or 'swagger'; the URL may be filled in later by finishNetworkEntry.
+   */
+  function startNetworkEntry(kind, method, url, headers, body) {
+    var entry = {
+      id: ++_networkSeq,
+      kind: kind,
+      method: (method || 'GET').toUpperCase(),
+      url: url ? absoluteUrl(url) : '',
+      requestHeaders: redactHeaders(headersToObject(headers)),
+      requestBody: typeof body === 'string' ? body.slice(0, NETWORK_BODY_LIMIT) : null,
+      requestBodySize: typeof body === 'string' ? body.length : 0,
+      startedDateTime: new Date().toISOString(),
+      startTime: perfNow(),
+      responseStart: null,
+      endTime: null,
+      status: null,
+      statusText: '',
+      responseHeaders: {},
+      mimeType: '',
+      error: null,
+      timing: null
+    };
+    _networkLog.push(entry);
+    if (_networkLog.length > NETWORK_LOG_LIMIT) _networkLog.splice(0, _networkLog.length - NETWORK_LOG_LIMIT);
+    notifyNetworkLog(entry);
+    return entry;
   }
-  DocBuddy.saveChatHistory = saveChatHistory;
+  DocBuddy.startNetworkEntry = startNetworkEntry;
 
-  function exportAsJson(data, filename) {
-    try {
-      var json = JSON.stringify(data, null, 2);
-      var blob = new Blob([json], { type: 'application/json' });
-      var url = URL.createObjectURL(blob);
-      var a = document.createElement('a');
-      a.href = url;
-      a.download = filename || 'export.json';
-      document.body.appendChild(a);
-      a.click();
-      document.body.removeChild(a);
-      URL.revokeObjectURL(url);
-    } catch (e) {
-      console.error('Failed to export:', e);
-    }
+  function finishNetworkEntry(entry, patch) {
+    if (patch.url) patch.url = absoluteUrl(patch.url);
+    Object.assign(entry, patch);
+    matchResourceTiming(entry);
+    notifyNetworkLog(entry);
   }
-  DocBuddy.exportAsJson = exportAsJson;
+  DocBuddy.finishNetworkEntry = finishNetworkEntry;
 
-  function loadToolSettings() {
-    try {
-      var raw = localStorage.getItem(TOOL_SETTINGS_KEY);
-      return raw ? JSON.parse(raw) : { enableTools: false, autoExecute: false, apiKey: '' };
-    } catch (e) {
-      return { enableTools: false, autoExecute: false, apiKey: '' };
-    }
+  function responseFields(res) {
+    var headers = headersToObject(res.headers);
+    return {
+      status: res.status,
+      statusText: res.statusText || '',
+      responseHeaders: headers,
+      mimeType: headers['content-type'] || '',
+      responseStart: perfNow()
+    };
   }
-  DocBuddy.loadToolSettings = loadToolSettings;
 
-  function saveToolSettings(settings) {
-    try {
-      localStorage.setItem(TOOL_SETTINGS_KEY, JSON.stringify(settings));
-    } catch (e) {
-      // ignore
-    }
+  // ── Cassettes: record and replay network traffic ──────────────────────────
+  // While recording, every trackedFetch request/response pair is stored in a
+  // cassette, optionally with per-chunk timing for streamed responses. During
+  // replay no request leaves the browser: LLM responses are served in recorded
+  // order and tool/model/schema responses by matching request, either at the
+  // recorded pace or as fast as possible. This gives repeatable runs for
+  // benchmarking the front-end pipeline.
+  var CASSETTE_FORMAT = 'docbuddy-cassette';
+  var NULL_BODY_STATUSES = { 101: true, 204: true, 205: true, 304: true };
+  var _cassette = { mode: 'idle' };
+
+  function notifyCassette() {
+    window.dispatchEvent(new CustomEvent('docbuddy-cassette', { detail: getCassetteState() }));
   }
-  DocBuddy.saveToolSettings = saveToolSettings;
 
-  // ── API Base URL helpers ───────────────────────────────────────────────────
-  function loadApiBaseUrl() {
-    try {
-      var raw = localStorage.getItem(API_BASE_URL_KEY);
-      return raw ? JSON.parse(raw) : null;
-    } catch (e) {
-      return null;
-    }
+  function getCassetteState() {
+    return {
+      mode: _cassette.mode,
+      interactions: _cassette.interactions ? _cassette.interactions.length : 0,
+      chunks: !!_cassette.chunks,
+      speed: _cassette.speed || null,
+      served: _cassette.served || 0,
+      missed: _cassette.missed || 0
+    };
   }
-  DocBuddy.loadApiBaseUrl = loadApiBaseUrl;
+  DocBuddy.getCassetteState = getCassetteState;
 
-  function saveApiBaseUrl(url) {
-    try {
-      localStorage.setItem(API_BASE_URL_KEY, JSON.stringify(url));
-    } catch (e) {
-      // ignore
-    }
+  function cassetteKey(kind, method, url, body) {
+    var text = typeof body === 'string' ? body : '';
+    return hashString(kind + ' ' + (method || 'GET').toUpperCase() + ' ' + absoluteUrl(url) + ' ' + text);
   }
-  DocBuddy.saveApiBaseUrl = saveApiBaseUrl;
 
-  function loadAutoDetectApiUrl() {
-    try {
-      var raw = localStorage.getItem(AUTO_DETECT_API_URL_KEY);
-      return raw ? JSON.parse(raw) : true;
-    } catch (e) {
-      return true;
-    }
+  /** Start recording. opts: { chunks } — also keep per-chunk stream timing. */
+  function startCassetteRecording(opts) {
+    _cassette = {
+      mode: 'recording',
+      chunks: !!(opts && opts.chunks),
+      created_at: new Date().toISOString(),
+      interactions: []
+    };
+    notifyCassette();
   }
-  DocBuddy.loadAutoDetectApiUrl = loadAutoDetectApiUrl;
+  DocBuddy.startCassetteRecording = startCassetteRecording;
+
+  /** Stop recording and return the cassette (null if not recording). */
+  function stopCassetteRecording() {
+    if (_cassette.mode !== 'recording') return null;
+    var cassette = {
+      format: CASSETTE_FORMAT,
+      version: 1,
+      created_at: _cassette.created_at,
+      chunks: _cassette.chunks,
+      interactions: _cassette.interactions
+    };
+    _cassette = { mode: 'idle' };
+    notifyCassette();
+    return cassette;
+  }
+  DocBuddy.stopCassetteRecording = stopCassetteRecording;
 
-  function saveAutoDetectApiUrl(enabled) {
-    try {
-      localStorage.setItem(AUTO_DETECT_API_URL_KEY, JSON.stringify(enabled));
-    } catch (e) {
-      // ignore
+  /**
+   * Replay a cassette. opts.speed: 'recorded' (default) keeps the recorded
+   * time to first byte and chunk spacing; 'fast' serves responses immediately.
+   * Returns an error message for an invalid cassette, else null.
+   */
+  function startCassetteReplay(cassette, opts) {
+    if (!cassette || cassette.format !== CASSETTE_FORMAT || !Array.isArray(cassette.interactions)) {
+      return 'Not a DocBuddy cassette file.';
     }
+    _cassette = {
+      mode: 'replaying',
+      speed: opts && opts.speed === 'fast' ? 'fast' : 'recorded',
+      interactions: cassette.interactions,
+      used: cassette.interactions.map(function() { return false; }),
+      served: 0,
+      missed: 0
+    };
+    notifyCassette();
+    return null;
   }
-  DocBuddy.saveAutoDetectApiUrl = saveAutoDetectApiUrl;
+  DocBuddy.startCassetteReplay = startCassetteReplay;
 
-  // ── Workflow storage helpers ────────────────────────────────────────────────
-  function loadWorkflow() {
-    try {
-      var data = localStorage.getItem(WORKFLOW_STORAGE_KEY);
-      if (data) return JSON.parse(data);
-    } catch (e) {}
+  function stopCassetteReplay() {
+    var state = getCassetteState();
+    _cassette = { mode: 'idle' };
+    notifyCassette();
+    return state;
+  }
+  DocBuddy.stopCassetteReplay = stopCassetteReplay;
+
+  function recordInteraction(kind, method, url, body, res, startedAt) {
+    var headers = headersToObject(res.headers);
+    // The stored body is decoded text, so length/encoding headers no longer apply
+    ['set-cookie', 'content-length', 'content-encoding'].forEach(function(name) { delete headers[name]; });
+    var interaction = {
+      kind: kind,
+      method: (method || 'GET').toUpperCase(),
+      url: absoluteUrl(url),
+      key: cassetteKey(kind, method, url, body),
+      status: res.status,
+      statusText: res.statusText || '',
+      headers: headers,
+      ttfbMs: Math.round(perfNow() - startedAt),
+      durationMs: null,
+      body: ''
+    };
+    if (_cassette.chunks) interaction.chunks = [];
+    var cassette = _cassette;
+    cassette.interactions.push(interaction);
+    notifyCassette();
+
+    if (!res.body || !res.body.getReader) return;
+    // Read a copy of the body so the caller's stream is untouched
+    var reader = res.clone().body.getReader();
+    var decoder = new TextDecoder();
+    var bodyStart = perfNow();
+    var pump = function() {
+      return reader.read().then(function(result) {
+        if (result.done) {
+          interaction.durationMs = Math.round(perfNow() - startedAt);
+          return;
+        }
+        var text = decoder.decode(result.value, { stream: true });
+        interaction.body += text;
+        if (interaction.chunks) interaction.chunks.push({ t: Math.round(perfNow() - bodyStart), data: text });
+        return pump();
+      });
+    };
+    pump().catch(function() {
+      interaction.aborted = true;
+      interaction.durationMs = Math.round(perfNow() - startedAt);
+    });
+  }
+
+  function takeInteraction(kind, method, url, body) {
+    var list = _cassette.interactions;
+    var key = cassetteKey(kind, method, url, body);
+    var fallback = -1;
+    for (var i = 0; i < list.length; i++) {
+      if (_cassette.used[i] || list[i].kind !== kind) continue;
+      // Model output is served in recorded order: prompts may have changed
+      // since recording, which is the point of replaying them
+      if (kind === 'llm' || list[i].key === key) {
+        _cassette.used[i] = true;
+        return list[i];
+      }
+      if (fallback < 0 && list[i].method === (method || 'GET').toUpperCase() && list[i].url === absoluteUrl(url)) {
+        fallback = i;
+      }
+    }
+    if (fallback >= 0) {
+      _cassette.used[fallback] = true;
+      return list[fallback];
+    }
     return null;
   }
-  DocBuddy.loadWorkflow = loadWorkflow;
 
-  function saveWorkflow(workflow) {
-    try {
-      localStorage.setItem(WORKFLOW_STORAGE_KEY, JSON.stringify(workflow));
-    } catch (e) {}
+  function abortError() {
+    var err = new Error('The operation was aborted.');
+    err.name = 'AbortError';
+    return err;
   }
-  DocBuddy.saveWorkflow = saveWorkflow;
 
-  function createDefaultBlock() {
-    return {
-      id: generateMessageId(),
-      type: 'prompt',
-      content: '',
-      output: '',
-      status: 'idle',
-      enableTools: true
-    };
+  function waitFor(ms, signal) {
+    return new Promise(function(resolve, reject) {
+      if (signal && signal.aborted) return reject(abortError());
+      setTimeout(function() {
+        if (signal && signal.aborted) return reject(abortError());
+        resolve();
+      }, ms);
+    });
   }
-  DocBuddy.createDefaultBlock = createDefaultBlock;
 
-  // ── Agent storage helpers ──────────────────────────────────────────────────
-  function loadAgentHistory() {
-    try {
-      var raw = localStorage.getItem(AGENT_HISTORY_KEY);
-      return raw ? JSON.parse(raw) : [];
-    } catch (e) {
-      return [];
+  function replayFetch(url, options, kind, onEnd) {
+    var method = (options.method || 'GET').toUpperCase();
+    var hit = takeInteraction(kind, method, url, options.body);
+    if (!hit) {
+      _cassette.missed++;
+      notifyCassette();
+      setTimeout(onEnd, 0);
+      return Promise.resolve(new Response('No recorded response for ' + method + ' ' + url, {
+        status: 504, statusText: 'Not in cassette', headers: { 'Content-Type': 'text/plain' }
+      }));
     }
+    _cassette.served++;
+    notifyCassette();
+
+    var realtime = _cassette.speed === 'recorded';
+    var chunks = hit.chunks && hit.chunks.length ? hit.chunks : [{
+      t: realtime && hit.durationMs != null ? Math.max(hit.durationMs - hit.ttfbMs, 0) : 0,
+      data: hit.body || ''
+    }];
+    var signal = options.signal;
+
+    return waitFor(realtime ? hit.ttfbMs || 0 : 0, signal).then(function() {
+      var encoder = new TextEncoder();
+      var body = NULL_BODY_STATUSES[hit.status] ? null : new ReadableStream({
+        start: function(controller) {
+          var t0 = perfNow();
+          var i = 0;
+          var next = function() {
+            if (signal && signal.aborted) {
+              controller.error(abortError());
+              onEnd();
+              return;
+            }
+            if (i >= chunks.length) {
+              controller.close();
+              onEnd();
+              return;
+            }
+            var chunk = chunks[i++];
+            var delay = realtime ? Math.max(chunk.t - (perfNow() - t0), 0) : 0;
+            setTimeout(function() {
+              controller.enqueue(encoder.encode(chunk.data));
+              next();
+            }, delay);
+          };
+          next();
+        }
+      });
+      if (!body) setTimeout(onEnd, 0);
+      return new Response(body, { status: hit.status, statusText: hit.statusText, headers: hit.headers });
+    });
   }
-  DocBuddy.loadAgentHistory = loadAgentHistory;
 
-  function saveAgentHistory(messages) {
-    try {
-      localStorage.setItem(AGENT_HISTORY_KEY, JSON.stringify(messages.slice(-30)));
-    } catch (e) {
-      // ignore
+  /**
+   * fetch() that records the request in the network log, and in the cassette
+   * while recording. While replaying, responses come from the cassette.
+   */
+  function trackedFetch(url, options, kind) {
+    options = options || {};
+    kind = kind || 'other';
+    var entry = startNetworkEntry(kind, options.method, url, options.headers, options.body);
+    var pending;
+    if (_cassette.mode === 'replaying') {
+      // No Resource Timing exists for replayed responses; end when the body does
+      entry.replayed = true;
+      pending = replayFetch(url, options, kind, function() {
+        finishNetworkEntry(entry, { endTime: perfNow() });
+      });
+    } else {
+      pending = fetch(url, options);
     }
+    return pending.then(function(res) {
+      finishNetworkEntry(entry, responseFields(res));
+      if (_cassette.mode === 'recording') {
+        recordInteraction(kind, options.method, url, options.body, res, entry.startTime);
+      }
+      return res;
+    }, function(err) {
+      finishNetworkEntry(entry, {
+        error: err && err.name === 'AbortError' ? 'Aborted' : (err && err.message) || 'Network error',
+        endTime: perfNow()
+      });
+      throw err;
+    });
   }
-  DocBuddy.saveAgentHistory = saveAgentHistory;
+  DocBuddy.trackedFetch = trackedFetch;
 
-  // ── Action types ────────────────────────────────────────────────────────────
-  var SET_BASE_URL = "LLM_SET_BASE_URL";
-  var SET_API_KEY = "LLM_SET_API_KEY";
-  var SET_MODEL_ID = "LLM_SET_MODEL_ID";
-  var SET_MAX_TOKENS = "LLM_SET_MAX_TOKENS";
-  var SET_TEMPERATURE = "LLM_SET_TEMPERATURE";
-  var SET_CONNECTION_STATUS = "LLM_SET_CONNECTION_STATUS";
-  var SET_PROVIDER = "LLM_SET_PROVIDER";
-  var SET_OPENAPI_SCHEMA = "LLM_SET_OPENAPI_SCHEMA";
-  var SET_THEME = "LLM_SET_THEME";
-  var SET_CUSTOM_COLOR = "LLM_SET_CUSTOM_COLOR";
+  function getNetworkLog() {
+    return _networkLog.slice();
+  }
+  DocBuddy.getNetworkLog = getNetworkLog;
 
-  // ── Default state ───────────────────────────────────────────────────────────
-  var storedSettings = loadFromStorage();
-  var storedTheme = loadTheme();
-  var storedToolSettings = loadToolSettings();
+  function clearNetworkLog() {
+    _networkLog = [];
+    notifyNetworkLog(null);
+  }
+  DocBuddy.clearNetworkLog = clearNetworkLog;
 
-  document.addEventListener('DOMContentLoaded', function() {
-    window.applyLLMTheme(storedTheme.theme, storedTheme.customColors);
-    // Skip eager prefetch on standalone page — URL isn't known until user clicks Load
-    if (!IS_STANDALONE) {
-      ensureOpenapiSchemaCached();
+  /**
+   * Phase durations (ms) for one entry. `detailed` is false when only
+   * fetch-level timing is known (e.g. cross-origin without Timing-Allow-Origin),
+   * in which case everything before the first byte is reported as `wait`.
+   */
+  function getNetworkPhases(entry) {
+    var t = entry.timing;
+    var end = entry.endTime != null ? entry.endTime : (entry.responseStart != null ? entry.responseStart : entry.startTime);
+    if (t && t.requestStart > 0 && t.responseStart > 0) {
+      var blockedEnd = t.domainLookupStart > 0 ? t.domainLookupStart : t.requestStart;
+      var ssl = t.secureConnectionStart > 0 ? t.connectEnd - t.secureConnectionStart : 0;
+      return {
+        detailed: true,
+        blocked: Math.max(blockedEnd - t.startTime, 0),
+        dns: Math.max(t.domainLookupEnd - t.domainLookupStart, 0),
+        connect: Math.max(t.connectEnd - t.connectStart - ssl, 0),
+        ssl: Math.max(ssl, 0),
+        wait: Math.max(t.responseStart - t.requestStart, 0),
+        receive: Math.max(t.responseEnd - t.responseStart, 0),
+        total: Math.max(t.responseEnd - entry.startTime, 0)
+      };
     }
-  });
+    var firstByte = entry.responseStart != null ? entry.responseStart : end;
+    return {
+      detailed: false,
+      blocked: 0,
+      dns: 0,
+      connect: 0,
+      ssl: 0,
+      wait: Math.max(firstByte - entry.startTime, 0),
+      receive: Math.max(end - firstByte, 0),
+      total: Math.max(end - entry.startTime, 0)
+    };
+  }
+  DocBuddy.getNetworkPhases = getNetworkPhases;
 
-  var DEFAULT_STATE = {
-    baseUrl: storedSettings.baseUrl || "http://localhost:11434/v1",
-    apiKey: storedSettings.apiKey || "",
-    modelId: storedSettings.modelId || "llama3",
-    maxTokens: storedSettings.maxTokens != null ? storedSettings.maxTokens : 4096,
-    temperature: storedSettings.temperature != null ? storedSettings.temperature : 0.7,
-    provider: storedSettings.provider || "ollama",
-    connectionStatus: "disconnected",
-    chatHistory: loadChatHistory(),
-    lastError: "",
-    theme: storedTheme.theme || "light",
-    customColors: storedTheme.customColors || {},
-    // Tool settings
-    enableTools: storedToolSettings.enableTools || false,
-    autoExecute: storedToolSettings.autoExecute || false,
-    toolApiKey: storedToolSettings.apiKey || '',
-  };
-  DocBuddy.DEFAULT_STATE = DEFAULT_STATE;
+  function harHeaders(headers) {
+    return Object.keys(headers || {}).map(function(name) { return { name: name, value: headers[name] }; });
+  }
 
-  // ── Debounce utility ───────────────────────────────────────────────────────
-  function debounce(fn, delay) {
-    var timeoutId;
-    return function () {
-      var self = this;
-      var args = arguments;
-      clearTimeout(timeoutId);
-      timeoutId = setTimeout(function () {
-        fn.apply(self, args);
-      }, delay);
+  /** Export log entries as a HAR 1.2 document. */
+  function buildHar(entries) {
+    entries = entries || _networkLog;
+    return {
+      log: {
+        version: '1.2',
+        creator: { name: 'DocBuddy', version: String(window.DOCBUDDY_VERSION || '') },
+        entries: entries.map(function(entry) {
+          var p = getNetworkPhases(entry);
+          var queryString = [];
+          try {
+            new URL(entry.url).searchParams.forEach(function(value, name) {
+              queryString.push({ name: name, value: value });
+            });
+          } catch (e) {}
+          var request = {
+            method: entry.method,
+            url: entry.url,
+            httpVersion: 'HTTP/1.1',
+            cookies: [],
+            headers: harHeaders(entry.requestHeaders),
+            queryString: queryString,
+            headersSize: -1,
+            bodySize: entry.requestBodySize
+          };
+          if (entry.requestBody != null) {
+            request.postData = { mimeType: entry.requestHeaders['Content-Type'] || 'application/json', text: entry.requestBody };
+          }
+          return {
+            startedDateTime: entry.startedDateTime,
+            time: Math.round(p.total * 10) / 10,
+            request: request,
+            response: {
+              status: entry.status || 0,
+              statusText: entry.error || entry.statusText || '',
+              httpVersion: 'HTTP/1.1',
+              cookies: [],
+              headers: harHeaders(entry.responseHeaders),
+              content: { size: entry.timing ? entry.timing.encodedBodySize : -1, mimeType: entry.mimeType || '' },
+              redirectURL: '',
+              headersSize: -1,
+              bodySize: entry.timing ? entry.timing.encodedBodySize : -1
+            },
+            cache: {},
+            timings: {
+              blocked: p.detailed ? p.blocked : -1,
+              dns: p.detailed ? p.dns : -1,
+              connect: p.detailed ? p.connect + p.ssl : -1,
+              ssl: p.detailed ? p.ssl : -1,
+              send: 0,
+              wait: p.wait,
+              receive: p.receive
+            },
+            _kind: entry.kind
+          };
+        })
+      }
     };
   }
-  DocBuddy.debounce = debounce;
+  DocBuddy.buildHar = buildHar;
 
-  // ── Helper to dispatch via Swagger UI's auto-generated action dispatchers ──
-  function dispatchAction(system, actionName, value) {
-    var sys = system && typeof system.getSystem === 'function' ? system.getSystem() : null;
-    if (sys && sys.llmSettingsActions && typeof sys.llmSettingsActions[actionName] === 'function') {
-      sys.llmSettingsActions[actionName](value);
+  // Swagger "Try it out" executions are captured by wrapping the spec
+  // plugin's executeRequest/setResponse actions (see plugin.js). The request
+  // URL is only known once the response arrives.
+  var _pendingSwaggerEntries = {};
+
+  function recordSwaggerRequest(req) {
+    var key = (req.method || '').toLowerCase() + ' ' + req.pathName;
+    _pendingSwaggerEntries[key] = startNetworkEntry('swagger', req.method, '', {}, null);
+  }
+  DocBuddy.recordSwaggerRequest = recordSwaggerRequest;
+
+  function recordSwaggerResponse(path, method, res) {
+    var key = (method || '').toLowerCase() + ' ' + path;
+    var entry = _pendingSwaggerEntries[key];
+    if (!entry || !res) return;
+    delete _pendingSwaggerEntries[key];
+    var end = perfNow();
+    var patch = {
+      url: res.url || path,
+      status: res.status || 0,
+      statusText: res.statusText || (res.error ? String(res.err && res.err.message || 'Error') : ''),
+      responseHeaders: res.headers || {},
+      mimeType: (res.headers && res.headers['content-type']) || '',
+      responseStart: end,
+      endTime: end
+    };
+    if (res.error && !res.status) patch.error = patch.statusText || 'Network error';
+    finishNetworkEntry(entry, patch);
+  }
+  DocBuddy.recordSwaggerResponse = recordSwaggerResponse;
+
+  // ── Tool request helpers (shared by chat, agent and workflow) ──────────────
+  var BODY_METHODS = { POST: true, PUT: true, PATCH: true };
+
+  /**
+   * Normalize api_request arguments so that equivalent calls compare equal:
+   * upper-case method, empty objects for missing params, body only for
+   * body-bearing methods.
+   */
+  function normalizeToolArgs(args) {
+    args = args || {};
+    var method = String(args.method || 'GET').toUpperCase();
+    var normalized = {
+      method: method,
+      path: args.path || '',
+      query_params: args.query_params || {},
+      path_params: args.path_params || {},
+    };
+    if (BODY_METHODS[method]) normalized.body = args.body || {};
+    return normalized;
+  }
+  DocBuddy.normalizeToolArgs = normalizeToolArgs;
+
+  /**
+   * Build the fetch URL and options for an api_request tool call.
+   * Returns { url, options } or { error: responseObj } when the call is rejected.
+   */
+  function buildToolRequest(args) {
+    var normalized = normalizeToolArgs(args);
+    var url = normalized.path;
+
+    try { url = decodeURIComponent(url); } catch (e) {}
+    if (!url || !/^\//.test(url)) {
+      console.error('[Tool Call] Rejected invalid path:', url);
+      return { error: { status: 0, statusText: 'Blocked', body: 'Tool call path must be a relative URL starting with /' } };
+    }
+
+    var pathParams = normalized.path_params;
+    Object.keys(pathParams).forEach(function(key) {
+      url = url.replace('{' + key + '}', encodeURIComponent(pathParams[key]));
+    });
+    // Re-validate after path params substitution to prevent bypass via path param values
+    if (/\.\./.test(url)) {
+      console.error('[Tool Call] Rejected path with ".." after param substitution:', url);
+      return { error: { status: 0, statusText: 'Blocked', body: 'Tool call path must not contain ".."' } };
+    }
+
+    var queryParams = normalized.query_params;
+    var queryKeys = Object.keys(queryParams);
+    if (queryKeys.length > 0) {
+      var qs = queryKeys.map(function(k) {
+        return encodeURIComponent(k) + '=' + encodeURIComponent(queryParams[k]);
+      }).join('&');
+      url += (url.indexOf('?') >= 0 ? '&' : '?') + qs;
     }
+
+    url = resolveApiBaseUrl(DocBuddy._cachedOpenapiSchema) + url;
+
+    var fetchHeaders = {};
+    var toolSettings = loadToolSettings();
+    var toolApiKey = toolSettings.apiKey && typeof toolSettings.apiKey === 'string' ? toolSettings.apiKey.trim() : '';
+    if (toolApiKey) {
+      fetchHeaders['Authorization'] = 'Bearer ' + toolApiKey;
+    }
+
+    var options = { method: normalized.method, headers: fetchHeaders };
+    if ('body' in normalized) {
+      fetchHeaders['Content-Type'] = 'application/json';
+      options.body = JSON.stringify(normalized.body);
+    }
+    return { url: url, options: options };
+  }
+  DocBuddy.buildToolRequest = buildToolRequest;
+
+  // ── Tool argument validation ──────────────────────────────────────────────
+  // Each operation's parameters and requestBody are compiled once into a
+  // validator (cached per schema hash) and run before the request is sent, so
+  // a missing path param or a mistyped body field goes straight back to the
+  // model as a structured tool error instead of costing an API round trip.
+  var MAX_VALIDATION_ERRORS = 10;
+  var _validatorCache = { hash: '', byOperation: {} };
+
+  function jsonType(v) {
+    if (v === null) return 'null';
+    if (Array.isArray(v)) return 'array';
+    if (typeof v === 'number') return Number.isInteger(v) ? 'integer' : 'number';
+    return typeof v;
   }
-  DocBuddy.dispatchAction = dispatchAction;
 
-  // ── Reducer ─────────────────────────────────────────────────────────────────
-  function llmSettingsReducer(state, action) {
-    if (state === undefined) state = DEFAULT_STATE;
-    switch (action.type) {
-      case SET_BASE_URL:
-        return Object.assign({}, state, { baseUrl: action.payload });
-      case SET_API_KEY:
-        return Object.assign({}, state, { apiKey: action.payload });
-      case SET_MODEL_ID:
-        return Object.assign({}, state, { modelId: action.payload });
-      case SET_MAX_TOKENS:
-        var val = action.payload;
-        if (val === '' || val === null || val === undefined) {
-          return state;
+  function typeMatches(expected, v) {
+    var actual = jsonType(v);
+    if (expected === 'number') return actual === 'number' || actual === 'integer';
+    return expected === actual;
+  }
+
+  /**
+   * Compile a JSON schema node into check(value, field, errors). $refs are
+   * compiled once through `memo`, which also terminates recursive schemas.
+   */
+  function compileJsonSchema(root, node, memo) {
+    var ref = node && typeof node['$ref'] === 'string' ? node['$ref'] : null;
+    if (ref && memo[ref]) return memo[ref];
+    var compiled = null;
+    if (ref) memo[ref] = function(v, field, errors) { return compiled(v, field, errors); };
+    node = resolveSchemaRef(root, node);
+    if (!node) {
+      compiled = function() { return true; };
+      return ref ? memo[ref] : compiled;
+    }
+
+    var checks = [];
+    var types = node.type == null ? null : [].concat(node.type);
+    var nullable = node.nullable === true || (types && types.indexOf('null') >= 0);
+    if (types) {
+      checks.push(function(v, field, errors) {
+        if (types.some(function(t) { return typeMatches(t, v); })) return true;
+        errors.push({ field: field, message: 'expected ' + types.join(' or ') + ', got ' + jsonType(v) });
+        return false;
+      });
+    }
+    if (Array.isArray(node['enum'])) {
+      var allowed = node['enum'];
+      checks.push(function(v, field, errors) {
+        if (allowed.some(function(a) { return stableStringify(a) === stableStringify(v); })) return true;
+        errors.push({ field: field, message: 'must be one of ' + JSON.stringify(allowed) });
+        return false;
+      });
+    }
+    if (node.minLength != null || node.maxLength != null || node.pattern) {
+      var re = null;
+      try { re = node.pattern ? new RegExp(node.pattern) : null; } catch (e) { re = null; }
+      checks.push(function(v, field, errors) {
+        if (typeof v !== 'string') return true;
+        if (node.minLength != null && v.length < node.minLength) {
+          errors.push({ field: field, message: 'must be at least ' + node.minLength + ' characters' });
+          return false;
         }
-        var num = Number(val);
-        if (!isNaN(num)) {
-          return Object.assign({}, state, { maxTokens: num });
+        if (node.maxLength != null && v.length > node.maxLength) {
+          errors.push({ field: field, message: 'must be at most ' + node.maxLength + ' characters' });
+          return false;
         }
-        return state;
-      case SET_TEMPERATURE:
-        var temp = action.payload;
-        if (temp === '' || temp === null || temp === undefined) {
-          return state;
+        if (re && !re.test(v)) {
+          errors.push({ field: field, message: 'must match pattern ' + node.pattern });
+          return false;
         }
-        var numTemp = Number(temp);
-        if (!isNaN(numTemp)) {
-          return Object.assign({}, state, { temperature: numTemp });
+        return true;
+      });
+    }
+    if (node.minimum != null || node.maximum != null) {
+      checks.push(function(v, field, errors) {
+        if (typeof v !== 'number') return true;
+        if (node.minimum != null && v < node.minimum) {
+          errors.push({ field: field, message: 'must be >= ' + node.minimum });
+          return false;
         }
-        return state;
-      case SET_CONNECTION_STATUS:
-        return Object.assign({}, state, { connectionStatus: action.payload });
-      case SET_PROVIDER:
-        var provider = LLM_PROVIDERS[action.payload] || LLM_PROVIDERS.custom;
-        return Object.assign({}, state, {
-          provider: action.payload,
-          baseUrl: provider.url
-        });
-      case SET_OPENAPI_SCHEMA:
-        return Object.assign({}, state, { openapiSchema: action.payload });
-      case SET_THEME:
-        var newTheme = action.payload;
-        if (!THEME_DEFINITIONS[newTheme]) {
-          console.warn('Invalid theme:', newTheme, 'Using default light theme');
-          newTheme = 'light';
+        if (node.maximum != null && v > node.maximum) {
+          errors.push({ field: field, message: 'must be <= ' + node.maximum });
+          return false;
         }
-        var themeDef = THEME_DEFINITIONS[newTheme] || THEME_DEFINITIONS.light;
-        var mergedColors = Object.assign({}, themeDef, state.customColors || {});
-        saveTheme({ theme: newTheme, customColors: mergedColors });
-        return Object.assign({}, state, { theme: newTheme, customColors: mergedColors });
-      case SET_CUSTOM_COLOR:
-        var colorKey = action.payload.key;
-        var colorValue = action.payload.value;
-        var newColors = Object.assign({}, state.customColors || {});
-        newColors[colorKey] = colorValue;
-        saveTheme({ theme: state.theme, customColors: newColors });
-        return Object.assign({}, state, { customColors: newColors });
-      default:
-        return state;
+        return true;
+      });
+    }
+    if (node.items) {
+      var itemCheck = compileJsonSchema(root, node.items, memo);
+      checks.push(function(v, field, errors) {
+        if (!Array.isArray(v)) return true;
+        var ok = true;
+        for (var i = 0; i < v.length && errors.length < MAX_VALIDATION_ERRORS; i++) {
+          ok = itemCheck(v[i], field + '[' + i + ']', errors) && ok;
+        }
+        return ok;
+      });
+    }
+    if (node.properties || node.required || node.additionalProperties === false) {
+      var props = node.properties || {};
+      var propChecks = {};
+      Object.keys(props).forEach(function(k) { propChecks[k] = compileJsonSchema(root, props[k], memo); });
+      var required = node.required || [];
+      var closed = node.additionalProperties === false;
+      checks.push(function(v, field, errors) {
+        if (!v || jsonType(v) !== 'object') return true;
+        var ok = true;
+        required.forEach(function(k) {
+          if (v[k] === undefined) {
+            errors.push({ field: field + '.' + k, message: 'is required' });
+            ok = false;
+          }
+        });
+        Object.keys(v).forEach(function(k) {
+          if (errors.length >= MAX_VALIDATION_ERRORS) return;
+          if (propChecks[k]) {
+            ok = propChecks[k](v[k], field + '.' + k, errors) && ok;
+          } else if (closed) {
+            errors.push({ field: field + '.' + k, message: 'is not a known field' });
+            ok = false;
+          }
+        });
+        return ok;
+      });
+    }
+    if (Array.isArray(node.allOf)) {
+      node.allOf.forEach(function(sub) { checks.push(compileJsonSchema(root, sub, memo)); });
     }
+    var alternatives = node.anyOf || node.oneOf;
+    if (Array.isArray(alternatives)) {
+      var altChecks = alternatives.map(function(sub) { return compileJsonSchema(root, sub, memo); });
+      checks.push(function(v, field, errors) {
+        if (altChecks.some(function(check) { return check(v, field, []); })) return true;
+        errors.push({ field: field, message: 'does not match any of the allowed schemas' });
+        return false;
+      });
+    }
+
+    compiled = function(v, field, errors) {
+      if (v === null && nullable) return true;
+      for (var i = 0; i < checks.length; i++) {
+        if (!checks[i](v, field, errors)) return false;
+      }
+      return true;
+    };
+    return ref ? memo[ref] : compiled;
   }
-  DocBuddy.llmSettingsReducer = llmSettingsReducer;
 
-  // ── Actions ─────────────────────────────────────────────────────────────────
-  var actions = {
-    setBaseUrl: function (value) { return { type: SET_BASE_URL, payload: value }; },
-    setApiKey: function (value) { return { type: SET_API_KEY, payload: value }; },
-    setModelId: function (value) { return { type: SET_MODEL_ID, payload: value }; },
-    setMaxTokens: function (value) { return { type: SET_MAX_TOKENS, payload: value }; },
-    setTemperature: function (value) { return { type: SET_TEMPERATURE, payload: value }; },
-    setConnectionStatus: function (value) { return { type: SET_CONNECTION_STATUS, payload: value }; },
-    setProvider: function (value) { return { type: SET_PROVIDER, payload: value }; },
-    setOpenApiSchema: function (schema) { return { type: SET_OPENAPI_SCHEMA, payload: schema }; },
-    setTheme: function (value) { return { type: SET_THEME, payload: value }; },
-    setCustomColor: function (value) { return { type: SET_CUSTOM_COLOR, payload: value }; },
-    // Tool settings actions
-    setEnableTools: function (value) { return { type: 'LLM_SET_ENABLE_TOOLS', payload: value }; },
-    setAutoExecute: function (value) { return { type: 'LLM_SET_AUTO_EXECUTE', payload: value }; },
-    setToolApiKey: function (value) { return { type: 'LLM_SET_TOOL_API_KEY', payload: value }; },
-  };
-  DocBuddy.actions = actions;
+  // Query and path values often arrive as strings; coerce them to the
+  // parameter's declared scalar type before checking.
+  function coerceParamValue(schemaNode, v) {
+    var type = schemaNode && schemaNode.type;
+    if (typeof v !== 'string') return v;
+    if ((type === 'integer' || type === 'number') && v.trim() !== '' && !isNaN(Number(v))) return Number(v);
+    if (type === 'boolean' && (v === 'true' || v === 'false')) return v === 'true';
+    return v;
+  }
 
-  // ── Selectors ───────────────────────────────────────────────────────────────
-  var selectors = {
-    getBaseUrl: function (state) { return state.baseUrl; },
-    getApiKey: function (state) { return state.apiKey; },
-    getModelId: function (state) { return state.modelId; },
-    getMaxTokens: function (state) { return state.maxTokens; },
-    getTemperature: function (state) { return state.temperature; },
-    getConnectionStatus: function (state) { return state.connectionStatus; },
-    getProvider: function (state) { return state.provider; },
-    getChatHistory: function (state) { return state.chatHistory || []; },
-    getOpenApiSchema: function (state) { return state.openapiSchema; },
-    getLastError: function (state) { return state.lastError; },
-    getTheme: function (state) { return state.theme; },
-    getCustomColors: function (state) { return state.customColors; },
-    // Tool settings selectors
-    getEnableTools: function (state) { return state.enableTools || false; },
-    getAutoExecute: function (state) { return state.autoExecute || false; },
-    getToolApiKey: function (state) { return state.toolApiKey || ''; },
-  };
-  DocBuddy.selectors = selectors;
+  /**
+   * Compile a validator for one operation. The returned function takes
+   * normalized tool args and returns a list of { location, field, message }.
+   */
+  function compileOperationValidator(root, match) {
+    var memo = {};
+    var pathItem = (root.paths || {})[match.path] || {};
+    var byKey = {};
+    (pathItem.parameters || []).concat(match.operation.parameters || []).forEach(function(p) {
+      p = resolveSchemaRef(root, p);
+      if (p && p.name && (p['in'] === 'path' || p['in'] === 'query')) byKey[p['in'] + ':' + p.name] = p;
+    });
+    var params = Object.keys(byKey).map(function(k) {
+      var p = byKey[k];
+      var schemaNode = resolveSchemaRef(root, p.schema) || {};
+      return {
+        name: p.name,
+        location: p['in'],
+        required: p.required === true || p['in'] === 'path',
+        schema: schemaNode,
+        check: compileJsonSchema(root, p.schema || {}, memo)
+      };
+    });
 
-  // ── Status indicator ───────────────────────────────────────────────────────
-  var STATUS_EMOJI = {
-    disconnected: "⚪",
-    connecting: "🟡",
-    connected: "🟢",
-    error: "🔴",
-  };
-  DocBuddy.STATUS_EMOJI = STATUS_EMOJI;
+    var requestBody = resolveSchemaRef(root, match.operation.requestBody);
+    var bodyContent = (requestBody && requestBody.content) || {};
+    var bodyMedia = bodyContent['application/json'];
+    var bodyCheck = bodyMedia && bodyMedia.schema ? compileJsonSchema(root, bodyMedia.schema, memo) : null;
+    var bodyRequired = !!(requestBody && requestBody.required);
+
+    return function(args) {
+      var errors = [];
+      var push = function(location) {
+        return function(e) { errors.push({ location: location, field: e.field, message: e.message }); };
+      };
+      params.forEach(function(p) {
+        var source = p.location === 'path' ? args.path_params : args.query_params;
+        var v = source[p.name];
+        // A concrete path ("/users/5") already carries its path params
+        if (p.location === 'path' && v === undefined && args.path.indexOf('{' + p.name + '}') < 0) return;
+        if (v === undefined || v === null || v === '') {
+          if (p.required) errors.push({ location: p.location, field: p.name, message: 'is required' });
+          return;
+        }
+        var paramErrors = [];
+        p.check(coerceParamValue(p.schema, v), p.name, paramErrors);
+        paramErrors.forEach(push(p.location));
+      });
+      if (bodyCheck && 'body' in args) {
+        var body = args.body == null ? {} : args.body;
+        var empty = jsonType(body) === 'object' && Object.keys(body).length === 0;
+        // An optional body may be left out; a required one must satisfy its schema
+        if (!empty || bodyRequired) {
+          var bodyErrors = [];
+          bodyCheck(body, 'body', bodyErrors);
+          bodyErrors.forEach(push('body'));
+        }
+      }
+      return errors.slice(0, MAX_VALIDATION_ERRORS);
+    };
+  }
 
-  // ── Message ID counter for unique timestamps ─
-  var _messageIdCounter = 0;
+  /**
+   * Validate api_request arguments against the OpenAPI schema. Returns null
+   * when they pass (or the operation is unknown), else a tool result object
+   * with status 0 and a structured JSON body listing the errors.
+   */
+  function validateToolArgs(root, args) {
+    if (!root) return null;
+    var normalized = normalizeToolArgs(args);
+    var match = matchOperation(root, normalized.method, normalized.path);
+    if (!match) return null;
+    var hash = getSchemaHash(root);
+    if (_validatorCache.hash !== hash) _validatorCache = { hash: hash, byOperation: {} };
+    var key = normalized.method + ' ' + match.path;
+    var validator = _validatorCache.byOperation[key];
+    if (!validator) validator = _validatorCache.byOperation[key] = compileOperationValidator(root, match);
+    var errors = validator(normalized);
+    if (errors.length === 0) return null;
+    return {
+      status: 0,
+      statusText: 'Invalid Arguments',
+      body: JSON.stringify({
+        error: 'invalid_arguments',
+        operation: key,
+        errors: errors,
+        hint: 'Fix these arguments and call the tool again. The request was not sent.'
+      }, null, 2),
+      validationErrors: errors
+    };
+  }
+  DocBuddy.validateToolArgs = validateToolArgs;
+
+  // ── JSON response compaction ──────────────────────────────────────────────
+  // Large list responses repeat the same keys on every record. Before a tool
+  // result goes to the model, arrays of homogeneous objects are rewritten as
+  // columns + rows, and long ones are cut to a head sample with per-field
+  // counts and min/max over every record. The operation's response schema,
+  // when available, picks the record array and the column order.
+  var COMPACT_MIN_ROWS = 3;
+  var COMPACT_MAX_ROWS = 50;
+  var COMPACT_MAX_DEPTH = 3;
+  var COMPACT_CELL_CHARS = 120;
+
+  /** Follow local "#/..." $ref pointers (bounded, so cycles terminate). */
+  function resolveSchemaRef(root, node) {
+    for (var i = 0; i < 10 && node && typeof node['$ref'] === 'string'; i++) {
+      var ref = node['$ref'];
+      if (ref.indexOf('#/') !== 0) return null;
+      node = ref.slice(2).split('/').reduce(function(cur, part) {
+        part = part.replace(/~1/g, '/').replace(/~0/g, '~');
+        return cur && typeof cur === 'object' ? cur[part] : undefined;
+      }, root);
+    }
+    return node && typeof node === 'object' ? node : null;
+  }
+  DocBuddy.resolveSchemaRef = resolveSchemaRef;
+
+  // ── Route index ───────────────────────────────────────────────────────────
+  // A segment trie over the schema's path templates, built once per schema,
+  // resolves a concrete path ("/invoices/42/remind") or a template
+  // ("/invoices/{id}/remind") to its operation in O(segments). Literal
+  // segments win over {param} segments, with backtracking when a literal
+  // branch dead-ends.
+  var _routeIndex = { hash: '', root: null };
+  var HTTP_METHODS_RE = /^(get|put|post|delete|options|head|patch|trace)$/;
+
+  function newRouteNode() {
+    return { literal: {}, param: null, methods: null };
+  }
 
-  function generateMessageId() {
-    return Date.now() + '_' + (++_messageIdCounter);
+  function splitPath(path) {
+    return String(path || '').split('?')[0].split('#')[0].split('/').filter(function(seg) { return seg !== ''; });
   }
-  DocBuddy.generateMessageId = generateMessageId;
 
-  // ── Consistent copy utility function (always returns a Promise) ────────────
-  function copyToClipboard(text) {
-    return new Promise(function(resolve, reject) {
-      if (!text || typeof text !== 'string') {
-        console.warn('copyToClipboard: invalid or empty text');
-        resolve(false);
-        return;
-      }
-      if (navigator.clipboard && navigator.clipboard.writeText) {
-        navigator.clipboard.writeText(text)
-          .then(function() {
-            resolve(true);
-          })
-          .catch(function(err) {
-            console.error('Clipboard API failed:', err);
-            runFallbackCopy(text, resolve);
-          });
-        return;
-      }
-      runFallbackCopy(text, resolve);
-    });
+  function isTemplateSegment(seg) {
+    return /^\{[^}]+\}$/.test(seg);
+  }
 
-    function runFallbackCopy(text, resolve) {
-      try {
-        var textarea = document.createElement('textarea');
-        textarea.value = text;
-        textarea.style.position = 'fixed';
-        textarea.style.opacity = '0';
-        textarea.style.pointerEvents = 'none';
-        document.body.appendChild(textarea);
-        textarea.focus();
-        textarea.select();
-        try {
-          var success = document.execCommand('copy');
-          document.body.removeChild(textarea);
-          if (success) {
-            resolve(true);
-          } else {
-            console.warn('execCommand copy failed');
-            resolve(false);
-          }
-        } catch (cmdErr) {
-          console.error('execCommand error:', cmdErr);
-          document.body.removeChild(textarea);
-          resolve(false);
+  function buildRouteIndex(schema) {
+    var root = newRouteNode();
+    var paths = (schema && schema.paths) || {};
+    Object.keys(paths).forEach(function(template) {
+      var node = root;
+      splitPath(template).forEach(function(seg) {
+        if (isTemplateSegment(seg)) {
+          node = node.param || (node.param = newRouteNode());
+        } else {
+          node = node.literal[seg] || (node.literal[seg] = newRouteNode());
         }
-      } catch (fallbackErr) {
-        console.error('Fallback copy also failed:', fallbackErr);
-        resolve(false);
-      }
+      });
+      var pathItem = paths[template] || {};
+      Object.keys(pathItem).forEach(function(m) {
+        if (!HTTP_METHODS_RE.test(m) || !pathItem[m] || typeof pathItem[m] !== 'object') return;
+        node.methods = node.methods || {};
+        // Keep the first template registered for a shape ({id} vs {userId})
+        if (!node.methods[m]) node.methods[m] = { path: template, method: m, operation: pathItem[m] };
+      });
+    });
+    return root;
+  }
+  DocBuddy.buildRouteIndex = buildRouteIndex;
+
+  function getRouteIndex(schema) {
+    var hash = getSchemaHash(schema);
+    if (_routeIndex.hash !== hash || !_routeIndex.root) {
+      _routeIndex = { hash: hash, root: buildRouteIndex(schema) };
     }
+    return _routeIndex.root;
   }
-  DocBuddy.copyToClipboard = copyToClipboard;
 
-  // ── System Prompt Preset Selector Component (for Settings panel) ───────────
-  function createSystemPromptPresetSelector(React) {
-    return class SystemPromptPresetSelector extends React.Component {
-      constructor(props) {
-        super(props);
-        this.state = { config: SYSTEM_PROMPT_CONFIG };
-      }
+  function lookupRoute(node, segs, i, m) {
+    if (i === segs.length) return node.methods && node.methods[m] ? node.methods[m] : null;
+    var seg = segs[i];
+    var next = Object.prototype.hasOwnProperty.call(node.literal, seg) ? node.literal[seg] : null;
+    var found = next ? lookupRoute(next, segs, i + 1, m) : null;
+    if (!found && node.param) found = lookupRoute(node.param, segs, i + 1, m);
+    return found;
+  }
 
-      componentDidMount() {
-        var self = this;
-        ensureSystemPromptConfig().then(function(data) {
-          if (data && !self.state.config) {
-            self.setState({ config: data });
-          }
-        });
-      }
+  /** Resolve through a prebuilt index (see buildRouteIndex). */
+  function matchRoute(index, method, path) {
+    return lookupRoute(index, splitPath(path), 0, String(method || 'GET').toLowerCase());
+  }
+  DocBuddy.matchRoute = matchRoute;
 
-      render() {
-        var props = this.props;
-        var config = this.state.config || { presets: {}, defaultPreset: 'api_assistant' };
-        var presets = config.presets || {};
-        var presetKeys = Object.keys(presets);
-        var selectedValue = props.value || 'api_assistant';
-        var isCustom = selectedValue === 'custom';
+  /**
+   * Match a method and a concrete or templated path to an OpenAPI operation.
+   * Returns { path: template, method, operation } or null.
+   */
+  function matchOperation(schema, method, path) {
+    if (!schema || !schema.paths) return null;
+    return matchRoute(getRouteIndex(schema), method, path);
+  }
+  DocBuddy.matchOperation = matchOperation;
 
-        var displayText = '';
-        if (isCustom) {
-          displayText = props.customPrompt || '';
-        } else {
-          var preset = presets[selectedValue];
-          if (preset) {
-            displayText = preset.prompt || '';
-          } else {
-            displayText = DEFAULT_SYSTEM_PROMPT_CONFIG.presets.api_assistant.prompt || '';
-          }
-        }
+  /** Find the OpenAPI operation for a method and a concrete or templated path. */
+  function findOperation(schema, method, path) {
+    var match = matchOperation(schema, method, path);
+    return match ? match.operation : null;
+  }
+  DocBuddy.findOperation = findOperation;
+
+  /** JSON schema of an operation's response for a status code, or null. */
+  function getResponseSchema(schema, operation, status) {
+    var responses = (operation && operation.responses) || {};
+    var code = String(status);
+    var response = responses[code] || responses[code.charAt(0) + 'XX'] || responses['default'];
+    response = resolveSchemaRef(schema, response);
+    var content = (response && response.content) || {};
+    var media = content['application/json'] || content[Object.keys(content).filter(function(t) {
+      return /json/.test(t);
+    })[0]];
+    return media ? resolveSchemaRef(schema, media.schema) : null;
+  }
+  DocBuddy.getResponseSchema = getResponseSchema;
 
-        var description = '';
-        if (!isCustom && presets[selectedValue]) {
-          description = presets[selectedValue].description || '';
-        }
+  function isPlainObject(v) {
+    return v !== null && typeof v === 'object' && !Array.isArray(v);
+  }
 
-        var textareaStyle = Object.assign({}, props.inputStyle, {
-          resize: "vertical",
-          minHeight: "120px",
-          marginTop: "8px",
-          fontFamily: "'Consolas', 'Monaco', monospace",
-          fontSize: "12px",
-          lineHeight: "1.5",
-          whiteSpace: "pre-wrap",
-        });
+  function isRecordArray(value) {
+    if (!Array.isArray(value) || value.length < COMPACT_MIN_ROWS) return false;
+    var objects = value.filter(isPlainObject).length;
+    return objects === value.length;
+  }
 
-        return React.createElement(
-          "div",
-          { style: { marginBottom: "12px" } },
-          React.createElement("label", { style: props.labelStyle }, "System Prompt Preset"),
-          React.createElement(
-            "select",
-            {
-              value: selectedValue,
-              onChange: function(e) {
-                props.onChange(e.target.value);
-                var stored = loadFromStorage();
-                stored.systemPromptPreset = e.target.value;
-                saveToStorage(stored);
-              },
-              style: props.inputStyle
-            },
-            presetKeys.length > 0 ? presetKeys.map(function(key) {
-              return React.createElement("option", { key: key, value: key }, presets[key].name);
-            }) : React.createElement("option", { value: "api_assistant" }, "API Assistant"),
-            React.createElement("option", { value: "custom" }, "Custom...")
-          ),
-          description && React.createElement("div", {
-            style: { color: "var(--theme-text-secondary)", fontSize: "11px", marginTop: "4px", fontStyle: "italic" }
-          }, description),
-          React.createElement("textarea", {
-            value: displayText,
-            readOnly: !isCustom,
-            onChange: isCustom ? function(e) {
-              props.onCustomChange(e.target.value);
-              var stored = loadFromStorage();
-              stored.customSystemPrompt = e.target.value;
-              saveToStorage(stored);
-            } : undefined,
-            style: Object.assign({}, textareaStyle, !isCustom ? { opacity: 0.8, cursor: "default" } : {}),
-            placeholder: isCustom ? "Enter custom system prompt..." : ""
-          }),
-          !isCustom && React.createElement("div", {
-            style: { color: "var(--theme-text-secondary)", fontSize: "10px", marginTop: "4px" }
-          }, "{openapi_context} is replaced with your API schema at send time. Select \"Custom...\" to edit.")
-        );
+  /**
+   * Locate the record array to tabulate: the root array, or the largest
+   * record array inside an envelope ({ data: [...], total, next }).
+   * Arrays typed as arrays of objects in the schema win over untyped ones.
+   * Returns { path: [...keys], value, itemSchema } or null.
+   */
+  function findRecordArray(root, value, schemaNode, path, depth) {
+    schemaNode = resolveSchemaRef(root, schemaNode) || null;
+    if (isRecordArray(value)) {
+      return {
+        path: path,
+        value: value,
+        itemSchema: schemaNode ? resolveSchemaRef(root, schemaNode.items) : null,
+        typed: !!(schemaNode && schemaNode.type === 'array')
+      };
+    }
+    if (!isPlainObject(value) || depth >= COMPACT_MAX_DEPTH) return null;
+    var props = (schemaNode && schemaNode.properties) || {};
+    var best = null;
+    Object.keys(value).forEach(function(key) {
+      var found = findRecordArray(root, value[key], props[key], path.concat(key), depth + 1);
+      if (!found) return;
+      if (!best || (found.typed && !best.typed) ||
+          (found.typed === best.typed && found.value.length > best.value.length)) {
+        best = found;
       }
+    });
+    return best;
+  }
+
+  function compactCell(v) {
+    if (v === null || typeof v !== 'object') return v === undefined ? null : v;
+    var s = JSON.stringify(v);
+    return s.length > COMPACT_CELL_CHARS ? s.slice(0, COMPACT_CELL_CHARS) + '…' : v;
+  }
+
+  function tabulateRecords(records, itemSchema, maxRows) {
+    // Schema property order first, then any extra keys in order of appearance
+    var columns = Object.keys((itemSchema && itemSchema.properties) || {});
+    var seen = {};
+    columns.forEach(function(c) { seen[c] = true; });
+    records.forEach(function(r) {
+      Object.keys(r).forEach(function(k) {
+        if (!seen[k]) { seen[k] = true; columns.push(k); }
+      });
+    });
+    columns = columns.filter(function(c) {
+      return records.some(function(r) { return r[c] !== undefined; });
+    });
+
+    var shown = records.slice(0, maxRows);
+    var table = {
+      count: records.length,
+      columns: columns,
+      rows: shown.map(function(r) {
+        return columns.map(function(c) { return compactCell(r[c]); });
+      })
     };
+    if (shown.length < records.length) {
+      table.omitted = records.length - shown.length;
+      // Stats cover every record, not just the sample
+      var stats = {};
+      columns.forEach(function(c) {
+        var st = { present: 0 };
+        records.forEach(function(r) {
+          var v = r[c];
+          if (v === undefined || v === null) return;
+          st.present++;
+          if (typeof v !== 'number' && typeof v !== 'string') return;
+          if (st.min === undefined || v < st.min) st.min = v;
+          if (st.max === undefined || v > st.max) st.max = v;
+        });
+        if (typeof st.min === 'string' && st.min.length > COMPACT_CELL_CHARS) delete st.min;
+        if (typeof st.max === 'string' && st.max.length > COMPACT_CELL_CHARS) delete st.max;
+        stats[c] = st;
+      });
+      table.stats = stats;
+    }
+    return table;
   }
-  DocBuddy.createSystemPromptPresetSelector = createSystemPromptPresetSelector;
 
-  // ── CodeBlock Component - Click-to-copy for code blocks ───────────────────
-  function createCodeBlock(React) {
-    return class CodeBlock extends React.Component {
-      constructor(props) {
-        super(props);
-        this.state = {
-          copied: false,
-          isHovering: false
-        };
-        this.handleCopy = this.handleCopy.bind(this);
-        this.handleMouseEnter = this.handleMouseEnter.bind(this);
-        this.handleMouseLeave = this.handleMouseLeave.bind(this);
-        this.handleClick = this.handleClick.bind(this);
+  /**
+   * Compact a JSON response body for the model. `opts.schema` is the
+   * operation's response schema (optional); `opts.root` the OpenAPI document
+   * its $refs resolve against. Returns { text, compaction } where compaction
+   * is null when the body is not JSON or nothing was saved, else
+   *   { shape: 'table'|'minified', path, count, shown,
+   *     originalChars, compactChars, ratio }.
+   */
+  function compactJsonForModel(text, opts) {
+    opts = opts || {};
+    var original = String(text || '');
+    var trimmed = original.trim();
+    if (!/^[\[{]/.test(trimmed)) return { text: original, compaction: null };
+    var data;
+    try { data = JSON.parse(trimmed); } catch (e) { return { text: original, compaction: null }; }
+
+    var maxRows = opts.maxRows > 0 ? opts.maxRows : COMPACT_MAX_ROWS;
+    var found = findRecordArray(opts.root || {}, data, opts.schema, [], 0);
+    var meta = { shape: 'minified', path: null, count: null, shown: null };
+    var out;
+    if (found) {
+      var table = tabulateRecords(found.value, found.itemSchema, maxRows);
+      var replaced = { _table: table };
+      if (found.path.length === 0) {
+        data = replaced;
+      } else {
+        var parent = found.path.slice(0, -1).reduce(function(cur, k) { return cur[k]; }, data);
+        parent[found.path[found.path.length - 1]] = replaced;
       }
+      var where = found.path.length ? '`' + found.path.join('.') + '`' : 'The response';
+      var header = '[Compacted JSON: ' + where + ' had ' + table.count + ' records, shown as ' +
+        '_table columns/rows' + (table.omitted ? ' (first ' + table.rows.length + '; stats cover all records)' : '') + ']';
+      out = header + '\n' + JSON.stringify(data);
+      meta = { shape: 'table', path: found.path.join('.'), count: table.count, shown: table.rows.length };
+    } else {
+      out = JSON.stringify(data);
+    }
+    if (out.length >= original.length) return { text: original, compaction: null };
+    meta.originalChars = original.length;
+    meta.compactChars = out.length;
+    meta.ratio = Math.round(original.length / out.length * 100) / 100;
+    return { text: out, compaction: meta };
+  }
+  DocBuddy.compactJsonForModel = compactJsonForModel;
 
-      handleCopy() {
-        var text = this.props.text;
-        if (!text) return;
+  /** e.g. "compacted 25.8 KB → 2.1 KB (11.99×)" */
+  function describeCompaction(c) {
+    if (!c) return '';
+    return 'compacted ' + formatBytes(c.originalChars) + ' → ' + formatBytes(c.compactChars) + ' (' + c.ratio + '×)';
+  }
+  DocBuddy.describeCompaction = describeCompaction;
+
+  // ── Size-capped response reading ──────────────────────────────────────────
+  // Tool responses are streamed with a byte cap and a time budget so a large
+  // export is never buffered whole, rendered, stored or sent to the model.
+  var DEFAULT_TOOL_MAX_BYTES = 64 * 1024;
+  var DEFAULT_TOOL_TIME_BUDGET_MS = 15000;
+  var BINARY_CONTENT_TYPE_RE = /^(image|audio|video|font)\/|^application\/(octet-stream|pdf|zip|gzip|x-gzip|x-tar|x-7z-compressed|vnd\.ms-excel|vnd\.openxmlformats|msword|wasm|protobuf|x-protobuf)/i;
+
+  // Binary if there are NUL bytes or mostly control characters in the sample
+  function looksBinary(bytes) {
+    var sample = Math.min(bytes.length, 512);
+    var control = 0;
+    for (var i = 0; i < sample; i++) {
+      var b = bytes[i];
+      if (b === 0) return true;
+      if (b < 9 || (b > 13 && b < 32)) control++;
+    }
+    return sample > 0 && control / sample > 0.1;
+  }
 
-        var self = this;
-        copyToClipboard(text).then(function(copied) {
-          if (copied) {
-            self.setState({ copied: true });
-            setTimeout(function() {
-              self.setState({ copied: false });
-            }, 2000);
+  /**
+   * Read a fetch Response body as text, stopping early once `maxBytes` have
+   * been read or `timeoutMs` has passed. Binary bodies (by Content-Type or by
+   * sniffing the first chunk) are not decoded. Resolves to
+   *   { text, truncated, reason, bytesKept, totalBytes, totalKnown, contentType }
+   * where reason is null, 'size', 'time' or 'binary'. totalBytes comes from
+   * Content-Length when present, else it is the number of bytes seen.
+   * Rejects with an AbortError if `signal` fires.
+   */
+  function readResponseCapped(res, opts) {
+    opts = opts || {};
+    var maxBytes = opts.maxBytes > 0 ? opts.maxBytes : DEFAULT_TOOL_MAX_BYTES;
+    var timeoutMs = opts.timeoutMs > 0 ? opts.timeoutMs : DEFAULT_TOOL_TIME_BUDGET_MS;
+    var signal = opts.signal;
+    var contentType = (res.headers && res.headers.get && res.headers.get('content-type')) || '';
+    var lengthHeader = parseInt(res.headers && res.headers.get && res.headers.get('content-length'), 10);
+    var result = {
+      text: '',
+      truncated: false,
+      reason: null,
+      bytesKept: 0,
+      totalBytes: lengthHeader >= 0 ? lengthHeader : 0,
+      totalKnown: lengthHeader >= 0,
+      contentType: contentType
+    };
+
+    if (!res.body || !res.body.getReader) {
+      return res.text().then(function(text) {
+        result.text = text.length > maxBytes ? text.slice(0, maxBytes) : text;
+        result.truncated = text.length > maxBytes;
+        result.reason = result.truncated ? 'size' : null;
+        result.bytesKept = result.text.length;
+        if (!result.totalKnown) result.totalBytes = text.length;
+        return result;
+      });
+    }
+
+    if (BINARY_CONTENT_TYPE_RE.test(contentType)) {
+      res.body.cancel().catch(function() {});
+      result.truncated = true;
+      result.reason = 'binary';
+      return Promise.resolve(result);
+    }
+
+    var reader = res.body.getReader();
+    var decoder = new TextDecoder();
+    var seen = 0;
+    var stopReason = null;
+    var timer = setTimeout(function() {
+      stopReason = 'time';
+      reader.cancel().catch(function() {});
+    }, timeoutMs);
+    var onAbort = function() {
+      stopReason = 'abort';
+      reader.cancel().catch(function() {});
+    };
+    if (signal) signal.addEventListener('abort', onAbort);
+
+    var finish = function() {
+      clearTimeout(timer);
+      if (signal) signal.removeEventListener('abort', onAbort);
+      result.text += decoder.decode();
+      if (!result.totalKnown) result.totalBytes = seen;
+      result.truncated = !!result.reason;
+      return result;
+    };
+
+    var pump = function() {
+      return reader.read().then(function(chunk) {
+        if (stopReason === 'abort') throw abortError();
+        if (stopReason === 'time') {
+          result.reason = 'time';
+          return finish();
+        }
+        if (chunk.done) return finish();
+        var bytes = chunk.value;
+        if (seen === 0 && !contentType && looksBinary(bytes)) {
+          reader.cancel().catch(function() {});
+          result.reason = 'binary';
+          seen = bytes.length;
+          return finish();
+        }
+        seen += bytes.length;
+        var room = maxBytes - result.bytesKept;
+        if (bytes.length >= room) {
+          result.text += decoder.decode(bytes.subarray(0, room), { stream: true });
+          result.bytesKept += room;
+          // Stop at the cap unless this chunk ends the body exactly there
+          if (bytes.length > room || !result.totalKnown || result.totalBytes > maxBytes) {
+            result.reason = 'size';
+            reader.cancel().catch(function() {});
+            return finish();
           }
-        }).catch(function(err) {
-          console.error('Failed to copy:', err);
+          return pump();
+        }
+        result.text += decoder.decode(bytes, { stream: true });
+        result.bytesKept += bytes.length;
+        return pump();
+      }, function(err) {
+        if (stopReason === 'abort' || (err && err.name === 'AbortError')) throw abortError();
+        if (stopReason === 'time') {
+          result.reason = 'time';
+          return finish();
+        }
+        throw err;
+      });
+    };
+    return pump().catch(function(err) {
+      clearTimeout(timer);
+      if (signal) signal.removeEventListener('abort', onAbort);
+      throw err;
+    });
+  }
+  DocBuddy.readResponseCapped = readResponseCapped;
+
+  function formatBytes(n) {
+    if (n < 1024) return n + ' B';
+    if (n < 1024 * 1024) return (n / 1024).toFixed(1).replace(/\.0$/, '') + ' KB';
+    return (n / (1024 * 1024)).toFixed(1).replace(/\.0$/, '') + ' MB';
+  }
+  DocBuddy.formatBytes = formatBytes;
+
+  /** One-line description of a truncated tool response, or '' if complete. */
+  function describeTruncation(t) {
+    if (!t || !t.reason) return '';
+    var total = formatBytes(t.totalBytes) + (t.totalKnown ? '' : '+');
+    if (t.reason === 'binary') {
+      return 'Binary response (' + (t.contentType || 'unknown type') + (t.totalBytes ? ', ' + total : '') + ') omitted';
+    }
+    var why = t.reason === 'time' ? 'time budget reached' : 'size limit';
+    return 'Response truncated: kept ' + formatBytes(t.bytesKept) + ' of ' + total + ' (' + why + ')';
+  }
+  DocBuddy.describeTruncation = describeTruncation;
+
+  /**
+   * Tool message content for an executeToolRequest result. `maxChars`
+   * optionally shortens the body further (workflow blocks keep 4000).
+   */
+  function formatToolResult(responseObj, maxChars) {
+    var body = String((responseObj.modelBody != null ? responseObj.modelBody : responseObj.body) || '');
+    if (maxChars && body.length > maxChars) body = body.substring(0, maxChars);
+    var note = describeTruncation(responseObj.truncation);
+    return 'Status: ' + responseObj.status + ' ' + (responseObj.statusText || '') + '\n\n' + body +
+      (note ? (body ? '\n\n' : '') + '[' + note + ']' : '');
+  }
+  DocBuddy.formatToolResult = formatToolResult;
+
+  /**
+   * Execute an api_request tool call. Resolves to
+   * { status, statusText, body, truncation, compaction, modelBody? }, where
+   * truncation is the readResponseCapped metadata (reason is null when the
+   * body is complete) and compaction the compactJsonForModel savings, if any.
+   * `body` is the response as received, for display; `modelBody` is the
+   * compacted text sent to the model in its place. Network failures
+   * resolve with status 0. Rejects only on AbortError so
+   * the caller can distinguish cancellation.
+   */
+  function executeToolRequest(args, signal) {
+    var invalid = validateToolArgs(DocBuddy._cachedOpenapiSchema, args);
+    if (invalid) return Promise.resolve(invalid);
+    var req = buildToolRequest(args);
+    if (req.error) return Promise.resolve(req.error);
+    if (signal) req.options.signal = signal;
+    var toolSettings = loadToolSettings();
+
+    return trackedFetch(req.url, req.options, 'tool')
+      .then(function(res) {
+        return readResponseCapped(res, {
+          maxBytes: toolSettings.maxResponseKb * 1024,
+          timeoutMs: toolSettings.responseTimeoutSec * 1000,
+          signal: signal
+        }).then(function(read) {
+          var truncation = {
+            reason: read.reason,
+            bytesKept: read.bytesKept,
+            totalBytes: read.totalBytes,
+            totalKnown: read.totalKnown,
+            contentType: read.contentType
+          };
+          var result = { status: res.status, statusText: res.statusText, body: read.text, truncation: truncation, compaction: null };
+          if (toolSettings.compactJson && !read.reason) {
+            var normalized = normalizeToolArgs(args);
+            var root = DocBuddy._cachedOpenapiSchema;
+            var operation = root ? findOperation(root, normalized.method, normalized.path) : null;
+            var compacted = compactJsonForModel(read.text, {
+              root: root,
+              schema: operation ? getResponseSchema(root, operation, res.status) : null
+            });
+            if (compacted.compaction) {
+              result.modelBody = compacted.text;
+              result.compaction = compacted.compaction;
+            }
+          }
+          return result;
+        });
+      })
+      .catch(function(err) {
+        if (err && err.name === 'AbortError') throw err;
+        console.error('[Tool Call Error]', err && err.message);
+        return { status: 0, statusText: 'Network Error', body: err && err.message };
+      });
+  }
+  DocBuddy.executeToolRequest = executeToolRequest;
+
+  // ── Speculative execution of safe tool calls ──────────────────────────────
+  // While the model is still streaming, a tool call whose arguments are
+  // already complete and whose method is safe/idempotent can be started early.
+  // The executor later claims the in-flight result; if the final (possibly
+  // user-edited) arguments differ, the speculative result is discarded. The
+  // request shares the stream's abort signal, so stopping the stream cancels it.
+  var SPECULATIVE_METHODS = { GET: true, HEAD: true };
+
+  function _speculativeKeys(toolCall) {
+    var keys = [];
+    if (toolCall && toolCall.id) keys.push('id:' + toolCall.id);
+    if (toolCall && toolCall.index != null) keys.push('index:' + toolCall.index);
+    return keys;
+  }
+
+  function speculateToolCall(store, toolCall, signal) {
+    if (!store || !toolCall || !toolCall.function || !toolCall.function.name) return false;
+    try { JSON.parse(toolCall.function.arguments || ''); } catch (e) { return false; }
+    var normalized = normalizeToolArgs(toolCallToApiArgs(toolCall));
+    if (!SPECULATIVE_METHODS[normalized.method]) return false;
+
+    var keys = _speculativeKeys(toolCall);
+    if (keys.length === 0 || keys.some(function(k) { return store[k]; })) return false;
+
+    var entry = { key: stableStringify(normalized), promise: executeToolRequest(normalized, signal) };
+    entry.promise.catch(function() {});
+    keys.forEach(function(k) { store[k] = entry; });
+    console.debug('[Tool Call] Speculatively started', normalized.method, normalized.path);
+    return true;
+  }
+  DocBuddy.speculateToolCall = speculateToolCall;
+
+  /**
+   * Take the speculative result for a tool call if its arguments match the
+   * arguments about to be executed. Returns a Promise or null.
+   */
+  function claimSpeculativeToolCall(store, toolCall, args) {
+    if (!store) return null;
+    var keys = _speculativeKeys(toolCall);
+    var entry = null;
+    keys.forEach(function(k) {
+      if (store[k]) entry = store[k];
+      delete store[k];
+    });
+    if (!entry) return null;
+    if (entry.key !== stableStringify(normalizeToolArgs(args))) {
+      console.debug('[Tool Call] Discarded speculative result (arguments changed)');
+      return null;
+    }
+    return entry.promise;
+  }
+  DocBuddy.claimSpeculativeToolCall = claimSpeculativeToolCall;
+
+  // ── Markdown parser initialization (marked.js) ────────────────────────────
+  var marked = (typeof window.marked !== 'undefined') ? window.marked : null;
+  function initMarked() {
+    if (!marked && typeof window.marked !== 'undefined') {
+      marked = window.marked;
+    }
+    return marked;
+  }
+  DocBuddy.initMarked = initMarked;
+
+  // ── Parse Markdown safely ─────────────────────────────────────────────────
+  function _escapeHtml(text) {
+    return text.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;').replace(/"/g, '&quot;').replace(/'/g, '&#39;').replace(/\n/g, '<br>');
+  }
+
+  // Register DOMPurify hook to force rel="noopener noreferrer" on links
+  // with target="_blank" (prevents tabnapping via window.opener) while
+  // preserving any existing rel directives (e.g., "nofollow").
+  var _domPurifyHooksRegistered = false;
+  function _ensureDomPurifyHooks() {
+    if (_domPurifyHooksRegistered || typeof DOMPurify === 'undefined') return;
+    DOMPurify.addHook('afterSanitizeAttributes', function(node) {
+      if (node.tagName === 'A') {
+        var target = node.getAttribute('target');
+        if (target && target.toLowerCase() === '_blank') {
+          var existingRel = node.getAttribute('rel') || '';
+          var tokens = existingRel ? existingRel.split(/\s+/) : [];
+          var relSet = {};
+          for (var i = 0; i < tokens.length; i++) {
+            if (tokens[i]) {
+              relSet[tokens[i]] = true;
+            }
+          }
+          relSet.noopener = true;
+          relSet.noreferrer = true;
+          var combined = [];
+          for (var key in relSet) {
+            if (Object.prototype.hasOwnProperty.call(relSet, key)) {
+              combined.push(key);
+            }
+          }
+          node.setAttribute('rel', combined.join(' '));
+        }
+      }
+    });
+    _domPurifyHooksRegistered = true;
+  }
+
+  function parseMarkdown(text) {
+    if (!text || typeof text !== 'string') return '';
+    if (typeof DOMPurify === 'undefined') {
+      console.error('DOMPurify not loaded — refusing to render markdown. Falling back to plain text.');
+      return _escapeHtml(text);
+    }
+    _ensureDomPurifyHooks();
+    try {
+      if (marked) {
+        var html = marked.parse(text);
+        var sanitized = DOMPurify.sanitize(html, {
+          ALLOWED_TAGS: ['p', 'br', 'strong', 'b', 'em', 'i', 'u', 'a', 'code', 'pre',
+            'blockquote', 'ul', 'ol', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+            'table', 'thead', 'tbody', 'tr', 'th', 'td', 'hr', 'span', 'div', 'del', 'sup', 'sub'],
+          ALLOWED_ATTR: ['href', 'target', 'rel', 'class', 'id', 'alt', 'title'],
+          ALLOW_DATA_ATTR: false
         });
+        if (/<script[\s>]/i.test(sanitized) || /\bon[a-z]+\s*=/i.test(sanitized)) {
+          console.error('DOMPurify produced suspicious output — falling back to plain text');
+          return _escapeHtml(text);
+        }
+        return sanitized;
       }
+    } catch (e) {
+      console.error('Markdown parsing error:', e);
+    }
+    return _escapeHtml(text);
+  }
+  DocBuddy.parseMarkdown = parseMarkdown;
 
-      handleMouseEnter() {
-        this.setState({ isHovering: true });
+  // ── Theme default configurations ─────────────────────────────────────────────
+  var THEME_DEFINITIONS = {
+    dark: {
+      name: 'Dark',
+      primary: '#1d4ed8',
+      primaryHover: '#1e40af',
+      secondary: '#2d3748',
+      accent: '#718096',
+      background: '#0f172a',
+      panelBg: '#1f2937',
+      headerBg: '#111827',
+      borderColor: '#4a5568',
+      textPrimary: '#f7fafc',
+      textSecondary: '#cbd5e0',
+      inputBg: '#1f2937',
+    },
+    light: {
+      name: 'Light',
+      primary: '#2563eb',
+      primaryHover: '#1d4ed8',
+      secondary: '#e2e8f0',
+      accent: '#718096',
+      background: '#f7fafc',
+      panelBg: '#ffffff',
+      headerBg: '#edf2f7',
+      borderColor: '#cbd5e0',
+      textPrimary: '#1a202c',
+      textSecondary: '#4a5568',
+      inputBg: '#f7fafc',
+    }
+  };
+  DocBuddy.THEME_DEFINITIONS = THEME_DEFINITIONS;
+
+  // ── Storage keys ──────────────────────────────────────────────────────────
+  var THEME_STORAGE_KEY = "docbuddy-theme";
+  var SETTINGS_STORAGE_KEY = "docbuddy-settings";
+  var CHAT_HISTORY_KEY = "docbuddy-chat-history";
+  var TOOL_SETTINGS_KEY = "docbuddy-tool-settings";
+  var WORKFLOW_STORAGE_KEY = 'docbuddy-workflow';
+  var WORKFLOW_CACHE_KEY = 'docbuddy-workflow-cache';
+  var AGENT_HISTORY_KEY = 'docbuddy-agent-history';
+  var CONTEXT_SUMMARY_KEY = 'docbuddy-context-summary';
+  var API_BASE_URL_KEY = "docbuddy-api-base-url";
+  var AUTO_DETECT_API_URL_KEY = "docbuddy-auto-detect-api-url";
+  var DISCOVERY_CACHE_KEY = 'docbuddy-provider-discovery';
+
+  // ── Settings store ────────────────────────────────────────────────────────
+  // Settings are read on every message, tool call and workflow block, so each
+  // key is parsed from localStorage once and then served from memory. Writes
+  // update memory at once and reach localStorage together, STORE_FLUSH_DELAY_MS
+  // later or when the page is hidden. A `storage` event from another tab drops
+  // the cached copy of that key unless this tab has a write pending for it.
+  var STORE_FLUSH_DELAY_MS = 250;
+  var _store = {};
+  var _storePending = {};
+  var _storeFlushTimer = null;
+
+  function hasOwn(obj, key) {
+    return Object.prototype.hasOwnProperty.call(obj, key);
+  }
+
+  function readStore(key) {
+    if (!hasOwn(_store, key)) {
+      var value = null;
+      try {
+        var raw = localStorage.getItem(key);
+        value = raw ? JSON.parse(raw) : null;
+      } catch (e) {
+        value = null;
       }
+      _store[key] = value;
+    }
+    return _store[key];
+  }
+
+  function writeStore(key, value) {
+    var raw = JSON.stringify(value === undefined ? null : value);
+    // Keep a private copy so callers mutating `value` later can't change the store
+    _store[key] = JSON.parse(raw);
+    _storePending[key] = raw;
+    if (!_storeFlushTimer) _storeFlushTimer = setTimeout(flushStore, STORE_FLUSH_DELAY_MS);
+  }
+
+  /** Write all pending settings to localStorage now. */
+  function flushStore() {
+    clearTimeout(_storeFlushTimer);
+    _storeFlushTimer = null;
+    var pending = _storePending;
+    _storePending = {};
+    Object.keys(pending).forEach(function(key) {
+      try {
+        localStorage.setItem(key, pending[key]);
+      } catch (e) {
+        // ignore
+      }
+    });
+  }
+  DocBuddy.flushSettingsStore = flushStore;
+
+  /** Forget the cached value for `key` (after writing localStorage directly). */
+  function invalidateStore(key) {
+    delete _store[key];
+    delete _storePending[key];
+  }
+  DocBuddy.invalidateSettingsStore = invalidateStore;
+
+  window.addEventListener('storage', function(e) {
+    if (e.storageArea && e.storageArea !== localStorage) return;
+    Object.keys(_store).forEach(function(key) {
+      // A null key means another tab cleared localStorage
+      if ((e.key === null || e.key === key) && !hasOwn(_storePending, key)) delete _store[key];
+    });
+  });
+  window.addEventListener('pagehide', flushStore);
+  document.addEventListener('visibilitychange', function() {
+    if (document.visibilityState === 'hidden') flushStore();
+  });
+
+  // ── In-memory cache for OpenAPI schema ────────────────────────────────────
+  DocBuddy._cachedOpenapiSchema = null;
+  DocBuddy._openapiSchemaFetchPromise = null;
+  DocBuddy._schemaFetchUrl = null;
+  DocBuddy._schemaFetchFailed = false;
+
+  function ensureOpenapiSchemaCached(onDone) {
+    var targetUrl = window.DOCBUDDY_OPENAPI_URL || "/openapi.json";
+    if (DocBuddy._cachedOpenapiSchema) {
+      if (DocBuddy._schemaFetchUrl === targetUrl) {
+        // Cache hit — same URL, return immediately
+        if (onDone) onDone(DocBuddy._cachedOpenapiSchema);
+        return;
+      }
+      // URL changed — invalidate stale cache
+      DocBuddy._cachedOpenapiSchema = null;
+      DocBuddy._openapiSchemaFetchPromise = null;
+      DocBuddy._schemaFetchFailed = false;
+    }
+    // Negative cache: if a previous fetch for this URL failed, don't retry
+    if (DocBuddy._schemaFetchFailed && DocBuddy._schemaFetchUrl === targetUrl) {
+      return;
+    }
+    if (!DocBuddy._openapiSchemaFetchPromise) {
+      var fetchUrl = targetUrl;
+      DocBuddy._schemaFetchUrl = fetchUrl;
+      DocBuddy._schemaFetchFailed = false;
+      // Another tab may already hold this schema; only fetch when none does
+      DocBuddy._openapiSchemaFetchPromise = requestSharedSchema(fetchUrl)
+        .then(function(shared) {
+          if (shared) return shared;
+          return trackedFetch(fetchUrl, {}, 'schema')
+            .then(function(res) {
+              if (!res.ok) throw new Error('HTTP ' + res.status);
+              return res.json();
+            })
+            .then(function(schema) {
+              shareSchema(fetchUrl, schema);
+              return schema;
+            });
+        })
+        .then(function(schema) {
+          // Only cache if this fetch is still current (prevents race conditions)
+          if (DocBuddy._schemaFetchUrl === fetchUrl) {
+            DocBuddy._cachedOpenapiSchema = schema;
+            DocBuddy._openapiSchemaFetchPromise = null;
+          }
+          return schema;
+        })
+        .catch(function(err) {
+          if (DocBuddy._schemaFetchUrl === fetchUrl) {
+            DocBuddy._schemaFetchFailed = true;
+            DocBuddy._openapiSchemaFetchPromise = null;
+          }
+          console.warn('Failed to fetch OpenAPI schema:', err);
+        });
+    }
+    if (onDone) {
+      DocBuddy._openapiSchemaFetchPromise.then(onDone).catch(function() {});
+    }
+  }
+  DocBuddy.ensureOpenapiSchemaCached = ensureOpenapiSchemaCached;
+
+  // ── Cross-tab sharing ─────────────────────────────────────────────────────
+  // Docs tabs of one origin share state over a SharedWorker
+  // (shared-worker.js), or a BroadcastChannel where workers are unavailable
+  // or the static files come from another origin. The worker holds fetched
+  // schemas with their built context text, so new tabs attach without a
+  // fetch; with a BroadcastChannel, peer tabs answer from memory instead.
+  // Settings, history and provider-probe changes go out as small deltas:
+  //   { type: 'delta', key, data, from }
+  // and arrive as `docbuddy-settings-sync`, `docbuddy-history-sync` and
+  // `docbuddy-discovery` window events.
+
+  var TAB_CHANNEL_NAME = 'docbuddy-tabs';
+  var TAB_REQUEST_TIMEOUT_MS = 250;
+  var _tabId = Date.now().toString(36) + Math.random().toString(36).slice(2, 8);
+  var _tabBus = null;
+  var _tabPeers = 0;
+  var _tabPending = {};
+  var _tabRequestSeq = 0;
+
+  function connectTabBus() {
+    var workerUrl = null;
+    try {
+      workerUrl = new URL(STATIC_BASE + '/shared-worker.js', window.location.href);
+    } catch (e) {}
+    if (typeof SharedWorker !== 'undefined' && workerUrl && workerUrl.origin === window.location.origin) {
+      try {
+        var worker = new SharedWorker(workerUrl.href, { name: 'docbuddy' });
+        worker.port.onmessage = function(e) { handleTabMessage(e.data || {}); };
+        worker.port.start();
+        return { mode: 'worker', post: function(msg) { worker.port.postMessage(msg); } };
+      } catch (e) {
+        // fall through to BroadcastChannel
+      }
+    }
+    if (typeof BroadcastChannel !== 'undefined') {
+      var channel = new BroadcastChannel(TAB_CHANNEL_NAME);
+      channel.onmessage = function(e) { handleTabMessage(e.data || {}); };
+      return { mode: 'broadcast', post: function(msg) { channel.postMessage(msg); } };
+    }
+    return null;
+  }
+
+  function postTabMessage(msg) {
+    if (!_tabBus) return;
+    try {
+      _tabBus.post(Object.assign({ from: _tabId }, msg));
+    } catch (e) {
+      // Uncloneable payloads are simply not shared
+    }
+  }
+
+  /** Ask the worker (or peer tabs) for `type`; resolves null when nobody answers. */
+  function tabRequest(type, data) {
+    if (!_tabBus || (_tabBus.mode === 'broadcast' && _tabPeers === 0)) return Promise.resolve(null);
+    var id = _tabId + ':' + (++_tabRequestSeq);
+    return new Promise(function(resolve) {
+      _tabPending[id] = resolve;
+      setTimeout(function() {
+        if (_tabPending[id]) {
+          delete _tabPending[id];
+          resolve(null);
+        }
+      }, TAB_REQUEST_TIMEOUT_MS);
+      postTabMessage(Object.assign({ type: type, id: id }, data));
+    });
+  }
+
+  function publishTabDelta(key, data) {
+    postTabMessage({ type: 'delta', key: key, data: data });
+  }
+  DocBuddy.publishTabDelta = publishTabDelta;
+
+  /** A schema another tab already fetched from `url`, or null. */
+  function requestSharedSchema(url) {
+    return tabRequest('get-schema', { url: url }).then(function(shared) {
+      if (!shared || !shared.schema) return null;
+      if (shared.context != null) _openApiContext = { hash: getSchemaHash(shared.schema), text: shared.context };
+      return shared.schema;
+    });
+  }
+
+  function shareSchema(url, schema) {
+    postTabMessage({ type: 'put-schema', url: url, data: { schema: schema, context: getOpenApiContext(schema) } });
+  }
+
+  function handleTabMessage(msg) {
+    if (msg.from === _tabId) return;
+    switch (msg.type) {
+      case 'reply':
+        if (_tabPending[msg.id]) {
+          var resolve = _tabPending[msg.id];
+          delete _tabPending[msg.id];
+          resolve(msg.data);
+        }
+        break;
+      case 'hello':
+        _tabPeers++;
+        postTabMessage({ type: 'here' });
+        break;
+      case 'here':
+        _tabPeers++;
+        break;
+      case 'bye':
+        _tabPeers = Math.max(0, _tabPeers - 1);
+        break;
+      case 'get-schema':
+        // BroadcastChannel mode: answer from this tab's memory
+        if (DocBuddy._cachedOpenapiSchema && DocBuddy._schemaFetchUrl === msg.url) {
+          postTabMessage({ type: 'reply', id: msg.id, data: { schema: DocBuddy._cachedOpenapiSchema, context: getOpenApiContext(DocBuddy._cachedOpenapiSchema) } });
+        }
+        break;
+      case 'delta':
+        applyTabDelta(msg.key, msg.data);
+        break;
+    }
+  }
+
+  function applyTabDelta(key, data) {
+    if (key === 'settings' || key === 'tool-settings') {
+      var storeKey = key === 'settings' ? SETTINGS_STORAGE_KEY : TOOL_SETTINGS_KEY;
+      if (hasOwn(_store, storeKey) && !hasOwn(_storePending, storeKey)) {
+        var merged = Object.assign({}, _store[storeKey]);
+        Object.keys(data).forEach(function(k) {
+          if (data[k] === null) delete merged[k];
+          else merged[k] = data[k];
+        });
+        _store[storeKey] = merged;
+      }
+      window.dispatchEvent(new CustomEvent('docbuddy-settings-sync', { detail: { key: key, patch: data } }));
+    } else if (key === CHAT_HISTORY_KEY || key === AGENT_HISTORY_KEY) {
+      var base = _savedHistories[key] || readStoredHistory(key);
+      var next = applyHistoryDelta(base, data) || readStoredHistory(key);
+      _savedHistories[key] = next;
+      window.dispatchEvent(new CustomEvent('docbuddy-history-sync', {
+        detail: { panel: key === CHAT_HISTORY_KEY ? 'chat' : 'agent', messages: next }
+      }));
+    } else if (key === 'discovery') {
+      window.dispatchEvent(new CustomEvent('docbuddy-discovery', { detail: data }));
+    }
+  }
+
+  /** Keys of `next` whose values differ from `prev` (removed keys map to null). */
+  function diffSettings(prev, next) {
+    var patch = {};
+    var changed = false;
+    Object.keys(next).forEach(function(k) {
+      if (stableStringify(prev[k]) !== stableStringify(next[k])) {
+        patch[k] = next[k];
+        changed = true;
+      }
+    });
+    Object.keys(prev).forEach(function(k) {
+      if (!(k in next)) {
+        patch[k] = null;
+        changed = true;
+      }
+    });
+    return changed ? patch : null;
+  }
+  DocBuddy.diffSettings = diffSettings;
+
+  // Last history each tab wrote or received, per storage key: the base that
+  // deltas are computed against
+  var _savedHistories = {};
+
+  function readStoredHistory(key) {
+    try {
+      var raw = localStorage.getItem(key);
+      return raw ? JSON.parse(raw) : [];
+    } catch (e) {
+      return [];
+    }
+  }
+
+  /**
+   * Delta between two stored histories. Saving trims from the front and
+   * streaming rewrites the newest message, so a delta is how many messages
+   * to drop from the front, how many to keep, and what to append.
+   */
+  function diffHistory(prev, next) {
+    var prevKeys = prev.map(stableStringify);
+    var nextKeys = next.map(stableStringify);
+    var drop = next.length ? prevKeys.indexOf(nextKeys[0]) : prev.length;
+    if (drop === -1) return { reset: true, messages: next };
+    var keep = 0;
+    while (drop + keep < prev.length && keep < next.length && prevKeys[drop + keep] === nextKeys[keep]) keep++;
+    if (drop === 0 && keep === prev.length && keep === next.length) return null;
+    return { drop: drop, keep: keep, append: next.slice(keep), length: next.length };
+  }
+  DocBuddy.diffHistory = diffHistory;
+
+  /** `local` with a diffHistory delta applied, or null if it does not fit. */
+  function applyHistoryDelta(local, delta) {
+    if (delta.reset) return delta.messages.slice();
+    if (local.length < delta.drop + delta.keep) return null;
+    var next = local.slice(delta.drop, delta.drop + delta.keep).concat(delta.append);
+    return next.length === delta.length ? next : null;
+  }
+  DocBuddy.applyHistoryDelta = applyHistoryDelta;
+
+  function saveHistory(key, messages) {
+    var prev = _savedHistories[key] || readStoredHistory(key);
+    try {
+      localStorage.setItem(key, JSON.stringify(messages));
+    } catch (e) {
+      // ignore
+    }
+    _savedHistories[key] = messages;
+    var delta = diffHistory(prev, messages);
+    if (delta) publishTabDelta(key, delta);
+  }
+
+  _tabBus = connectTabBus();
+  if (_tabBus) {
+    postTabMessage({ type: 'hello' });
+    window.addEventListener('pagehide', function() { postTabMessage({ type: 'bye' }); });
+  }
+
+  // ── Theme loading/saving functions ─────────────────────────────────────────
+  function loadTheme() {
+    try {
+      var raw = localStorage.getItem(THEME_STORAGE_KEY);
+      if (raw) {
+        var parsed = JSON.parse(raw);
+        if (parsed.theme && THEME_DEFINITIONS[parsed.theme]) {
+          return parsed;
+        }
+      }
+    } catch (e) {
+      console.warn('Failed to load theme from localStorage:', e);
+    }
+    return { theme: 'light', customColors: {} };
+  }
+  DocBuddy.loadTheme = loadTheme;
+
+  function saveTheme(themeData) {
+    try {
+      localStorage.setItem(THEME_STORAGE_KEY, JSON.stringify(themeData));
+    } catch (e) {
+      // ignore
+    }
+  }
+  DocBuddy.saveTheme = saveTheme;
+
+  function loadFromStorage() {
+    return Object.assign({}, readStore(SETTINGS_STORAGE_KEY));
+  }
+  DocBuddy.loadFromStorage = loadFromStorage;
+
+  function saveToStorage(state) {
+    var patch = diffSettings(loadFromStorage(), state);
+    writeStore(SETTINGS_STORAGE_KEY, state);
+    if (patch) publishTabDelta('settings', patch);
+  }
+  DocBuddy.saveToStorage = saveToStorage;
+
+  /** Merge fields changed through llmSettingsReducer into the stored settings. */
+  function patchStoredSettings(fields) {
+    var current = loadFromStorage();
+    var patch = diffSettings(current, Object.assign({}, current, fields));
+    if (!patch) return;
+    writeStore(SETTINGS_STORAGE_KEY, Object.assign(current, fields));
+    publishTabDelta('settings', patch);
+  }
+
+  function loadChatHistory() {
+    try {
+      var raw = localStorage.getItem(CHAT_HISTORY_KEY);
+      return raw ? JSON.parse(raw) : [];
+    } catch (e) {
+      return [];
+    }
+  }
+  DocBuddy.loadChatHistory = loadChatHistory;
+
+  function saveChatHistory(messages) {
+    saveHistory(CHAT_HISTORY_KEY, messages.slice(-20));
+  }
+  DocBuddy.saveChatHistory = saveChatHistory;
+
+  function exportAsJson(data, filename) {
+    try {
+      var json = JSON.stringify(data, null, 2);
+      var blob = new Blob([json], { type: 'application/json' });
+      var url = URL.createObjectURL(blob);
+      var a = document.createElement('a');
+      a.href = url;
+      a.download = filename || 'export.json';
+      document.body.appendChild(a);
+      a.click();
+      document.body.removeChild(a);
+      URL.revokeObjectURL(url);
+    } catch (e) {
+      console.error('Failed to export:', e);
+    }
+  }
+  DocBuddy.exportAsJson = exportAsJson;
+
+  var DEFAULT_TOOL_SETTINGS = {
+    enableTools: false,
+    autoExecute: false,
+    apiKey: '',
+    maxResponseKb: DEFAULT_TOOL_MAX_BYTES / 1024,
+    responseTimeoutSec: DEFAULT_TOOL_TIME_BUDGET_MS / 1000,
+    compactJson: true,
+    toolMode: 'generic',
+    toolTopK: DEFAULT_TYPED_TOOL_TOP_K
+  };
+
+  function loadToolSettings() {
+    return Object.assign({}, DEFAULT_TOOL_SETTINGS, readStore(TOOL_SETTINGS_KEY));
+  }
+  DocBuddy.loadToolSettings = loadToolSettings;
+
+  function saveToolSettings(settings) {
+    var patch = diffSettings(loadToolSettings(), settings);
+    writeStore(TOOL_SETTINGS_KEY, settings);
+    if (patch) publishTabDelta('tool-settings', patch);
+  }
+  DocBuddy.saveToolSettings = saveToolSettings;
+
+  // ── API Base URL helpers ───────────────────────────────────────────────────
+  function loadApiBaseUrl() {
+    return readStore(API_BASE_URL_KEY);
+  }
+  DocBuddy.loadApiBaseUrl = loadApiBaseUrl;
+
+  function saveApiBaseUrl(url) {
+    writeStore(API_BASE_URL_KEY, url);
+  }
+  DocBuddy.saveApiBaseUrl = saveApiBaseUrl;
+
+  function loadAutoDetectApiUrl() {
+    var enabled = readStore(AUTO_DETECT_API_URL_KEY);
+    return enabled == null ? true : enabled;
+  }
+  DocBuddy.loadAutoDetectApiUrl = loadAutoDetectApiUrl;
+
+  function saveAutoDetectApiUrl(enabled) {
+    writeStore(AUTO_DETECT_API_URL_KEY, enabled);
+  }
+  DocBuddy.saveAutoDetectApiUrl = saveAutoDetectApiUrl;
+
+  // ── Workflow storage helpers ────────────────────────────────────────────────
+  function loadWorkflow() {
+    try {
+      var data = localStorage.getItem(WORKFLOW_STORAGE_KEY);
+      if (data) return JSON.parse(data);
+    } catch (e) {}
+    return null;
+  }
+  DocBuddy.loadWorkflow = loadWorkflow;
+
+  function saveWorkflow(workflow) {
+    try {
+      localStorage.setItem(WORKFLOW_STORAGE_KEY, JSON.stringify(workflow));
+    } catch (e) {}
+  }
+  DocBuddy.saveWorkflow = saveWorkflow;
+
+  function createDefaultBlock() {
+    return {
+      id: generateMessageId(),
+      type: 'prompt',
+      content: '',
+      output: '',
+      status: 'idle',
+      enableTools: true
+    };
+  }
+  DocBuddy.createDefaultBlock = createDefaultBlock;
+
+  // ── Workflow output cache ──────────────────────────────────────────────────
+  // Block outputs keyed by a hash of everything that can change them. Bounded
+  // to WORKFLOW_CACHE_LIMIT entries; the least recently used are evicted.
+  var WORKFLOW_CACHE_LIMIT = 100;
+
+  function loadWorkflowCache() {
+    try {
+      var data = localStorage.getItem(WORKFLOW_CACHE_KEY);
+      if (data) {
+        var parsed = JSON.parse(data);
+        if (parsed && parsed.entries) return parsed;
+      }
+    } catch (e) {}
+    return { entries: {} };
+  }
+  DocBuddy.loadWorkflowCache = loadWorkflowCache;
+
+  function saveWorkflowCache(cache) {
+    var keys = Object.keys(cache.entries).sort(function(a, b) {
+      return (cache.entries[b].usedAt || 0) - (cache.entries[a].usedAt || 0);
+    });
+    var limit = WORKFLOW_CACHE_LIMIT;
+    while (limit > 0) {
+      var kept = {};
+      keys.slice(0, limit).forEach(function(k) { kept[k] = cache.entries[k]; });
+      try {
+        localStorage.setItem(WORKFLOW_CACHE_KEY, JSON.stringify({ entries: kept }));
+        cache.entries = kept;
+        return;
+      } catch (e) {
+        // Quota exceeded — retry with half as many entries
+        limit = Math.floor(Math.min(limit, keys.length) / 2);
+      }
+    }
+  }
+  DocBuddy.saveWorkflowCache = saveWorkflowCache;
+
+  function clearWorkflowCache() {
+    try {
+      localStorage.removeItem(WORKFLOW_CACHE_KEY);
+    } catch (e) {}
+  }
+  DocBuddy.clearWorkflowCache = clearWorkflowCache;
+
+  // ── Agent storage helpers ──────────────────────────────────────────────────
+  function loadAgentHistory() {
+    try {
+      var raw = localStorage.getItem(AGENT_HISTORY_KEY);
+      return raw ? JSON.parse(raw) : [];
+    } catch (e) {
+      return [];
+    }
+  }
+  DocBuddy.loadAgentHistory = loadAgentHistory;
+
+  function saveAgentHistory(messages) {
+    saveHistory(AGENT_HISTORY_KEY, messages.slice(-30));
+  }
+  DocBuddy.saveAgentHistory = saveAgentHistory;
+
+  // ── Action types ────────────────────────────────────────────────────────────
+  var SET_BASE_URL = "LLM_SET_BASE_URL";
+  var SET_API_KEY = "LLM_SET_API_KEY";
+  var SET_MODEL_ID = "LLM_SET_MODEL_ID";
+  var SET_MAX_TOKENS = "LLM_SET_MAX_TOKENS";
+  var SET_TEMPERATURE = "LLM_SET_TEMPERATURE";
+  var SET_CONNECTION_STATUS = "LLM_SET_CONNECTION_STATUS";
+  var SET_PROVIDER = "LLM_SET_PROVIDER";
+  var SET_OPENAPI_SCHEMA = "LLM_SET_OPENAPI_SCHEMA";
+  var SET_THEME = "LLM_SET_THEME";
+  var SET_CUSTOM_COLOR = "LLM_SET_CUSTOM_COLOR";
+
+  // ── Default state ───────────────────────────────────────────────────────────
+  var storedSettings = loadFromStorage();
+  var storedTheme = loadTheme();
+  var storedToolSettings = loadToolSettings();
+
+  document.addEventListener('DOMContentLoaded', function() {
+    window.applyLLMTheme(storedTheme.theme, storedTheme.customColors);
+    // Skip eager prefetch on standalone page — URL isn't known until user clicks Load
+    if (!IS_STANDALONE) {
+      ensureOpenapiSchemaCached();
+    }
+  });
+
+  var DEFAULT_STATE = {
+    baseUrl: storedSettings.baseUrl || "http://localhost:11434/v1",
+    apiKey: storedSettings.apiKey || "",
+    modelId: storedSettings.modelId || "llama3",
+    maxTokens: storedSettings.maxTokens != null ? storedSettings.maxTokens : 4096,
+    temperature: storedSettings.temperature != null ? storedSettings.temperature : 0.7,
+    provider: storedSettings.provider || "ollama",
+    connectionStatus: "disconnected",
+    chatHistory: loadChatHistory(),
+    lastError: "",
+    theme: storedTheme.theme || "light",
+    customColors: storedTheme.customColors || {},
+    // Tool settings
+    enableTools: storedToolSettings.enableTools || false,
+    autoExecute: storedToolSettings.autoExecute || false,
+    toolApiKey: storedToolSettings.apiKey || '',
+  };
+  DocBuddy.DEFAULT_STATE = DEFAULT_STATE;
+
+  // ── Debounce utility ───────────────────────────────────────────────────────
+  function debounce(fn, delay) {
+    var timeoutId;
+    return function () {
+      var self = this;
+      var args = arguments;
+      clearTimeout(timeoutId);
+      timeoutId = setTimeout(function () {
+        fn.apply(self, args);
+      }, delay);
+    };
+  }
+  DocBuddy.debounce = debounce;
+
+  // ── Helper to dispatch via Swagger UI's auto-generated action dispatchers ──
+  function dispatchAction(system, actionName, value) {
+    var sys = system && typeof system.getSystem === 'function' ? system.getSystem() : null;
+    if (sys && sys.llmSettingsActions && typeof sys.llmSettingsActions[actionName] === 'function') {
+      sys.llmSettingsActions[actionName](value);
+    }
+  }
+  DocBuddy.dispatchAction = dispatchAction;
+
+  // ── Reducer ─────────────────────────────────────────────────────────────────
+  function llmSettingsReducer(state, action) {
+    if (state === undefined) state = DEFAULT_STATE;
+    switch (action.type) {
+      case SET_BASE_URL:
+        patchStoredSettings({ baseUrl: action.payload });
+        return Object.assign({}, state, { baseUrl: action.payload });
+      case SET_API_KEY:
+        patchStoredSettings({ apiKey: action.payload });
+        return Object.assign({}, state, { apiKey: action.payload });
+      case SET_MODEL_ID:
+        patchStoredSettings({ modelId: action.payload });
+        return Object.assign({}, state, { modelId: action.payload });
+      case SET_MAX_TOKENS:
+        var val = action.payload;
+        if (val === '' || val === null || val === undefined) {
+          return state;
+        }
+        var num = Number(val);
+        if (!isNaN(num)) {
+          patchStoredSettings({ maxTokens: num });
+          return Object.assign({}, state, { maxTokens: num });
+        }
+        return state;
+      case SET_TEMPERATURE:
+        var temp = action.payload;
+        if (temp === '' || temp === null || temp === undefined) {
+          return state;
+        }
+        var numTemp = Number(temp);
+        if (!isNaN(numTemp)) {
+          patchStoredSettings({ temperature: numTemp });
+          return Object.assign({}, state, { temperature: numTemp });
+        }
+        return state;
+      case SET_CONNECTION_STATUS:
+        return Object.assign({}, state, { connectionStatus: action.payload });
+      case SET_PROVIDER:
+        var provider = LLM_PROVIDERS[action.payload] || LLM_PROVIDERS.custom;
+        // A provider synced from another tab is already stored with its own baseUrl
+        if (loadFromStorage().provider !== action.payload) {
+          patchStoredSettings({ provider: action.payload, baseUrl: provider.url });
+        }
+        return Object.assign({}, state, {
+          provider: action.payload,
+          baseUrl: provider.url
+        });
+      case SET_OPENAPI_SCHEMA:
+        return Object.assign({}, state, { openapiSchema: action.payload });
+      case SET_THEME:
+        var newTheme = action.payload;
+        if (!THEME_DEFINITIONS[newTheme]) {
+          console.warn('Invalid theme:', newTheme, 'Using default light theme');
+          newTheme = 'light';
+        }
+        var themeDef = THEME_DEFINITIONS[newTheme] || THEME_DEFINITIONS.light;
+        var mergedColors = Object.assign({}, themeDef, state.customColors || {});
+        saveTheme({ theme: newTheme, customColors: mergedColors });
+        return Object.assign({}, state, { theme: newTheme, customColors: mergedColors });
+      case SET_CUSTOM_COLOR:
+        var colorKey = action.payload.key;
+        var colorValue = action.payload.value;
+        var newColors = Object.assign({}, state.customColors || {});
+        newColors[colorKey] = colorValue;
+        saveTheme({ theme: state.theme, customColors: newColors });
+        return Object.assign({}, state, { customColors: newColors });
+      default:
+        return state;
+    }
+  }
+  DocBuddy.llmSettingsReducer = llmSettingsReducer;
+
+  // ── Actions ─────────────────────────────────────────────────────────────────
+  var actions = {
+    setBaseUrl: function (value) { return { type: SET_BASE_URL, payload: value }; },
+    setApiKey: function (value) { return { type: SET_API_KEY, payload: value }; },
+    setModelId: function (value) { return { type: SET_MODEL_ID, payload: value }; },
+    setMaxTokens: function (value) { return { type: SET_MAX_TOKENS, payload: value }; },
+    setTemperature: function (value) { return { type: SET_TEMPERATURE, payload: value }; },
+    setConnectionStatus: function (value) { return { type: SET_CONNECTION_STATUS, payload: value }; },
+    setProvider: function (value) { return { type: SET_PROVIDER, payload: value }; },
+    setOpenApiSchema: function (schema) { return { type: SET_OPENAPI_SCHEMA, payload: schema }; },
+    setTheme: function (value) { return { type: SET_THEME, payload: value }; },
+    setCustomColor: function (value) { return { type: SET_CUSTOM_COLOR, payload: value }; },
+    // Tool settings actions
+    setEnableTools: function (value) { return { type: 'LLM_SET_ENABLE_TOOLS', payload: value }; },
+    setAutoExecute: function (value) { return { type: 'LLM_SET_AUTO_EXECUTE', payload: value }; },
+    setToolApiKey: function (value) { return { type: 'LLM_SET_TOOL_API_KEY', payload: value }; },
+  };
+  DocBuddy.actions = actions;
+
+  // ── Selectors ───────────────────────────────────────────────────────────────
+  var selectors = {
+    getBaseUrl: function (state) { return state.baseUrl; },
+    getApiKey: function (state) { return state.apiKey; },
+    getModelId: function (state) { return state.modelId; },
+    getMaxTokens: function (state) { return state.maxTokens; },
+    getTemperature: function (state) { return state.temperature; },
+    getConnectionStatus: function (state) { return state.connectionStatus; },
+    getProvider: function (state) { return state.provider; },
+    getChatHistory: function (state) { return state.chatHistory || []; },
+    getOpenApiSchema: function (state) { return state.openapiSchema; },
+    getLastError: function (state) { return state.lastError; },
+    getTheme: function (state) { return state.theme; },
+    getCustomColors: function (state) { return state.customColors; },
+    // Tool settings selectors
+    getEnableTools: function (state) { return state.enableTools || false; },
+    getAutoExecute: function (state) { return state.autoExecute || false; },
+    getToolApiKey: function (state) { return state.toolApiKey || ''; },
+  };
+  DocBuddy.selectors = selectors;
+
+  // ── Status indicator ───────────────────────────────────────────────────────
+  var STATUS_EMOJI = {
+    disconnected: "⚪",
+    connecting: "🟡",
+    connected: "🟢",
+    error: "🔴",
+  };
+  DocBuddy.STATUS_EMOJI = STATUS_EMOJI;
+
+  // ── Message ID counter for unique timestamps ─
+  var _messageIdCounter = 0;
+
+  function generateMessageId() {
+    return Date.now() + '_' + (++_messageIdCounter);
+  }
+  DocBuddy.generateMessageId = generateMessageId;
+
+  // ── Consistent copy utility function (always returns a Promise) ────────────
+  function copyToClipboard(text) {
+    return new Promise(function(resolve, reject) {
+      if (!text || typeof text !== 'string') {
+        console.warn('copyToClipboard: invalid or empty text');
+        resolve(false);
+        return;
+      }
+      if (navigator.clipboard && navigator.clipboard.writeText) {
+        navigator.clipboard.writeText(text)
+          .then(function() {
+            resolve(true);
+          })
+          .catch(function(err) {
+            console.error('Clipboard API failed:', err);
+            runFallbackCopy(text, resolve);
+          });
+        return;
+      }
+      runFallbackCopy(text, resolve);
+    });
+
+    function runFallbackCopy(text, resolve) {
+      try {
+        var textarea = document.createElement('textarea');
+        textarea.value = text;
+        textarea.style.position = 'fixed';
+        textarea.style.opacity = '0';
+        textarea.style.pointerEvents = 'none';
+        document.body.appendChild(textarea);
+        textarea.focus();
+        textarea.select();
+        try {
+          var success = document.execCommand('copy');
+          document.body.removeChild(textarea);
+          if (success) {
+            resolve(true);
+          } else {
+            console.warn('execCommand copy failed');
+            resolve(false);
+          }
+        } catch (cmdErr) {
+          console.error('execCommand error:', cmdErr);
+          document.body.removeChild(textarea);
+          resolve(false);
+        }
+      } catch (fallbackErr) {
+        console.error('Fallback copy also failed:', fallbackErr);
+        resolve(false);
+      }
+    }
+  }
+  DocBuddy.copyToClipboard = copyToClipboard;
+
+  // ── System Prompt Preset Selector Component (for Settings panel) ───────────
+  function createSystemPromptPresetSelector(React) {
+    return class SystemPromptPresetSelector extends React.Component {
+      constructor(props) {
+        super(props);
+        this.state = { config: SYSTEM_PROMPT_CONFIG };
+      }
+
+      componentDidMount() {
+        var self = this;
+        ensureSystemPromptConfig().then(function(data) {
+          if (data && !self.state.config) {
+            self.setState({ config: data });
+          }
+        });
+      }
+
+      render() {
+        var props = this.props;
+        var config = this.state.config || { presets: {}, defaultPreset: 'api_assistant' };
+        var presets = config.presets || {};
+        var presetKeys = Object.keys(presets);
+        var selectedValue = props.value || 'api_assistant';
+        var isCustom = selectedValue === 'custom';
+
+        var displayText = '';
+        if (isCustom) {
+          displayText = props.customPrompt || '';
+        } else {
+          var preset = presets[selectedValue];
+          if (preset) {
+            displayText = preset.prompt || '';
+          } else {
+            displayText = DEFAULT_SYSTEM_PROMPT_CONFIG.presets.api_assistant.prompt || '';
+          }
+        }
+
+        var description = '';
+        if (!isCustom && presets[selectedValue]) {
+          description = presets[selectedValue].description || '';
+        }
+
+        var textareaStyle = Object.assign({}, props.inputStyle, {
+          resize: "vertical",
+          minHeight: "120px",
+          marginTop: "8px",
+          fontFamily: "'Consolas', 'Monaco', monospace",
+          fontSize: "12px",
+          lineHeight: "1.5",
+          whiteSpace: "pre-wrap",
+        });
+
+        return React.createElement(
+          "div",
+          { style: { marginBottom: "12px" } },
+          React.createElement("label", { style: props.labelStyle }, "System Prompt Preset"),
+          React.createElement(
+            "select",
+            {
+              value: selectedValue,
+              onChange: function(e) {
+                props.onChange(e.target.value);
+                var stored = loadFromStorage();
+                stored.systemPromptPreset = e.target.value;
+                saveToStorage(stored);
+              },
+              style: props.inputStyle
+            },
+            presetKeys.length > 0 ? presetKeys.map(function(key) {
+              return React.createElement("option", { key: key, value: key }, presets[key].name);
+            }) : React.createElement("option", { value: "api_assistant" }, "API Assistant"),
+            React.createElement("option", { value: "custom" }, "Custom...")
+          ),
+          description && React.createElement("div", {
+            style: { color: "var(--theme-text-secondary)", fontSize: "11px", marginTop: "4px", fontStyle: "italic" }
+          }, description),
+          React.createElement("textarea", {
+            value: displayText,
+            readOnly: !isCustom,
+            onChange: isCustom ? function(e) {
+              props.onCustomChange(e.target.value);
+              var stored = loadFromStorage();
+              stored.customSystemPrompt = e.target.value;
+              saveToStorage(stored);
+            } : undefined,
+            style: Object.assign({}, textareaStyle, !isCustom ? { opacity: 0.8, cursor: "default" } : {}),
+            placeholder: isCustom ? "Enter custom system prompt..." : ""
+          }),
+          !isCustom && React.createElement("div", {
+            style: { color: "var(--theme-text-secondary)", fontSize: "10px", marginTop: "4px" }
+          }, "{openapi_context} is replaced with your API schema at send time. Select \"Custom...\" to edit.")
+        );
+      }
+    };
+  }
+  DocBuddy.createSystemPromptPresetSelector = createSystemPromptPresetSelector;
+
+  // ── CodeBlock Component - Click-to-copy for code blocks ───────────────────
+  function createCodeBlock(React) {
+    return class CodeBlock extends React.Component {
+      constructor(props) {
+        super(props);
+        this.state = {
+          copied: false,
+          isHovering: false
+        };
+        this.handleCopy = this.handleCopy.bind(this);
+        this.handleMouseEnter = this.handleMouseEnter.bind(this);
+        this.handleMouseLeave = this.handleMouseLeave.bind(this);
+        this.handleClick = this.handleClick.bind(this);
+      }
+
+      handleCopy() {
+        var text = this.props.text;
+        if (!text) return;
+
+        var self = this;
+        copyToClipboard(text).then(function(copied) {
+          if (copied) {
+            self.setState({ copied: true });
+            setTimeout(function() {
+              self.setState({ copied: false });
+            }, 2000);
+          }
+        }).catch(function(err) {
+          console.error('Failed to copy:', err);
+        });
+      }
+
+      handleMouseEnter() {
+        this.setState({ isHovering: true });
+      }
+
+      handleMouseLeave() {
+        this.setState({ isHovering: false });
+      }
+
+      handleClick(e) {
+        e.stopPropagation();
+        this.handleCopy();
+      }
+
+      handleTouchStart(e) {
+        e.preventDefault();
+        this.handleClick(e);
+      }
+
+      render() {
+        var text = this.props.text;
+        var language = (typeof this.props.language !== "undefined") ? this.props.language : "text";
+        var messageId = this.props.messageId;
+        var copied = this.state.copied;
+        var isHovering = this.state.isHovering;
+        var maxHeight = this.props.maxHeight;
+        var scrollStyle = {
+          padding: "0",
+          margin: 0,
+          overflowX: "auto",
+          whiteSpace: "pre-wrap",
+          wordBreak: "break-all",
+          cursor: "pointer",
+        };
+        if (maxHeight) {
+          scrollStyle.maxHeight = maxHeight;
+          scrollStyle.overflowY = "auto";
+        }
+
+        return React.createElement(
+          "div",
+          {
+            className: "llm-code-block-wrapper",
+            style: {
+              background: "var(--theme-input-bg)",
+              border: "1px solid var(--theme-border-color)",
+              borderRadius: "8px",
+              overflow: "hidden",
+              margin: "10px 0",
+              fontFamily: "'Consolas', 'Monaco', monospace",
+              fontSize: "13px",
+            },
+          },
+          React.createElement(
+            "div",
+            {
+              role: "button",
+              "aria-label": copied ? "Copied!" : "Click to copy " + language + " code",
+              tabIndex: 0,
+              style: {
+                display: "flex",
+                justifyContent: "space-between",
+                alignItems: "center",
+                padding: "8px 12px",
+                background: isHovering || copied ? "var(--theme-primary)" : "var(--theme-panel-bg)",
+                borderBottom: "1px solid var(--theme-border-color)",
+                cursor: "pointer",
+                transition: "all 0.2s ease",
+              },
+              onClick: this.handleClick,
+              onMouseEnter: this.handleMouseEnter,
+              onMouseLeave: this.handleMouseLeave,
+              onTouchStart: this.handleTouchStart.bind(this),
+            },
+            React.createElement(
+              "span",
+              {
+                style: {
+                  color: copied ? "#f0fdf4" : "var(--theme-text-secondary)",
+                  fontSize: "10px",
+                  fontFamily: "'Inter', sans-serif",
+                  fontWeight: "600",
+                  textTransform: "uppercase",
+                }
+              },
+              language
+            ),
+            React.createElement(
+              "span",
+              {
+                style: {
+                  color: copied ? "#4ade80" : (isHovering || copied ? "#fff" : "var(--theme-text-secondary)"),
+                  fontSize: "12px",
+                  display: "flex",
+                  alignItems: "center",
+                  gap: "6px",
+                  transition: "all 0.2s ease",
+                }
+              },
+              copied && React.createElement("span", null, "✓ "),
+              copied ? "Copied!" : (isHovering ? "Click to copy" : "")
+            )
+          ),
+          React.createElement(
+            "div",
+            {
+              style: scrollStyle,
+              onClick: this.handleClick,
+              onTouchStart: this.handleTouchStart.bind(this),
+            },
+            React.createElement(
+              "pre",
+              {
+                style: {
+                  padding: "14px 12px",
+                  margin: 0,
+                  overflowX: "auto",
+                  whiteSpace: "pre-wrap",
+                  wordBreak: "break-all",
+                  color: language === 'json' ? "#a5b4fc" : "var(--theme-text-primary)",
+                  lineHeight: "1.6",
+                }
+              },
+              React.createElement("code", null, text)
+            )
+          )
+        );
+      }
+    };
+  }
+  DocBuddy.createCodeBlock = createCodeBlock;
+
+  // ── Helper: map chat history to API message format ──────────────────────────
+  function buildApiMessages(history) {
+    return history.map(function(m) {
+      var msg = { role: m.role };
+      if (m.content != null) msg.content = m.content;
+      if (m.tool_calls) {
+        msg.tool_calls = m.tool_calls;
+        // OpenAI spec requires content: null (not absent) on assistant tool_call messages.
+        // Omitting it causes errors with some providers when replaying the history.
+        if (!('content' in msg)) msg.content = null;
+      }
+      if (m.tool_call_id) msg.tool_call_id = m.tool_call_id;
+      if (!m.tool_calls && msg.content == null) msg.content = m._displayContent || '';
+      return msg;
+    });
+  }
+  DocBuddy.buildApiMessages = buildApiMessages;
+
+  // ── Context window management ─────────────────────────────────────────────
+  // Keeps each request inside the model's context window. The most recent
+  // turns are sent verbatim, older tool payloads are cut down to digests, and
+  // turns that still don't fit are replaced by a rolling summary that the
+  // model writes in the background (see updateRollingSummary).
+  var DEFAULT_CONTEXT_WINDOW = 8192;
+  var MODEL_CONTEXT_WINDOWS = [
+    [/gpt-4o|gpt-4\.1|gpt-4-turbo|\bo[134]\b/i, 128000],
+    [/llama-?3\.[1-3]/i, 131072],
+    [/qwen2\.5|qwen3|mistral|mixtral/i, 32768],
+    [/phi-?3/i, 4096]
+  ];
+  // The reply allowance never takes more than this share of the window
+  var MAX_REPLY_SHARE = 0.25;
+  var CONTEXT_RECENT_TURNS = 2;
+  // Start folding old turns into the summary once history uses this share of
+  // the budget, so a summary is ready before anything has to be dropped.
+  var CONTEXT_SUMMARY_THRESHOLD = 0.75;
+  var TOOL_DIGEST_CHARS = 200;
+
+  // Rough token estimate (~4 characters per token); no tokenizer is shipped.
+  function estimateTokens(value) {
+    if (value == null) return 0;
+    var text = typeof value === 'string' ? value : JSON.stringify(value);
+    return Math.ceil(text.length / 4);
+  }
+  DocBuddy.estimateTokens = estimateTokens;
+
+  function estimateMessageTokens(msg) {
+    // +4 for the per-message role/framing overhead
+    return 4 + estimateTokens(msg.content) + (msg.tool_calls ? estimateTokens(msg.tool_calls) : 0);
+  }
+
+  function sumMessageTokens(messages) {
+    return messages.reduce(function(total, m) { return total + estimateMessageTokens(m); }, 0);
+  }
+
+  /**
+   * Context window (in tokens) for the configured model: a per-model override
+   * from settings.contextWindows, else a guess from the model name. Ollama's
+   * native API allocates the whole window as KV cache (num_ctx), so the guess
+   * is capped there unless the user set the window explicitly.
+   */
+  function getContextWindow(settings) {
+    return getKnownContextWindow(settings) || DEFAULT_CONTEXT_WINDOW;
+  }
+  DocBuddy.getContextWindow = getContextWindow;
+
+  /**
+   * Like getContextWindow, but 0 when the window is only the default guess:
+   * no override, no matching model name, and not an Ollama num_ctx that we
+   * set ourselves. History is not trimmed against an unknown window.
+   */
+  function getKnownContextWindow(settings) {
+    settings = settings || {};
+    var modelId = settings.modelId || '';
+    var override = parseInt((settings.contextWindows || {})[modelId], 10);
+    if (override > 0) return override;
+    var known = 0;
+    for (var i = 0; i < MODEL_CONTEXT_WINDOWS.length; i++) {
+      if (MODEL_CONTEXT_WINDOWS[i][0].test(modelId)) {
+        known = MODEL_CONTEXT_WINDOWS[i][1];
+        break;
+      }
+    }
+    if (settings.provider === 'ollama' && settings.nativeApi !== false) {
+      known = Math.min(known || DEFAULT_CONTEXT_WINDOW, OLLAMA_MAX_NUM_CTX);
+    }
+    return known;
+  }
+  DocBuddy.getKnownContextWindow = getKnownContextWindow;
+
+  function digestToolPayload(content) {
+    var text = content == null ? '' : String(content);
+    if (text.length <= TOOL_DIGEST_CHARS) return text;
+    var head = text.slice(0, TOOL_DIGEST_CHARS).replace(/\s+$/, '');
+    return head + '\n[… ' + (text.length - head.length) + ' more characters omitted from this earlier tool result]';
+  }
+  DocBuddy.digestToolPayload = digestToolPayload;
+
+  function digestOlderMessage(msg) {
+    if (msg.role !== 'tool') return msg;
+    return Object.assign({}, msg, { content: digestToolPayload(msg.content) });
+  }
+
+  function messageAnchor(msg) {
+    return hashString(stableStringify(msg));
+  }
+
+  /**
+   * Trim API-shape messages to fit `opts.budget` tokens.
+   *
+   * opts: { budget, recentTurns?, summary?: { text, anchor, anchors? } }
+   *
+   * A turn starts at each user message, so a tool result is never separated
+   * from the assistant message that requested it. Returns
+   *   { messages, tokens, summaryText, dropped, fold }
+   * where `fold` (or null) lists older messages not yet covered by the
+   * summary, with the anchor of the first message that stays verbatim and
+   * the anchors of every message that stays verbatim.
+   */
+  function buildContextWindow(apiMessages, opts) {
+    opts = opts || {};
+    var budget = opts.budget != null ? opts.budget : Infinity;
+    var recentTurns = opts.recentTurns || CONTEXT_RECENT_TURNS;
+
+    var turnStarts = [];
+    apiMessages.forEach(function(m, i) {
+      if (i === 0 || m.role === 'user') turnStarts.push(i);
+    });
+    var recentStart = turnStarts.length ? turnStarts[Math.max(turnStarts.length - recentTurns, 0)] : 0;
+
+    // Everything before the summary's anchor is already folded into it. Once
+    // history trimming has dropped the anchor itself, the summary still
+    // applies from the first message, but only if one of the messages that
+    // were verbatim when it was written is still here; otherwise it belongs
+    // to another conversation.
+    var start = 0;
+    var summaryText = '';
+    var summary = opts.summary;
+    if (summary && summary.text) {
+      var covered = summary.anchors || [summary.anchor];
+      for (var i = 0; i < apiMessages.length; i++) {
+        var anchor = messageAnchor(apiMessages[i]);
+        if (anchor === summary.anchor) {
+          start = i;
+          summaryText = summary.text;
+          break;
+        }
+        if (covered.indexOf(anchor) !== -1) summaryText = summary.text;
+      }
+    }
+    if (start > recentStart) recentStart = start;
+
+    var older = apiMessages.slice(start, recentStart).map(digestOlderMessage);
+    var recent = apiMessages.slice(recentStart);
+    var summaryTokens = summaryText ? estimateTokens(summaryText) + 4 : 0;
+    var fullTokens = summaryTokens + sumMessageTokens(older) + sumMessageTokens(recent);
+
+    var fold = null;
+    if (older.length && fullTokens > budget * CONTEXT_SUMMARY_THRESHOLD) {
+      fold = {
+        messages: older,
+        anchor: messageAnchor(apiMessages[recentStart]),
+        anchors: apiMessages.slice(recentStart).map(messageAnchor)
+      };
+    }
+
+    // Drop whole turns, oldest first, until the request fits
+    var kept = older.concat(recent);
+    var tokens = fullTokens;
+    var dropped = 0;
+    while (tokens > budget && kept.length) {
+      var next = 1;
+      while (next < kept.length && kept[next].role !== 'user') next++;
+      if (next >= kept.length) {
+        // Only the current turn is left — digest its tool payloads as a last resort
+        kept = kept.map(function(m, idx) { return idx < kept.length - 1 ? digestOlderMessage(m) : m; });
+        tokens = summaryTokens + sumMessageTokens(kept);
+        break;
+      }
+      dropped += next;
+      kept = kept.slice(next);
+      tokens = summaryTokens + sumMessageTokens(kept);
+    }
+
+    return { messages: kept, tokens: tokens, summaryText: summaryText, dropped: dropped, fold: fold };
+  }
+  DocBuddy.buildContextWindow = buildContextWindow;
+
+  function loadContextSummary(panelKey) {
+    var all = readStore(CONTEXT_SUMMARY_KEY) || {};
+    return all[panelKey] || null;
+  }
+  DocBuddy.loadContextSummary = loadContextSummary;
+
+  function saveContextSummary(panelKey, summary) {
+    var all = Object.assign({}, readStore(CONTEXT_SUMMARY_KEY));
+    if (summary) {
+      all[panelKey] = summary;
+    } else {
+      delete all[panelKey];
+    }
+    writeStore(CONTEXT_SUMMARY_KEY, all);
+  }
+  DocBuddy.saveContextSummary = saveContextSummary;
+
+  var CONTEXT_SUMMARY_PROMPT = "You maintain a running summary of a conversation between a user and an API assistant. " +
+    "Merge the new messages into the existing summary. Keep the user's goals, endpoints called, parameters, IDs, " +
+    "results and decisions that later messages may refer back to. Reply with the updated summary only, in under 250 words.";
+
+  var _summaryInFlight = {};
+
+  /**
+   * Fold `fold.messages` into the stored summary for `panelKey` with a
+   * non-streaming completion. At most one update per panel runs at a time;
+   * failures leave the previous summary in place.
+   */
+  function updateRollingSummary(panelKey, fold, settings) {
+    if (!fold || !fold.messages.length || _summaryInFlight[panelKey]) return Promise.resolve(null);
+    var previous = loadContextSummary(panelKey);
+    var transcript = fold.messages.map(function(m) {
+      var text = m.content != null ? String(m.content) : '';
+      if (m.tool_calls) text += (text ? '\n' : '') + 'Tool calls: ' + JSON.stringify(m.tool_calls);
+      return m.role + ': ' + text;
+    }).join('\n\n');
+
+    var headers = { 'Content-Type': 'application/json' };
+    if (settings.apiKey) headers['Authorization'] = 'Bearer ' + settings.apiKey;
+    var payload = {
+      model: modelForRole(settings, 'summary'),
+      messages: [
+        { role: 'system', content: CONTEXT_SUMMARY_PROMPT },
+        { role: 'user', content: 'Existing summary:\n' + (previous && previous.text ? previous.text : '(none)') +
+          '\n\nNew messages:\n' + transcript }
+      ],
+      max_tokens: 512,
+      temperature: 0.2,
+      stream: false
+    };
+
+    var baseUrl = (settings.baseUrl || '').replace(/\/+$/, '');
+    var timer = startLlmTimer(payload, 'summary');
+    _summaryInFlight[panelKey] = trackedFetch(baseUrl + '/chat/completions', {
+      method: 'POST', headers: headers, body: JSON.stringify(payload)
+    }, 'llm')
+      .then(function(res) {
+        if (!res.ok) throw new Error('HTTP ' + res.status);
+        return res.json();
+      })
+      .then(function(data) {
+        var text = data && data.choices && data.choices[0] && data.choices[0].message &&
+          data.choices[0].message.content;
+        recordLlmStats(finishLlmTimer(timer, data && data.usage, text || '', 'done'));
+        if (!text || !text.trim()) return null;
+        var summary = {
+          text: text.trim(),
+          anchor: fold.anchor,
+          anchors: fold.anchors,
+          schemaHash: getSchemaHash(DocBuddy._cachedOpenapiSchema),
+          updatedAt: Date.now()
+        };
+        saveContextSummary(panelKey, summary);
+        return summary;
+      })
+      .catch(function(err) {
+        console.warn('[Context] Summary update failed:', err && err.message);
+        return null;
+      })
+      .then(function(result) {
+        delete _summaryInFlight[panelKey];
+        return result;
+      });
+    return _summaryInFlight[panelKey];
+  }
+  DocBuddy.updateRollingSummary = updateRollingSummary;
+
+  /**
+   * Build the full `messages` array for a chat completion request: the system
+   * prompt (plus any rolling summary) followed by history trimmed to what is
+   * left of the model's context window after the prompt, tool definitions and
+   * the reply allowance. Schedules a summary update when history grows large.
+   * History goes out untrimmed when the model's window is unknown.
+   */
+  function fitContextWindow(panelKey, systemPrompt, apiMessages, settings, tools) {
+    var contextWindow = getKnownContextWindow(settings);
+    if (!contextWindow) return [{ role: 'system', content: systemPrompt }].concat(apiMessages);
+
+    var maxTokens = parseInt(settings.maxTokens, 10) || 4096;
+    var replyTokens = Math.min(maxTokens, Math.floor(contextWindow * MAX_REPLY_SHARE));
+    var reserved = estimateTokens(systemPrompt) + 4 + (tools ? estimateTokens(tools) : 0) + replyTokens;
+    var budget = Math.max(contextWindow - reserved, 0);
+
+    var summary = loadContextSummary(panelKey);
+    // A summary written against another API's schema describes another conversation
+    if (summary && summary.schemaHash !== getSchemaHash(DocBuddy._cachedOpenapiSchema)) summary = null;
+    var ctx = buildContextWindow(apiMessages, { budget: budget, summary: summary });
+    if (ctx.dropped) {
+      console.warn('[Context] Dropped ' + ctx.dropped + ' older messages to fit the context window');
+    }
+    if (!budget) {
+      // Nothing older would fit next to the prompt even as a summary
+      console.warn('[Context] System prompt and tools fill the context window; sending only the current turn');
+    } else if (ctx.fold) {
+      updateRollingSummary(panelKey, ctx.fold, settings);
+    }
+
+    var system = systemPrompt;
+    if (ctx.summaryText) {
+      system += '\n\n## Summary of Earlier Conversation\n\n' + ctx.summaryText;
+    }
+    return [{ role: 'system', content: system }].concat(ctx.messages);
+  }
+  DocBuddy.fitContextWindow = fitContextWindow;
+
+  // ── CSS injection helper ───────────────────────────────────────────────────
+  function injectStyles(id, css) {
+    if (typeof document === 'undefined') return;
+
+    var existing = document.getElementById(id);
+    if (existing) {
+      if (existing.textContent !== css) {
+        existing.textContent = css;
+      }
+      return;
+    }
+
+    var styleEl = document.createElement('style');
+    styleEl.id = id;
+    styleEl.textContent = css;
+    document.head.appendChild(styleEl);
+  }
+  DocBuddy.injectStyles = injectStyles;
+
+  // ── CSS styles for chat bubbles, avatars, and animations (theme-aware) ─────
+  var chatStyles = [
+    '.llm-chat-container { display: flex; flex-direction: column; height: 100%; min-height: 0; overflow: hidden; }',
+
+    '.llm-chat-message-wrapper { display: flex; width: 100%; margin-bottom: 8px; box-sizing: border-box; }',
+
+    '.llm-chat-message { padding: 10px 14px; border-radius: 12px; max-width: 85%; position: relative; box-sizing: border-box; word-wrap: break-word; overflow-wrap: break-word; }',
+    '.llm-chat-message.user { align-self: flex-end; background: var(--theme-primary); color: white; }',
+    '.llm-chat-message.assistant { align-self: flex-start; background: var(--theme-secondary); color: var(--theme-text-primary); }',
+
+    '.llm-assistant-label { font-weight: 600; color: #8b5cf6; }',
+
+    '.llm-chat-message-header { display: flex; justify-content: space-between; align-items: center; margin-bottom: 6px; font-size: 11px; opacity: 0.9; flex-shrink: 0; }',
+
+    '.llm-chat-message-text { font-size: 15px; line-height: 1.6; word-wrap: break-word; overflow-wrap: break-word; }',
+
+    '.llm-msg-stats { margin-top: 6px; font-size: 11px; color: var(--theme-text-secondary); font-family: "Consolas", "Monaco", monospace; cursor: default; }',
+    '.llm-msg-stats summary { cursor: pointer; opacity: 0.8; }',
+    '.llm-msg-stats[open] { padding: 6px 8px; border-radius: 6px; background: var(--theme-input-bg); }',
+    '.llm-chat-message-text p { margin: 8px 0; }',
+    '.llm-chat-message-text p:first-child { margin-top: 4px; }',
+    '.llm-chat-message-text p:last-child { margin-bottom: 4px; }',
+
+    '.llm-streaming-indicator { color: var(--theme-accent); font-style: italic; opacity: 0.7; font-size: 13px; margin-top: 8px; }',
+
+    '.llm-chat-message-text strong { color: var(--theme-text-primary); }',
+    '.llm-chat-message-text em { font-style: italic; }',
+    '.llm-chat-message-text ul { margin: 8px 0; padding-left: 24px; }',
+    '.llm-chat-message-text ol { margin: 8px 0; padding-left: 24px; }',
+    '.llm-chat-message-text li { margin: 4px 0; }',
+    '.llm-chat-message-text blockquote { border-left: 3px solid var(--theme-accent); margin: 8px 0; padding-left: 12px; opacity: 0.9; }',
+    '.llm-chat-message-text a { color: #60a5fa; text-decoration: none; }',
+    '.llm-chat-message-text a:hover { text-decoration: underline; }',
+
+    '.llm-chat-message-text pre { background: var(--theme-input-bg); border-radius: 8px; padding: 12px; overflow-x: auto; margin: 10px 0; font-family: "Consolas", "Monaco", monospace; font-size: 14px; position: relative; max-width: 100%; box-sizing: border-box; word-break: break-all; }',
+    '.llm-chat-message-text code { font-family: "Consolas", "Monaco", monospace; background: rgba(0,0,0,0.15); padding: 2px 6px; border-radius: 4px; font-size: 13px; }',
+    '.llm-chat-message-text pre code { background: transparent; padding: 0; }',
+
+    '#llm-chat-messages::-webkit-scrollbar { width: 8px; }',
+    '#llm-chat-messages::-webkit-scrollbar-track { background: var(--theme-panel-bg); border-radius: 4px; }',
+    '#llm-chat-messages::-webkit-scrollbar-thumb { background: var(--theme-secondary); border-radius: 4px; }',
+    '#llm-chat-messages::-webkit-scrollbar-thumb:hover { background: var(--theme-accent); }',
+
+    '@keyframes typing { 0%, 80%, 100% { transform: scale(0); } 40% { transform: scale(1); } }',
+    '.llm-typing-indicator { display: inline-flex; align-items: center; gap: 4px; padding: 8px 12px; background: var(--theme-secondary); border-radius: 18px; font-size: 14px; margin-bottom: 8px; }',
+    '.llm-typing-dot { width: 6px; height: 6px; border-radius: 50%; background: var(--theme-text-secondary); animation: typing 1.4s infinite ease-in-out both; }',
+    '.llm-typing-dot:nth-child(1) { animation-delay: -0.32s; }',
+    '.llm-typing-dot:nth-child(2) { animation-delay: -0.16s; }',
+
+    '.llm-chat-input-area { width: 100%; box-sizing: border-box; flex-shrink: 0; }',
+
+    '.llm-chat-input-area textarea { width: 100%; box-sizing: border-box; overflow-x: hidden; word-wrap: break-word; }',
+
+    '@media (min-width: 769px) and (max-width: 1024px) {',
+    '  .llm-chat-message { max-width: 80%; }',
+    '}',
+
+    '@media (min-width: 1200px) {',
+    '  .llm-chat-container { max-width: 100%; }',
+    '  .llm-chat-message { max-width: 75%; }',
+    '}',
+
+    '@media (max-width: 768px) {',
+    '  .llm-chat-message-wrapper { width: 100%; padding: 0 4px; margin-bottom: 6px; }',
+    '  .llm-chat-message { max-width: 90%; padding: 8px 10px; }',
+    '  .llm-chat-message-text { font-size: 14px; }',
+    '  .llm-typing-indicator { font-size: 13px; padding: 8px 12px; }',
+    '  .llm-chat-messages { padding: 6px; gap: 6px; }',
+    '  .llm-chat-message-header { font-size: 10px; }',
+    '  .llm-chat-message-text pre { font-size: 12px; padding: 8px; }',
+    '  .llm-code-block-wrapper { font-size: 12px; }',
+    '}',
+
+    '@media (max-width: 768px) and (orientation: landscape) {',
+    '  .llm-chat-container { height: calc(100dvh - 40px) !important; }',
+    '}',
+
+    '.llm-error-message {',
+    '  background: linear-gradient(135deg, rgba(239, 68, 68, 0.15), rgba(220, 38, 38, 0.1));',
+    '  border: 1px solid rgba(239, 68, 68, 0.3);',
+    '  border-radius: 8px;',
+    '  padding: 12px 14px;',
+    '  margin: 4px 0;',
+    '}',
+    '.llm-error-title {',
+    '  color: #ef4444;',
+    '  font-weight: 600;',
+    '  font-size: 14px;',
+    '  margin-bottom: 6px;',
+    '  display: flex;',
+    '  align-items: center;',
+    '  gap: 6px;',
+    '}',
+    '.llm-error-title::before {',
+    '  content: "⚠️";',
+    '}',
+    '.llm-error-text {',
+    '  color: var(--theme-text-secondary);',
+    '  font-size: 13px;',
+    '  line-height: 1.5;',
+    '}',
+    '.llm-error-actions {',
+    '  margin-top: 10px;',
+    '}',
+    '.llm-error-action-btn {',
+    '  background: var(--theme-primary);',
+    '  color: white;',
+    '  border: none;',
+    '  border-radius: 6px;',
+    '  padding: 6px 14px;',
+    '  font-size: 12px;',
+    '  cursor: pointer;',
+    '  transition: all 0.2s ease;',
+    '}',
+    '.llm-error-action-btn:hover {',
+    '  background: var(--theme-primary-hover);',
+    '  transform: translateY(-1px);',
+    '}',
+
+    '.llm-code-block-wrapper { background: var(--theme-input-bg); border: 1px solid var(--theme-border-color); border-radius: 8px; overflow: hidden; margin: 10px 0; font-family: "Consolas", "Monaco", monospace; font-size: 13px; cursor: pointer; transition: all 0.2s ease; touch-action: manipulation; }',
+    '.llm-code-block-wrapper:hover { border-color: var(--theme-accent); box-shadow: 0 2px 8px rgba(0,0,0,0.1); }',
+    '.llm-code-block-header { display: flex; justify-content: space-between; align-items: center; padding: 8px 12px; background: var(--theme-panel-bg); border-bottom: 1px solid var(--theme-border-color); }',
+    '.llm-code-block-language { color: var(--theme-text-secondary); font-size: 10px; font-family: "Inter", sans-serif; font-weight: 600; text-transform: uppercase; }',
+    '.llm-code-block-copy-indicator { color: var(--theme-text-secondary); font-size: 12px; display: flex; align-items: center; gap: 4px; transition: all 0.2s ease; }',
+    '.llm-code-block-content { padding: 14px 12px; margin: 0; overflow-x: auto; white-space: pre-wrap; word-break: break-all; line-height: 1.6; cursor: pointer; }',
+    '.llm-code-block-content code { font-family: "Consolas", "Monaco", monospace; }',
+    '.llm-code-block-content pre { margin: 0; padding: 0; }',
+    '.llm-code-block-content.json { color: #a5b4fc; }',
+    '@keyframes llm-fade-in { from { opacity: 0; transform: translate(-50%, -50%) scale(0.9); } to { opacity: 1; transform: translate(-50%, -50%) scale(1); } }',
+
+  ].join('\n');
+
+  injectStyles('docbuddy-chat-styles', chatStyles);
+
+  // ── Theme injection function ────────────────────────────────────────────────
+  var _colorRe = /^#[0-9a-fA-F]{3,8}$|^rgba?\(\s*\d{1,3}\s*,\s*\d{1,3}\s*,\s*\d{1,3}\s*(,\s*(0|1|0?\.\d+))?\s*\)$/;
+  function _safeColor(val, fallback) { return _colorRe.test(val) ? val : fallback; }
+
+  var applyLLMTheme = function (themeName, customColors) {
+    var validatedTheme = THEME_DEFINITIONS[themeName] ? themeName : 'light';
+    var themeDef = THEME_DEFINITIONS[validatedTheme];
+
+    var finalColors = Object.assign({}, themeDef, customColors);
+
+    var cssVars = [
+      '--theme-primary: ' + _safeColor(finalColors.primary, themeDef.primary),
+      '--theme-primary-hover: ' + _safeColor(finalColors.primaryHover || finalColors.primary, themeDef.primaryHover || themeDef.primary),
+      '--theme-secondary: ' + _safeColor(finalColors.secondary, themeDef.secondary),
+      '--theme-accent: ' + _safeColor(finalColors.accent, themeDef.accent),
+      '--theme-background: ' + _safeColor(finalColors.background, themeDef.background),
+      '--theme-panel-bg: ' + _safeColor(finalColors.panelBg || finalColors.secondary, themeDef.panelBg || themeDef.secondary),
+      '--theme-header-bg: ' + _safeColor(finalColors.headerBg || finalColors.background, themeDef.headerBg || themeDef.background),
+      '--theme-border-color: ' + _safeColor(finalColors.borderColor || finalColors.secondary, themeDef.borderColor || themeDef.secondary),
+      '--theme-text-primary: ' + _safeColor(finalColors.textPrimary, themeDef.textPrimary),
+      '--theme-text-secondary: ' + _safeColor(finalColors.textSecondary || '#6b7280', themeDef.textSecondary || '#6b7280'),
+      '--theme-input-bg: ' + _safeColor(finalColors.inputBg || finalColors.secondary, themeDef.inputBg || themeDef.secondary),
+    ].join('; ');
+
+    var css = ':root { ' + cssVars + ' }';
+    var themeStyle = document.getElementById('docbuddy-theme-styles');
+
+    if (themeStyle) {
+      if (themeStyle.textContent !== css) {
+        themeStyle.textContent = css;
+      }
+    } else {
+      themeStyle = document.createElement('style');
+      themeStyle.id = 'docbuddy-theme-styles';
+      themeStyle.textContent = css;
+      document.head.appendChild(themeStyle);
+    }
+  };
+  DocBuddy.applyLLMTheme = applyLLMTheme;
+  window.applyLLMTheme = applyLLMTheme;
+
+  // ── Global function to open settings tab ───────────────────────────────────
+  var llmOpenSettings = function() {
+    if (window.llmSwitchTab) {
+      window.llmSwitchTab('settings');
+    } else {
+      try {
+        localStorage.setItem("docbuddy-active-tab", "settings");
+      } catch (e) {
+        console.warn('Failed to switch to settings tab:', e);
+      }
+    }
+  };
+  DocBuddy.llmOpenSettings = llmOpenSettings;
+  window.llmOpenSettings = llmOpenSettings;
+
+  // Eagerly load system prompt config at module init (before DOMContentLoaded)
+  loadSystemPromptConfig();
+
+  // ── Boot timing ───────────────────────────────────────────────────────────
+  // The page sets DOCBUDDY_BOOT_MODE ("standard" or "chat-first"). Boot steps
+  // are recorded as `docbuddy:<name>` performance marks so time-to-interactive
+  // of the chat tab can be compared between modes (getBootTimings()).
+  var BOOT_MODE = window.DOCBUDDY_BOOT_MODE || 'standard';
+  DocBuddy.BOOT_MODE = BOOT_MODE;
+  var BOOT_MARKS = ['shell-interactive', 'chat-interactive', 'api-spec-requested'];
+
+  /** Record the first occurrence of boot step `name`. */
+  function markBoot(name) {
+    try {
+      if (performance.getEntriesByName('docbuddy:' + name).length) return;
+      performance.mark('docbuddy:' + name);
+      console.debug('[DocBuddy boot] ' + name + ' at ' + Math.round(performance.now()) + ' ms (' + BOOT_MODE + ')');
+    } catch (e) {
+      // performance marks are best-effort
+    }
+  }
+  DocBuddy.markBoot = markBoot;
+
+  /** Milliseconds from navigation start to each boot mark (null if not reached). */
+  function getBootTimings() {
+    var timings = { mode: BOOT_MODE };
+    BOOT_MARKS.forEach(function(name) {
+      var entry = null;
+      try {
+        entry = performance.getEntriesByName('docbuddy:' + name)[0];
+      } catch (e) {
+        // ignore
+      }
+      timings[name] = entry ? Math.round(entry.startTime) : null;
+    });
+    return timings;
+  }
+  DocBuddy.getBootTimings = getBootTimings;
+
+  var _bootDraft = null;
+
+  /**
+   * What was typed into the chat-first boot shell. React replaces the shell
+   * on first render, so the layout snapshots it then; later calls (the chat
+   * panel, once its script has loaded) get the same snapshot.
+   */
+  function takeBootDraft() {
+    if (!_bootDraft) {
+      var el = document.getElementById('docbuddy-boot-draft');
+      _bootDraft = el
+        ? { text: el.value, focused: document.activeElement === el }
+        : { text: '', focused: false };
+    }
+    return _bootDraft;
+  }
+  DocBuddy.takeBootDraft = takeBootDraft;
+
+  /** Run `fn` when the browser is idle (or after a short delay without requestIdleCallback). */
+  function whenIdle(fn) {
+    if (window.requestIdleCallback) return window.requestIdleCallback(fn, { timeout: 10000 });
+    return setTimeout(fn, 2000);
+  }
+  DocBuddy.whenIdle = whenIdle;
+
+  // ── On-demand panel scripts ───────────────────────────────────────────────
+  // Only core.js and plugin.js load with the page. A panel's script is added
+  // the first time its tab opens (or when the browser is idle) and registers
+  // its factory on DocBuddy just as an eagerly loaded script does; pages that
+  // still include a script up front skip its load.
+  var PANEL_SCRIPTS = {
+    chat: { file: 'chat.js', factory: 'ChatPanelFactory' },
+    workflow: { file: 'workflow.js', factory: 'WorkflowPanelFactory' },
+    agent: { file: 'agent.js', factory: 'AgentPanelFactory' },
+    network: { file: 'network.js', factory: 'NetworkPanelFactory' },
+    settings: { file: 'settings.js', factory: 'SettingsPanelFactory' }
+  };
+  DocBuddy.PANEL_SCRIPTS = PANEL_SCRIPTS;
+
+  var _panelScriptPromises = {};
+
+  /** Resolve with the panel factory for `tab`, loading its script first if needed. */
+  function loadPanelScript(tab) {
+    var entry = PANEL_SCRIPTS[tab];
+    if (!entry) return Promise.reject(new Error('Unknown panel: ' + tab));
+    if (DocBuddy[entry.factory]) return Promise.resolve(DocBuddy[entry.factory]);
+    if (!_panelScriptPromises[tab]) {
+      _panelScriptPromises[tab] = new Promise(function(resolve, reject) {
+        var script = document.createElement('script');
+        script.src = STATIC_BASE + '/' + entry.file;
+        script.async = true;
+        script.onload = function() {
+          if (DocBuddy[entry.factory]) {
+            resolve(DocBuddy[entry.factory]);
+          } else {
+            reject(new Error(entry.file + ' did not register ' + entry.factory));
+          }
+        };
+        script.onerror = function() {
+          // Allow a retry the next time the tab is opened
+          delete _panelScriptPromises[tab];
+          document.head.removeChild(script);
+          reject(new Error('Failed to load ' + entry.file));
+        };
+        document.head.appendChild(script);
+      });
+    }
+    return _panelScriptPromises[tab];
+  }
+  DocBuddy.loadPanelScript = loadPanelScript;
+
+  /** Load the remaining panel scripts one per idle period, so tab switches are instant. */
+  function prefetchPanelScripts() {
+    var tabs = Object.keys(PANEL_SCRIPTS);
+    (function next(i) {
+      if (i >= tabs.length) return;
+      whenIdle(function() {
+        loadPanelScript(tabs[i])
+          .catch(function(err) { console.warn('[DocBuddy] Panel prefetch failed:', err.message); })
+          .then(function() { next(i + 1); });
+      });
+    })(0);
+  }
+  DocBuddy.prefetchPanelScripts = prefetchPanelScripts;
+
+  // ── Incremental JSON completeness scanner ─────────────────────────────────
+  // Tracks bracket depth across streamed fragments (ignoring brackets inside
+  // strings) so a tool call's arguments can be detected as complete without
+  // re-parsing the whole accumulated string on every chunk.
+  function createJsonScanner() {
+    return { depth: 0, inString: false, escaped: false, started: false, complete: false };
+  }
+  DocBuddy.createJsonScanner = createJsonScanner;
+
+  function feedJsonScanner(state, text) {
+    for (var i = 0; i < text.length && !state.complete; i++) {
+      var ch = text.charAt(i);
+      if (state.inString) {
+        if (state.escaped) state.escaped = false;
+        else if (ch === '\\') state.escaped = true;
+        else if (ch === '"') state.inString = false;
+        continue;
+      }
+      if (ch === '"') {
+        state.inString = true;
+      } else if (ch === '{' || ch === '[') {
+        state.depth++;
+        state.started = true;
+      } else if (ch === '}' || ch === ']') {
+        state.depth--;
+        if (state.started && state.depth === 0) state.complete = true;
+      }
+    }
+    return state.complete;
+  }
+  DocBuddy.feedJsonScanner = feedJsonScanner;
+
+  // ── LLM call accounting ───────────────────────────────────────────────────
+  // Every completion records prompt/completion tokens (the provider's `usage`
+  // when it reports one, else a local estimate) plus time-to-first-token,
+  // mean inter-token latency and total duration. Per-call stats go to the
+  // caller; session totals are kept here for the settings panel.
+  function emptyLlmSession() {
+    return {
+      calls: 0, errors: 0, estimatedCalls: 0,
+      promptTokens: 0, completionTokens: 0, cachedTokens: 0, cacheReportedPromptTokens: 0,
+      durationMs: 0, ttftMs: 0, ttftCount: 0, generationMs: 0,
+      toolCalls: { generic: { calls: 0, failed: 0 }, typed: { calls: 0, failed: 0 } },
+      // role -> { calls, promptTokens, completionTokens, durationMs, ttftMs, ttftCount, model }
+      byRole: {},
+      cacheHits: 0, cacheSavedMs: 0
+    };
+  }
+  var _llmSession = emptyLlmSession();
 
-      handleMouseLeave() {
-        this.setState({ isHovering: false });
-      }
+  function resetLlmSessionStats() {
+    _llmSession = emptyLlmSession();
+    window.dispatchEvent(new CustomEvent('docbuddy-llm-stats', { detail: null }));
+  }
+  DocBuddy.resetLlmSessionStats = resetLlmSessionStats;
 
-      handleClick(e) {
-        e.stopPropagation();
-        this.handleCopy();
-      }
+  function getLlmSessionStats() {
+    return Object.assign({}, _llmSession, { byRole: Object.assign({}, _llmSession.byRole) });
+  }
+  DocBuddy.getLlmSessionStats = getLlmSessionStats;
 
-      handleTouchStart(e) {
-        e.preventDefault();
-        this.handleClick(e);
-      }
+  /**
+   * Count an executed tool call by tool style, so the failure/retry rate of
+   * typed per-operation tools can be compared with generic api_request.
+   */
+  function recordToolCallOutcome(toolName, responseObj) {
+    var bucket = _llmSession.toolCalls[toolName && toolName !== 'api_request' ? 'typed' : 'generic'];
+    bucket.calls++;
+    if (!responseObj || !(responseObj.status >= 200 && responseObj.status < 300)) bucket.failed++;
+    window.dispatchEvent(new CustomEvent('docbuddy-llm-stats', { detail: null }));
+  }
+  DocBuddy.recordToolCallOutcome = recordToolCallOutcome;
 
-      render() {
-        var text = this.props.text;
-        var language = (typeof this.props.language !== "undefined") ? this.props.language : "text";
-        var messageId = this.props.messageId;
-        var copied = this.state.copied;
-        var isHovering = this.state.isHovering;
-        var maxHeight = this.props.maxHeight;
-        var scrollStyle = {
-          padding: "0",
-          margin: 0,
-          overflowX: "auto",
-          whiteSpace: "pre-wrap",
-          wordBreak: "break-all",
-          cursor: "pointer",
-        };
-        if (maxHeight) {
-          scrollStyle.maxHeight = maxHeight;
-          scrollStyle.overflowY = "auto";
-        }
+  function perfNow() {
+    return typeof performance !== 'undefined' && performance.now ? performance.now() : Date.now();
+  }
 
-        return React.createElement(
-          "div",
-          {
-            className: "llm-code-block-wrapper",
-            style: {
-              background: "var(--theme-input-bg)",
-              border: "1px solid var(--theme-border-color)",
-              borderRadius: "8px",
-              overflow: "hidden",
-              margin: "10px 0",
-              fontFamily: "'Consolas', 'Monaco', monospace",
-              fontSize: "13px",
-            },
-          },
-          React.createElement(
-            "div",
-            {
-              role: "button",
-              "aria-label": copied ? "Copied!" : "Click to copy " + language + " code",
-              tabIndex: 0,
-              style: {
-                display: "flex",
-                justifyContent: "space-between",
-                alignItems: "center",
-                padding: "8px 12px",
-                background: isHovering || copied ? "var(--theme-primary)" : "var(--theme-panel-bg)",
-                borderBottom: "1px solid var(--theme-border-color)",
-                cursor: "pointer",
-                transition: "all 0.2s ease",
-              },
-              onClick: this.handleClick,
-              onMouseEnter: this.handleMouseEnter,
-              onMouseLeave: this.handleMouseLeave,
-              onTouchStart: this.handleTouchStart.bind(this),
-            },
-            React.createElement(
-              "span",
-              {
-                style: {
-                  color: copied ? "#f0fdf4" : "var(--theme-text-secondary)",
-                  fontSize: "10px",
-                  fontFamily: "'Inter', sans-serif",
-                  fontWeight: "600",
-                  textTransform: "uppercase",
-                }
-              },
-              language
-            ),
-            React.createElement(
-              "span",
-              {
-                style: {
-                  color: copied ? "#4ade80" : (isHovering || copied ? "#fff" : "var(--theme-text-secondary)"),
-                  fontSize: "12px",
-                  display: "flex",
-                  alignItems: "center",
-                  gap: "6px",
-                  transition: "all 0.2s ease",
-                }
-              },
-              copied && React.createElement("span", null, "✓ "),
-              copied ? "Copied!" : (isHovering ? "Click to copy" : "")
-            )
-          ),
-          React.createElement(
-            "div",
-            {
-              style: scrollStyle,
-              onClick: this.handleClick,
-              onTouchStart: this.handleTouchStart.bind(this),
-            },
-            React.createElement(
-              "pre",
-              {
-                style: {
-                  padding: "14px 12px",
-                  margin: 0,
-                  overflowX: "auto",
-                  whiteSpace: "pre-wrap",
-                  wordBreak: "break-all",
-                  color: language === 'json' ? "#a5b4fc" : "var(--theme-text-primary)",
-                  lineHeight: "1.6",
-                }
-              },
-              React.createElement("code", null, text)
-            )
-          )
-        );
-      }
+  function startLlmTimer(payload, role) {
+    return {
+      model: payload.model || null,
+      role: role || null,
+      promptEstimate: sumMessageTokens(payload.messages || []) + (payload.tools ? estimateTokens(payload.tools) : 0),
+      startedAt: perfNow(),
+      firstTokenAt: null,
+      lastTokenAt: null,
+      gapTotal: 0,
+      gapCount: 0
     };
   }
-  DocBuddy.createCodeBlock = createCodeBlock;
 
-  // ── Helper: map chat history to API message format ──────────────────────────
-  function buildApiMessages(history) {
-    return history.map(function(m) {
-      var msg = { role: m.role };
-      if (m.content != null) msg.content = m.content;
-      if (m.tool_calls) {
-        msg.tool_calls = m.tool_calls;
-        // OpenAI spec requires content: null (not absent) on assistant tool_call messages.
-        // Omitting it causes errors with some providers when replaying the history.
-        if (!('content' in msg)) msg.content = null;
-      }
-      if (m.tool_call_id) msg.tool_call_id = m.tool_call_id;
-      if (!m.tool_calls && msg.content == null) msg.content = m._displayContent || '';
-      return msg;
-    });
+  // Called once per streamed delta; chunks stand in for tokens here
+  function markLlmToken(timer) {
+    var t = perfNow();
+    if (timer.firstTokenAt == null) {
+      timer.firstTokenAt = t;
+    } else {
+      timer.gapTotal += t - timer.lastTokenAt;
+      timer.gapCount++;
+    }
+    timer.lastTokenAt = t;
   }
-  DocBuddy.buildApiMessages = buildApiMessages;
 
-  // ── CSS injection helper ───────────────────────────────────────────────────
-  function injectStyles(id, css) {
-    if (typeof document === 'undefined') return;
+  function finishLlmTimer(timer, usage, completionText, outcome) {
+    var end = perfNow();
+    var fromProvider = !!(usage && usage.prompt_tokens != null && usage.completion_tokens != null);
+    var completionTokens = fromProvider ? usage.completion_tokens : estimateTokens(completionText);
+    var generationMs = timer.firstTokenAt != null ? end - timer.firstTokenAt : 0;
+    return {
+      model: timer.model,
+      role: timer.role,
+      outcome: outcome,
+      usageSource: fromProvider ? 'provider' : 'estimate',
+      promptTokens: fromProvider ? usage.prompt_tokens : timer.promptEstimate,
+      cachedTokens: usage && usage.prompt_tokens_details && usage.prompt_tokens_details.cached_tokens != null
+        ? usage.prompt_tokens_details.cached_tokens : null,
+      completionTokens: completionTokens,
+      ttftMs: timer.firstTokenAt != null ? Math.round(timer.firstTokenAt - timer.startedAt) : null,
+      interTokenMs: timer.gapCount ? Math.round(timer.gapTotal / timer.gapCount * 10) / 10 : null,
+      durationMs: Math.round(end - timer.startedAt),
+      generationMs: Math.round(generationMs),
+      tokensPerSec: generationMs > 0 && completionTokens ? Math.round(completionTokens / (generationMs / 1000) * 10) / 10 : null,
+      at: Date.now()
+    };
+  }
 
-    var existing = document.getElementById(id);
-    if (existing) {
-      if (existing.textContent !== css) {
-        existing.textContent = css;
-      }
+  function recordLlmStats(stats) {
+    var s = _llmSession;
+    if (stats.outcome === 'cached') {
+      // Replayed from the completion cache: no tokens were spent
+      s.cacheHits++;
+      s.cacheSavedMs += stats.savedMs || 0;
+      window.dispatchEvent(new CustomEvent('docbuddy-llm-stats', { detail: stats }));
       return;
     }
-
-    var styleEl = document.createElement('style');
-    styleEl.id = id;
-    styleEl.textContent = css;
-    document.head.appendChild(styleEl);
+    s.calls++;
+    if (stats.outcome === 'error') s.errors++;
+    if (stats.usageSource === 'estimate') s.estimatedCalls++;
+    s.promptTokens += stats.promptTokens || 0;
+    s.completionTokens += stats.completionTokens || 0;
+    if (stats.cachedTokens != null) {
+      s.cachedTokens += stats.cachedTokens;
+      s.cacheReportedPromptTokens += stats.promptTokens || 0;
+    }
+    s.durationMs += stats.durationMs || 0;
+    s.generationMs += stats.generationMs || 0;
+    if (stats.ttftMs != null) {
+      s.ttftMs += stats.ttftMs;
+      s.ttftCount++;
+    }
+    if (stats.role) {
+      var r = s.byRole[stats.role] ||
+        (s.byRole[stats.role] = { calls: 0, promptTokens: 0, completionTokens: 0, durationMs: 0, ttftMs: 0, ttftCount: 0, model: null });
+      r.calls++;
+      r.model = stats.model;
+      r.promptTokens += stats.promptTokens || 0;
+      r.completionTokens += stats.completionTokens || 0;
+      r.durationMs += stats.durationMs || 0;
+      if (stats.ttftMs != null) {
+        r.ttftMs += stats.ttftMs;
+        r.ttftCount++;
+      }
+    }
+    window.dispatchEvent(new CustomEvent('docbuddy-llm-stats', { detail: stats }));
   }
-  DocBuddy.injectStyles = injectStyles;
+  DocBuddy.recordLlmStats = recordLlmStats;
 
-  // ── CSS styles for chat bubbles, avatars, and animations (theme-aware) ─────
-  var chatStyles = [
-    '.llm-chat-container { display: flex; flex-direction: column; height: 100%; min-height: 0; overflow: hidden; }',
+  function formatMs(ms) {
+    if (ms == null) return '–';
+    return ms < 1000 ? Math.round(ms) + 'ms' : (ms / 1000).toFixed(1) + 's';
+  }
 
-    '.llm-chat-message-wrapper { display: flex; width: 100%; margin-bottom: 8px; box-sizing: border-box; }',
+  function formatLlmStats(stats) {
+    if (stats.outcome === 'cached') {
+      return 'cached · ' + stats.completionTokens + ' tok · saved ' + formatMs(stats.savedMs);
+    }
+    var approx = stats.usageSource === 'estimate' ? '~' : '';
+    var parts = [
+      approx + stats.promptTokens + ' → ' + approx + stats.completionTokens + ' tok',
+      'TTFT ' + formatMs(stats.ttftMs),
+      formatMs(stats.durationMs)
+    ];
+    if (stats.tokensPerSec != null) parts.push(stats.tokensPerSec + ' tok/s');
+    if (stats.role && stats.model) parts.push(stats.role + ': ' + stats.model);
+    return parts.join(' · ');
+  }
+  DocBuddy.formatLlmStats = formatLlmStats;
+
+  // Collapsible per-message stats line
+  function renderLlmStats(React, stats) {
+    if (!stats) return null;
+    var rowStyle = { display: 'flex', justifyContent: 'space-between', gap: '12px' };
+    var rows = [
+      ['Model', stats.model || '–'],
+      ['Prompt tokens', stats.promptTokens + (stats.usageSource === 'estimate' ? ' (estimated)' : '')],
+      ['Cached prompt tokens', stats.cachedTokens != null ? String(stats.cachedTokens) : '–'],
+      ['Completion tokens', stats.completionTokens + (stats.usageSource === 'estimate' ? ' (estimated)' : '')],
+      ['Time to first token', formatMs(stats.ttftMs)],
+      ['Inter-token latency', stats.interTokenMs != null ? stats.interTokenMs + 'ms' : '–'],
+      ['Tokens / second', stats.tokensPerSec != null ? String(stats.tokensPerSec) : '–'],
+      ['Total duration', formatMs(stats.durationMs)]
+    ];
+    return React.createElement(
+      'details',
+      {
+        className: 'llm-msg-stats',
+        onClick: function(e) { e.stopPropagation(); }
+      },
+      React.createElement('summary', null, formatLlmStats(stats)),
+      rows.map(function(r) {
+        return React.createElement('div', { key: r[0], style: rowStyle },
+          React.createElement('span', null, r[0]),
+          React.createElement('span', null, r[1])
+        );
+      })
+    );
+  }
+  DocBuddy.renderLlmStats = renderLlmStats;
+
+  // ── Guided decoding for tool-call arguments ──────────────────────────────
+  // Small local models sometimes stream tool-call arguments that are not
+  // valid JSON. A guided-decoding constraint cannot be put on the turn itself
+  // (it would also force free-text answers into the schema), so a call with
+  // broken arguments is re-requested once with the provider's structured
+  // output parameter built from the tool's JSON schema, which makes the
+  // arguments valid by construction.
+  function buildGuidedDecoding(provider, schema, name) {
+    var style = (LLM_PROVIDERS[provider] || LLM_PROVIDERS.custom).guidedDecoding;
+    var responseFormat = {
+      type: 'json_schema',
+      json_schema: { name: String(name || 'arguments').replace(/[^A-Za-z0-9_-]/g, '_').slice(0, 64), schema: schema }
+    };
+    if (style === 'guided_json') return { guided_json: schema };
+    // `format` is read by Ollama's native API, `response_format` by its /v1 layer
+    if (style === 'format') return { format: schema, response_format: responseFormat };
+    return { response_format: responseFormat };
+  }
+  DocBuddy.buildGuidedDecoding = buildGuidedDecoding;
 
-    '.llm-chat-message { padding: 10px 14px; border-radius: 12px; max-width: 85%; position: relative; box-sizing: border-box; word-wrap: break-word; overflow-wrap: break-word; }',
-    '.llm-chat-message.user { align-self: flex-end; background: var(--theme-primary); color: white; }',
-    '.llm-chat-message.assistant { align-self: flex-start; background: var(--theme-secondary); color: var(--theme-text-primary); }',
+  function hasValidToolArguments(toolCall) {
+    try {
+      var parsed = JSON.parse(toolCall.function.arguments || '{}');
+      return !!parsed && typeof parsed === 'object' && !Array.isArray(parsed);
+    } catch (e) {
+      return false;
+    }
+  }
+  DocBuddy.hasValidToolArguments = hasValidToolArguments;
 
-    '.llm-assistant-label { font-weight: 600; color: #8b5cf6; }',
+  /**
+   * Re-request the arguments of one tool call under a guided-decoding
+   * constraint. Resolves to the repaired tool call, or the original one when
+   * the provider rejects the constraint or still returns invalid JSON.
+   */
+  function repairToolCallArguments(url, payload, headers, signal, toolCall) {
+    var name = toolCall.function.name;
+    var tool = (payload.tools || []).filter(function(t) { return t.function && t.function.name === name; })[0];
+    var schema = tool && tool.function.parameters ? tool.function.parameters : { type: 'object' };
+    var lastUser = (payload.messages || []).filter(function(m) { return m.role === 'user'; }).slice(-1)[0];
+    var settings = loadFromStorage();
+    var body = Object.assign({
+      model: payload.model,
+      messages: [
+        {
+          role: 'system',
+          content: 'Reply with only the JSON arguments object for the function `' + name + '`' +
+            (tool && tool.function.description ? ' (' + tool.function.description.split('\n')[0] + ')' : '') + '.'
+        }
+      ].concat(lastUser ? [lastUser] : []).concat([{
+        role: 'user',
+        content: 'These arguments for `' + name + '` are not valid JSON. Return them as a JSON object that matches the schema:\n\n' +
+          toolCall.function.arguments
+      }]),
+      temperature: 0,
+      max_tokens: payload.max_tokens,
+      stream: false
+    }, buildGuidedDecoding(settings.provider, schema, name));
+
+    var timer = startLlmTimer(body);
+    return trackedFetch(url, { method: 'POST', headers: headers, body: JSON.stringify(body), signal: signal }, 'llm')
+      .then(function(res) {
+        if (!res.ok) throw new Error('HTTP ' + res.status);
+        return res.json();
+      })
+      .then(function(data) {
+        var content = data && data.choices && data.choices[0] && data.choices[0].message ? data.choices[0].message.content : '';
+        recordLlmStats(finishLlmTimer(timer, data && data.usage, content || '', 'done'));
+        var repaired = { id: toolCall.id, index: toolCall.index, function: { name: name, arguments: String(content || '').trim() } };
+        if (!hasValidToolArguments(repaired)) throw new Error('still not a JSON object');
+        console.debug('[Tool Call] Repaired arguments for', name, 'with guided decoding');
+        return repaired;
+      })
+      .catch(function(err) {
+        if (err && err.name === 'AbortError') throw err;
+        console.warn('[Tool Call] Could not repair arguments for', name + ':', err && err.message);
+        return toolCall;
+      });
+  }
+  DocBuddy.repairToolCallArguments = repairToolCallArguments;
+
+  // ── Provider adapters ─────────────────────────────────────────────────────
+  // streamLLMCompletion speaks OpenAI chat completions by default. Providers
+  // with a better native API get an adapter that rewrites the request and
+  // turns each native stream line back into an OpenAI-style chunk, so the
+  // callback interface stays the same:
+  //   ollama   — /api/chat NDJSON with keep_alive (the model stays loaded
+  //              between sparse conversations) and options.num_ctx sized to
+  //              the context window (the default silently truncates prompts)
+  //   llamacpp — OpenAI endpoint plus cache_prompt, so the shared prompt
+  //              prefix is reused from the server's KV cache
+  var DEFAULT_KEEP_ALIVE = '30m';
+  var OLLAMA_MAX_NUM_CTX = 16384;
+
+  function ollamaNativeUrl(url) {
+    return url.replace(/\/chat\/completions\/?$/, '').replace(/\/+$/, '').replace(/\/v1$/, '') + '/api/chat';
+  }
 
-    '.llm-chat-message-header { display: flex; justify-content: space-between; align-items: center; margin-bottom: 6px; font-size: 11px; opacity: 0.9; flex-shrink: 0; }',
+  // Ollama wants tool-call arguments as objects and no null content
+  function toOllamaMessages(messages) {
+    return (messages || []).map(function(m) {
+      var out = { role: m.role, content: m.content == null ? '' : m.content };
+      if (m.tool_calls) {
+        out.tool_calls = m.tool_calls.map(function(tc) {
+          var args = {};
+          try { args = JSON.parse(tc.function.arguments || '{}'); } catch (e) { args = {}; }
+          return { function: { name: tc.function.name, arguments: args } };
+        });
+      }
+      return out;
+    });
+  }
 
-    '.llm-chat-message-text { font-size: 15px; line-height: 1.6; word-wrap: break-word; overflow-wrap: break-word; }',
-    '.llm-chat-message-text p { margin: 8px 0; }',
-    '.llm-chat-message-text p:first-child { margin-top: 4px; }',
-    '.llm-chat-message-text p:last-child { margin-bottom: 4px; }',
+  function ollamaChunkToOpenAI(obj, state) {
+    if (obj.error) return { error: obj.error };
+    var message = obj.message || {};
+    var delta = {};
+    if (message.content) delta.content = message.content;
+    if (message.tool_calls && message.tool_calls.length) {
+      // Ollama sends each tool call whole, with object arguments
+      delta.tool_calls = message.tool_calls.map(function(tc) {
+        var idx = state.toolCalls++;
+        var args = tc['function'].arguments;
+        return {
+          index: idx,
+          id: tc.id || 'call_' + state.callPrefix + '_' + idx,
+          'function': { name: tc['function'].name, arguments: typeof args === 'string' ? args : JSON.stringify(args || {}) }
+        };
+      });
+    }
+    var chunk = { choices: [{ index: 0, delta: delta, finish_reason: null }] };
+    if (obj.done) {
+      chunk.choices[0].finish_reason = state.toolCalls ? 'tool_calls' : 'stop';
+      if (obj.eval_count != null) {
+        chunk.usage = { prompt_tokens: obj.prompt_eval_count || 0, completion_tokens: obj.eval_count };
+      }
+      chunk.done = true;
+    }
+    return chunk;
+  }
 
-    '.llm-streaming-indicator { color: var(--theme-accent); font-style: italic; opacity: 0.7; font-size: 13px; margin-top: 8px; }',
+  var PROVIDER_ADAPTERS = {
+    openai: {
+      format: 'sse',
+      prepare: function(url, payload) { return { url: url, body: payload }; },
+      toChunk: function(obj) { return obj; }
+    },
+    llamacpp: {
+      format: 'sse',
+      prepare: function(url, payload) {
+        return { url: url, body: Object.assign({}, payload, { cache_prompt: true }) };
+      },
+      toChunk: function(obj) { return obj; }
+    },
+    ollama: {
+      format: 'ndjson',
+      prepare: function(url, payload, settings) {
+        // Size num_ctx for the model actually requested (agent roles may differ)
+        var modelSettings = Object.assign({}, settings, { modelId: payload.model || settings.modelId });
+        var options = { num_ctx: getContextWindow(modelSettings) };
+        if (payload.temperature != null) options.temperature = payload.temperature;
+        if (payload.max_tokens != null) options.num_predict = payload.max_tokens;
+        var body = {
+          model: payload.model,
+          messages: toOllamaMessages(payload.messages),
+          stream: payload.stream !== false,
+          keep_alive: settings.keepAlive || DEFAULT_KEEP_ALIVE,
+          options: options
+        };
+        if (payload.tools) body.tools = payload.tools;
+        if (payload.format) body.format = payload.format;
+        return { url: ollamaNativeUrl(url), body: body };
+      },
+      toChunk: ollamaChunkToOpenAI
+    }
+  };
 
-    '.llm-chat-message-text strong { color: var(--theme-text-primary); }',
-    '.llm-chat-message-text em { font-style: italic; }',
-    '.llm-chat-message-text ul { margin: 8px 0; padding-left: 24px; }',
-    '.llm-chat-message-text ol { margin: 8px 0; padding-left: 24px; }',
-    '.llm-chat-message-text li { margin: 4px 0; }',
-    '.llm-chat-message-text blockquote { border-left: 3px solid var(--theme-accent); margin: 8px 0; padding-left: 12px; opacity: 0.9; }',
-    '.llm-chat-message-text a { color: #60a5fa; text-decoration: none; }',
-    '.llm-chat-message-text a:hover { text-decoration: underline; }',
+  /** The adapter for the configured provider (see LLM_PROVIDERS[].adapter). */
+  function getProviderAdapter(settings) {
+    settings = settings || {};
+    var name = (LLM_PROVIDERS[settings.provider] || LLM_PROVIDERS.custom).adapter || 'openai';
+    if (name === 'ollama' && settings.nativeApi === false) name = 'openai';
+    return PROVIDER_ADAPTERS[name] || PROVIDER_ADAPTERS.openai;
+  }
+  DocBuddy.getProviderAdapter = getProviderAdapter;
+
+  // ── Model routing ─────────────────────────────────────────────────────────
+  // Optional per-role models: a fast model for tool-argument steps and
+  // history summaries, a strong one for planning and the final answer. Either
+  // falls back to settings.modelId when unset.
+
+  var MODEL_ROLES = {
+    plan: 'strong',
+    tool: 'fast',
+    final: 'strong',
+    summary: 'fast',
+    chat: null
+  };
+  DocBuddy.MODEL_ROLES = MODEL_ROLES;
 
-    '.llm-chat-message-text pre { background: var(--theme-input-bg); border-radius: 8px; padding: 12px; overflow-x: auto; margin: 10px 0; font-family: "Consolas", "Monaco", monospace; font-size: 14px; position: relative; max-width: 100%; box-sizing: border-box; word-break: break-all; }',
-    '.llm-chat-message-text code { font-family: "Consolas", "Monaco", monospace; background: rgba(0,0,0,0.15); padding: 2px 6px; border-radius: 4px; font-size: 13px; }',
-    '.llm-chat-message-text pre code { background: transparent; padding: 0; }',
+  function modelForRole(settings, role) {
+    settings = settings || {};
+    var tier = MODEL_ROLES[role];
+    var model = tier === 'fast' ? settings.fastModelId : tier === 'strong' ? settings.strongModelId : null;
+    return model || settings.modelId || 'llama3';
+  }
+  DocBuddy.modelForRole = modelForRole;
 
-    '#llm-chat-messages::-webkit-scrollbar { width: 8px; }',
-    '#llm-chat-messages::-webkit-scrollbar-track { background: var(--theme-panel-bg); border-radius: 4px; }',
-    '#llm-chat-messages::-webkit-scrollbar-thumb { background: var(--theme-secondary); border-radius: 4px; }',
-    '#llm-chat-messages::-webkit-scrollbar-thumb:hover { background: var(--theme-accent); }',
+  /**
+   * Role of the next agent step: 'plan' in plan mode, 'tool' while the agent
+   * can still call tools, 'final' once it cannot and has to answer: no tools,
+   * or `lastMessage` is a tool result and the iteration budget is spent.
+   */
+  function classifyAgentStep(mode, toolsAvailable, lastMessage, budgetSpent) {
+    if (mode === 'plan') return 'plan';
+    if (!toolsAvailable) return 'final';
+    if (budgetSpent && lastMessage && lastMessage.role === 'tool') return 'final';
+    return 'tool';
+  }
+  DocBuddy.classifyAgentStep = classifyAgentStep;
 
-    '@keyframes typing { 0%, 80%, 100% { transform: scale(0); } 40% { transform: scale(1); } }',
-    '.llm-typing-indicator { display: inline-flex; align-items: center; gap: 4px; padding: 8px 12px; background: var(--theme-secondary); border-radius: 18px; font-size: 14px; margin-bottom: 8px; }',
-    '.llm-typing-dot { width: 6px; height: 6px; border-radius: 50%; background: var(--theme-text-secondary); animation: typing 1.4s infinite ease-in-out both; }',
-    '.llm-typing-dot:nth-child(1) { animation-delay: -0.32s; }',
-    '.llm-typing-dot:nth-child(2) { animation-delay: -0.16s; }',
+  /** True when `role` would run on a different model than the final answer. */
+  function routesToSeparateModel(settings, role) {
+    return modelForRole(settings, role) !== modelForRole(settings, 'final');
+  }
+  DocBuddy.routesToSeparateModel = routesToSeparateModel;
+
+  // ── LLM endpoint pool ─────────────────────────────────────────────────────
+  // Settings may list extra OpenAI-compatible endpoints serving the same
+  // model (`endpointPool`, comma or newline separated). Each request goes to
+  // the endpoint with the lowest recent time-to-first-token weighted by its
+  // in-flight streams; endpoints that fail or stall sit out for a while.
+
+  var TTFT_EWMA_ALPHA = 0.3;
+  var ENDPOINT_COOLDOWN_MS = 30000;
+  // No data at all from an endpoint for this long means the stream stalled.
+  // The first chunk gets longer, since prompt processing happens before it.
+  var STREAM_STALL_TIMEOUT_MS = 30000;
+  var FIRST_CHUNK_TIMEOUT_MS = 120000;
+  var RETRYABLE_LLM_STATUS = { 408: true, 429: true, 500: true, 502: true, 503: true, 504: true };
+
+  // base URL -> { ttft, inFlight, requests, failures, cooldownUntil }
+  var _endpointStats = {};
+
+  function normalizeBaseUrl(url) {
+    return String(url || '').trim().replace(/\/+$/, '');
+  }
 
-    '.llm-chat-input-area { width: 100%; box-sizing: border-box; flex-shrink: 0; }',
+  /** Base URLs in the pool: the configured baseUrl first, then `endpointPool`. */
+  function getEndpointPool(settings) {
+    settings = settings || {};
+    var pool = [];
+    [settings.baseUrl].concat(String(settings.endpointPool || '').split(/[\s,]+/)).forEach(function(url) {
+      var base = normalizeBaseUrl(url);
+      if (base && pool.indexOf(base) === -1) pool.push(base);
+    });
+    return pool;
+  }
+  DocBuddy.getEndpointPool = getEndpointPool;
 
-    '.llm-chat-input-area textarea { width: 100%; box-sizing: border-box; overflow-x: hidden; word-wrap: break-word; }',
+  function endpointStats(base) {
+    if (!_endpointStats[base]) {
+      _endpointStats[base] = { ttft: null, inFlight: 0, requests: 0, failures: 0, cooldownUntil: 0 };
+    }
+    return _endpointStats[base];
+  }
 
-    '@media (min-width: 769px) and (max-width: 1024px) {',
-    '  .llm-chat-message { max-width: 80%; }',
-    '}',
+  function endpointScore(stats, now) {
+    // Unmeasured endpoints score as fast so each one gets tried
+    var score = (stats.ttft || 0) + 1;
+    score *= 1 + stats.inFlight;
+    if (stats.cooldownUntil > now) score += 1e9;
+    return score;
+  }
 
-    '@media (min-width: 1200px) {',
-    '  .llm-chat-container { max-width: 100%; }',
-    '  .llm-chat-message { max-width: 75%; }',
-    '}',
+  /**
+   * Route a /chat/completions URL built from settings.baseUrl to the best
+   * pool endpoint not in `tried`. URLs that are not under the configured
+   * baseUrl are left alone. Returns { base, url } (base is null when the URL
+   * was not routed).
+   */
+  function pickEndpoint(settings, url, tried) {
+    var pool = getEndpointPool(settings);
+    var primary = pool[0];
+    if (!primary || url.indexOf(primary) !== 0) return { base: null, url: url };
+    var now = Date.now();
+    var best = null;
+    var bestScore = Infinity;
+    pool.forEach(function(base) {
+      if (tried && tried.indexOf(base) !== -1) return;
+      var score = endpointScore(endpointStats(base), now);
+      if (score < bestScore) {
+        best = base;
+        bestScore = score;
+      }
+    });
+    if (!best) return { base: null, url: url };
+    return { base: best, url: best + url.slice(primary.length) };
+  }
+  DocBuddy.pickEndpoint = pickEndpoint;
 
-    '@media (max-width: 768px) {',
-    '  .llm-chat-message-wrapper { width: 100%; padding: 0 4px; margin-bottom: 6px; }',
-    '  .llm-chat-message { max-width: 90%; padding: 8px 10px; }',
-    '  .llm-chat-message-text { font-size: 14px; }',
-    '  .llm-typing-indicator { font-size: 13px; padding: 8px 12px; }',
-    '  .llm-chat-messages { padding: 6px; gap: 6px; }',
-    '  .llm-chat-message-header { font-size: 10px; }',
-    '  .llm-chat-message-text pre { font-size: 12px; padding: 8px; }',
-    '  .llm-code-block-wrapper { font-size: 12px; }',
-    '}',
+  function acquireEndpoint(base) {
+    if (!base) return;
+    var stats = endpointStats(base);
+    stats.inFlight++;
+    stats.requests++;
+  }
 
-    '@media (max-width: 768px) and (orientation: landscape) {',
-    '  .llm-chat-container { height: calc(100dvh - 40px) !important; }',
-    '}',
+  /** End one stream on `base`; `ttftMs` is null when no token arrived. */
+  function releaseEndpoint(base, ttftMs, failed) {
+    if (!base) return;
+    var stats = endpointStats(base);
+    stats.inFlight = Math.max(0, stats.inFlight - 1);
+    if (failed) {
+      stats.failures++;
+      stats.cooldownUntil = Date.now() + ENDPOINT_COOLDOWN_MS;
+    } else if (ttftMs != null) {
+      stats.ttft = stats.ttft == null ? ttftMs : stats.ttft + TTFT_EWMA_ALPHA * (ttftMs - stats.ttft);
+      stats.cooldownUntil = 0;
+    }
+  }
 
-    '.llm-error-message {',
-    '  background: linear-gradient(135deg, rgba(239, 68, 68, 0.15), rgba(220, 38, 38, 0.1));',
-    '  border: 1px solid rgba(239, 68, 68, 0.3);',
-    '  border-radius: 8px;',
-    '  padding: 12px 14px;',
-    '  margin: 4px 0;',
-    '}',
-    '.llm-error-title {',
-    '  color: #ef4444;',
-    '  font-weight: 600;',
-    '  font-size: 14px;',
-    '  margin-bottom: 6px;',
-    '  display: flex;',
-    '  align-items: center;',
-    '  gap: 6px;',
-    '}',
-    '.llm-error-title::before {',
-    '  content: "⚠️";',
-    '}',
-    '.llm-error-text {',
-    '  color: var(--theme-text-secondary);',
-    '  font-size: 13px;',
-    '  line-height: 1.5;',
-    '}',
-    '.llm-error-actions {',
-    '  margin-top: 10px;',
-    '}',
-    '.llm-error-action-btn {',
-    '  background: var(--theme-primary);',
-    '  color: white;',
-    '  border: none;',
-    '  border-radius: 6px;',
-    '  padding: 6px 14px;',
-    '  font-size: 12px;',
-    '  cursor: pointer;',
-    '  transition: all 0.2s ease;',
-    '}',
-    '.llm-error-action-btn:hover {',
-    '  background: var(--theme-primary-hover);',
-    '  transform: translateY(-1px);',
-    '}',
+  /** Snapshot of per-endpoint routing stats, for the settings panel. */
+  function getEndpointStats() {
+    return Object.keys(_endpointStats).map(function(base) {
+      return Object.assign({ base: base }, _endpointStats[base]);
+    });
+  }
+  DocBuddy.getEndpointStats = getEndpointStats;
+
+  /** Errors worth retrying on another endpoint: network failures, stalls, 429/5xx. */
+  function isRetryableLlmError(err) {
+    if (!err || err.name === 'AbortError') return false;
+    if (err.stalled) return true;
+    if (err.status != null) return !!RETRYABLE_LLM_STATUS[err.status];
+    return true;
+  }
 
-    '.llm-code-block-wrapper { background: var(--theme-input-bg); border: 1px solid var(--theme-border-color); border-radius: 8px; overflow: hidden; margin: 10px 0; font-family: "Consolas", "Monaco", monospace; font-size: 13px; cursor: pointer; transition: all 0.2s ease; touch-action: manipulation; }',
-    '.llm-code-block-wrapper:hover { border-color: var(--theme-accent); box-shadow: 0 2px 8px rgba(0,0,0,0.1); }',
-    '.llm-code-block-header { display: flex; justify-content: space-between; align-items: center; padding: 8px 12px; background: var(--theme-panel-bg); border-bottom: 1px solid var(--theme-border-color); }',
-    '.llm-code-block-language { color: var(--theme-text-secondary); font-size: 10px; font-family: "Inter", sans-serif; font-weight: 600; text-transform: uppercase; }',
-    '.llm-code-block-copy-indicator { color: var(--theme-text-secondary); font-size: 12px; display: flex; align-items: center; gap: 4px; transition: all 0.2s ease; }',
-    '.llm-code-block-content { padding: 14px 12px; margin: 0; overflow-x: auto; white-space: pre-wrap; word-break: break-all; line-height: 1.6; cursor: pointer; }',
-    '.llm-code-block-content code { font-family: "Consolas", "Monaco", monospace; }',
-    '.llm-code-block-content pre { margin: 0; padding: 0; }',
-    '.llm-code-block-content.json { color: #a5b4fc; }',
-    '@keyframes llm-fade-in { from { opacity: 0; transform: translate(-50%, -50%) scale(0.9); } to { opacity: 1; transform: translate(-50%, -50%) scale(1); } }',
+  // ── Provider discovery ────────────────────────────────────────────────────
+  // Probes every provider default from LLM_PROVIDERS plus the user's own
+  // endpoints in parallel. Results (model list, latency) persist in
+  // localStorage and are served immediately; entries older than the TTL are
+  // re-probed in the background (stale-while-revalidate). Each finished probe
+  // fires a `docbuddy-discovery` window event.
 
-  ].join('\n');
+  var DISCOVERY_TTL_MS = 60000;
+  var DISCOVERY_PROBE_TIMEOUT_MS = 2000;
+  var _discoveryInFlight = {};
 
-  injectStyles('docbuddy-chat-styles', chatStyles);
+  function loadDiscoveryCache() {
+    return Object.assign({}, readStore(DISCOVERY_CACHE_KEY));
+  }
 
-  // ── Theme injection function ────────────────────────────────────────────────
-  var _colorRe = /^#[0-9a-fA-F]{3,8}$|^rgba?\(\s*\d{1,3}\s*,\s*\d{1,3}\s*,\s*\d{1,3}\s*(,\s*(0|1|0?\.\d+))?\s*\)$/;
-  function _safeColor(val, fallback) { return _colorRe.test(val) ? val : fallback; }
+  function saveDiscoveryEntry(entry) {
+    var cache = loadDiscoveryCache();
+    cache[entry.base] = entry;
+    writeStore(DISCOVERY_CACHE_KEY, cache);
+  }
 
-  var applyLLMTheme = function (themeName, customColors) {
-    var validatedTheme = THEME_DEFINITIONS[themeName] ? themeName : 'light';
-    var themeDef = THEME_DEFINITIONS[validatedTheme];
+  /** Sorted model ids from an OpenAI-style /models response. */
+  function parseModelList(data) {
+    if (!data || !Array.isArray(data.data)) return [];
+    return data.data
+      .map(function(m) { return m.id || m.name || ''; })
+      .filter(function(id) { return id !== ''; })
+      .sort();
+  }
+  DocBuddy.parseModelList = parseModelList;
 
-    var finalColors = Object.assign({}, themeDef, customColors);
+  /**
+   * Endpoints to probe: provider defaults, then the configured baseUrl and
+   * pool. The API key is only sent to the user's own endpoints.
+   */
+  function getDiscoveryTargets(settings) {
+    settings = settings || {};
+    var targets = [];
+    var seen = {};
+    var add = function(base, provider, own) {
+      base = normalizeBaseUrl(base);
+      if (!base) return;
+      if (seen[base]) {
+        if (own) seen[base].own = true;
+        return;
+      }
+      seen[base] = { base: base, provider: provider, own: own };
+      targets.push(seen[base]);
+    };
+    Object.keys(LLM_PROVIDERS).forEach(function(key) {
+      add(LLM_PROVIDERS[key].url, key, false);
+    });
+    getEndpointPool(settings).forEach(function(base) {
+      add(base, settings.provider || 'custom', true);
+    });
+    return targets;
+  }
+  DocBuddy.getDiscoveryTargets = getDiscoveryTargets;
 
-    var cssVars = [
-      '--theme-primary: ' + _safeColor(finalColors.primary, themeDef.primary),
-      '--theme-primary-hover: ' + _safeColor(finalColors.primaryHover || finalColors.primary, themeDef.primaryHover || themeDef.primary),
-      '--theme-secondary: ' + _safeColor(finalColors.secondary, themeDef.secondary),
-      '--theme-accent: ' + _safeColor(finalColors.accent, themeDef.accent),
-      '--theme-background: ' + _safeColor(finalColors.background, themeDef.background),
-      '--theme-panel-bg: ' + _safeColor(finalColors.panelBg || finalColors.secondary, themeDef.panelBg || themeDef.secondary),
-      '--theme-header-bg: ' + _safeColor(finalColors.headerBg || finalColors.background, themeDef.headerBg || themeDef.background),
-      '--theme-border-color: ' + _safeColor(finalColors.borderColor || finalColors.secondary, themeDef.borderColor || themeDef.secondary),
-      '--theme-text-primary: ' + _safeColor(finalColors.textPrimary, themeDef.textPrimary),
-      '--theme-text-secondary: ' + _safeColor(finalColors.textSecondary || '#6b7280', themeDef.textSecondary || '#6b7280'),
-      '--theme-input-bg: ' + _safeColor(finalColors.inputBg || finalColors.secondary, themeDef.inputBg || themeDef.secondary),
-    ].join('; ');
+  /**
+   * GET {base}/models once. Always resolves with a cache entry:
+   * { base, ok, models, latencyMs, status, error, errorKind, checkedAt }
+   * where errorKind is 'timeout', 'network' or 'http'. Background probes
+   * (no opts.timeoutMs) of the same base share one request.
+   */
+  function probeEndpoint(base, opts) {
+    opts = opts || {};
+    base = normalizeBaseUrl(base);
+    var shared = !opts.timeoutMs;
+    if (shared && _discoveryInFlight[base]) return _discoveryInFlight[base];
+    var headers = { 'Content-Type': 'application/json' };
+    if (opts.apiKey) headers['Authorization'] = 'Bearer ' + opts.apiKey;
+    var controller = new AbortController();
+    var timeoutMs = opts.timeoutMs || DISCOVERY_PROBE_TIMEOUT_MS;
+    var timeoutId = setTimeout(function() { controller.abort(); }, timeoutMs);
+    var started = perfNow();
+    var entry = { base: base, ok: false, models: [], latencyMs: null, status: null, error: null, errorKind: null, checkedAt: null };
+
+    var pending = trackedFetch(base + '/models', { method: 'GET', headers: headers, signal: controller.signal }, 'models')
+      .then(function(res) {
+        entry.status = res.status;
+        if (!res.ok) {
+          return res.text().then(function(text) {
+            var err = new Error('HTTP ' + res.status + ': ' + res.statusText + (text ? ' - ' + text : ''));
+            err.kind = 'http';
+            throw err;
+          });
+        }
+        return res.json();
+      })
+      .then(function(data) {
+        if (data && data.error) {
+          var err = new Error(data.details || data.error);
+          err.kind = 'http';
+          throw err;
+        }
+        entry.ok = true;
+        entry.models = parseModelList(data);
+        entry.latencyMs = Math.round(perfNow() - started);
+      })
+      .catch(function(err) {
+        entry.error = err.name === 'AbortError'
+          ? 'Connection timed out (' + Math.round(timeoutMs / 1000) + 's)'
+          : (err.message || 'Connection failed');
+        entry.errorKind = err.name === 'AbortError' ? 'timeout' : (err.kind || 'network');
+      })
+      .then(function() {
+        clearTimeout(timeoutId);
+        if (_discoveryInFlight[base] === pending) delete _discoveryInFlight[base];
+        entry.checkedAt = Date.now();
+        saveDiscoveryEntry(entry);
+        window.dispatchEvent(new CustomEvent('docbuddy-discovery', { detail: entry }));
+        publishTabDelta('discovery', entry);
+        return entry;
+      });
+    if (shared) _discoveryInFlight[base] = pending;
+    return pending;
+  }
+  DocBuddy.probeEndpoint = probeEndpoint;
 
-    var css = ':root { ' + cssVars + ' }';
-    var themeStyle = document.getElementById('docbuddy-theme-styles');
+  /**
+   * Cached discovery results for every target, without touching the
+   * network. `stale` marks entries past the TTL; `checking` marks probes in
+   * flight. Targets never probed have checkedAt null.
+   */
+  function getDiscoverySnapshot(settings) {
+    var cache = loadDiscoveryCache();
+    var now = Date.now();
+    return getDiscoveryTargets(settings).map(function(target) {
+      var hit = cache[target.base];
+      return Object.assign({ ok: false, models: [], latencyMs: null, error: null, checkedAt: null }, hit || {}, {
+        base: target.base,
+        provider: target.provider,
+        stale: !hit || now - hit.checkedAt > DISCOVERY_TTL_MS,
+        checking: !!_discoveryInFlight[target.base]
+      });
+    });
+  }
+  DocBuddy.getDiscoverySnapshot = getDiscoverySnapshot;
 
-    if (themeStyle) {
-      if (themeStyle.textContent !== css) {
-        themeStyle.textContent = css;
+  /**
+   * Re-probe stale targets (all targets with opts.force) in parallel.
+   * Resolves with the refreshed snapshot once every probe has settled.
+   */
+  function refreshDiscovery(settings, opts) {
+    opts = opts || {};
+    settings = settings || {};
+    var snapshot = getDiscoverySnapshot(settings);
+    var probes = getDiscoveryTargets(settings).filter(function(target, i) {
+      return opts.force || snapshot[i].stale;
+    }).map(function(target) {
+      return probeEndpoint(target.base, { apiKey: target.own ? settings.apiKey : null });
+    });
+    return Promise.all(probes).then(function() {
+      return getDiscoverySnapshot(settings);
+    });
+  }
+  DocBuddy.refreshDiscovery = refreshDiscovery;
+
+  // ── Completion cache ──────────────────────────────────────────────────────
+  // Exact-match cache of finished completions in IndexedDB, keyed on a
+  // normalized hash of (model, messages, tools, temperature, max_tokens) and
+  // the schema hash. settings.completionCache: 'deterministic' (default;
+  // temperature 0 only), 'all' or 'off'. Hits replay through the same
+  // callbacks as a live stream, instantly or at the recorded speed
+  // (settings.cacheReplay === 'simulated'). Entries are evicted least
+  // recently used first past COMPLETION_CACHE_MAX_BYTES, and dropped when the
+  // schema they were made against changes.
+
+  var COMPLETION_DB_NAME = 'docbuddy-completions';
+  var COMPLETION_STORE = 'completions';
+  var COMPLETION_CACHE_MAX_BYTES = 8 * 1024 * 1024;
+  var COMPLETION_CACHE_MAX_ENTRIES = 500;
+  var REPLAY_CHUNK_CHARS = 16;
+  var _completionDb = null;
+
+  /** Promise of the IndexedDB handle, or null where IndexedDB is unavailable. */
+  function openCompletionDb() {
+    if (_completionDb) return _completionDb;
+    _completionDb = new Promise(function(resolve) {
+      if (typeof indexedDB === 'undefined') return resolve(null);
+      try {
+        var req = indexedDB.open(COMPLETION_DB_NAME, 1);
+        req.onupgradeneeded = function() {
+          var store = req.result.createObjectStore(COMPLETION_STORE, { keyPath: 'key' });
+          store.createIndex('usedAt', 'usedAt');
+        };
+        req.onsuccess = function() { resolve(req.result); };
+        req.onerror = function() { resolve(null); };
+        req.onblocked = function() { resolve(null); };
+      } catch (e) {
+        resolve(null);
       }
-    } else {
-      themeStyle = document.createElement('style');
-      themeStyle.id = 'docbuddy-theme-styles';
-      themeStyle.textContent = css;
-      document.head.appendChild(themeStyle);
-    }
-  };
-  DocBuddy.applyLLMTheme = applyLLMTheme;
-  window.applyLLMTheme = applyLLMTheme;
+    });
+    return _completionDb;
+  }
 
-  // ── Global function to open settings tab ───────────────────────────────────
-  var llmOpenSettings = function() {
-    if (window.llmSwitchTab) {
-      window.llmSwitchTab('settings');
-    } else {
+  function idbRequest(req) {
+    return new Promise(function(resolve, reject) {
+      req.onsuccess = function() { resolve(req.result); };
+      req.onerror = function() { reject(req.error); };
+    });
+  }
+
+  function isCacheableCompletion(payload, settings) {
+    if (_cassette.mode !== 'idle') return false;
+    var mode = (settings && settings.completionCache) || 'deterministic';
+    if (mode === 'off') return false;
+    if (mode === 'all') return true;
+    return payload.temperature != null && Number(payload.temperature) === 0;
+  }
+  DocBuddy.isCacheableCompletion = isCacheableCompletion;
+
+  /**
+   * Cache key for a request. Tool-call ids are renumbered by first use and
+   * argument JSON re-serialized with sorted keys, so histories that differ
+   * only in generated ids or whitespace share a key.
+   */
+  function completionCacheKey(payload, schemaHash) {
+    var ids = {};
+    var next = 0;
+    var idFor = function(id) {
+      if (!(id in ids)) ids[id] = 'call_' + (next++);
+      return ids[id];
+    };
+    var normArgs = function(args) {
       try {
-        localStorage.setItem("docbuddy-active-tab", "settings");
+        return stableStringify(typeof args === 'string' ? JSON.parse(args) : args);
       } catch (e) {
-        console.warn('Failed to switch to settings tab:', e);
+        return String(args);
       }
-    }
-  };
-  DocBuddy.llmOpenSettings = llmOpenSettings;
-  window.llmOpenSettings = llmOpenSettings;
+    };
+    var messages = (payload.messages || []).map(function(m) {
+      var out = { role: m.role, content: typeof m.content === 'string' ? m.content.replace(/\s+/g, ' ').trim() : m.content };
+      if (m.tool_calls) {
+        out.tool_calls = m.tool_calls.map(function(tc) {
+          return { id: idFor(tc.id), name: tc.function && tc.function.name, arguments: normArgs(tc.function && tc.function.arguments) };
+        });
+      }
+      if (m.tool_call_id) out.tool_call_id = idFor(m.tool_call_id);
+      return out;
+    });
+    return hashString(stableStringify({
+      model: payload.model || null,
+      messages: messages,
+      tools: payload.tools || null,
+      temperature: payload.temperature != null ? Number(payload.temperature) : null,
+      max_tokens: payload.max_tokens != null ? Number(payload.max_tokens) : null,
+      schema: schemaHash || ''
+    }));
+  }
+  DocBuddy.completionCacheKey = completionCacheKey;
+
+  /** The cached entry for `key` (touching its LRU stamp), or null. */
+  function lookupCompletion(key, schemaHash) {
+    return openCompletionDb().then(function(db) {
+      if (!db) return null;
+      var store = db.transaction(COMPLETION_STORE, 'readwrite').objectStore(COMPLETION_STORE);
+      return idbRequest(store.get(key)).then(function(entry) {
+        if (!entry) return null;
+        if (entry.schemaHash !== schemaHash) {
+          store.delete(key);
+          return null;
+        }
+        entry.usedAt = Date.now();
+        entry.hits = (entry.hits || 0) + 1;
+        store.put(entry);
+        return entry;
+      });
+    }).catch(function() { return null; });
+  }
 
-  // Eagerly load system prompt config at module init (before DOMContentLoaded)
-  loadSystemPromptConfig();
+  // Walk newest-first and delete what falls outside the size/count budget or
+  // was made against another schema
+  function evictCompletions(db, schemaHash) {
+    var store = db.transaction(COMPLETION_STORE, 'readwrite').objectStore(COMPLETION_STORE);
+    var bytes = 0;
+    var count = 0;
+    var cursorReq = store.index('usedAt').openCursor(null, 'prev');
+    cursorReq.onsuccess = function() {
+      var cursor = cursorReq.result;
+      if (!cursor) return;
+      var entry = cursor.value;
+      bytes += entry.size || 0;
+      count++;
+      if (entry.schemaHash !== schemaHash || bytes > COMPLETION_CACHE_MAX_BYTES || count > COMPLETION_CACHE_MAX_ENTRIES) {
+        cursor.delete();
+      }
+      cursor.continue();
+    };
+  }
+
+  function storeCompletion(entry) {
+    return openCompletionDb().then(function(db) {
+      if (!db) return;
+      entry.size = JSON.stringify(entry).length;
+      var store = db.transaction(COMPLETION_STORE, 'readwrite').objectStore(COMPLETION_STORE);
+      return idbRequest(store.put(entry)).then(function() {
+        evictCompletions(db, entry.schemaHash);
+      });
+    }).catch(function(err) {
+      console.warn('[Cache] Could not store completion:', err && err.message);
+    });
+  }
+
+  function clearCompletionCache() {
+    return openCompletionDb().then(function(db) {
+      if (!db) return;
+      return idbRequest(db.transaction(COMPLETION_STORE, 'readwrite').objectStore(COMPLETION_STORE).clear());
+    }).catch(function() {});
+  }
+  DocBuddy.clearCompletionCache = clearCompletionCache;
+
+  // Wrap stream callbacks so a finished completion is written to the cache
+  function cachingCallbacks(callbacks, key, schemaHash, payload) {
+    var content = '';
+    var toolCalls = null;
+    return Object.assign({}, callbacks, {
+      onContent: function(delta, accumulated) {
+        content = accumulated;
+        callbacks.onContent(delta, accumulated);
+      },
+      onToolCalls: function(list) {
+        toolCalls = list.map(function(tc) {
+          return { function: { name: tc.function.name, arguments: tc.function.arguments } };
+        });
+        callbacks.onToolCalls(list);
+      },
+      onStats: function(stats) {
+        if ((stats.outcome === 'done' || stats.outcome === 'tool_calls') && (content || toolCalls)) {
+          var now = Date.now();
+          storeCompletion({
+            key: key,
+            schemaHash: schemaHash,
+            model: payload.model || null,
+            content: content,
+            toolCalls: toolCalls,
+            promptTokens: stats.promptTokens,
+            completionTokens: stats.completionTokens,
+            durationMs: stats.durationMs,
+            tokensPerSec: stats.tokensPerSec,
+            createdAt: now,
+            usedAt: now,
+            hits: 0
+          });
+        }
+        if (callbacks.onStats) callbacks.onStats(stats);
+      }
+    });
+  }
+
+  /**
+   * Play a cached completion through the stream callbacks. Simulated replay
+   * paces REPLAY_CHUNK_CHARS-sized chunks at the recorded tokens/second.
+   */
+  function replayCompletion(entry, payload, callbacks, signal, simulated) {
+    var started = perfNow();
+    var text = entry.content || '';
+    var accumulated = '';
+    var pos = 0;
+    var chunkChars = simulated ? REPLAY_CHUNK_CHARS : text.length || 1;
+    var delayMs = simulated && entry.tokensPerSec ? (REPLAY_CHUNK_CHARS / 4) / entry.tokensPerSec * 1000 : 0;
+    var ttftMs = null;
+
+    var finish = function() {
+      var stats = {
+        model: entry.model,
+        role: callbacks.role || null,
+        outcome: 'cached',
+        usageSource: 'cache',
+        promptTokens: entry.promptTokens,
+        cachedTokens: null,
+        completionTokens: entry.completionTokens,
+        ttftMs: ttftMs,
+        interTokenMs: null,
+        durationMs: Math.round(perfNow() - started),
+        generationMs: 0,
+        tokensPerSec: null,
+        savedMs: entry.durationMs || 0,
+        at: Date.now()
+      };
+      recordLlmStats(stats);
+      if (callbacks.onStats) callbacks.onStats(stats);
+    };
+
+    var step = function() {
+      if (signal && signal.aborted) {
+        callbacks.onAbort(accumulated);
+        return;
+      }
+      if (pos < text.length) {
+        var delta = text.slice(pos, pos + chunkChars);
+        pos += chunkChars;
+        accumulated += delta;
+        if (ttftMs == null) ttftMs = Math.round(perfNow() - started);
+        callbacks.onContent(delta, accumulated);
+        setTimeout(step, delayMs);
+        return;
+      }
+      if (entry.toolCalls && entry.toolCalls.length) {
+        var prefix = 'call_' + Date.now().toString(36) + '_';
+        callbacks.onToolCalls(entry.toolCalls.map(function(tc, i) {
+          return { id: prefix + i, index: i, function: { name: tc.function.name, arguments: tc.function.arguments } };
+        }));
+      } else {
+        callbacks.onDone(accumulated);
+      }
+      finish();
+    };
+    setTimeout(step, 0);
+  }
 
   // ── Shared SSE streaming helper ───────────────────────────────────────────
   // Handles the fetch + SSE parse loop so chat.js and agent.js share one
   // implementation. Callbacks let each panel wire its own state updates.
+  // `url` is the OpenAI-style /chat/completions URL; the provider adapter
+  // may send the request to a native endpoint instead.
   //
   // callbacks:
   //   onContent(delta, accumulated)   — new content token arrived
-  //   onToolCalls(toolCallsList)      — finish_reason === "tool_calls"
+  //   onToolCallReady(toolCall)       — a tool call's arguments are complete
+  //                                     JSON while the stream continues (optional)
+  //   onToolCalls(toolCallsList)      — finish_reason === "tool_calls"; calls
+  //                                     whose arguments are not valid JSON are
+  //                                     repaired first (repairToolCallArguments)
   //   onDone(accumulated)             — stream finished normally
   //   onAbort(accumulated)            — AbortController fired
   //   onNetworkError(err, accumulated)— fetch / HTTP error
   //   onChunkError(err, raw)          — JSON parse error on SSE chunk (optional)
+  //   onStats(stats)                  — token/latency accounting, fired once after
+  //                                     the stream ends (optional; see recordLlmStats)
+  //   role                            — model role ('tool', 'final', ...) the
+  //                                     stats are filed under (optional, not a callback)
+  //
+  // Requests under settings.baseUrl are routed through the endpoint pool. If
+  // an endpoint errors, returns 429/5xx or stalls before tool calls were
+  // handed off, the request restarts on the next endpoint; panels see the
+  // restarted stream's `accumulated` text in onContent.
+
+  // Endpoints that rejected `stream_options`; requests to them omit it
+  var _noStreamOptions = {};
+
   DocBuddy.streamLLMCompletion = function(url, payload, headers, signal, callbacks) {
+    var settings = loadFromStorage();
+    if (!isCacheableCompletion(payload, settings)) {
+      streamFromPool(url, payload, headers, signal, callbacks, []);
+      return;
+    }
+    var schemaHash = getSchemaHash(DocBuddy._cachedOpenapiSchema);
+    var key = completionCacheKey(payload, schemaHash);
+    lookupCompletion(key, schemaHash).then(function(entry) {
+      if (entry) {
+        replayCompletion(entry, payload, callbacks, signal, settings.cacheReplay === 'simulated');
+      } else {
+        streamFromPool(url, payload, headers, signal, cachingCallbacks(callbacks, key, schemaHash, payload), []);
+      }
+    });
+  };
+
+  // One attempt on one endpoint; `tried` lists the pool bases already used
+  function streamFromPool(url, payload, headers, signal, callbacks, tried) {
     var accumulated = '';
     var accumulatedToolCalls = {};
+    var argScanners = {};
+    var timer = startLlmTimer(payload, callbacks.role);
+    var usage = null;
+    // Set once onToolCalls has fired; the rest of the stream is only read for `usage`
+    var handedOff = false;
+    var statsReported = false;
+
+    var settings = loadFromStorage();
+    var endpoint = pickEndpoint(settings, url, tried);
+    // Stalls abort through our own controller so they can be told apart
+    var controller = new AbortController();
+    var onOuterAbort = function() { controller.abort(); };
+    if (signal) {
+      if (signal.aborted) controller.abort();
+      else signal.addEventListener('abort', onOuterAbort);
+    }
+    var stallTimer = null;
+    var stalledAfterMs = 0;
+    var armStallTimer = function(ms) {
+      clearTimeout(stallTimer);
+      stallTimer = setTimeout(function() {
+        stalledAfterMs = ms;
+        controller.abort();
+      }, ms);
+    };
+    var attemptFinished = false;
+    var finishAttempt = function(failed) {
+      if (attemptFinished) return;
+      attemptFinished = true;
+      clearTimeout(stallTimer);
+      if (signal) signal.removeEventListener('abort', onOuterAbort);
+      releaseEndpoint(endpoint.base, timer.firstTokenAt != null ? timer.firstTokenAt - timer.startedAt : null, failed);
+    };
+    acquireEndpoint(endpoint.base);
+
+    var reportStats = function(outcome) {
+      finishAttempt(false);
+      if (statsReported) return;
+      statsReported = true;
+      var toolArgs = Object.keys(accumulatedToolCalls).map(function(k) {
+        return accumulatedToolCalls[k].function.arguments;
+      }).join('');
+      var stats = finishLlmTimer(timer, usage, accumulated + toolArgs, outcome);
+      recordLlmStats(stats);
+      if (callbacks.onStats) callbacks.onStats(stats);
+    };
+
+    var handOffToolCalls = function(toolCallsList) {
+      if (toolCallsList.every(hasValidToolArguments)) {
+        callbacks.onToolCalls(toolCallsList);
+        return;
+      }
+      Promise.all(toolCallsList.map(function(tc) {
+        return hasValidToolArguments(tc) ? tc : repairToolCallArguments(endpoint.url, payload, headers, signal, tc);
+      })).then(function(repaired) {
+        callbacks.onToolCalls(repaired);
+      }, function() {
+        callbacks.onAbort(accumulated);
+      });
+    };
 
-    fetch(url, { method: 'POST', headers: headers, body: JSON.stringify(payload), signal: signal })
+    var adapter = getProviderAdapter(settings);
+    var request = adapter.prepare(endpoint.url, payload, settings);
+    var chunkState = { toolCalls: 0, callPrefix: Date.now().toString(36) };
+    var body = request.body;
+    if (adapter.format === 'sse' && payload.stream && !_noStreamOptions[endpoint.url]) {
+      body = Object.assign({}, request.body, { stream_options: { include_usage: true } });
+    }
+
+    armStallTimer(FIRST_CHUNK_TIMEOUT_MS);
+    trackedFetch(request.url, { method: 'POST', headers: headers, body: JSON.stringify(body), signal: controller.signal }, 'llm')
       .then(function(res) {
         if (!res.ok) {
           return res.text().then(function(text) {
-            throw new Error('HTTP ' + res.status + ': ' + res.statusText + (text ? ' - ' + text : ''));
+            // Older servers reject the unknown field; retry once without it
+            if (body !== request.body && (res.status === 400 || res.status === 422) && /stream_options/.test(text)) {
+              _noStreamOptions[endpoint.url] = true;
+              finishAttempt(false);
+              statsReported = true;
+              streamFromPool(url, payload, headers, signal, callbacks, tried);
+              return;
+            }
+            var httpErr = new Error('HTTP ' + res.status + ': ' + res.statusText + (text ? ' - ' + text : ''));
+            httpErr.status = res.status;
+            throw httpErr;
           });
         }
         var reader = res.body.getReader();
@@ -1691,12 +5304,15 @@
 
         var processChunk = function() {
           return reader.read().then(function(result) {
+            armStallTimer(STREAM_STALL_TIMEOUT_MS);
             if (signal && signal.aborted) {
-              callbacks.onAbort(accumulated);
+              reportStats(handedOff ? 'tool_calls' : 'aborted');
+              if (!handedOff) callbacks.onAbort(accumulated);
               return;
             }
             if (result.done) {
-              callbacks.onDone(accumulated || "Sorry, I couldn't get a response.");
+              if (!handedOff) callbacks.onDone(accumulated || "Sorry, I couldn't get a response.");
+              reportStats(handedOff ? 'tool_calls' : 'done');
               return;
             }
 
@@ -1706,21 +5322,31 @@
 
             for (var i = 0; i < lines.length; i++) {
               var line = lines[i].trim();
-              if (!line || !line.startsWith('data: ')) continue;
-              var payloadData = line.substring(6);
+              var payloadData = line;
+              if (adapter.format === 'sse') {
+                if (!line || !line.startsWith('data: ')) continue;
+                payloadData = line.substring(6);
+              } else if (!line) {
+                continue;
+              }
 
               if (payloadData === '[DONE]') {
-                callbacks.onDone(accumulated || "Sorry, I couldn't get a response.");
+                if (!handedOff) callbacks.onDone(accumulated || "Sorry, I couldn't get a response.");
+                reportStats(handedOff ? 'tool_calls' : 'done');
                 return;
               }
 
               try {
-                var chunk = JSON.parse(payloadData);
+                var chunk = adapter.toChunk(JSON.parse(payloadData), chunkState);
+                if (chunk.usage) usage = chunk.usage;
+                if (handedOff) continue;
+
                 if (chunk.error) {
                   callbacks.onNetworkError(
                     new Error(chunk.error + (chunk.details ? ': ' + chunk.details : '')),
                     accumulated
                   );
+                  reportStats('error');
                   return;
                 }
 
@@ -1728,20 +5354,34 @@
                 if (!choice) continue;
 
                 if (choice.delta && choice.delta.content) {
+                  markLlmToken(timer);
                   accumulated += choice.delta.content;
                   callbacks.onContent(choice.delta.content, accumulated);
                 }
 
                 if (choice.delta && choice.delta.tool_calls) {
+                  markLlmToken(timer);
                   choice.delta.tool_calls.forEach(function(tc) {
                     var idx = tc.index != null ? tc.index : 0;
                     if (!accumulatedToolCalls[idx]) {
-                      accumulatedToolCalls[idx] = { id: '', function: { name: '', arguments: '' } };
+                      accumulatedToolCalls[idx] = { id: '', index: idx, function: { name: '', arguments: '' } };
+                      argScanners[idx] = createJsonScanner();
                     }
-                    if (tc.id) accumulatedToolCalls[idx].id = tc.id;
+                    var current = accumulatedToolCalls[idx];
+                    if (tc.id) current.id = tc.id;
                     if (tc.function) {
-                      if (tc.function.name) accumulatedToolCalls[idx].function.name = tc.function.name;
-                      if (tc.function.arguments) accumulatedToolCalls[idx].function.arguments += tc.function.arguments;
+                      if (tc.function.name) current.function.name = tc.function.name;
+                      if (tc.function.arguments) {
+                        current.function.arguments += tc.function.arguments;
+                        if (callbacks.onToolCallReady && !argScanners[idx].complete &&
+                            feedJsonScanner(argScanners[idx], tc.function.arguments)) {
+                          callbacks.onToolCallReady({
+                            id: current.id,
+                            index: idx,
+                            function: { name: current.function.name, arguments: current.function.arguments }
+                          });
+                        }
+                      }
                     }
                   });
                 }
@@ -1751,12 +5391,20 @@
                     return accumulatedToolCalls[k];
                   });
                   if (toolCallsList.length > 0) {
-                    callbacks.onToolCalls(toolCallsList);
-                    return;
+                    // Hand off immediately; the trailing usage chunk is read afterwards
+                    handedOff = true;
+                    handOffToolCalls(toolCallsList);
                   }
                 }
+
+                // NDJSON streams end with a `done` object instead of [DONE]
+                if (chunk.done) {
+                  if (!handedOff) callbacks.onDone(accumulated || "Sorry, I couldn't get a response.");
+                  reportStats(handedOff ? 'tool_calls' : 'done');
+                  return;
+                }
               } catch (e) {
-                if (callbacks.onChunkError) callbacks.onChunkError(e, payloadData);
+                if (callbacks.onChunkError && !handedOff) callbacks.onChunkError(e, payloadData);
               }
             }
 
@@ -1767,8 +5415,28 @@
         return processChunk();
       })
       .catch(function(err) {
+        var userAborted = !!(signal && signal.aborted);
+        if (stalledAfterMs && !userAborted) {
+          err = new Error('LLM stream stalled: no data from ' + (endpoint.base || endpoint.url) +
+            ' for ' + Math.round(stalledAfterMs / 1000) + ' s');
+          err.stalled = true;
+        }
+        if (handedOff) {
+          reportStats('tool_calls');
+          return;
+        }
+        if (!userAborted && isRetryableLlmError(err)) {
+          finishAttempt(true);
+          var nextTried = endpoint.base ? tried.concat([endpoint.base]) : tried;
+          if (endpoint.base && pickEndpoint(settings, url, nextTried).base) {
+            statsReported = true;
+            streamFromPool(url, payload, headers, signal, callbacks, nextTried);
+            return;
+          }
+        }
         callbacks.onNetworkError(err, accumulated);
+        reportStats(userAborted || (err && err.name === 'AbortError') ? 'aborted' : 'error');
       });
-  };
+  }
 
 })();
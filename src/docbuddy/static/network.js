@@ -0,0 +1,432 @@
+// DocBuddy Network Panel — request waterfall for LLM, tool and Swagger traffic
+// Depends on: core.js (window.DocBuddy)
+
+(function () {
+  "use strict";
+
+  var DB = window.DocBuddy;
+
+  var KIND_FILTERS = [
+    { key: 'all', label: 'All' },
+    { key: 'llm', label: 'LLM' },
+    { key: 'models', label: 'Models' },
+    { key: 'tool', label: 'Tool calls' },
+    { key: 'swagger', label: 'Try it out' },
+    { key: 'schema', label: 'Schema' },
+  ];
+
+  var KIND_COLORS = {
+    llm: '#8b5cf6',
+    models: '#06b6d4',
+    tool: '#10b981',
+    swagger: '#3b82f6',
+    schema: '#6b7280',
+  };
+
+  // Waterfall segment order and colours
+  var PHASES = [
+    { key: 'blocked', label: 'Queued', color: '#9ca3af' },
+    { key: 'dns', label: 'DNS', color: '#14b8a6' },
+    { key: 'connect', label: 'Connect', color: '#f59e0b' },
+    { key: 'ssl', label: 'TLS', color: '#a855f7' },
+    { key: 'wait', label: 'TTFB', color: '#10b981' },
+    { key: 'receive', label: 'Download', color: '#3b82f6' },
+  ];
+
+  function formatMs(ms) {
+    if (ms == null) return '–';
+    return ms < 1000 ? Math.round(ms) + ' ms' : (ms / 1000).toFixed(2) + ' s';
+  }
+
+  function shortUrl(url) {
+    try {
+      var u = new URL(url);
+      return (u.origin === window.location.origin ? '' : u.host) + u.pathname + u.search;
+    } catch (e) {
+      return url || '(pending)';
+    }
+  }
+
+  // ── NetworkPanel component ────────────────────────────────────────────────
+  function NetworkPanelFactory(system) {
+    var React = system.React;
+
+    return class NetworkPanel extends React.Component {
+      constructor(props) {
+        super(props);
+        this.state = {
+          entries: DB.getNetworkLog(),
+          filter: 'all',
+          selectedId: null,
+          cassette: DB.getCassetteState(),
+          recordChunks: true,
+          replaySpeed: 'recorded',
+          cassetteError: '',
+        };
+        this._refreshScheduled = false;
+        this._onNetwork = this._onNetwork.bind(this);
+        this._onCassette = this._onCassette.bind(this);
+        this.handleExportHar = this.handleExportHar.bind(this);
+        this.handleClear = this.handleClear.bind(this);
+        this.handleRecord = this.handleRecord.bind(this);
+        this.handleStopRecording = this.handleStopRecording.bind(this);
+        this.handleReplayFile = this.handleReplayFile.bind(this);
+        this.handleStopReplay = this.handleStopReplay.bind(this);
+      }
+
+      componentDidMount() {
+        window.addEventListener('docbuddy-network', this._onNetwork);
+        window.addEventListener('docbuddy-cassette', this._onCassette);
+      }
+
+      componentWillUnmount() {
+        window.removeEventListener('docbuddy-network', this._onNetwork);
+        window.removeEventListener('docbuddy-cassette', this._onCassette);
+      }
+
+      _onCassette(e) {
+        this.setState({ cassette: e.detail });
+      }
+
+      // Coalesce bursts of log events into one render per frame
+      _onNetwork() {
+        var self = this;
+        if (self._refreshScheduled) return;
+        self._refreshScheduled = true;
+        requestAnimationFrame(function() {
+          self._refreshScheduled = false;
+          self.setState({ entries: DB.getNetworkLog() });
+        });
+      }
+
+      _visibleEntries() {
+        var filter = this.state.filter;
+        return this.state.entries.filter(function(e) {
+          return filter === 'all' || e.kind === filter;
+        });
+      }
+
+      handleExportHar() {
+        var stamp = new Date().toISOString().replace(/[:.]/g, '-');
+        DB.exportAsJson(DB.buildHar(this._visibleEntries()), 'docbuddy-network-' + stamp + '.har');
+      }
+
+      handleRecord() {
+        DB.startCassetteRecording({ chunks: this.state.recordChunks });
+        this.setState({ cassetteError: '' });
+      }
+
+      handleStopRecording() {
+        var cassette = DB.stopCassetteRecording();
+        if (!cassette) return;
+        var stamp = new Date().toISOString().replace(/[:.]/g, '-');
+        DB.exportAsJson(cassette, 'docbuddy-cassette-' + stamp + '.json');
+      }
+
+      handleReplayFile(e) {
+        var self = this;
+        var file = e.target.files && e.target.files[0];
+        e.target.value = '';
+        if (!file) return;
+        var reader = new FileReader();
+        reader.onload = function() {
+          var cassette = null;
+          try { cassette = JSON.parse(reader.result); } catch (err) { cassette = null; }
+          var error = DB.startCassetteReplay(cassette, { speed: self.state.replaySpeed });
+          self.setState({ cassetteError: error || '' });
+        };
+        reader.readAsText(file);
+      }
+
+      handleStopReplay() {
+        DB.stopCassetteReplay();
+      }
+
+      _renderCassetteControls(btnStyle) {
+        var self = this;
+        var c = this.state.cassette;
+        var labelStyle = { fontSize: '12px', color: 'var(--theme-text-secondary)', display: 'flex', alignItems: 'center', gap: '4px' };
+        var controls;
+        if (c.mode === 'recording') {
+          controls = [
+            React.createElement('span', { key: 'status', style: { fontSize: '12px', color: '#ef4444', fontWeight: '600', animation: 'docbuddy-pulse 1.4s infinite ease-in-out' } },
+              '● Recording · ' + c.interactions + ' requests'),
+            React.createElement('button', { key: 'stop', onClick: this.handleStopRecording, style: btnStyle(true) }, 'Stop & save cassette'),
+          ];
+        } else if (c.mode === 'replaying') {
+          controls = [
+            React.createElement('span', { key: 'status', style: { fontSize: '12px', color: '#f59e0b', fontWeight: '600' } },
+              '↺ Replaying (' + c.speed + ') · ' + c.served + ' served' + (c.missed ? ' · ' + c.missed + ' not in cassette' : '')),
+            React.createElement('button', { key: 'stop', onClick: this.handleStopReplay, style: btnStyle(true) }, 'Stop replay'),
+          ];
+        } else {
+          controls = [
+            React.createElement('button', {
+              key: 'record',
+              onClick: this.handleRecord,
+              style: btnStyle(false),
+              title: 'Record LLM, tool and model requests into a cassette file'
+            }, '● Record'),
+            React.createElement('label', { key: 'chunks', style: labelStyle },
+              React.createElement('input', {
+                type: 'checkbox',
+                checked: this.state.recordChunks,
+                onChange: function(e) { self.setState({ recordChunks: e.target.checked }); }
+              }),
+              'stream chunk timing'),
+            React.createElement('span', { key: 'sep', style: { width: '12px' } }),
+            React.createElement('select', {
+              key: 'speed',
+              value: this.state.replaySpeed,
+              onChange: function(e) { self.setState({ replaySpeed: e.target.value }); },
+              style: Object.assign(btnStyle(false), { padding: '3px 6px' })
+            },
+              React.createElement('option', { value: 'recorded' }, 'Recorded speed'),
+              React.createElement('option', { value: 'fast' }, 'As fast as possible')
+            ),
+            React.createElement('label', { key: 'replay', style: Object.assign(btnStyle(false), { display: 'inline-block' }), title: 'Serve responses from a cassette without touching the network' },
+              'Replay cassette…',
+              React.createElement('input', { type: 'file', accept: '.json,application/json', onChange: this.handleReplayFile, style: { display: 'none' } })
+            ),
+          ];
+        }
+        return React.createElement(
+          'div',
+          {
+            style: {
+              display: 'flex', flexWrap: 'wrap', alignItems: 'center', gap: '6px',
+              padding: '8px 12px', borderBottom: '1px solid var(--theme-border-color)', flexShrink: 0,
+            }
+          },
+          React.createElement('span', { style: { fontSize: '12px', fontWeight: '600', color: 'var(--theme-text-primary)', marginRight: '4px' } }, 'Cassette'),
+          controls,
+          this.state.cassetteError
+            ? React.createElement('span', { style: { fontSize: '12px', color: '#ef4444' } }, this.state.cassetteError)
+            : null
+        );
+      }
+
+      handleClear() {
+        DB.clearNetworkLog();
+        this.setState({ entries: [], selectedId: null });
+      }
+
+      _renderWaterfall(entry, range) {
+        var p = DB.getNetworkPhases(entry);
+        var span = range.end - range.start || 1;
+        var left = (entry.startTime - range.start) / span * 100;
+        var pending = entry.endTime == null && !entry.error;
+        var segments = PHASES.filter(function(ph) { return p[ph.key] > 0; }).map(function(ph) {
+          return React.createElement('div', {
+            key: ph.key,
+            title: ph.label + ': ' + formatMs(p[ph.key]),
+            style: {
+              width: (p[ph.key] / (p.total || 1) * 100) + '%',
+              background: ph.color,
+              height: '100%',
+            }
+          });
+        });
+        return React.createElement(
+          'div',
+          { style: { position: 'relative', height: '10px', minWidth: '120px' } },
+          React.createElement(
+            'div',
+            {
+              style: {
+                position: 'absolute',
+                left: left + '%',
+                width: Math.max(p.total / span * 100, 0.5) + '%',
+                height: '100%',
+                display: 'flex',
+                borderRadius: '2px',
+                overflow: 'hidden',
+                background: entry.error ? '#ef4444' : (pending ? 'var(--theme-border-color)' : 'transparent'),
+                animation: pending ? 'docbuddy-pulse 1.4s infinite ease-in-out' : 'none',
+              }
+            },
+            segments
+          )
+        );
+      }
+
+      _renderDetails(entry) {
+        var p = DB.getNetworkPhases(entry);
+        var mono = { fontFamily: "'Consolas', 'Monaco', monospace", fontSize: '11px' };
+        var headerRows = function(headers) {
+          var names = Object.keys(headers || {});
+          if (!names.length) return React.createElement('div', { style: { opacity: 0.6 } }, '(none)');
+          return names.map(function(name) {
+            return React.createElement('div', { key: name, style: { wordBreak: 'break-all' } },
+              React.createElement('strong', null, name + ': '), headers[name]);
+          });
+        };
+        return React.createElement(
+          'div',
+          {
+            style: {
+              padding: '10px 12px',
+              background: 'var(--theme-input-bg)',
+              borderBottom: '1px solid var(--theme-border-color)',
+              color: 'var(--theme-text-primary)',
+              fontSize: '12px',
+            }
+          },
+          React.createElement('div', { style: Object.assign({ marginBottom: '8px', wordBreak: 'break-all' }, mono) }, entry.method + ' ' + entry.url),
+          React.createElement(
+            'div',
+            { style: { display: 'flex', flexWrap: 'wrap', gap: '6px 16px', marginBottom: '8px' } },
+            PHASES.map(function(ph) {
+              return React.createElement('span', { key: ph.key, style: mono },
+                React.createElement('span', { style: { display: 'inline-block', width: '8px', height: '8px', background: ph.color, marginRight: '4px', borderRadius: '2px' } }),
+                ph.label + ' ' + (p.detailed || ph.key === 'wait' || ph.key === 'receive' ? formatMs(p[ph.key]) : 'n/a'));
+            }),
+            React.createElement('span', { style: mono }, 'Total ' + formatMs(p.total))
+          ),
+          p.detailed ? null : React.createElement('div', { style: { fontSize: '11px', color: 'var(--theme-text-secondary)', marginBottom: '8px' } },
+            'Connection phases are unavailable for this request (cross-origin without Timing-Allow-Origin); TTFB includes them.'),
+          React.createElement('div', { style: { fontWeight: '600', marginTop: '6px' } }, 'Request headers'),
+          React.createElement('div', { style: mono }, headerRows(entry.requestHeaders)),
+          React.createElement('div', { style: { fontWeight: '600', marginTop: '6px' } }, 'Response headers'),
+          React.createElement('div', { style: mono }, headerRows(entry.responseHeaders)),
+          entry.requestBody ? React.createElement('div', { style: { fontWeight: '600', marginTop: '6px' } }, 'Request body (' + entry.requestBodySize + ' bytes)') : null,
+          entry.requestBody ? React.createElement('pre', {
+            style: Object.assign({ maxHeight: '200px', overflowY: 'auto', whiteSpace: 'pre-wrap', wordBreak: 'break-all', margin: '4px 0 0' }, mono)
+          }, entry.requestBody) : null
+        );
+      }
+
+      render() {
+        var self = this;
+        var s = this.state;
+        var entries = this._visibleEntries();
+
+        var range = { start: Infinity, end: -Infinity };
+        entries.forEach(function(e) {
+          var p = DB.getNetworkPhases(e);
+          range.start = Math.min(range.start, e.startTime);
+          range.end = Math.max(range.end, e.startTime + p.total);
+        });
+        var totalSpan = entries.length ? range.end - range.start : 0;
+
+        var btnStyle = function(active) {
+          return {
+            background: active ? 'var(--theme-primary)' : 'var(--theme-secondary)',
+            color: active ? '#fff' : 'var(--theme-text-primary)',
+            border: '1px solid var(--theme-border-color)',
+            borderRadius: '4px',
+            padding: '4px 10px',
+            cursor: 'pointer',
+            fontSize: '12px',
+          };
+        };
+        var cellStyle = {
+          padding: '6px 8px',
+          borderBottom: '1px solid var(--theme-border-color)',
+          textAlign: 'left',
+          verticalAlign: 'middle',
+          whiteSpace: 'nowrap',
+        };
+
+        var toolbar = React.createElement(
+          'div',
+          {
+            style: {
+              display: 'flex', flexWrap: 'wrap', alignItems: 'center', gap: '6px',
+              padding: '10px 12px', borderBottom: '1px solid var(--theme-border-color)', flexShrink: 0,
+            }
+          },
+          KIND_FILTERS.map(function(f) {
+            return React.createElement('button', {
+              key: f.key,
+              onClick: function() { self.setState({ filter: f.key }); },
+              style: btnStyle(s.filter === f.key),
+            }, f.label);
+          }),
+          React.createElement('div', { style: { flex: 1 } }),
+          React.createElement('span', { style: { fontSize: '12px', color: 'var(--theme-text-secondary)' } },
+            entries.length + ' requests · ' + formatMs(totalSpan)),
+          React.createElement('button', { onClick: this.handleClear, style: btnStyle(false) }, 'Clear'),
+          React.createElement('button', {
+            onClick: this.handleExportHar,
+            disabled: !entries.length,
+            style: Object.assign(btnStyle(true), { opacity: entries.length ? 1 : 0.5 }),
+            title: 'Download the visible requests as a HAR file'
+          }, 'Export HAR')
+        );
+
+        var legend = React.createElement(
+          'div',
+          { style: { display: 'flex', flexWrap: 'wrap', gap: '10px', padding: '6px 12px', fontSize: '11px', color: 'var(--theme-text-secondary)', flexShrink: 0 } },
+          PHASES.map(function(ph) {
+            return React.createElement('span', { key: ph.key },
+              React.createElement('span', { style: { display: 'inline-block', width: '8px', height: '8px', background: ph.color, marginRight: '4px', borderRadius: '2px' } }),
+              ph.label);
+          })
+        );
+
+        var rows = [];
+        entries.forEach(function(entry) {
+          var p = DB.getNetworkPhases(entry);
+          var statusColor = entry.error || (entry.status && entry.status >= 400) ? '#ef4444' : 'var(--theme-text-primary)';
+          rows.push(React.createElement(
+            'tr',
+            {
+              key: entry.id,
+              onClick: function() { self.setState({ selectedId: s.selectedId === entry.id ? null : entry.id }); },
+              style: { cursor: 'pointer', background: s.selectedId === entry.id ? 'var(--theme-secondary)' : 'transparent' },
+            },
+            React.createElement('td', { style: cellStyle },
+              React.createElement('span', {
+                style: { fontSize: '10px', fontWeight: '600', color: '#fff', background: KIND_COLORS[entry.kind] || '#6b7280', padding: '1px 6px', borderRadius: '4px' }
+              }, entry.kind),
+              entry.replayed ? React.createElement('span', { style: { marginLeft: '4px', color: '#f59e0b' }, title: 'Served from cassette' }, '↺') : null),
+            React.createElement('td', { style: Object.assign({}, cellStyle, { fontFamily: "'Consolas', 'Monaco', monospace", fontSize: '11px' }) }, entry.method),
+            React.createElement('td', {
+              style: Object.assign({}, cellStyle, { maxWidth: '320px', overflow: 'hidden', textOverflow: 'ellipsis', fontFamily: "'Consolas', 'Monaco', monospace", fontSize: '11px' }),
+              title: entry.url
+            }, shortUrl(entry.url)),
+            React.createElement('td', { style: Object.assign({}, cellStyle, { color: statusColor }) },
+              entry.error || (entry.status != null ? entry.status : '…')),
+            React.createElement('td', { style: cellStyle }, entry.endTime != null || entry.error ? formatMs(p.total) : '…'),
+            React.createElement('td', { style: Object.assign({}, cellStyle, { width: '40%' }) }, self._renderWaterfall(entry, range))
+          ));
+          if (s.selectedId === entry.id) {
+            rows.push(React.createElement('tr', { key: entry.id + '-details' },
+              React.createElement('td', { colSpan: 6, style: { padding: 0 } }, self._renderDetails(entry))));
+          }
+        });
+
+        var headerCell = function(label) {
+          return React.createElement('th', { key: label, style: Object.assign({}, cellStyle, { fontSize: '11px', color: 'var(--theme-text-secondary)', fontWeight: '600' }) }, label);
+        };
+
+        return React.createElement(
+          'div',
+          { style: { display: 'flex', flexDirection: 'column', height: '100%', background: 'var(--theme-panel-bg)' } },
+          toolbar,
+          this._renderCassetteControls(btnStyle),
+          legend,
+          React.createElement(
+            'div',
+            { style: { flex: 1, overflowY: 'auto', WebkitOverflowScrolling: 'touch' } },
+            entries.length
+              ? React.createElement(
+                  'table',
+                  { style: { width: '100%', borderCollapse: 'collapse', fontSize: '12px', color: 'var(--theme-text-primary)' } },
+                  React.createElement('thead', null, React.createElement('tr', null,
+                    ['Type', 'Method', 'URL', 'Status', 'Time', 'Waterfall'].map(headerCell))),
+                  React.createElement('tbody', null, rows)
+                )
+              : React.createElement('div', {
+                  style: { padding: '40px 20px', textAlign: 'center', color: 'var(--theme-text-secondary)', fontSize: '13px' }
+                }, 'No requests yet. LLM calls, model probes, tool calls and "Try it out" executions will appear here.')
+          )
+        );
+      }
+    };
+  }
+
+  DB.NetworkPanelFactory = NetworkPanelFactory;
+
+})();
@@ -1,6 +1,7 @@
 // DocBuddy Plugin — assembles the Swagger UI plugin from the DocBuddy namespace.
 // Combines state management, component factories, and the tab layout.
-// Load order: core.js -> chat.js, settings.js, workflow.js -> plugin.js
+// Load order: core.js -> plugin.js. The panel scripts (chat.js, settings.js,
+// workflow.js, agent.js, network.js) are loaded on demand, see DB.loadPanelScript.
 
 (function () {
   "use strict";
@@ -17,8 +18,87 @@
     document.head.appendChild(style);
   })();
 
+  // Stored settings fields mirrored in the Swagger llmSettings state, in the
+  // order they are replayed (setProvider resets baseUrl, so it goes first)
+  var REDUCER_SYNC_ACTIONS = [
+    ['provider', 'setProvider'],
+    ['baseUrl', 'setBaseUrl'],
+    ['apiKey', 'setApiKey'],
+    ['modelId', 'setModelId'],
+    ['maxTokens', 'setMaxTokens'],
+    ['temperature', 'setTemperature'],
+  ];
+
+  // Chat-first boot: Swagger UI starts without a spec, so the API explorer
+  // renders nothing until the spec is handed over here, on the first visit to
+  // the API tab or once the page is idle. The schema the chat panel already
+  // fetched is reused instead of downloading it again.
+  var _apiSpecRequested = false;
+
+  function loadDeferredApiSpec(system) {
+    if (_apiSpecRequested) return;
+    _apiSpecRequested = true;
+    DB.markBoot('api-spec-requested');
+    var url = window.DOCBUDDY_OPENAPI_URL;
+    system.specActions.updateUrl(url);
+    DB.ensureOpenapiSchemaCached(function (schema) {
+      if (schema) {
+        system.specActions.updateSpec(JSON.stringify(schema));
+      } else {
+        // Let Swagger UI fetch it and show its own error if that fails too
+        system.specActions.download(url);
+      }
+    });
+  }
+
   window.DocBuddyPlugin = function (system) {
     var React = system.React;
+    var chatFirst = DB.BOOT_MODE === "chat-first";
+
+    // Keep the Swagger llmSettings state in step with settings saved in another
+    // tab, whether or not the Settings panel has been opened here
+    window.addEventListener('docbuddy-settings-sync', function (e) {
+      if (e.detail.key !== 'settings') return;
+      var synced = Object.assign({}, e.detail.patch);
+      if (synced.provider != null) synced.baseUrl = DB.loadFromStorage().baseUrl;
+      REDUCER_SYNC_ACTIONS.forEach(function (pair) {
+        if (synced[pair[0]] != null) DB.dispatchAction(system, pair[1], synced[pair[0]]);
+      });
+    });
+
+    // Panel components, built once their factory's script has loaded
+    var panelComponents = {};
+
+    // Stands in for a panel until its script has loaded
+    function lazyPanel(tab) {
+      return function LazyPanel() {
+        var _panelState = React.useState(function () { return panelComponents[tab] || null; });
+        var Panel = _panelState[0];
+        var setPanel = _panelState[1];
+        var _failedState = React.useState(false);
+        var failed = _failedState[0];
+        var setFailed = _failedState[1];
+
+        React.useEffect(function () {
+          if (Panel) return;
+          var cancelled = false;
+          DB.loadPanelScript(tab).then(function (factory) {
+            if (!panelComponents[tab]) panelComponents[tab] = factory(system);
+            // Functional update: the component class itself is a function
+            if (!cancelled) setPanel(function () { return panelComponents[tab]; });
+          }).catch(function (err) {
+            console.error('DocBuddy:', err);
+            if (!cancelled) setFailed(true);
+          });
+          return function () { cancelled = true; };
+        }, []);
+
+        if (Panel) return React.createElement(Panel, null);
+        return React.createElement("div", {
+          style: { padding: "20px", color: failed ? "#ef4444" : "var(--theme-text-secondary)", textAlign: "center", fontFamily: "'Inter', sans-serif", fontSize: "13px" }
+        }, failed ? "Could not load this panel. Please reload the page." : "Loading…");
+      };
+    }
 
     // Error boundary to catch render errors in panels
     class ErrorBoundary extends React.Component {
@@ -48,13 +128,27 @@
       var ChatPanel = system.getComponent("ChatPanel", true);
       var WorkflowPanel = system.getComponent("WorkflowPanel", true);
       var AgentPanel = system.getComponent("AgentPanel", true);
+      var NetworkPanel = system.getComponent("NetworkPanel", true);
 
-      // Get saved tab preference, default to "api"
+      // Get saved tab preference, default to "api" ("chat" when booting chat-first)
       var savedTab = localStorage.getItem(TAB_STORAGE_KEY) || "api";
+      if (chatFirst && savedTab === "api") savedTab = "chat";
       var _state = React.useState(savedTab);
       var activeTab = _state[0];
       var setActiveTab = _state[1];
 
+      // Panels mount on their first visit and then stay mounted (hidden via CSS)
+      var visitedRef = React.useRef({});
+      visitedRef.current[activeTab] = true;
+      var visited = visitedRef.current;
+
+      // The boot shell's draft must be read before React replaces the shell
+      DB.takeBootDraft();
+
+      React.useEffect(function () {
+        DB.prefetchPanelScripts();
+      }, []);
+
       // Listen for external tab change requests (from other plugins)
       React.useEffect(function () {
         var handleStorageChange = function(e) {
@@ -77,6 +171,15 @@
         localStorage.setItem(TAB_STORAGE_KEY, activeTab);
       }, [activeTab]);
 
+      // Chat-first: give the API explorer its spec on first visit, or when idle
+      React.useEffect(function () {
+        if (chatFirst && activeTab === "api") loadDeferredApiSpec(system);
+      }, [activeTab]);
+
+      React.useEffect(function () {
+        if (chatFirst) DB.whenIdle(function () { loadDeferredApiSpec(system); });
+      }, []);
+
       // When switching back to chat or agent, scroll to bottom to show any messages streamed in background
       React.useEffect(function () {
         requestAnimationFrame(function () {
@@ -149,8 +252,8 @@
         };
       };
 
-      // Content area style - full height for chat, settings, workflow, and agent
-      var isContained = activeTab === "chat" || activeTab === "settings" || activeTab === "workflow" || activeTab === "agent";
+      // Content area style - full height for chat, settings, workflow, agent, and network
+      var isContained = activeTab === "chat" || activeTab === "settings" || activeTab === "workflow" || activeTab === "agent" || activeTab === "network";
       var contentStyle = {
         border: "1px solid var(--theme-border-color)",
         borderTop: "none",
@@ -251,6 +354,12 @@
                   })
                 : null
             ),
+            // Network tab
+            React.createElement(
+              "button",
+              { role: "tab", "aria-selected": activeTab === "network", onClick: function () { setActiveTab("network"); }, style: tabStyle("network") },
+              "Network"
+            ),
             // Settings tab
             React.createElement(
               "button",
@@ -267,25 +376,30 @@
           // API api tab content
           activeTab === "api" ? React.createElement(BaseLayout, props) : null,
 
-          // Chat tab content (always mounted, hidden via CSS to preserve streaming state across tab switches)
-          React.createElement("div", { style: { display: activeTab === "chat" ? "block" : "none", height: "100%" } },
+          // Chat tab content (mounted on first visit, then hidden via CSS to preserve streaming state across tab switches)
+          visited.chat ? React.createElement("div", { style: { display: activeTab === "chat" ? "block" : "none", height: "100%" } },
             React.createElement(ErrorBoundary, null, React.createElement(ChatPanel, null))
-          ),
+          ) : null,
 
-          // Workflow tab content (always mounted, hidden via CSS to preserve streaming state across tab switches)
-          React.createElement("div", { style: { display: activeTab === "workflow" ? "block" : "none", height: "100%" } },
+          // Workflow tab content (mounted on first visit, then hidden via CSS to preserve streaming state across tab switches)
+          visited.workflow ? React.createElement("div", { style: { display: activeTab === "workflow" ? "block" : "none", height: "100%" } },
             React.createElement(ErrorBoundary, null, React.createElement(WorkflowPanel, null))
-          ),
+          ) : null,
 
-          // Agent tab content (always mounted, hidden via CSS to preserve streaming state across tab switches)
-          React.createElement("div", { style: { display: activeTab === "agent" ? "block" : "none", height: "100%" } },
+          // Agent tab content (mounted on first visit, then hidden via CSS to preserve streaming state across tab switches)
+          visited.agent ? React.createElement("div", { style: { display: activeTab === "agent" ? "block" : "none", height: "100%" } },
             React.createElement(ErrorBoundary, null, React.createElement(AgentPanel, null))
-          ),
+          ) : null,
+
+          // Network tab content (mounted on first visit; the log itself is kept by core.js)
+          visited.network ? React.createElement("div", { style: { display: activeTab === "network" ? "block" : "none", height: "100%" } },
+            React.createElement(ErrorBoundary, null, React.createElement(NetworkPanel, null))
+          ) : null,
 
-          // LLM Settings tab content (always mounted, hidden via CSS to preserve state across tab switches)
-          React.createElement("div", { style: { display: activeTab === "settings" ? "block" : "none", height: "100%", overflow: "auto" } },
+          // LLM Settings tab content (mounted on first visit, then hidden via CSS to preserve state across tab switches)
+          visited.settings ? React.createElement("div", { style: { display: activeTab === "settings" ? "block" : "none", height: "100%", overflow: "auto" } },
             React.createElement(ErrorBoundary, null, React.createElement(SettingsPanel, null))
-          )
+          ) : null
         )
       );
     }
@@ -297,12 +411,30 @@
           reducers: { llmSettings: DB.llmSettingsReducer },
           selectors: DB.selectors,
         },
+        // Log "Try it out" executions in the Network panel
+        spec: {
+          wrapActions: {
+            executeRequest: function (oriAction) {
+              return function (req) {
+                DB.recordSwaggerRequest(req);
+                return oriAction(req);
+              };
+            },
+            setResponse: function (oriAction) {
+              return function (path, method, res) {
+                DB.recordSwaggerResponse(path, method, res);
+                return oriAction(path, method, res);
+              };
+            },
+          },
+        },
       },
       components: {
-        SettingsPanel: DB.SettingsPanelFactory(system),
-        ChatPanel: DB.ChatPanelFactory(system),
-        WorkflowPanel: DB.WorkflowPanelFactory(system),
-        AgentPanel: DB.AgentPanelFactory(system),
+        SettingsPanel: lazyPanel("settings"),
+        ChatPanel: lazyPanel("chat"),
+        WorkflowPanel: lazyPanel("workflow"),
+        AgentPanel: lazyPanel("agent"),
+        NetworkPanel: lazyPanel("network"),
         LLMDocsLayout: LLMDocsLayout,
       },
     };
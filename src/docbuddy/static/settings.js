@@ -17,10 +17,13 @@
         super(props);
         var s = DB.loadFromStorage();
         var ts = DB.loadToolSettings();
+        var discovery = DB.getDiscoverySnapshot(s);
         this.state = {
           baseUrl: s.baseUrl || DB.DEFAULT_STATE.baseUrl,
           apiKey: s.apiKey || DB.DEFAULT_STATE.apiKey,
           modelId: s.modelId || DB.DEFAULT_STATE.modelId,
+          fastModelId: s.fastModelId || '',
+          strongModelId: s.strongModelId || '',
           maxTokens: s.maxTokens != null && s.maxTokens !== '' ? s.maxTokens : DB.DEFAULT_STATE.maxTokens,
           temperature: s.temperature != null && s.temperature !== '' ? s.temperature : DB.DEFAULT_STATE.temperature,
           provider: s.provider || DB.DEFAULT_STATE.provider,
@@ -28,27 +31,77 @@
           customColors: DB.DEFAULT_STATE.customColors,
           connectionStatus: "disconnected",
           lastError: "",
-          availableModels: [],
+          availableModels: this._cachedModels(discovery, s.baseUrl || DB.DEFAULT_STATE.baseUrl),
+          discovery: discovery,
           enableTools: ts.enableTools || false,
           autoExecute: ts.autoExecute || false,
           toolApiKey: ts.apiKey || '',
+          maxResponseKb: ts.maxResponseKb,
+          responseTimeoutSec: ts.responseTimeoutSec,
+          compactJson: ts.compactJson !== false,
+          toolMode: ts.toolMode || 'generic',
+          toolTopK: ts.toolTopK,
           apiBaseUrl: DB.loadApiBaseUrl() || '',
           autoDetectApiUrl: DB.loadAutoDetectApiUrl(),
           systemPromptPreset: s.systemPromptPreset || 'api_assistant',
           customSystemPrompt: s.customSystemPrompt || '',
+          contextWindows: s.contextWindows || {},
+          nativeApi: s.nativeApi !== false,
+          keepAlive: s.keepAlive || '',
+          endpointPool: s.endpointPool || '',
+          completionCache: s.completionCache || 'deterministic',
+          cacheReplay: s.cacheReplay || 'instant',
+          llmStats: DB.getLlmSessionStats(),
         };
         this._debouncedSave = DB.debounce(this._saveSettings.bind(this), 300);
         this.handleProviderChange = this.handleProviderChange.bind(this);
         this.handleBaseUrlChange = this.handleBaseUrlChange.bind(this);
         this.handleApiKeyChange = this.handleApiKeyChange.bind(this);
         this.handleModelIdChange = this.handleModelIdChange.bind(this);
+        this.handleFastModelIdChange = this.handleFastModelIdChange.bind(this);
+        this.handleStrongModelIdChange = this.handleStrongModelIdChange.bind(this);
         this.handleMaxTokensChange = this.handleMaxTokensChange.bind(this);
+        this.handleContextWindowChange = this.handleContextWindowChange.bind(this);
+        this.handleNativeApiChange = this.handleNativeApiChange.bind(this);
+        this.handleKeepAliveChange = this.handleKeepAliveChange.bind(this);
+        this.handleEndpointPoolChange = this.handleEndpointPoolChange.bind(this);
+        this.handleCompletionCacheChange = this.handleCompletionCacheChange.bind(this);
+        this.handleCacheReplayChange = this.handleCacheReplayChange.bind(this);
         this.handleTemperatureChange = this.handleTemperatureChange.bind(this);
         this.handleThemeChange = this.handleThemeChange.bind(this);
         this.handleEnableToolsChange = this.handleEnableToolsChange.bind(this);
         this.handleAutoExecuteChange = this.handleAutoExecuteChange.bind(this);
         this.handleToolApiKeyChange = this.handleToolApiKeyChange.bind(this);
+        this.handleMaxResponseKbChange = this.handleMaxResponseKbChange.bind(this);
+        this.handleResponseTimeoutChange = this.handleResponseTimeoutChange.bind(this);
+        this.handleCompactJsonChange = this.handleCompactJsonChange.bind(this);
+        this.handleToolModeChange = this.handleToolModeChange.bind(this);
+        this.handleToolTopKChange = this.handleToolTopKChange.bind(this);
         this.handleTestConnection = this.handleTestConnection.bind(this);
+        this.handleUseDiscovered = this.handleUseDiscovered.bind(this);
+        this._onDiscovery = function(e) {
+          var entry = e.detail || {};
+          var newState = { discovery: DB.getDiscoverySnapshot(DB.loadFromStorage()) };
+          if (entry.ok && entry.models.length > 0 && entry.base === (this.state.baseUrl || '').replace(/\/+$/, '') &&
+              this.state.availableModels.length === 0) {
+            newState.availableModels = entry.models;
+          }
+          this.setState(newState);
+        }.bind(this);
+        // Settings saved in another docs tab arrive as changed keys only
+        this._onSettingsSync = function(e) {
+          var patch = e.detail.patch || {};
+          var rename = e.detail.key === 'tool-settings' ? { apiKey: 'toolApiKey' } : {};
+          var update = {};
+          Object.keys(patch).forEach(function(k) {
+            var field = rename[k] || k;
+            if (patch[k] != null && Object.prototype.hasOwnProperty.call(this.state, field)) update[field] = patch[k];
+          }, this);
+          if (Object.keys(update).length) this.setState(update);
+        }.bind(this);
+        this._onLlmStats = function() {
+          this.setState({ llmStats: DB.getLlmSessionStats() });
+        }.bind(this);
       }
 
       _saveSettings() {
@@ -56,21 +109,41 @@
           baseUrl: this.state.baseUrl,
           apiKey: this.state.apiKey,
           modelId: this.state.modelId,
+          fastModelId: this.state.fastModelId,
+          strongModelId: this.state.strongModelId,
           maxTokens: this.state.maxTokens !== '' ? this.state.maxTokens : null,
           temperature: this.state.temperature !== '' ? this.state.temperature : null,
           provider: this.state.provider,
+          contextWindows: this.state.contextWindows,
+          nativeApi: this.state.nativeApi,
+          keepAlive: this.state.keepAlive,
+          endpointPool: this.state.endpointPool,
+          completionCache: this.state.completionCache,
+          cacheReplay: this.state.cacheReplay,
         };
         DB.saveToStorage(settings);
         DB.saveToolSettings({
           enableTools: this.state.enableTools,
           autoExecute: this.state.autoExecute,
           apiKey: this.state.toolApiKey,
+          maxResponseKb: this.state.maxResponseKb,
+          responseTimeoutSec: this.state.responseTimeoutSec,
+          compactJson: this.state.compactJson,
+          toolMode: this.state.toolMode,
+          toolTopK: this.state.toolTopK,
         });
         DB.saveApiBaseUrl(this.state.apiBaseUrl || '');
         DB.saveAutoDetectApiUrl(this.state.autoDetectApiUrl);
         DB.saveTheme({ theme: this.state.theme, customColors: this.state.customColors });
       }
 
+      // Models for `baseUrl` from the discovery cache, so the dropdown fills instantly
+      _cachedModels(discovery, baseUrl) {
+        var base = (baseUrl || '').replace(/\/+$/, '');
+        var hit = discovery.filter(function(entry) { return entry.base === base && entry.ok; })[0];
+        return hit ? hit.models : [];
+      }
+
       componentDidMount() {
         // Theme is already applied globally by core.js DOMContentLoaded handler.
         // Only sync local state from storage for the settings form.
@@ -79,6 +152,17 @@
           theme: stored.theme || DB.DEFAULT_STATE.theme,
           customColors: stored.customColors || {}
         });
+        window.addEventListener('docbuddy-llm-stats', this._onLlmStats);
+        window.addEventListener('docbuddy-discovery', this._onDiscovery);
+        window.addEventListener('docbuddy-settings-sync', this._onSettingsSync);
+        // Cached results are already on screen; re-probe the stale ones
+        DB.refreshDiscovery(DB.loadFromStorage());
+      }
+
+      componentWillUnmount() {
+        window.removeEventListener('docbuddy-llm-stats', this._onLlmStats);
+        window.removeEventListener('docbuddy-discovery', this._onDiscovery);
+        window.removeEventListener('docbuddy-settings-sync', this._onSettingsSync);
       }
 
       componentDidUpdate(prevProps, prevState) {
@@ -98,65 +182,36 @@
         self.setState({ connectionStatus: "connecting", lastError: "" });
         DB.dispatchAction(system, 'setConnectionStatus', "connecting");
 
-        var headers = { "Content-Type": "application/json" };
-        if (settings.apiKey) {
-          headers["Authorization"] = "Bearer " + settings.apiKey;
-        }
-
         var baseUrl = (settings.baseUrl || "").replace(/\/+$/, "");
 
-        var controller = new AbortController();
-        var timeoutId = setTimeout(function() { controller.abort(); }, 10000);
-
-        fetch(baseUrl + "/models", {
-          method: 'GET',
-          headers: headers,
-          signal: controller.signal
-        })
-          .then(function (res) {
-            if (!res.ok) {
-              return res.text().then(function(text) {
-                throw new Error('HTTP ' + res.status + ': ' + res.statusText + (text ? " - " + text : ""));
-              });
-            }
-            return res.json();
-          })
-          .then(function (data) {
-            clearTimeout(timeoutId);
-            if (data && data.error) {
-              throw new Error(data.details || data.error);
-            }
-            var models = [];
-            if (data && Array.isArray(data.data)) {
-              models = data.data
-                .map(function(m) { return m.id || m.name || ''; })
-                .filter(function(id) { return id !== ''; })
-                .sort();
-            }
-            var newState = { connectionStatus: "connected", availableModels: models };
-            if (models.length > 0 && models.indexOf(self.state.modelId) === -1) {
-              newState.modelId = models[0];
-              DB.dispatchAction(system, 'setModelId', models[0]);
+        DB.probeEndpoint(baseUrl, { apiKey: settings.apiKey, timeoutMs: 10000 })
+          .then(function (entry) {
+            if (entry.ok) {
+              var models = entry.models;
+              var newState = { connectionStatus: "connected", availableModels: models };
+              if (models.length > 0 && models.indexOf(self.state.modelId) === -1) {
+                newState.modelId = models[0];
+                DB.dispatchAction(system, 'setModelId', models[0]);
+              }
+              self.setState(newState);
+              DB.saveToStorage(Object.assign({}, DB.loadFromStorage(), {
+                baseUrl: self.state.baseUrl,
+                apiKey: self.state.apiKey,
+                modelId: newState.modelId || self.state.modelId,
+              }));
+              DB.dispatchAction(system, 'setConnectionStatus', "connected");
+              return;
             }
-            self.setState(newState);
-            DB.saveToStorage(Object.assign({}, DB.loadFromStorage(), {
-              baseUrl: self.state.baseUrl,
-              apiKey: self.state.apiKey,
-              modelId: newState.modelId || self.state.modelId,
-            }));
-            DB.dispatchAction(system, 'setConnectionStatus', "connected");
-          })
-          .catch(function (err) {
-            clearTimeout(timeoutId);
-            var errorMsg = err.name === 'AbortError' ? 'Connection timed out (10s)' : (err.message || "Connection failed");
+
+            var errorMsg = entry.error || "Connection failed";
 
             // Detect CORS errors and provide helpful guidance
             if (!navigator.onLine) {
               errorMsg = 'No internet connection. Please check your network.';
-            } else if (errorMsg.includes('Failed to fetch') || err.name === 'TypeError') {
+            } else if (entry.errorKind === 'network') {
               // This is likely a CORS error when fetching from GitHub Pages to localhost
               var baseUrlUrl;
-              try { baseUrlUrl = new URL(baseUrl + '/models'); }
+              try { baseUrlUrl = new URL(baseUrl + "/models"); }
               catch(e) { baseUrlUrl = null; }
 
               if (baseUrlUrl && (baseUrlUrl.hostname === 'localhost' || baseUrlUrl.hostname === '127.0.0.1')) {
@@ -179,11 +234,24 @@
       handleProviderChange(e) {
         var value = e.target.value;
         var provider = DB.LLM_PROVIDERS[value] || DB.LLM_PROVIDERS.custom;
-        this.setState({ provider: value, baseUrl: provider.url, availableModels: [], connectionStatus: "disconnected" });
+        this.setState({ provider: value, baseUrl: provider.url, availableModels: this._cachedModels(this.state.discovery, provider.url), connectionStatus: "disconnected" });
         DB.dispatchAction(system, 'setProvider', value);
         this._debouncedSave();
       }
 
+      handleUseDiscovered(entry) {
+        var newState = { provider: entry.provider, baseUrl: entry.base, availableModels: entry.models, connectionStatus: "connected" };
+        if (entry.models.length > 0 && entry.models.indexOf(this.state.modelId) === -1) {
+          newState.modelId = entry.models[0];
+          DB.dispatchAction(system, 'setModelId', newState.modelId);
+        }
+        this.setState(newState);
+        DB.dispatchAction(system, 'setProvider', entry.provider);
+        DB.dispatchAction(system, 'setBaseUrl', entry.base);
+        DB.dispatchAction(system, 'setConnectionStatus', "connected");
+        this._debouncedSave();
+      }
+
       handleBaseUrlChange(e) {
         this.setState({ baseUrl: e.target.value });
         DB.dispatchAction(system, 'setBaseUrl', e.target.value);
@@ -202,12 +270,60 @@
         this._debouncedSave();
       }
 
+      handleFastModelIdChange(e) {
+        this.setState({ fastModelId: e.target.value });
+        this._debouncedSave();
+      }
+
+      handleStrongModelIdChange(e) {
+        this.setState({ strongModelId: e.target.value });
+        this._debouncedSave();
+      }
+
       handleMaxTokensChange(e) {
         this.setState({ maxTokens: e.target.value });
         DB.dispatchAction(system, 'setMaxTokens', e.target.value);
         this._debouncedSave();
       }
 
+      handleContextWindowChange(e) {
+        // Stored per model; an empty value falls back to the detected default
+        var windows = Object.assign({}, this.state.contextWindows);
+        var value = parseInt(e.target.value, 10);
+        if (value > 0) {
+          windows[this.state.modelId] = value;
+        } else {
+          delete windows[this.state.modelId];
+        }
+        this.setState({ contextWindows: windows });
+        this._debouncedSave();
+      }
+
+      handleNativeApiChange(e) {
+        this.setState({ nativeApi: e.target.checked });
+        this._debouncedSave();
+      }
+
+      handleKeepAliveChange(e) {
+        this.setState({ keepAlive: e.target.value });
+        this._debouncedSave();
+      }
+
+      handleEndpointPoolChange(e) {
+        this.setState({ endpointPool: e.target.value });
+        this._debouncedSave();
+      }
+
+      handleCompletionCacheChange(e) {
+        this.setState({ completionCache: e.target.value });
+        this._debouncedSave();
+      }
+
+      handleCacheReplayChange(e) {
+        this.setState({ cacheReplay: e.target.checked ? 'simulated' : 'instant' });
+        this._debouncedSave();
+      }
+
       handleTemperatureChange(e) {
         this.setState({ temperature: e.target.value });
         DB.dispatchAction(system, 'setTemperature', e.target.value);
@@ -247,6 +363,34 @@
         this._debouncedSave();
       }
 
+      handleMaxResponseKbChange(e) {
+        var value = parseInt(e.target.value, 10);
+        this.setState({ maxResponseKb: value > 0 ? value : e.target.value });
+        this._debouncedSave();
+      }
+
+      handleResponseTimeoutChange(e) {
+        var value = parseFloat(e.target.value);
+        this.setState({ responseTimeoutSec: value > 0 ? value : e.target.value });
+        this._debouncedSave();
+      }
+
+      handleCompactJsonChange(e) {
+        this.setState({ compactJson: e.target.checked });
+        this._debouncedSave();
+      }
+
+      handleToolModeChange(e) {
+        this.setState({ toolMode: e.target.value });
+        this._debouncedSave();
+      }
+
+      handleToolTopKChange(e) {
+        var value = parseInt(e.target.value, 10);
+        this.setState({ toolTopK: value > 0 ? value : e.target.value });
+        this._debouncedSave();
+      }
+
       handleApiBaseUrlChange(e) {
         this.setState({ apiBaseUrl: e.target.value });
         DB.saveApiBaseUrl(e.target.value || '');
@@ -321,6 +465,19 @@
           { style: { display: "grid", gridTemplateColumns: "repeat(auto-fit, minmax(200px, 1fr))", gap: "12px 20px" } },
           providerField,
           baseUrlField,
+          // Extra endpoints serving the same model; requests go to the fastest idle one
+          React.createElement(
+            "div",
+            { style: fieldStyle },
+            React.createElement("label", { style: labelStyle }, "Fallback Endpoints (same model)"),
+            React.createElement("input", {
+              type: "text",
+              value: s.endpointPool,
+              placeholder: "http://gpu-2:1234/v1, http://gpu-3:1234/v1",
+              style: inputStyle,
+              onChange: this.handleEndpointPoolChange,
+            })
+          ),
           React.createElement(
             "div",
             { style: fieldStyle },
@@ -356,6 +513,40 @@
                   onChange: this.handleModelIdChange,
                 })
           ),
+          // Agent steps pick a model by role; blank means the Model ID above
+          React.createElement(
+            "div",
+            { style: fieldStyle },
+            React.createElement("label", { style: labelStyle }, "Fast Model (agent tool steps, summaries)"),
+            React.createElement("input", {
+              type: "text",
+              value: s.fastModelId,
+              list: "llm-settings-model-list",
+              placeholder: "Same as Model ID",
+              style: inputStyle,
+              onChange: this.handleFastModelIdChange,
+            })
+          ),
+          React.createElement(
+            "div",
+            { style: fieldStyle },
+            React.createElement("label", { style: labelStyle }, "Strong Model (planning, final answer)"),
+            React.createElement("input", {
+              type: "text",
+              value: s.strongModelId,
+              list: "llm-settings-model-list",
+              placeholder: "Same as Model ID",
+              style: inputStyle,
+              onChange: this.handleStrongModelIdChange,
+            }),
+            React.createElement(
+              "datalist",
+              { id: "llm-settings-model-list" },
+              s.availableModels.map(function (model) {
+                return React.createElement("option", { key: model, value: model });
+              })
+            )
+          ),
           React.createElement(
             "div",
             { style: fieldStyle },
@@ -369,6 +560,20 @@
               onChange: this.handleMaxTokensChange,
             })
           ),
+          React.createElement(
+            "div",
+            { style: fieldStyle },
+            React.createElement("label", { style: labelStyle }, "Context Window (tokens, this model)"),
+            React.createElement("input", {
+              type: "number",
+              value: s.contextWindows[s.modelId] || "",
+              min: 512,
+              placeholder: String(DB.getKnownContextWindow({ modelId: s.modelId, provider: s.provider, nativeApi: s.nativeApi }) ||
+                "Unknown – history is not trimmed"),
+              style: inputStyle,
+              onChange: this.handleContextWindowChange,
+            })
+          ),
           React.createElement(
             "div",
             { style: fieldStyle },
@@ -383,7 +588,62 @@
               style: inputStyle,
               onChange: this.handleTemperatureChange,
             })
-          )
+          ),
+          // Exact-match answers replay from IndexedDB instead of regenerating
+          React.createElement(
+            "div",
+            { style: fieldStyle },
+            React.createElement("label", { style: labelStyle }, "Completion Cache"),
+            React.createElement(
+              "select",
+              { value: s.completionCache, onChange: this.handleCompletionCacheChange, style: inputStyle },
+              React.createElement("option", { value: "deterministic" }, "Temperature 0 requests"),
+              React.createElement("option", { value: "all" }, "All requests"),
+              React.createElement("option", { value: "off" }, "Off")
+            ),
+            React.createElement(
+              "div",
+              { style: { display: "flex", alignItems: "center", gap: "8px", marginTop: "4px", fontSize: "12px", color: "var(--theme-text-secondary)" } },
+              React.createElement(
+                "label",
+                { style: { display: "flex", alignItems: "center", gap: "6px", cursor: "pointer", flex: 1 } },
+                React.createElement("input", {
+                  type: "checkbox",
+                  checked: s.cacheReplay === "simulated",
+                  disabled: s.completionCache === "off",
+                  onChange: this.handleCacheReplayChange,
+                }),
+                "Replay at recorded speed"
+              ),
+              React.createElement("button", {
+                onClick: function () { DB.clearCompletionCache(); },
+                style: { background: "var(--theme-secondary)", color: "var(--theme-text-primary)", border: "1px solid var(--theme-border-color)", borderRadius: "4px", padding: "2px 8px", fontSize: "11px", cursor: "pointer" }
+              }, "Clear")
+            )
+          ),
+          // Ollama's native /api/chat keeps the model loaded and sizes num_ctx
+          s.provider === "ollama" ? React.createElement(
+            "div",
+            { style: fieldStyle },
+            React.createElement(
+              "label",
+              { style: { display: "flex", alignItems: "center", gap: "6px", color: "var(--theme-text-secondary)", fontSize: "12px", marginBottom: "4px", cursor: "pointer" } },
+              React.createElement("input", {
+                type: "checkbox",
+                checked: s.nativeApi,
+                onChange: this.handleNativeApiChange,
+              }),
+              "Use native /api/chat"
+            ),
+            React.createElement("input", {
+              type: "text",
+              value: s.keepAlive,
+              placeholder: "Keep model loaded: 30m",
+              style: inputStyle,
+              disabled: !s.nativeApi,
+              onChange: this.handleKeepAliveChange,
+            })
+          ) : null
         );
 
         var themeConfig = React.createElement(
@@ -503,6 +763,87 @@
                 disabled: !s.enableTools,
                 onChange: this.handleToolApiKeyChange
               })
+            ),
+            React.createElement(
+              "div",
+              { style: fieldStyle },
+              React.createElement("label", { style: labelStyle }, "Max Tool Response Size (KB)"),
+              React.createElement("input", {
+                type: "number",
+                min: "1",
+                value: s.maxResponseKb,
+                style: inputStyle,
+                disabled: !s.enableTools,
+                onChange: this.handleMaxResponseKbChange
+              }),
+              React.createElement("div", { style: { color: "var(--theme-text-secondary)", fontSize: "11px", marginTop: "4px" } },
+                "Larger responses are cut off and marked as truncated"
+              )
+            ),
+            React.createElement(
+              "div",
+              { style: fieldStyle },
+              React.createElement("label", { style: labelStyle }, "Tool Response Time Budget (s)"),
+              React.createElement("input", {
+                type: "number",
+                min: "1",
+                value: s.responseTimeoutSec,
+                style: inputStyle,
+                disabled: !s.enableTools,
+                onChange: this.handleResponseTimeoutChange
+              }),
+              React.createElement("div", { style: { color: "var(--theme-text-secondary)", fontSize: "11px", marginTop: "4px" } },
+                "Stop reading a slow response body after this long"
+              )
+            ),
+            React.createElement(
+              "div",
+              { style: fieldStyle },
+              React.createElement(
+                "label",
+                { style: checkboxLabelStyle },
+                React.createElement("input", {
+                  type: "checkbox",
+                  checked: s.compactJson,
+                  onChange: this.handleCompactJsonChange,
+                  style: checkboxStyle,
+                  disabled: !s.enableTools
+                }),
+                "Compact JSON Responses"
+              ),
+              React.createElement("div", { style: { color: "var(--theme-text-secondary)", fontSize: "11px", marginTop: "4px" } },
+                "Send large lists to the model as columns and rows"
+              )
+            ),
+            React.createElement(
+              "div",
+              { style: fieldStyle },
+              React.createElement("label", { style: labelStyle }, "Tool Style"),
+              React.createElement(
+                "select",
+                { value: s.toolMode, style: inputStyle, disabled: !s.enableTools, onChange: this.handleToolModeChange },
+                React.createElement("option", { value: "generic" }, "Single api_request tool"),
+                React.createElement("option", { value: "typed" }, "Typed tool per operation")
+              ),
+              React.createElement("div", { style: { color: "var(--theme-text-secondary)", fontSize: "11px", marginTop: "4px" } },
+                "Typed tools give the model exact parameter names and types"
+              )
+            ),
+            React.createElement(
+              "div",
+              { style: fieldStyle },
+              React.createElement("label", { style: labelStyle }, "Typed Tools Per Turn"),
+              React.createElement("input", {
+                type: "number",
+                min: "1",
+                value: s.toolTopK,
+                style: inputStyle,
+                disabled: !s.enableTools || s.toolMode !== 'typed',
+                onChange: this.handleToolTopKChange
+              }),
+              React.createElement("div", { style: { color: "var(--theme-text-secondary)", fontSize: "11px", marginTop: "4px" } },
+                "Only the most relevant operations are sent each turn"
+              )
             )
           )
         );
@@ -568,6 +909,34 @@
           "Test Connection"
         );
 
+        // Live/down state of every known local provider, from the discovery cache
+        var discoveryList = React.createElement(
+          "div",
+          { style: { marginTop: "4px" } },
+          React.createElement("label", { style: labelStyle }, "Detected Providers"),
+          s.discovery.map(function (entry) {
+            var providerName = (DB.LLM_PROVIDERS[entry.provider] || DB.LLM_PROVIDERS.custom).name;
+            var checking = entry.checkedAt == null || (entry.checking && !entry.ok);
+            var state = checking ? "checking…"
+              : entry.ok ? entry.models.length + " model" + (entry.models.length === 1 ? "" : "s") + ", " + entry.latencyMs + "ms"
+              : "not running";
+            return React.createElement(
+              "div",
+              { key: entry.base, style: { display: "flex", alignItems: "center", gap: "8px", fontSize: "12px", padding: "3px 0", color: "var(--theme-text-secondary)" } },
+              React.createElement("span", { title: entry.error || "" }, DB.STATUS_EMOJI[checking ? "connecting" : entry.ok ? "connected" : "disconnected"]),
+              React.createElement("span", { style: { color: "var(--theme-text-primary)", minWidth: "80px" } }, providerName),
+              React.createElement("code", { style: { flex: 1, overflow: "hidden", textOverflow: "ellipsis" } }, entry.base),
+              React.createElement("span", { style: { opacity: entry.stale ? 0.7 : 1 } }, state),
+              entry.ok && entry.base !== (s.baseUrl || "").replace(/\/+$/, "")
+                ? React.createElement("button", {
+                    onClick: function () { self.handleUseDiscovered(entry); },
+                    style: { background: "var(--theme-secondary)", color: "var(--theme-text-primary)", border: "1px solid var(--theme-border-color)", borderRadius: "4px", padding: "2px 8px", fontSize: "11px", cursor: "pointer" }
+                  }, "Use")
+                : null
+            );
+          })
+        );
+
         var statusBadge = React.createElement(
           "span",
           {
@@ -592,6 +961,59 @@
             : s.connectionStatus
         );
 
+        // Session totals across chat, agent and workflow requests
+        var st = s.llmStats;
+        var avgTtft = st.ttftCount ? Math.round(st.ttftMs / st.ttftCount) + 'ms' : '–';
+        var avgRate = st.generationMs > 0 ? (st.completionTokens / (st.generationMs / 1000)).toFixed(1) : '–';
+        var usageRows = [
+          ['LLM calls', st.calls + (st.errors ? ' (' + st.errors + ' failed)' : '')],
+          ['Completion cache hits', st.cacheHits + (st.cacheHits ? ' (saved ' + (st.cacheSavedMs / 1000).toFixed(1) + 's)' : '')],
+          ['Prompt tokens', String(st.promptTokens)],
+          ['Prompt cache hit rate', st.cacheReportedPromptTokens ? Math.round(st.cachedTokens / st.cacheReportedPromptTokens * 100) + '%' : '–'],
+          ['Completion tokens', String(st.completionTokens)],
+          ['Avg time to first token', avgTtft],
+          ['Avg tokens / second', avgRate],
+          ['Total LLM time', (st.durationMs / 1000).toFixed(1) + 's'],
+          ['Tool calls (api_request)', st.toolCalls.generic.calls + (st.toolCalls.generic.failed ? ' (' + st.toolCalls.generic.failed + ' failed)' : '')],
+          ['Tool calls (typed)', st.toolCalls.typed.calls + (st.toolCalls.typed.failed ? ' (' + st.toolCalls.typed.failed + ' failed)' : '')]
+        ];
+        var roleLabels = { plan: 'Plan steps', tool: 'Tool steps', final: 'Final answers', summary: 'Summaries' };
+        Object.keys(st.byRole).forEach(function(role) {
+          var r = st.byRole[role];
+          usageRows.push([(roleLabels[role] || role) + ' (' + r.model + ')',
+            r.calls + ' calls, ' + (r.promptTokens + r.completionTokens) + ' tok, ' +
+            (r.ttftCount ? Math.round(r.ttftMs / r.ttftCount) + 'ms TTFT, ' : '') + (r.durationMs / 1000).toFixed(1) + 's']);
+        });
+        if (DB.getEndpointPool(s).length > 1) {
+          DB.getEndpointStats().forEach(function(ep) {
+            usageRows.push([ep.base, (ep.ttft != null ? Math.round(ep.ttft) + 'ms TTFT, ' : '') +
+              ep.requests + ' requests' + (ep.failures ? ', ' + ep.failures + ' failed over' : '')]);
+          });
+        }
+        var usageSection = React.createElement(
+          "div",
+          { style: { marginBottom: "24px", paddingBottom: "20px", borderBottom: "1px solid var(--theme-border-color)" } },
+          React.createElement("h3", { style: { color: "var(--theme-text-primary)", fontSize: "14px", fontWeight: "600", marginBottom: "12px" } }, "Usage This Session"),
+          React.createElement(
+            "div",
+            { style: { display: "grid", gridTemplateColumns: "repeat(auto-fit, minmax(160px, 1fr))", gap: "8px 20px", marginBottom: "12px" } },
+            usageRows.map(function(r) {
+              return React.createElement("div", { key: r[0] },
+                React.createElement("span", { style: labelStyle }, r[0]),
+                React.createElement("span", { style: { color: "var(--theme-text-primary)", fontSize: "13px", fontFamily: "'Consolas', 'Monaco', monospace" } }, r[1])
+              );
+            })
+          ),
+          st.estimatedCalls
+            ? React.createElement("p", { style: { color: "var(--theme-text-secondary)", fontSize: "12px", marginBottom: "8px" } },
+                st.estimatedCalls + " of " + st.calls + " calls used estimated token counts (the provider did not report usage).")
+            : null,
+          React.createElement("button", {
+            onClick: function() { DB.resetLlmSessionStats(); },
+            style: { background: "var(--theme-secondary)", color: "var(--theme-text-primary)", border: "1px solid var(--theme-border-color)", borderRadius: "4px", padding: "4px 10px", fontSize: "12px", cursor: "pointer" }
+          }, "Reset")
+        );
+
         var bodyContent = React.createElement(
           "div",
           { style: { padding: "16px", background: "var(--theme-panel-bg)" } },
@@ -604,7 +1026,8 @@
               React.createElement("div", { style: { flex: 1 } }),
               statusBadge
             ),
-            fields
+            fields,
+            discoveryList
           ),
           apiBaseUrlSection,
           React.createElement(
@@ -648,7 +1071,8 @@
               )
             )
           ),
-          toolCallSettings
+          toolCallSettings,
+          usageSection
         );
 
         // Version footer with link to GitHub repo
@@ -0,0 +1,54 @@
+// DocBuddy Shared Worker — one instance per origin, shared by all docs tabs
+// Holds fetched OpenAPI schemas (with their built context text) so extra
+// tabs attach without refetching, and relays settings/history/provider
+// deltas between tabs. Message protocol: see "Cross-tab sharing" in core.js.
+
+(function () {
+  "use strict";
+
+  // Schemas for a handful of URLs are plenty; the oldest is dropped past this
+  var MAX_SCHEMAS = 8;
+
+  var ports = [];
+  // url -> { schema, context }, in insertion order
+  var schemas = {};
+  var schemaOrder = [];
+
+  function broadcast(msg, sender) {
+    ports.forEach(function (port) {
+      if (port !== sender) port.postMessage(msg);
+    });
+  }
+
+  function putSchema(url, data) {
+    if (!schemas[url]) schemaOrder.push(url);
+    schemas[url] = data;
+    while (schemaOrder.length > MAX_SCHEMAS) {
+      delete schemas[schemaOrder.shift()];
+    }
+  }
+
+  self.onconnect = function (e) {
+    var port = e.ports[0];
+    ports.push(port);
+
+    port.onmessage = function (ev) {
+      var msg = ev.data || {};
+      switch (msg.type) {
+        case "get-schema":
+          port.postMessage({ type: "reply", id: msg.id, data: schemas[msg.url] || null });
+          break;
+        case "put-schema":
+          putSchema(msg.url, msg.data);
+          break;
+        case "delta":
+          broadcast(msg, port);
+          break;
+        case "bye":
+          ports = ports.filter(function (p) { return p !== port; });
+          break;
+      }
+    };
+    port.start();
+  };
+})();
@@ -6,6 +6,192 @@
 
   var DB = window.DocBuddy;
 
+  var DEFAULT_WORKFLOW_CONCURRENCY = 3;
+  var MAX_WORKFLOW_CONCURRENCY = 8;
+
+  // ── Workflow graph helpers ─────────────────────────────────────────────────
+  // Blocks form a DAG. A block without an explicit `dependsOn` list depends on
+  // the block before it, so existing workflows keep their linear behaviour.
+  // Dependencies may only point at earlier blocks, which keeps the graph
+  // acyclic and makes block order a valid topological order.
+  function resolveDependencies(blocks) {
+    var position = {};
+    blocks.forEach(function(b, i) { position[b.id] = i; });
+    var deps = {};
+    blocks.forEach(function(b, i) {
+      if (Array.isArray(b.dependsOn)) {
+        deps[b.id] = b.dependsOn.filter(function(id) {
+          return position[id] != null && position[id] < i;
+        });
+      } else {
+        deps[b.id] = i > 0 ? [blocks[i - 1].id] : [];
+      }
+    });
+    return deps;
+  }
+
+  // All transitive ancestors of a block, returned in block (topological) order.
+  function collectAncestors(blocks, deps, blockId) {
+    var seen = {};
+    var stack = (deps[blockId] || []).slice();
+    while (stack.length) {
+      var id = stack.pop();
+      if (seen[id]) continue;
+      seen[id] = true;
+      (deps[id] || []).forEach(function(d) { stack.push(d); });
+    }
+    return blocks.filter(function(b) { return seen[b.id]; });
+  }
+
+  // Longest path through the DAG weighted by block duration. Only blocks with
+  // a recorded duration take part.
+  function computeCriticalPath(blocks, deps) {
+    var finish = {};
+    var via = {};
+    var endId = null;
+    blocks.forEach(function(b) {
+      if (b.durationMs == null) return;
+      var start = 0;
+      via[b.id] = null;
+      deps[b.id].forEach(function(d) {
+        if (finish[d] != null && finish[d] > start) {
+          start = finish[d];
+          via[b.id] = d;
+        }
+      });
+      finish[b.id] = start + b.durationMs;
+      if (endId === null || finish[b.id] > finish[endId]) endId = b.id;
+    });
+    var path = [];
+    for (var id = endId; id != null; id = via[id]) path.unshift(id);
+    return { ids: path, durationMs: endId != null ? finish[endId] : 0 };
+  }
+
+  // Run `runNode(block)` for every block once all of its dependencies inside
+  // the run have settled, keeping at most `limit` blocks in flight.
+  // Dependencies outside `blocks` are treated as already satisfied.
+  function scheduleDag(blocks, deps, limit, runNode, isCancelled) {
+    var inRun = {};
+    blocks.forEach(function(b) { inRun[b.id] = true; });
+    var started = {};
+    var settled = {};
+    var inFlight = 0;
+
+    return new Promise(function(resolve) {
+      function isReady(b) {
+        return !started[b.id] && deps[b.id].every(function(d) { return !inRun[d] || settled[d]; });
+      }
+
+      function pump() {
+        if (!isCancelled()) {
+          for (var i = 0; i < blocks.length && inFlight < limit; i++) {
+            var block = blocks[i];
+            if (!isReady(block)) continue;
+            started[block.id] = true;
+            inFlight++;
+            launch(block);
+          }
+        }
+        if (inFlight === 0) resolve();
+      }
+
+      function launch(block) {
+        Promise.resolve()
+          .then(function() { return runNode(block); })
+          .catch(function(err) { console.error('Workflow block failed:', err); })
+          .then(function() {
+            settled[block.id] = true;
+            inFlight--;
+            pump();
+          });
+      }
+
+      pump();
+    });
+  }
+
+  // ── Input dataset parsing ─────────────────────────────────────────────────
+  // RFC 4180-style CSV: quoted fields may contain commas, newlines and "".
+  function parseCsv(text) {
+    var rows = [];
+    var row = [];
+    var field = '';
+    var inQuotes = false;
+    for (var i = 0; i < text.length; i++) {
+      var ch = text.charAt(i);
+      if (inQuotes) {
+        if (ch === '"' && text.charAt(i + 1) === '"') { field += '"'; i++; }
+        else if (ch === '"') inQuotes = false;
+        else field += ch;
+      } else if (ch === '"') {
+        inQuotes = true;
+      } else if (ch === ',') {
+        row.push(field);
+        field = '';
+      } else if (ch === '\n' || ch === '\r') {
+        if (ch === '\r' && text.charAt(i + 1) === '\n') i++;
+        row.push(field);
+        rows.push(row);
+        row = [];
+        field = '';
+      } else {
+        field += ch;
+      }
+    }
+    if (field !== '' || row.length) {
+      row.push(field);
+      rows.push(row);
+    }
+    return rows.filter(function(r) { return !(r.length === 1 && !r[0].trim()); });
+  }
+
+  // Parse pasted or uploaded inputs: a JSON array of objects, or CSV whose
+  // first row is the header. Returns { columns, rows } or { error }.
+  function parseInputTable(text) {
+    var trimmed = (text || '').trim();
+    if (!trimmed) return { columns: [], rows: [] };
+    var columns = [];
+    var rows;
+
+    if (trimmed.charAt(0) === '[' || trimmed.charAt(0) === '{') {
+      var data;
+      try { data = JSON.parse(trimmed); } catch (e) { return { error: 'Invalid JSON: ' + e.message }; }
+      if (data && !Array.isArray(data) && Array.isArray(data.rows)) data = data.rows;
+      if (!Array.isArray(data)) return { error: 'JSON input must be an array of objects' };
+      for (var i = 0; i < data.length; i++) {
+        if (!data[i] || typeof data[i] !== 'object' || Array.isArray(data[i])) {
+          return { error: 'JSON row ' + (i + 1) + ' is not an object' };
+        }
+        Object.keys(data[i]).forEach(function(k) { if (columns.indexOf(k) < 0) columns.push(k); });
+      }
+      return { columns: columns, rows: data };
+    }
+
+    var table = parseCsv(trimmed);
+    columns = table[0].map(function(h) { return h.trim(); });
+    for (var c = 0; c < columns.length; c++) {
+      if (!columns[c]) return { error: 'CSV header column ' + (c + 1) + ' is empty' };
+      if (columns.indexOf(columns[c]) !== c) return { error: 'Duplicate CSV column "' + columns[c] + '"' };
+    }
+    rows = table.slice(1).map(function(cells) {
+      var row = {};
+      columns.forEach(function(col, idx) { row[col] = cells[idx] != null ? cells[idx] : ''; });
+      return row;
+    });
+    return { columns: columns, rows: rows };
+  }
+
+  function formatDuration(ms) {
+    if (ms == null) return '';
+    return ms < 1000 ? ms + 'ms' : (ms / 1000).toFixed(1) + 's';
+  }
+
+  function clampConcurrency(value) {
+    var n = parseInt(value, 10);
+    if (isNaN(n)) return DEFAULT_WORKFLOW_CONCURRENCY;
+    return Math.max(1, Math.min(MAX_WORKFLOW_CONCURRENCY, n));
+  }
+
   // ── Workflow panel component ───────────────────────────────────────────────
   function WorkflowPanelFactory(system) {
     var React = system.React;
@@ -19,7 +205,9 @@
           initialBlocks = saved.blocks.map(function (block) {
             return Object.assign({}, block, {
               output: '',
-              status: 'idle'
+              status: 'idle',
+              cached: false,
+              durationMs: null
             });
           });
         } else {
@@ -28,12 +216,26 @@
         this.state = {
           blocks: initialBlocks,
           running: false,
-          currentBlockIdx: -1,
           aborted: false,
           copiedBlockId: null,
           runningSingleBlock: false,
+          concurrency: clampConcurrency(saved && saved.concurrency),
+          criticalPath: null,
+          wallMs: null,
+          forceRerun: false,
+          // Fan-out over an input dataset
+          inputText: (saved && saved.inputs) || '',
+          showInputs: !!(saved && saved.inputs),
+          rowConcurrency: clampConcurrency(saved && saved.rowConcurrency),
+          rowResults: [],
+          runningDataset: false,
         };
-        this._abortController = null;
+        // One AbortController per in-flight block, keyed by block id (prefixed
+        // with the row for dataset runs)
+        this._abortControllers = {};
+        // Full message history (including tool calls) produced by each block
+        this._blockHistory = {};
+        this._runId = 0;
         this.handleStart = this.handleStart.bind(this);
         this.handleStop = this.handleStop.bind(this);
         this.handleReset = this.handleReset.bind(this);
@@ -41,7 +243,12 @@
         this.handleRemoveBlock = this.handleRemoveBlock.bind(this);
         this.handleBlockContentChange = this.handleBlockContentChange.bind(this);
         this.handleToggleBlockTools = this.handleToggleBlockTools.bind(this);
+        this.handleToggleDependency = this.handleToggleDependency.bind(this);
+        this.handleConcurrencyChange = this.handleConcurrencyChange.bind(this);
         this.handleRunSingleBlock = this.handleRunSingleBlock.bind(this);
+        this.handleInputFileUpload = this.handleInputFileUpload.bind(this);
+        this.handleRunDataset = this.handleRunDataset.bind(this);
+        this.handleExportResults = this.handleExportResults.bind(this);
         this.runWorkflow = this.runWorkflow.bind(this);
       }
 
@@ -50,22 +257,53 @@
       }
 
       componentDidUpdate(prevProps, prevState) {
-        if (prevState.blocks !== this.state.blocks && !this.state.running) {
-          var persistedBlocks = this.state.blocks.map(function(b) {
-            return { id: b.id, type: b.type, content: b.content, enableTools: b.enableTools !== false };
-          });
-          DB.saveWorkflow({ blocks: persistedBlocks });
+        var changed = prevState.blocks !== this.state.blocks ||
+          prevState.concurrency !== this.state.concurrency ||
+          prevState.inputText !== this.state.inputText ||
+          prevState.rowConcurrency !== this.state.rowConcurrency;
+        if (changed && !this.state.running) {
+          this._persist(this.state.blocks);
         }
       }
 
+      _persist(blocks) {
+        var persistedBlocks = blocks.map(function(b) {
+          var persisted = { id: b.id, type: b.type, content: b.content, enableTools: b.enableTools !== false };
+          if (Array.isArray(b.dependsOn)) persisted.dependsOn = b.dependsOn;
+          return persisted;
+        });
+        DB.saveWorkflow({
+          blocks: persistedBlocks,
+          concurrency: this.state.concurrency,
+          inputs: this.state.inputText,
+          rowConcurrency: this.state.rowConcurrency,
+        });
+      }
+
       componentWillUnmount() {
-        if (this._abortController) {
-          this._abortController.abort();
-          this._abortController = null;
-        }
+        this._abortAll();
         window.dispatchEvent(new CustomEvent('docbuddy-workflow-streaming', { detail: { streaming: false } }));
       }
 
+      _abortAll() {
+        var controllers = this._abortControllers;
+        this._abortControllers = {};
+        Object.keys(controllers).forEach(function(id) {
+          try { controllers[id].abort(); } catch (e) {}
+        });
+      }
+
+      // Blocks run concurrently, so every update is applied to the latest state
+      _patchBlock(blockId, patch) {
+        this.setState(function(prev) {
+          return {
+            blocks: prev.blocks.map(function(b) {
+              return b.id === blockId ? Object.assign({}, b, patch) : b;
+            })
+          };
+        });
+      }
+
       handleAddBlock() {
         this.setState(function(prev) {
           return { blocks: prev.blocks.concat([DB.createDefaultBlock()]) };
@@ -75,7 +313,15 @@
       handleRemoveBlock(blockId) {
         this.setState(function(prev) {
           if (prev.blocks.length <= 1) return {};
-          return { blocks: prev.blocks.filter(function(b) { return b.id !== blockId; }) };
+          return {
+            blocks: prev.blocks
+              .filter(function(b) { return b.id !== blockId; })
+              .map(function(b) {
+                if (!Array.isArray(b.dependsOn) || b.dependsOn.indexOf(blockId) < 0) return b;
+                return Object.assign({}, b, { dependsOn: b.dependsOn.filter(function(id) { return id !== blockId; }) });
+              }),
+            criticalPath: null,
+          };
         });
       }
 
@@ -101,6 +347,27 @@
         });
       }
 
+      handleToggleDependency(blockId, depId) {
+        this.setState(function(prev) {
+          var deps = resolveDependencies(prev.blocks);
+          return {
+            blocks: prev.blocks.map(function(b) {
+              if (b.id !== blockId) return b;
+              var next = deps[b.id].slice();
+              var at = next.indexOf(depId);
+              if (at >= 0) next.splice(at, 1);
+              else next.push(depId);
+              return Object.assign({}, b, { dependsOn: next });
+            }),
+            criticalPath: null,
+          };
+        });
+      }
+
+      handleConcurrencyChange(value) {
+        this.setState({ concurrency: clampConcurrency(value) });
+      }
+
       handleRunSingleBlock(idx) {
         var self = this;
         var blocks = self.state.blocks;
@@ -108,38 +375,28 @@
         if (!block || !block.content || !block.content.trim()) return;
         if (self.state.running) return;
 
-        // Validate all prior blocks have output
-        for (var i = 0; i < idx; i++) {
-          if (!blocks[i].output || !blocks[i].output.trim()) {
-            alert('Cannot run Block ' + (idx + 1) + ': Block ' + (i + 1) + ' has not been run yet. Run all blocks first or run earlier blocks individually.');
+        // Validate all ancestor blocks have output
+        var ancestors = collectAncestors(blocks, resolveDependencies(blocks), block.id);
+        for (var i = 0; i < ancestors.length; i++) {
+          if (!ancestors[i].output || !ancestors[i].output.trim()) {
+            alert('Cannot run Block ' + (idx + 1) + ': Block ' + (blocks.indexOf(ancestors[i]) + 1) + ' has not been run yet. Run all blocks first or run earlier blocks individually.');
             return;
           }
         }
 
-        // Build conversation history from prior blocks' stored outputs
-        var prebuiltHistory = [];
-        for (var j = 0; j < idx; j++) {
-          prebuiltHistory.push({ role: 'user', content: blocks[j].content || '' });
-          prebuiltHistory.push({ role: 'assistant', content: blocks[j].output || '' });
-        }
-
-        if (self._abortController) {
-          self._abortController.abort();
-          self._abortController = null;
-        }
+        self._abortAll();
         window.dispatchEvent(new CustomEvent('docbuddy-workflow-streaming', { detail: { streaming: true } }));
 
         // Clear only the target block's output/status
-        var updatedBlocks = blocks.slice();
-        updatedBlocks[idx] = Object.assign({}, updatedBlocks[idx], { output: '', status: 'idle' });
+        self._patchBlock(block.id, { output: '', status: 'idle', cached: false, durationMs: null });
         self.setState({
-          blocks: updatedBlocks,
           running: true,
           aborted: false,
-          currentBlockIdx: idx,
           runningSingleBlock: true,
+          criticalPath: null,
         }, function() {
-          self.runWorkflow(idx, idx + 1, prebuiltHistory);
+          // An explicit single-block run always re-executes the block
+          self.runWorkflow([block.id], { force: true });
         });
       }
 
@@ -147,91 +404,350 @@
         var self = this;
         var hasContent = self.state.blocks.some(function(b) { return b.content && b.content.trim(); });
         if (!hasContent) return;
-        if (self._abortController) {
-          self._abortController.abort();
-          self._abortController = null;
-        }
+        self._abortAll();
+        self._blockHistory = {};
         window.dispatchEvent(new CustomEvent('docbuddy-workflow-streaming', { detail: { streaming: true } }));
         self.setState(function(prev) {
           return {
             running: true,
             aborted: false,
-            currentBlockIdx: 0,
             runningSingleBlock: false,
+            criticalPath: null,
+            wallMs: null,
             blocks: prev.blocks.map(function(b) {
-              return Object.assign({}, b, { output: '', status: 'idle' });
+              return Object.assign({}, b, { output: '', status: 'idle', cached: false, durationMs: null });
             })
           };
         }, function() {
-          self.runWorkflow();
+          self.runWorkflow(null, { force: self.state.forceRerun });
         });
       }
 
       handleStop() {
-        if (this._abortController) {
-          this._abortController.abort();
-        }
+        this._runId++;
+        this._abortAll();
         window.dispatchEvent(new CustomEvent('docbuddy-workflow-streaming', { detail: { streaming: false } }));
-        this.setState({ running: false, aborted: true, currentBlockIdx: -1, runningSingleBlock: false });
+        this.setState(function(prev) {
+          return {
+            running: false,
+            aborted: true,
+            runningSingleBlock: false,
+            runningDataset: false,
+            rowResults: prev.rowResults.map(function(row) {
+              return row.status === 'queued' || row.status === 'running' ? Object.assign({}, row, { status: 'aborted' }) : row;
+            }),
+          };
+        });
       }
 
       handleReset() {
-        if (this._abortController) {
-          this._abortController.abort();
-        }
+        this._runId++;
+        this._abortAll();
+        this._blockHistory = {};
         window.dispatchEvent(new CustomEvent('docbuddy-workflow-streaming', { detail: { streaming: false } }));
         var defaultBlock = DB.createDefaultBlock();
         this.setState({
           blocks: [defaultBlock],
           running: false,
-          currentBlockIdx: -1,
           aborted: false,
           runningSingleBlock: false,
+          criticalPath: null,
+          wallMs: null,
+          inputText: '',
+          rowResults: [],
+          runningDataset: false,
+        });
+      }
+
+      // History visible to a block: the messages of its ancestors only, in
+      // topological order. Blocks run in an earlier session fall back to their
+      // prompt/output pair.
+      _ancestorHistory(blocks, deps, blockId, history) {
+        var conversationHistory = [];
+        collectAncestors(blocks, deps, blockId).forEach(function(ancestor) {
+          var messages = history[ancestor.id] || [
+            { role: 'user', content: ancestor.content || '' },
+            { role: 'assistant', content: ancestor.output || '' }
+          ];
+          conversationHistory = conversationHistory.concat(messages);
         });
-        DB.saveWorkflow({ blocks: [defaultBlock] });
+        return conversationHistory;
       }
 
-      runWorkflow(startIdx, endIdx, initialHistory) {
+      // Cache key per block: a hash of the block's own inputs, the keys of its
+      // dependencies and the run configuration. Editing a block therefore
+      // invalidates it and every descendant, and nothing else.
+      _computeBlockKeys(blocks, deps) {
+        var settings = DB.loadFromStorage();
+        var toolSettings = DB.loadToolSettings();
+        var config = {
+          model: settings.modelId || 'llama3',
+          temperature: settings.temperature != null && settings.temperature !== '' ? parseFloat(settings.temperature) : 0.7,
+          maxTokens: settings.maxTokens != null && settings.maxTokens !== '' ? parseInt(settings.maxTokens) : 4096,
+          preset: settings.systemPromptPreset || 'api_assistant',
+          schema: DB.getSchemaHash(DB._cachedOpenapiSchema),
+        };
+        var keys = {};
+        blocks.forEach(function(b) {
+          keys[b.id] = DB.hashString(DB.stableStringify({
+            content: b.content || '',
+            tools: !!(toolSettings.enableTools && b.enableTools !== false),
+            upstream: deps[b.id].map(function(d) { return keys[d]; }),
+            config: config,
+          }));
+        });
+        return keys;
+      }
+
+      // Run one instance of the workflow graph. Normal runs and each dataset
+      // row go through here; they differ only in where history and block
+      // updates are kept.
+      //
+      // opts: { force, cache, history, keyPrefix, isCancelled, onBlockUpdate(blockId, patch) }
+      _runInstance(blocks, deps, selected, opts) {
         var self = this;
-        var conversationHistory = initialHistory || [];
-        var firstIdx = startIdx || 0;
-        var stopIdx = (endIdx != null) ? endIdx : self.state.blocks.length;
-
-        function runBlock(idx) {
-          var currentBlocks = self.state.blocks;
-          if (idx >= stopIdx || self.state.aborted) {
-            window.dispatchEvent(new CustomEvent('docbuddy-workflow-streaming', { detail: { streaming: false } }));
-            self.setState({ running: false, currentBlockIdx: -1, runningSingleBlock: false });
+        var blockKeys = self._computeBlockKeys(blocks, deps);
+
+        return scheduleDag(selected, deps, self.state.concurrency, function(block) {
+          var key = blockKeys[block.id];
+          var hit = !opts.force && opts.cache.entries[key];
+          if (hit) {
+            hit.usedAt = Date.now();
+            opts.history[block.id] = hit.messages;
+            opts.onBlockUpdate(block.id, { output: hit.output, status: 'done', cached: true, durationMs: 0 });
             return;
           }
 
-          self.setState({ currentBlockIdx: idx });
+          var conversationHistory = self._ancestorHistory(blocks, deps, block.id, opts.history);
+          var blockStartedAt = Date.now();
+          opts.onBlockUpdate(block.id, { status: 'running', output: '', cached: false, durationMs: null, stats: null });
+
+          return self._executeBlock(block, conversationHistory, {
+            controllerKey: opts.keyPrefix + block.id,
+            onOutput: function(output) { opts.onBlockUpdate(block.id, { output: output }); },
+            onStats: function(stats) { opts.onBlockUpdate(block.id, { stats: stats }); }
+          }).then(function(result) {
+            var durationMs = Date.now() - blockStartedAt;
+            if (!result.aborted) {
+              opts.history[block.id] = result.messages;
+              // Failed LLM requests are not cached so the next run retries them
+              if (!/^Error: /.test(result.output || '')) {
+                opts.cache.entries[key] = { output: result.output, messages: result.messages, durationMs: durationMs, usedAt: Date.now() };
+              }
+            }
+            opts.onBlockUpdate(block.id, {
+              output: result.output || '(no output)',
+              status: 'done',
+              durationMs: durationMs
+            });
+          });
+        }, opts.isCancelled);
+      }
 
-          var block = currentBlocks[idx];
-          var updatedBlocks = currentBlocks.slice();
-          updatedBlocks[idx] = Object.assign({}, updatedBlocks[idx], { status: 'running', output: '' });
-          self.setState({ blocks: updatedBlocks });
+      runWorkflow(targetIds, options) {
+        var self = this;
+        var runId = ++self._runId;
+        var blocks = self.state.blocks;
+        var deps = resolveDependencies(blocks);
+        var selected = targetIds
+          ? blocks.filter(function(b) { return targetIds.indexOf(b.id) >= 0; })
+          : blocks;
+        var runStartedAt = Date.now();
+        var isCancelled = function() { return self._runId !== runId; };
+        var cache = DB.loadWorkflowCache();
+
+        // Cache keys include the schema hash, so wait for the schema first
+        return self._schemaReady().then(function() {
+          return self._runInstance(blocks, deps, selected, {
+            force: !!(options && options.force),
+            cache: cache,
+            history: self._blockHistory,
+            keyPrefix: '',
+            isCancelled: isCancelled,
+            onBlockUpdate: function(blockId, patch) { self._patchBlock(blockId, patch); }
+          });
+        }).then(function() {
+          DB.saveWorkflowCache(cache);
+          if (isCancelled()) return;
+          window.dispatchEvent(new CustomEvent('docbuddy-workflow-streaming', { detail: { streaming: false } }));
+          self.setState(function(prev) {
+            return {
+              running: false,
+              runningSingleBlock: false,
+              criticalPath: computeCriticalPath(prev.blocks, resolveDependencies(prev.blocks)),
+              wallMs: Date.now() - runStartedAt,
+            };
+          });
+        });
+      }
 
-          var settings = DB.loadFromStorage();
-          var toolSettings = DB.loadToolSettings();
-          var blockToolsEnabled = toolSettings.enableTools && (block.enableTools !== false);
+      // Parsed input table, memoized on the raw text
+      _getInputTable() {
+        var text = this.state.inputText;
+        if (!this._parsedInputs || this._parsedInputs.text !== text) {
+          this._parsedInputs = { text: text, table: parseInputTable(text) };
+        }
+        return this._parsedInputs.table;
+      }
 
-          var selectedPreset = settings.systemPromptPreset || 'api_assistant';
+      handleInputFileUpload(e) {
+        var self = this;
+        var file = e.target.files && e.target.files[0];
+        if (!file) return;
+        var reader = new FileReader();
+        reader.onload = function() {
+          self.setState({ inputText: String(reader.result || ''), showInputs: true, rowResults: [] });
+        };
+        reader.readAsText(file);
+        e.target.value = '';
+      }
 
-          // Ensure both system prompt config and OpenAPI schema are loaded before building the prompt
-          var configReady = DB.ensureSystemPromptConfig();
-          var schemaReady = new Promise(function(resolve) {
-            DB.ensureOpenapiSchemaCached(function() { resolve(); });
-          });
+      handleRunDataset() {
+        var self = this;
+        var table = self._getInputTable();
+        if (self.state.running || table.error || !table.rows.length) return;
+        self._abortAll();
+        window.dispatchEvent(new CustomEvent('docbuddy-workflow-streaming', { detail: { streaming: true } }));
+        self.setState({
+          running: true,
+          aborted: false,
+          runningDataset: true,
+          criticalPath: null,
+          wallMs: null,
+          rowResults: table.rows.map(function(vars, i) {
+            return { index: i, vars: vars, status: 'queued', durationMs: null, blocks: {} };
+          }),
+        }, function() {
+          self.runDataset(table.rows);
+        });
+      }
 
-          Promise.all([configReady, schemaReady]).then(function() {
-          var systemPrompt = DB.getSystemPromptForPreset(selectedPreset, DB._cachedOpenapiSchema);
+      _patchRow(rowIdx, update) {
+        this.setState(function(prev) {
+          return {
+            rowResults: prev.rowResults.map(function(row) {
+              return row.index === rowIdx ? Object.assign({}, row, typeof update === 'function' ? update(row) : update) : row;
+            })
+          };
+        });
+      }
 
-          if (blockToolsEnabled) {
-            systemPrompt = systemPrompt.replace(/## Tool Calling Instructions[\s\S]*$/, '').trimEnd();
-            systemPrompt += '\n\nUse the `api_request` tool via native tool calling when the user asks to call an API endpoint. Do NOT output tool calls as JSON text — the system handles tool execution automatically.';
-          }
-          systemPrompt += '\n\nYou are executing a multi-step workflow. Be concise. Execute each instruction precisely.';
+      // Each row is an independent instance of the workflow with {{variables}}
+      // rendered from that row. Rows are scheduled like blocks in a graph
+      // without edges, bounded by the row concurrency.
+      runDataset(rows) {
+        var self = this;
+        var runId = ++self._runId;
+        var blocks = self.state.blocks;
+        var deps = resolveDependencies(blocks);
+        var isCancelled = function() { return self._runId !== runId; };
+        var cache = DB.loadWorkflowCache();
+        var force = self.state.forceRerun;
+        var runStartedAt = Date.now();
+
+        var rowNodes = rows.map(function(vars, i) { return { id: 'row-' + i, index: i, vars: vars }; });
+        var rowDeps = {};
+        rowNodes.forEach(function(node) { rowDeps[node.id] = []; });
+
+        return self._schemaReady().then(function() {
+          return scheduleDag(rowNodes, rowDeps, self.state.rowConcurrency, function(node) {
+            var rendered = blocks.map(function(b) {
+              return Object.assign({}, b, { content: DB.renderTemplate(b.content, node.vars) });
+            });
+            var rowStartedAt = Date.now();
+            self._patchRow(node.index, { status: 'running' });
+
+            return self._runInstance(rendered, deps, rendered, {
+              force: force,
+              cache: cache,
+              history: {},
+              keyPrefix: node.id + ':',
+              isCancelled: isCancelled,
+              onBlockUpdate: function(blockId, patch) {
+                self._patchRow(node.index, function(row) {
+                  var rowBlocks = Object.assign({}, row.blocks);
+                  rowBlocks[blockId] = Object.assign({}, rowBlocks[blockId], patch);
+                  return { blocks: rowBlocks };
+                });
+              }
+            }).then(function() {
+              var aborted = isCancelled();
+              self._patchRow(node.index, function(row) {
+                var failed = Object.keys(row.blocks).some(function(id) {
+                  return /^Error: /.test(row.blocks[id].output || '');
+                });
+                return {
+                  status: aborted ? 'aborted' : (failed ? 'error' : 'done'),
+                  durationMs: Date.now() - rowStartedAt
+                };
+              });
+            });
+          }, isCancelled);
+        }).then(function() {
+          DB.saveWorkflowCache(cache);
+          if (isCancelled()) return;
+          window.dispatchEvent(new CustomEvent('docbuddy-workflow-streaming', { detail: { streaming: false } }));
+          self.setState({ running: false, runningDataset: false, wallMs: Date.now() - runStartedAt });
+        });
+      }
+
+      handleExportResults() {
+        var blocks = this.state.blocks;
+        var rowResults = this.state.rowResults;
+        if (!rowResults.length) return;
+        var exportData = rowResults.map(function(row) {
+          return {
+            row: row.index + 1,
+            inputs: row.vars,
+            status: row.status,
+            durationMs: row.durationMs,
+            blocks: blocks.map(function(b, i) {
+              var result = row.blocks[b.id] || {};
+              return {
+                block: i + 1,
+                prompt: DB.renderTemplate(b.content, row.vars),
+                output: result.output || '',
+                durationMs: result.durationMs != null ? result.durationMs : null,
+                cached: !!result.cached
+              };
+            })
+          };
+        });
+        DB.exportAsJson(exportData, 'workflow-results-' + new Date().toISOString().slice(0, 10) + '.json');
+      }
+
+      _schemaReady() {
+        return new Promise(function(resolve) {
+          DB.ensureOpenapiSchemaCached(function() { resolve(); });
+        });
+      }
+
+      // Run a single block against the given history. Resolves to
+      // { output, messages, aborted } where `messages` is the block's own
+      // contribution to its descendants' history.
+      //
+      // opts: { controllerKey, onOutput(accumulated), onStats(stats) }
+      _executeBlock(block, conversationHistory, opts) {
+        var self = this;
+        var settings = DB.loadFromStorage();
+        var toolSettings = DB.loadToolSettings();
+        var blockToolsEnabled = toolSettings.enableTools && (block.enableTools !== false);
+
+        var selectedPreset = settings.systemPromptPreset || 'api_assistant';
+
+        var controller = new AbortController();
+        self._abortControllers[opts.controllerKey] = controller;
+
+        // Ensure both system prompt config and OpenAPI schema are loaded before building the prompt
+        var configReady = DB.ensureSystemPromptConfig();
+        return Promise.all([configReady, self._schemaReady()]).then(function() {
+          var toolInstruction = blockToolsEnabled
+            ? 'Use ' + DB.describeApiTools(toolSettings) + ' via native tool calling when the user asks to call an API endpoint. Do NOT output tool calls as JSON text — the system handles tool execution automatically.'
+            : null;
+          var systemPrompt = DB.withSessionNotes(
+            DB.buildStaticSystemPrompt(selectedPreset, DB._cachedOpenapiSchema, null, toolInstruction),
+            ['You are executing a multi-step workflow. Be concise. Execute each instruction precisely.']
+          );
 
           var currentUserMessage = { role: 'user', content: block.content || '' };
 
@@ -250,7 +766,7 @@
           if (blockToolsEnabled) {
             var fullSchema = DB._cachedOpenapiSchema;
             if (fullSchema) {
-              payload.tools = [DB.buildApiRequestTool(fullSchema)];
+              payload.tools = DB.buildToolsForTurn(fullSchema, messages, toolSettings);
               payload.tool_choice = 'auto';
             }
           }
@@ -261,269 +777,293 @@
           }
 
           var baseUrl = (settings.baseUrl || '').replace(/\/+$/, '');
-
-          if (self._abortController && typeof self._abortController.abort === 'function') {
-            try { self._abortController.abort(); } catch (e) {}
-          }
-
-          self._abortController = new AbortController();
           var accumulated = '';
-          var accumulatedToolCalls = {};
-
           var blockMessages = [];
+          var speculativeTools = {};
+
+          function executeToolCall(tc) {
+            var args = DB.toolCallToApiArgs(tc);
+            var pending = DB.claimSpeculativeToolCall(speculativeTools, tc, args) ||
+              DB.executeToolRequest(args, controller.signal);
+            return pending.then(function(responseObj) {
+              DB.recordToolCallOutcome(tc.function.name, responseObj);
+              if (responseObj.status === 0) return 'Error: ' + responseObj.body;
+              return DB.formatToolResult(responseObj, 4000);
+            }, function() {
+              return '(aborted)';
+            });
+          }
 
-          fetch(baseUrl + '/chat/completions', {
-            method: 'POST',
-            headers: fetchHeaders,
-            body: JSON.stringify(payload),
-            signal: self._abortController.signal
-          })
-            .then(function(res) {
-              if (!res.ok) {
-                return res.text().then(function(text) {
-                  throw new Error('HTTP ' + res.status + ': ' + res.statusText + (text ? ' - ' + text : ''));
-                });
-              }
-              var reader = res.body.getReader();
-              var decoder = new TextDecoder();
-              var buffer = '';
-
-              function processChunk() {
-                return reader.read().then(function(result) {
-                  if (self.state.aborted) return;
-                  if (result.done) {
-                    return finishBlock(accumulated, blockMessages);
-                  }
-
-                  buffer += decoder.decode(result.value, { stream: true });
-                  var lines = buffer.split('\n');
-                  buffer = lines.pop() || '';
-
-                  for (var i = 0; i < lines.length; i++) {
-                    var line = lines[i].trim();
-                    if (!line || !line.startsWith('data: ')) continue;
-                    var payloadData = line.substring(6);
-                    if (payloadData === '[DONE]') {
-                      return finishBlock(accumulated, blockMessages);
-                    }
-
-                    try {
-                      var chunk = JSON.parse(payloadData);
-                      if (chunk.error) {
-                        var errMsg = typeof chunk.error === 'string' ? chunk.error
-                          : (chunk.error.message || JSON.stringify(chunk.error));
-                        return finishBlock('Error: ' + errMsg, blockMessages);
-                      }
-                      var choice = chunk.choices && chunk.choices[0];
-                      if (!choice) continue;
-
-                      if (choice.delta && choice.delta.content) {
-                        accumulated += choice.delta.content;
-                        var currentBlocks = self.state.blocks.slice();
-                        currentBlocks[idx] = Object.assign({}, currentBlocks[idx], { output: accumulated });
-                        self.setState({ blocks: currentBlocks });
-                      }
-
-                      if (choice.delta && choice.delta.tool_calls) {
-                        choice.delta.tool_calls.forEach(function(tc) {
-                          var tcIdx = tc.index != null ? tc.index : 0;
-                          if (!accumulatedToolCalls[tcIdx]) {
-                            accumulatedToolCalls[tcIdx] = { id: '', function: { name: '', arguments: '' } };
-                          }
-                          if (tc.id) accumulatedToolCalls[tcIdx].id = tc.id;
-                          if (tc.function) {
-                            if (tc.function.name) accumulatedToolCalls[tcIdx].function.name = tc.function.name;
-                            if (tc.function.arguments) accumulatedToolCalls[tcIdx].function.arguments += tc.function.arguments;
-                          }
-                        });
-                      }
-
-                      if (choice.finish_reason === 'tool_calls') {
-                        var toolCallsList = Object.keys(accumulatedToolCalls).map(function(k) {
-                          return accumulatedToolCalls[k];
-                        });
-                        if (toolCallsList.length > 0) {
-                          // Push the assistant message with all tool calls
-                          blockMessages.push({
-                            role: 'assistant',
-                            content: null,
-                            tool_calls: toolCallsList.map(function(tc) {
-                              return { id: tc.id, type: 'function', function: { name: tc.function.name, arguments: tc.function.arguments } };
-                            })
-                          });
-
-                          // Execute all tool calls sequentially
-                          var toolIdx = 0;
-                          function executeNextToolCall() {
-                            if (toolIdx >= toolCallsList.length) {
-                              var currentBlocks2 = self.state.blocks.slice();
-                              currentBlocks2[idx] = Object.assign({}, currentBlocks2[idx], { output: accumulated });
-                              self.setState({ blocks: currentBlocks2 });
-                              finishBlock(accumulated, blockMessages);
-                              return;
-                            }
-                            var currentTc = toolCallsList[toolIdx];
-                            executeToolCall(currentTc, toolCallsList, function(toolOutput) {
-                              blockMessages.push({
-                                role: 'tool',
-                                tool_call_id: currentTc.id,
-                                content: toolOutput
-                              });
-
-                              var tcArgs = {};
-                              try { tcArgs = JSON.parse(currentTc.function.arguments || '{}'); } catch (e) {}
-                              var curlCmd = DB.buildCurlCommand(
-                                tcArgs.method || 'GET',
-                                tcArgs.path || '',
-                                tcArgs.query_params || {},
-                                tcArgs.path_params || {},
-                                tcArgs.body || {}
-                              );
-                              accumulated += '\n\n[Tool Call]\n' + curlCmd + '\n\n[Tool Result]\n' + toolOutput;
-                              toolIdx++;
-                              executeNextToolCall();
-                            });
-                          }
-                          executeNextToolCall();
-                          return;
-                        }
-                      }
-                    } catch (e) {
-                      console.error('Error processing streaming chunk:', payloadData, e);
-                    }
-                  }
+          return new Promise(function(resolve) {
+            function finishBlock(output, aborted) {
+              if (self._abortControllers[opts.controllerKey] === controller) delete self._abortControllers[opts.controllerKey];
+              // Include the user message so descendants keep proper user/assistant
+              // alternation, and close with an assistant message so a "user" turn
+              // never directly follows a "tool" message (HTTP 400 on most providers).
+              resolve({
+                output: output,
+                aborted: !!aborted,
+                messages: [currentUserMessage].concat(blockMessages).concat([{ role: 'assistant', content: output || '' }])
+              });
+            }
 
-                  return processChunk();
+            DB.streamLLMCompletion(baseUrl + '/chat/completions', payload, fetchHeaders, controller.signal, {
+              onContent: function(delta, accum) {
+                accumulated = accum;
+                opts.onOutput(accumulated);
+              },
+              onToolCallReady: function(toolCall) {
+                if (blockToolsEnabled) DB.speculateToolCall(speculativeTools, toolCall, controller.signal);
+              },
+              onToolCalls: function(toolCallsList) {
+                // Push the assistant message with all tool calls
+                blockMessages.push({
+                  role: 'assistant',
+                  content: null,
+                  tool_calls: toolCallsList.map(function(tc) {
+                    return { id: tc.id, type: 'function', function: { name: tc.function.name, arguments: tc.function.arguments } };
+                  })
                 });
-              }
 
-              return processChunk();
-            })
-            .catch(function(err) {
-              self._abortController = null;
-              if (err && err.name === 'AbortError') {
-                // On abort, mark the block as done so it doesn't stay stuck in 'running'
-                var currentBlocks = self.state.blocks.slice();
-                currentBlocks[idx] = Object.assign({}, currentBlocks[idx], {
-                  output: accumulated || '(aborted)',
-                  status: 'done'
+                // Execute all tool calls sequentially
+                var chain = Promise.resolve();
+                toolCallsList.forEach(function(currentTc) {
+                  chain = chain.then(function() {
+                    return executeToolCall(currentTc).then(function(toolOutput) {
+                      blockMessages.push({ role: 'tool', tool_call_id: currentTc.id, content: toolOutput });
+                      var tcArgs = DB.toolCallToApiArgs(currentTc);
+                      var curlCmd = DB.buildCurlCommand(
+                        tcArgs.method || 'GET',
+                        tcArgs.path || '',
+                        tcArgs.query_params || {},
+                        tcArgs.path_params || {},
+                        tcArgs.body || {}
+                      );
+                      accumulated += '\n\n[Tool Call]\n' + curlCmd + '\n\n[Tool Result]\n' + toolOutput;
+                      opts.onOutput(accumulated);
+                    });
+                  });
                 });
-                self.setState({ blocks: currentBlocks, running: false, currentBlockIdx: -1 });
-                return;
+                chain.then(function() {
+                  finishBlock(accumulated, controller.signal.aborted);
+                });
+              },
+              onDone: function(accum) {
+                finishBlock(accum);
+              },
+              onAbort: function(accum) {
+                finishBlock(accum || '(aborted)', true);
+              },
+              onNetworkError: function(err, accum) {
+                if (err && err.name === 'AbortError') {
+                  // On abort, mark the block as done so it doesn't stay stuck in 'running'
+                  finishBlock(accum || '(aborted)', true);
+                  return;
+                }
+                finishBlock('Error: ' + (err && err.message ? err.message : 'Request failed'));
+              },
+              onChunkError: function(e, data) {
+                console.error('Error processing streaming chunk:', data, e);
+              },
+              onStats: function(stats) {
+                if (opts.onStats) opts.onStats(stats);
               }
-              finishBlock('Error: ' + (err && err.message ? err.message : 'Request failed'), blockMessages);
             });
+          });
+        });
+      }
 
-          function executeToolCall(tc, toolCallsList, callback) {
-            var args = {};
-            try { args = JSON.parse(tc.function.arguments || '{}'); } catch (e) { console.warn('Failed to parse tool call arguments:', e); }
-            var method = args.method || 'GET';
-            var url = args.path || '';
-
-            try { url = decodeURIComponent(url); } catch (e) { console.warn('Failed to decode URL component:', e); }
-            if (!url || !/^\//.test(url)) {
-              callback('Error: Tool call path must be a relative URL starting with /');
-              return;
-            }
-
-            try {
-              var pathParams = args.path_params || {};
-              Object.keys(pathParams).forEach(function(key) {
-                url = url.replace('{' + key + '}', encodeURIComponent(pathParams[key]));
-              });
-              // Re-validate after path params substitution to prevent bypass via path param values
-              if (/\.\./.test(url)) {
-                callback('Error: Tool call path must not contain ".."');
-                return;
-              }
-            } catch (e) { console.warn('Failed to apply path params:', e); }
-
-            try {
-              var queryParams = args.query_params || {};
-              var queryKeys = Object.keys(queryParams);
-              if (queryKeys.length > 0) {
-                var qs = queryKeys.map(function(k) {
-                  return encodeURIComponent(k) + '=' + encodeURIComponent(queryParams[k]);
-                }).join('&');
-                url += (url.indexOf('?') >= 0 ? '&' : '?') + qs;
-              }
-            } catch (e) { console.warn('Failed to apply query params:', e); }
-
-            // Use the new resolveApiBaseUrl function which handles:
-            // 1. User-configured API Base URL (highest priority)
-            // 2. OpenAPI schema servers array
-            // 3. Auto-detect from loaded schema URL
-            // 4. Fallback to page origin (for local development)
-            var apiBaseUrl = DB.resolveApiBaseUrl(DB._cachedOpenapiSchema);
-            url = apiBaseUrl + url;
-
-            var toolFetchHeaders = {};
-            var tSettings = DB.loadToolSettings();
-            var toolApiKey = tSettings.apiKey && typeof tSettings.apiKey === 'string' ? tSettings.apiKey.trim() : '';
-            if (toolApiKey) {
-              toolFetchHeaders['Authorization'] = 'Bearer ' + toolApiKey;
-            }
+      // Input dataset editor and per-row results table
+      _renderInputs(btnStyle, table) {
+        var self = this;
+        var s = this.state;
+        var rowCount = table.rows ? table.rows.length : 0;
+        var columns = table.columns || [];
+        var variables = [];
+        s.blocks.forEach(function(b) {
+          DB.extractTemplateVariables(b.content).forEach(function(name) {
+            if (variables.indexOf(name) < 0) variables.push(name);
+          });
+        });
+        var runDisabled = s.running || !!table.error || rowCount === 0;
+        var shownColumns = columns.slice(0, 3);
+        var finalBlock = s.blocks[s.blocks.length - 1];
+
+        var statusColor = {
+          running: '#f59e0b',
+          done: '#10b981',
+          error: '#ef4444',
+        };
+        var cellStyle = {
+          padding: '6px 8px',
+          borderBottom: '1px solid var(--theme-border-color)',
+          textAlign: 'left',
+          verticalAlign: 'top',
+        };
 
-            var hasBody = args.body && (method === 'POST' || method === 'PUT' || method === 'PATCH');
-            if (hasBody) {
-              toolFetchHeaders['Content-Type'] = 'application/json';
-            }
+        var summary = table.error
+          ? React.createElement('span', { style: { color: '#ef4444' } }, table.error)
+          : rowCount
+            ? rowCount + (rowCount === 1 ? ' row' : ' rows') + ' · columns: ' + columns.join(', ')
+            : 'Paste CSV (first row is the header) or a JSON array of objects';
 
-            var fetchOpts = { method: method, headers: toolFetchHeaders };
-            if (hasBody) {
-              fetchOpts.body = JSON.stringify(args.body);
+        return React.createElement(
+          'div',
+          {
+            style: {
+              background: 'var(--theme-input-bg)',
+              border: '1px solid var(--theme-border-color)',
+              borderRadius: '8px',
+              overflow: 'hidden',
+              flexShrink: 0,
             }
-
-            if (self._abortController) {
-              fetchOpts.signal = self._abortController.signal;
+          },
+          React.createElement(
+            'div',
+            {
+              style: {
+                display: 'flex', justifyContent: 'space-between', alignItems: 'center', gap: '8px',
+                padding: '8px 12px', background: 'var(--theme-panel-bg)', borderBottom: '1px solid var(--theme-border-color)',
+              }
+            },
+            React.createElement('span', {
+              style: { color: 'var(--theme-text-secondary)', fontSize: '10px', fontWeight: '600', textTransform: 'uppercase' }
+            }, 'Input dataset'),
+            React.createElement('span', { style: { fontSize: '11px', color: 'var(--theme-text-secondary)' } }, summary)
+          ),
+          React.createElement('textarea', {
+            value: s.inputText,
+            onChange: function(e) { self.setState({ inputText: e.target.value, rowResults: [] }); },
+            disabled: s.running,
+            placeholder: 'id,name\n1,alice\n2,bob\n\nor [{"id": 1, "name": "alice"}]',
+            style: {
+              width: '100%',
+              boxSizing: 'border-box',
+              background: 'var(--theme-input-bg)',
+              color: 'var(--theme-text-primary)',
+              border: 'none',
+              borderBottom: '1px solid var(--theme-border-color)',
+              padding: '12px',
+              fontSize: '12px',
+              fontFamily: "'Consolas', 'Monaco', monospace",
+              resize: 'vertical',
+              minHeight: '72px',
+              outline: 'none',
             }
-
-            fetch(url, fetchOpts)
-              .then(function(res) {
-                if (self.state.aborted) { callback('(aborted)'); return; }
-                return res.text().then(function(text) {
-                  if (self.state.aborted) { callback('(aborted)'); return; }
-                  callback('Status: ' + res.status + ' ' + res.statusText + '\n\n' + text.substring(0, 4000));
-                });
+          }),
+          React.createElement(
+            'div',
+            { style: { display: 'flex', flexWrap: 'wrap', alignItems: 'center', gap: '8px', padding: '8px 12px', fontSize: '12px', color: 'var(--theme-text-secondary)' } },
+            React.createElement('input', {
+              type: 'file',
+              accept: '.csv,.json,text/csv,application/json',
+              ref: function(el) { self._fileInput = el; },
+              onChange: self.handleInputFileUpload,
+              style: { display: 'none' }
+            }),
+            React.createElement('button', {
+              onClick: function() { if (self._fileInput) self._fileInput.click(); },
+              disabled: s.running,
+              style: Object.assign({}, btnStyle('var(--theme-secondary)'), { color: 'var(--theme-text-primary)' }, s.running ? { opacity: 0.5, cursor: 'not-allowed' } : {})
+            }, '⬆ Upload CSV/JSON'),
+            React.createElement('label', {
+              style: { display: 'inline-flex', alignItems: 'center', gap: '6px' },
+              title: 'Maximum number of rows that run at the same time'
+            },
+              'Rows in parallel',
+              React.createElement('input', {
+                type: 'number',
+                min: 1,
+                max: MAX_WORKFLOW_CONCURRENCY,
+                value: s.rowConcurrency,
+                disabled: s.running,
+                onChange: function(e) { self.setState({ rowConcurrency: clampConcurrency(e.target.value) }); },
+                style: {
+                  width: '48px',
+                  background: 'var(--theme-input-bg)',
+                  color: 'var(--theme-text-primary)',
+                  border: '1px solid var(--theme-border-color)',
+                  borderRadius: '4px',
+                  padding: '4px 6px',
+                  fontSize: '12px',
+                }
               })
-              .catch(function(err) {
-                if (err && err.name === 'AbortError') { callback('(aborted)'); return; }
-                callback('Error: ' + err.message);
-              });
-          }
-
-          function finishBlock(output, historyMessages) {
-            // Include the user message for this block in conversation history
-            // so that subsequent blocks maintain proper user/assistant alternation
-            // (required by LM Studio, OpenAI, and most LLM providers)
-            conversationHistory.push({ role: 'user', content: block.content || '' });
-
-            if (historyMessages && historyMessages.length > 0) {
-              // Include all tool call messages in conversation history
-              historyMessages.forEach(function(msg) {
-                conversationHistory.push(msg);
-              });
-              // After tool messages, add an assistant summary so the next block's
-              // "user" message doesn't immediately follow a "tool" role (which
-              // causes HTTP 400 from most LLM providers).
-              conversationHistory.push({ role: 'assistant', content: output || accumulated || '' });
-            } else {
-              conversationHistory.push({ role: 'assistant', content: output || accumulated || '' });
-            }
-
-            var currentBlocks = self.state.blocks.slice();
-            currentBlocks[idx] = Object.assign({}, currentBlocks[idx], {
-              output: output || '(no output)',
-              status: 'done'
-            });
-            self.setState({ blocks: currentBlocks }, function() {
-              runBlock(idx + 1);
-            });
-          }
-          }); // end ensureSystemPromptConfig().then
-        }
-
-        runBlock(firstIdx);
+            ),
+            React.createElement('button', {
+              onClick: self.handleRunDataset,
+              disabled: runDisabled,
+              style: Object.assign({}, btnStyle('#10b981'), runDisabled ? { opacity: 0.5, cursor: 'not-allowed' } : {})
+            }, '▶ Run ' + rowCount + (rowCount === 1 ? ' row' : ' rows')),
+            React.createElement('button', {
+              onClick: self.handleExportResults,
+              disabled: s.running || !s.rowResults.length,
+              style: Object.assign({}, btnStyle('var(--theme-secondary)'), { color: 'var(--theme-text-primary)' }, (s.running || !s.rowResults.length) ? { opacity: 0.5, cursor: 'not-allowed' } : {})
+            }, '⬇ Export results'),
+            variables.length
+              ? React.createElement('span', { style: { marginLeft: 'auto' } },
+                  'Variables: ',
+                  variables.map(function(name) {
+                    var missing = rowCount > 0 && columns.indexOf(name) < 0;
+                    return React.createElement('code', {
+                      key: name,
+                      style: { marginLeft: '4px', color: missing ? '#ef4444' : 'var(--theme-text-primary)' },
+                      title: missing ? 'No "' + name + '" column in the inputs — the placeholder will be left as is' : null
+                    }, '{{' + name + '}}');
+                  })
+                )
+              : React.createElement('span', { style: { marginLeft: 'auto', fontStyle: 'italic' } }, 'Use {{column}} in block prompts to insert row values')
+          ),
+          s.rowResults.length ? React.createElement(
+            'div',
+            { style: { overflowX: 'auto', maxHeight: '400px', overflowY: 'auto', borderTop: '1px solid var(--theme-border-color)' } },
+            React.createElement(
+              'table',
+              { style: { width: '100%', borderCollapse: 'collapse', fontSize: '12px', color: 'var(--theme-text-primary)' } },
+              React.createElement(
+                'thead',
+                null,
+                React.createElement(
+                  'tr',
+                  { style: { background: 'var(--theme-panel-bg)', color: 'var(--theme-text-secondary)' } },
+                  React.createElement('th', { style: cellStyle }, '#'),
+                  shownColumns.map(function(col) {
+                    return React.createElement('th', { key: col, style: cellStyle }, col);
+                  }),
+                  React.createElement('th', { style: cellStyle }, 'Status'),
+                  React.createElement('th', { style: cellStyle }, 'Time'),
+                  React.createElement('th', { style: cellStyle }, 'Final output')
+                )
+              ),
+              React.createElement(
+                'tbody',
+                null,
+                s.rowResults.map(function(row) {
+                  var final = finalBlock && row.blocks[finalBlock.id];
+                  var output = final && final.output ? final.output : '';
+                  return React.createElement(
+                    'tr',
+                    { key: row.index },
+                    React.createElement('td', { style: cellStyle }, row.index + 1),
+                    shownColumns.map(function(col) {
+                      var value = row.vars[col];
+                      return React.createElement('td', { key: col, style: cellStyle },
+                        value != null && typeof value === 'object' ? JSON.stringify(value) : String(value != null ? value : ''));
+                    }),
+                    React.createElement('td', {
+                      style: Object.assign({}, cellStyle, { color: statusColor[row.status] || 'var(--theme-text-secondary)', fontWeight: '600', textTransform: 'uppercase', fontSize: '10px' })
+                    }, row.status),
+                    React.createElement('td', { style: Object.assign({}, cellStyle, { whiteSpace: 'nowrap' }) }, formatDuration(row.durationMs)),
+                    React.createElement('td', {
+                      style: Object.assign({}, cellStyle, { fontFamily: "'Consolas', 'Monaco', monospace", whiteSpace: 'pre-wrap', overflowWrap: 'break-word', maxWidth: '480px', cursor: output ? 'pointer' : 'default' }),
+                      title: output ? 'Click to copy output' : null,
+                      onClick: output ? function() { DB.copyToClipboard(output); } : null
+                    }, output.length > 300 ? output.substring(0, 300) + '…' : output)
+                  );
+                })
+              )
+            )
+          ) : null
+        );
       }
 
       render() {
@@ -579,6 +1119,16 @@
         var startDisabled = s.running || !hasContent;
         var globalToolSettings = DB.loadToolSettings();
         var globalToolsEnabled = globalToolSettings.enableTools;
+        var deps = resolveDependencies(s.blocks);
+        var blockIndex = {};
+        var runningIdx = [];
+        s.blocks.forEach(function(b, i) {
+          blockIndex[b.id] = i;
+          if (b.status === 'running') runningIdx.push(i);
+        });
+        var criticalIds = s.criticalPath && s.criticalPath.ids.length > 1 ? s.criticalPath.ids : [];
+        var inputTable = self._getInputTable();
+        var rowsFinished = s.rowResults.filter(function(row) { return row.status !== 'queued' && row.status !== 'running'; }).length;
 
         return React.createElement(
           'div',
@@ -610,35 +1160,95 @@
               onClick: function() {
                 var blocks = self.state.blocks || [];
                 if (blocks.length === 0) return;
+                var blockDeps = resolveDependencies(blocks);
+                var exportIndex = {};
+                blocks.forEach(function(b, i) { exportIndex[b.id] = i + 1; });
                 var exportData = blocks.map(function(b, i) {
-                  return { block: i + 1, prompt: b.content || '', output: b.output || '', status: b.status || 'idle' };
+                  return {
+                    block: i + 1,
+                    dependsOn: blockDeps[b.id].map(function(id) { return exportIndex[id]; }),
+                    prompt: b.content || '',
+                    output: b.output || '',
+                    status: b.status || 'idle',
+                    durationMs: b.durationMs != null ? b.durationMs : null
+                  };
                 });
                 DB.exportAsJson(exportData, 'workflow-' + new Date().toISOString().slice(0, 10) + '.json');
               },
               disabled: s.running || !hasContent,
               style: Object.assign({}, btnStyle('var(--theme-secondary)'), { color: 'var(--theme-text-primary)' }, (s.running || !hasContent) ? { opacity: 0.5, cursor: 'not-allowed' } : {})
             }, '⬇ Export'),
+            React.createElement('button', {
+              onClick: function() { self.setState({ showInputs: !s.showInputs }); },
+              style: Object.assign({}, btnStyle(s.showInputs ? 'var(--theme-primary)' : 'var(--theme-secondary)'), s.showInputs ? {} : { color: 'var(--theme-text-primary)' }),
+              title: 'Run the workflow once per row of an input table using {{variable}} placeholders'
+            }, '▦ Inputs' + (inputTable.rows && inputTable.rows.length ? ' (' + inputTable.rows.length + ')' : '')),
+            React.createElement('label', {
+              style: { display: 'inline-flex', alignItems: 'center', gap: '6px', fontSize: '12px', color: 'var(--theme-text-secondary)' },
+              title: 'Maximum number of independent blocks that run at the same time'
+            },
+              'Parallel',
+              React.createElement('input', {
+                type: 'number',
+                min: 1,
+                max: MAX_WORKFLOW_CONCURRENCY,
+                value: s.concurrency,
+                disabled: s.running,
+                onChange: function(e) { self.handleConcurrencyChange(e.target.value); },
+                style: {
+                  width: '48px',
+                  background: 'var(--theme-input-bg)',
+                  color: 'var(--theme-text-primary)',
+                  border: '1px solid var(--theme-border-color)',
+                  borderRadius: '4px',
+                  padding: '4px 6px',
+                  fontSize: '12px',
+                }
+              })
+            ),
+            React.createElement('label', {
+              style: { display: 'inline-flex', alignItems: 'center', gap: '4px', fontSize: '12px', color: 'var(--theme-text-secondary)', cursor: s.running ? 'default' : 'pointer' },
+              title: 'Re-run every block instead of reusing cached outputs for unchanged blocks'
+            },
+              React.createElement('input', {
+                type: 'checkbox',
+                checked: s.forceRerun,
+                disabled: s.running,
+                onChange: function(e) { self.setState({ forceRerun: e.target.checked }); }
+              }),
+              'Force'
+            ),
             s.running ? React.createElement('span', {
               style: { fontSize: '12px', color: 'var(--theme-text-secondary)', marginLeft: 'auto' }
-            }, s.runningSingleBlock
-              ? 'Running block ' + (s.currentBlockIdx + 1) + '…'
-              : 'Running block ' + (s.currentBlockIdx + 1) + ' of ' + s.blocks.length + '…'
-            ) : null
+            }, s.runningDataset
+              ? 'Running rows: ' + rowsFinished + ' of ' + s.rowResults.length + ' finished…'
+              : s.runningSingleBlock
+              ? 'Running block ' + (runningIdx[0] + 1) + '…'
+              : 'Running ' + (runningIdx.length === 1 ? 'block ' : 'blocks ') + runningIdx.map(function(i) { return i + 1; }).join(', ') + ' of ' + s.blocks.length + '…'
+            ) : (criticalIds.length ? React.createElement('span', {
+              style: { fontSize: '12px', color: 'var(--theme-text-secondary)', marginLeft: 'auto' },
+              title: 'Longest chain of dependent blocks — it bounds the total run time'
+            }, 'Critical path: ' + criticalIds.map(function(id) { return 'Block ' + (blockIndex[id] + 1); }).join(' → ') +
+              ' · ' + formatDuration(s.criticalPath.durationMs) +
+              (s.wallMs != null ? ' (wall ' + formatDuration(s.wallMs) + ')' : '')
+            ) : null)
           ),
           React.createElement(
             'div',
             { style: blocksContainerStyle },
+            s.showInputs ? self._renderInputs(btnStyle, inputTable) : null,
             s.blocks.length === 0
               ? React.createElement('div', {
                   style: { textAlign: 'center', color: 'var(--theme-text-secondary)', padding: '40px', fontSize: '14px' }
                 }, 'No blocks yet. Click "+ Add Block" to get started.')
               : s.blocks.map(function(block, idx) {
-                  var isActive = s.running && s.currentBlockIdx === idx;
+                  var isActive = block.status === 'running';
                   var isDone = block.status === 'done';
+                  var isCritical = !s.running && criticalIds.indexOf(block.id) >= 0;
 
                   var blockWrapperStyle = {
                     background: 'var(--theme-input-bg)',
-                    border: '1px solid ' + (isActive ? 'var(--theme-primary)' : 'var(--theme-border-color)'),
+                    border: '1px solid ' + (isActive ? 'var(--theme-primary)' : isCritical ? '#f59e0b' : 'var(--theme-border-color)'),
                     borderRadius: '8px',
                     overflow: 'hidden',
                     transition: 'all 0.2s ease',
@@ -667,6 +1277,56 @@
                     }, 'DONE');
                   }
 
+                  var cachedBadge = block.cached ? React.createElement('span', {
+                    style: { fontSize: '10px', fontWeight: '600', color: '#fff', background: '#6366f1', padding: '2px 8px', borderRadius: '4px' },
+                    title: 'Output reused from cache — inputs unchanged since the last run. Tick "Force" to re-run.'
+                  }, 'CACHED') : null;
+
+                  var timingBadge = block.durationMs != null && !block.cached ? React.createElement('span', {
+                    style: { fontSize: '10px', color: isActive ? '#fff' : 'var(--theme-text-secondary)', fontFamily: "'Consolas', 'Monaco', monospace" },
+                    title: 'Block run time' + (block.stats ? ' · ' + DB.formatLlmStats(block.stats) : '')
+                  }, formatDuration(block.durationMs)) : null;
+
+                  var criticalBadge = isCritical ? React.createElement('span', {
+                    style: { fontSize: '10px', fontWeight: '600', color: '#f59e0b', border: '1px solid #f59e0b', padding: '1px 6px', borderRadius: '4px' },
+                    title: 'This block is on the critical path'
+                  }, 'CRITICAL PATH') : null;
+
+                  // Dependency chips: only earlier blocks can be selected, which keeps the graph acyclic
+                  var blockDeps = deps[block.id];
+                  var dependencyRow = idx > 0 ? React.createElement(
+                    'div',
+                    {
+                      style: {
+                        display: 'flex', flexWrap: 'wrap', alignItems: 'center', gap: '4px',
+                        padding: '6px 12px', borderBottom: '1px solid var(--theme-border-color)',
+                        fontSize: '11px', color: 'var(--theme-text-secondary)',
+                      }
+                    },
+                    React.createElement('span', { style: { marginRight: '4px' } }, 'Depends on:'),
+                    s.blocks.slice(0, idx).map(function(dep, depIdx) {
+                      var selected = blockDeps.indexOf(dep.id) >= 0;
+                      return React.createElement('button', {
+                        key: dep.id,
+                        onClick: !s.running ? function() { self.handleToggleDependency(block.id, dep.id); } : null,
+                        style: {
+                          background: selected ? 'var(--theme-primary)' : 'transparent',
+                          color: selected ? '#fff' : 'var(--theme-text-secondary)',
+                          border: '1px solid ' + (selected ? 'var(--theme-primary)' : 'var(--theme-border-color)'),
+                          borderRadius: '10px',
+                          padding: '1px 8px',
+                          fontSize: '11px',
+                          cursor: s.running ? 'default' : 'pointer',
+                          opacity: s.running ? 0.6 : 1,
+                        },
+                        title: selected ? 'Click to remove this dependency' : 'Click to depend on Block ' + (depIdx + 1)
+                      }, 'Block ' + (depIdx + 1));
+                    }),
+                    blockDeps.length === 0
+                      ? React.createElement('span', { style: { fontStyle: 'italic', marginLeft: '4px' } }, 'none — starts immediately')
+                      : null
+                  ) : null;
+
                   return React.createElement(
                     'div',
                     { key: block.id, style: blockWrapperStyle },
@@ -685,7 +1345,10 @@
                             textTransform: 'uppercase',
                           }
                         }, 'Block ' + (idx + 1)),
-                        statusBadge
+                        statusBadge,
+                        cachedBadge,
+                        timingBadge,
+                        criticalBadge
                       ),
                       React.createElement(
                         'div',
@@ -755,6 +1418,7 @@
                         }, '✕') : null
                       )
                     ),
+                    dependencyRow,
                     React.createElement('textarea', {
                       value: block.content,
                       onChange: function(e) { self.handleBlockContentChange(block.id, e.target.value); },
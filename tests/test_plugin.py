@@ -16,6 +16,7 @@ DOCBUDDY_JS_FILES = [
     "settings.js",
     "workflow.js",
     "agent.js",
+    "network.js",
     "plugin.js",
 ]
 
@@ -1516,7 +1517,7 @@ def test_agent_panel_included():
     client = TestClient(make_app())
     js_content = client.get("/docbuddy-static/plugin.js").text
 
-    assert "AgentPanel: DB.AgentPanelFactory(system)" in js_content
+    assert 'AgentPanel: lazyPanel("agent")' in js_content
 
 
 def test_agent_streaming_indicator_in_layout():
@@ -1634,11 +1635,11 @@ def test_agent_tool_call_panel():
 
 
 def test_agent_template_script_included():
-    """Verify agent.js is loaded in the HTML template."""
+    """Verify agent.js is loaded on demand when the Agent tab opens."""
     client = TestClient(make_app())
-    html = client.get("/docs").text
+    js_content = client.get("/docbuddy-static/core.js").text
 
-    assert "agent.js" in html
+    assert "agent: { file: 'agent.js', factory: 'AgentPanelFactory' }" in js_content
 
 
 def test_agent_uses_shared_namespace():
@@ -1738,11 +1739,11 @@ def test_standalone_page_contains_swagger_ui():
 
 
 def test_standalone_page_contains_docbuddy_scripts():
-    """Verify standalone page loads all DocBuddy JS files."""
+    """Verify standalone page loads core.js and plugin.js (panels load per tab)."""
     from pathlib import Path
 
     html = (Path(__file__).parent.parent / "docs" / "index.html").read_text()
-    for f in DOCBUDDY_JS_FILES:
+    for f in ("core.js", "plugin.js"):
         assert f in html, f"Standalone page should reference {f}"
 
 
@@ -2067,3 +2068,1174 @@ def test_cli_uses_directory_not_chdir(monkeypatch, tmp_path):
     assert handler.keywords["directory"] == str(
         tmp_path
     ), "directory= must be the package directory"
+
+
+# ── Speculative tool execution tests ──────────────────────────────────────────
+
+
+def test_incremental_json_scanner_in_core():
+    """core.js must expose an incremental scanner for streamed tool arguments."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "DocBuddy.createJsonScanner" in js_content
+    assert "DocBuddy.feedJsonScanner" in js_content
+    assert "onToolCallReady" in js_content
+
+
+def test_speculative_tool_calls_limited_to_safe_methods():
+    """Only safe, idempotent methods may be executed speculatively."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "SPECULATIVE_METHODS = { GET: true, HEAD: true }" in js_content
+    assert "DocBuddy.speculateToolCall" in js_content
+    assert "DocBuddy.claimSpeculativeToolCall" in js_content
+    # Speculative results are discarded when the final arguments differ
+    assert "entry.key !== stableStringify(normalizeToolArgs(args))" in js_content
+
+
+def test_chat_and_agent_claim_speculative_results():
+    """Chat and agent executors reuse speculative results under auto-execute."""
+    client = TestClient(make_app())
+    for name in ("chat.js", "agent.js"):
+        js_content = client.get(f"/docbuddy-static/{name}").text
+        assert "DB.speculateToolCall(self._speculativeTools" in js_content
+        assert "DB.claimSpeculativeToolCall(self._speculativeTools" in js_content
+        assert "DB.executeToolRequest(executedArgs, signal)" in js_content
+
+
+def test_speculative_tool_calls_share_stream_abort_signal():
+    """Stopping a stream also cancels the tool calls it started speculatively."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+    assert "promise: executeToolRequest(normalized, signal)" in js_content
+
+    expected = {
+        "chat.js": "toolCall, self._currentCancelToken.signal);",
+        "agent.js": "toolCall, controller.signal);",
+        "workflow.js": "toolCall, controller.signal);",
+    }
+    for name, call in expected.items():
+        js_content = client.get(f"/docbuddy-static/{name}").text
+        assert call in js_content
+
+
+def test_cancelled_tool_calls_are_answered():
+    """An aborted tool request leaves a cancelled tool result, not a spinner."""
+    client = TestClient(make_app())
+    for name in ("chat.js", "agent.js"):
+        js_content = client.get(f"/docbuddy-static/{name}").text
+        assert "self._toolCallController = self._currentCancelToken;" in js_content
+        assert "if (err && err.name === 'AbortError') {" in js_content
+        assert "_displayContent: 'Tool call cancelled'" in js_content
+        assert "this._toolCallController.abort();" in js_content
+
+
+# ── Workflow DAG tests ────────────────────────────────────────────────────────
+
+
+def test_workflow_blocks_declare_dependencies():
+    """Blocks default to a linear chain and may declare earlier dependencies."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/workflow.js").text
+
+    assert "function resolveDependencies(blocks)" in js_content
+    assert "deps[b.id] = i > 0 ? [blocks[i - 1].id] : [];" in js_content
+    assert "handleToggleDependency" in js_content
+    assert "persisted.dependsOn = b.dependsOn" in js_content
+
+
+def test_workflow_runs_independent_blocks_concurrently():
+    """Workflow scheduler bounds concurrency and isolates history to ancestors."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/workflow.js").text
+
+    assert (
+        "function scheduleDag(blocks, deps, limit, runNode, isCancelled)" in js_content
+    )
+    assert "inFlight < limit" in js_content
+    assert "collectAncestors(blocks, deps, blockId)" in js_content
+    # Each in-flight block gets its own AbortController
+    assert "this._abortControllers = {}" in js_content
+    assert "DB.streamLLMCompletion" in js_content
+
+
+def test_workflow_shows_timing_and_critical_path():
+    """Workflow UI reports per-block timing and highlights the critical path."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/workflow.js").text
+
+    assert "function computeCriticalPath(blocks, deps)" in js_content
+    assert "durationMs" in js_content
+    assert "CRITICAL PATH" in js_content
+
+
+def test_workflow_cache_helpers_in_core():
+    """core.js provides hashing and a bounded workflow output cache."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "DocBuddy.hashString = hashString" in js_content
+    assert "DocBuddy.getSchemaHash = getSchemaHash" in js_content
+    assert "'docbuddy-workflow-cache'" in js_content
+    assert "WORKFLOW_CACHE_LIMIT" in js_content
+
+
+def test_workflow_reuses_cached_block_outputs():
+    """Unchanged blocks are served from cache unless a forced re-run is requested."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/workflow.js").text
+
+    assert "_computeBlockKeys(blocks, deps)" in js_content
+    assert "upstream: deps[b.id].map(function(d) { return keys[d]; })" in js_content
+    assert "var hit = !opts.force && opts.cache.entries[key];" in js_content
+    assert "forceRerun" in js_content
+    assert "'CACHED'" in js_content
+
+
+def test_template_helpers_in_core():
+    """core.js renders {{variable}} placeholders for workflow fan-out."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "DocBuddy.renderTemplate = renderTemplate" in js_content
+    assert "DocBuddy.extractTemplateVariables = extractTemplateVariables" in js_content
+
+
+def test_workflow_fans_out_over_input_rows():
+    """Workflow runs one instance per input row through the shared block runner."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/workflow.js").text
+
+    assert "function parseInputTable(text)" in js_content
+    assert "function parseCsv(text)" in js_content
+    assert "handleRunDataset" in js_content
+    assert "self.state.rowConcurrency" in js_content
+    # Rows reuse the same per-instance runner as a normal run
+    assert "return self._runInstance(rendered, deps, rendered, {" in js_content
+    assert "DB.renderTemplate(b.content, node.vars)" in js_content
+    assert "handleExportResults" in js_content
+
+
+# ── Headless workflow runner tests ────────────────────────────────────────────
+
+
+def test_runner_loads_saved_and_exported_workflows():
+    """run-workflow accepts both the saved panel format and the Export format."""
+    from docbuddy import runner
+
+    saved = runner.load_workflow(
+        {
+            "blocks": [
+                {"id": "a", "content": "x"},
+                {"id": "b", "content": "y", "dependsOn": []},
+            ]
+        }
+    )
+    assert runner.resolve_dependencies(saved) == {"a": [], "b": []}
+
+    exported = runner.load_workflow(
+        [
+            {"block": 1, "prompt": "x"},
+            {"block": 2, "prompt": "y"},
+            {"block": 3, "prompt": "z", "dependsOn": [1]},
+        ]
+    )
+    deps = runner.resolve_dependencies(exported)
+    assert deps["block-2"] == ["block-1"]
+    assert deps["block-3"] == ["block-1"]
+    assert runner.collect_ancestors(exported, deps, "block-3") == ["block-1"]
+
+
+def test_runner_templates_and_inputs():
+    """Inputs parse from CSV or JSON and render into {{variable}} placeholders."""
+    from docbuddy import runner
+
+    rows = runner.parse_input_table('id,name\n1,"a, b"\n2,c\n')
+    assert rows == [{"id": "1", "name": "a, b"}, {"id": "2", "name": "c"}]
+    assert runner.parse_input_table('[{"id": 1}]') == [{"id": 1}]
+    assert (
+        runner.render_template("Get {{ id }} {{missing}}", {"id": 7})
+        == "Get 7 {{missing}}"
+    )
+
+
+def test_runner_rejects_unsafe_tool_paths():
+    """Tool calls from the runner follow the same path rules as the browser."""
+    from docbuddy import runner
+
+    request, error = runner.build_tool_request(
+        {
+            "method": "get",
+            "path": "/items/{id}",
+            "path_params": {"id": "a b"},
+            "query_params": {"q": "x y"},
+        },
+        "http://api.test",
+    )
+    assert error is None
+    assert request[0] == "GET"
+    assert request[1] == "http://api.test/items/a%20b?q=x%20y"
+
+    assert (
+        runner.build_tool_request({"path": "http://evil"}, "http://api.test")[0] is None
+    )
+    assert (
+        runner.build_tool_request(
+            {"path": "/a/{x}", "path_params": {"x": ".."}}, "http://api.test"
+        )[0]
+        is None
+    )
+
+
+def test_runner_executes_workflow_end_to_end(tmp_path):
+    """run-workflow calls the LLM and target API over HTTP and writes JSONL."""
+    import http.server
+    import json
+    import threading
+
+    from docbuddy import cli
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/openapi.json":
+                self._send(
+                    {
+                        "openapi": "3.0.0",
+                        "info": {"title": "T"},
+                        "paths": {"/items": {"get": {}}},
+                    }
+                )
+            else:
+                self._send({"path": self.path})
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            last = payload["messages"][-1]["content"]
+            if last.startswith("call"):
+                message = {
+                    "content": "",
+                    "tool_calls": [
+                        {
+                            "id": "c1",
+                            "type": "function",
+                            "function": {
+                                "name": "api_request",
+                                "arguments": '{"method": "GET", "path": "/items"}',
+                            },
+                        }
+                    ],
+                }
+            else:
+                message = {
+                    "content": "echo:" + last + ":" + str(len(payload["messages"]))
+                }
+            self._send({"choices": [{"message": message}]})
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    workflow = tmp_path / "wf.json"
+    workflow.write_text(
+        json.dumps(
+            [
+                {"block": 1, "prompt": "call {{id}}"},
+                {"block": 2, "prompt": "independent {{id}}", "dependsOn": []},
+                {"block": 3, "prompt": "summarize", "dependsOn": [1, 2]},
+            ]
+        )
+    )
+    inputs = tmp_path / "inputs.csv"
+    inputs.write_text("id\n1\n2\n")
+    out = tmp_path / "out.jsonl"
+
+    import sys
+    from unittest.mock import patch
+
+    argv = [
+        "docbuddy",
+        "run-workflow",
+        str(workflow),
+        "--openapi",
+        base + "/openapi.json",
+        "--inputs",
+        str(inputs),
+        "--output",
+        str(out),
+        "--base-url",
+        base + "/v1",
+    ]
+    try:
+        with patch.object(sys, "argv", argv):
+            try:
+                cli.main()
+            except SystemExit as exc:
+                assert exc.code == 0
+    finally:
+        server.shutdown()
+
+    records = [json.loads(line) for line in out.read_text().splitlines()]
+    blocks = [r for r in records if r["type"] == "block"]
+    instances = [r for r in records if r["type"] == "instance"]
+    assert len(blocks) == 6 and len(instances) == 2
+    assert all(r["status"] == "done" and "duration_ms" in r for r in records)
+
+    row1 = {r["block"]: r for r in blocks if r["row"] == 1}
+    assert row1[1]["prompt"] == "call 1"
+    assert "[Tool Result]\nStatus: 200" in row1[1]["output"]
+    # Block 2 has no ancestors: system + its own user message only
+    assert row1[2]["output"] == "echo:independent 1:2"
+    # Block 3 sees both ancestors' history (user/assistant/tool messages)
+    assert row1[3]["output"].startswith("echo:summarize:")
+    assert int(row1[3]["output"].rsplit(":", 1)[1]) == 1 + 4 + 2 + 1
+
+
+def test_runner_requires_api_base_url_for_file_schema(tmp_path, capsys):
+    """A schema file without an absolute server needs --api-base-url for tools."""
+    import json
+    import sys
+    from unittest.mock import patch
+
+    from docbuddy import cli
+
+    schema = tmp_path / "openapi.json"
+    schema.write_text(json.dumps({"openapi": "3.0.0", "info": {"title": "T"}}))
+    workflow = tmp_path / "wf.json"
+    workflow.write_text(json.dumps([{"block": 1, "prompt": "list items"}]))
+
+    argv = ["docbuddy", "run-workflow", str(workflow), "--openapi", str(schema)]
+    with patch.object(sys, "argv", argv):
+        try:
+            cli.main()
+        except SystemExit as exc:
+            assert exc.code == 2
+        else:
+            raise AssertionError("run-workflow should exit with code 2")
+    assert "could not determine the API base URL" in capsys.readouterr().err
+
+
+# ── Context window tests ──────────────────────────────────────────────────────
+
+
+def test_context_window_helpers_in_core():
+    """core.js trims history to a per-model token budget."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "DocBuddy.estimateTokens = estimateTokens" in js_content
+    assert "DocBuddy.getContextWindow = getContextWindow" in js_content
+    assert "DocBuddy.buildContextWindow = buildContextWindow" in js_content
+    assert "DocBuddy.digestToolPayload = digestToolPayload" in js_content
+    assert "'docbuddy-context-summary'" in js_content
+
+
+def test_context_window_rolling_summary():
+    """Old turns are folded into a summary written by a background completion."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "DocBuddy.updateRollingSummary = updateRollingSummary" in js_content
+    assert "CONTEXT_SUMMARY_THRESHOLD" in js_content
+    assert "stream: false" in js_content
+    assert "## Summary of Earlier Conversation" in js_content
+
+
+def test_context_summary_kept_after_anchor_is_trimmed():
+    """A trimmed-anchor summary applies only to its own conversation and schema."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "var covered = summary.anchors || [summary.anchor];" in js_content
+    assert "if (covered.indexOf(anchor) !== -1) summaryText" in js_content
+    assert "anchors: apiMessages.slice(recentStart).map(messageAnchor)" in js_content
+    assert "schemaHash: getSchemaHash(DocBuddy._cachedOpenapiSchema)," in js_content
+    assert "summary.schemaHash !== getSchemaHash(" in js_content
+
+
+def test_standalone_pages_clear_context_summaries():
+    """Switching schemas on the standalone pages drops both rolling summaries."""
+    from pathlib import Path
+
+    root = Path(__file__).parent.parent
+    for page in (root / "docs" / "index.html", root / "src/docbuddy/standalone.html"):
+        html = page.read_text(encoding="utf-8")
+        assert html.count("window.DocBuddy.saveContextSummary('chat', null);") == 2
+        assert html.count("window.DocBuddy.saveContextSummary('agent', null);") == 2
+
+
+def test_context_window_unknown_models_are_not_trimmed():
+    """Only a known window trims history; the reply share is capped."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "DocBuddy.getKnownContextWindow = getKnownContextWindow" in js_content
+    assert "if (!contextWindow) return [{ role: 'system'" in js_content
+    assert "Math.floor(contextWindow * MAX_REPLY_SHARE)" in js_content
+    assert "} else if (ctx.fold) {" in js_content
+
+
+def test_chat_and_agent_fit_context_window():
+    """Both panels send trimmed history and reset the summary on clear."""
+    client = TestClient(make_app())
+    for name, key in (("chat", "'chat'"), ("agent", "'agent'")):
+        js_content = client.get(f"/docbuddy-static/{name}.js").text
+        assert f"DB.fitContextWindow({key}, systemPrompt, apiMessages" in js_content
+        assert f"DB.saveContextSummary({key}, null)" in js_content
+
+    settings_js = client.get("/docbuddy-static/settings.js").text
+    assert "handleContextWindowChange" in settings_js
+    assert "contextWindows" in settings_js
+
+
+# ── LLM usage accounting tests ────────────────────────────────────────────────
+
+
+def test_stream_requests_usage_and_records_stats():
+    """Streaming requests ask for usage and record token/latency stats."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "stream_options: { include_usage: true }" in js_content
+    assert "if (chunk.usage) usage = chunk.usage;" in js_content
+    assert "DocBuddy.recordLlmStats = recordLlmStats" in js_content
+    assert "usageSource: fromProvider ? 'provider' : 'estimate'" in js_content
+    for field in ("ttftMs", "interTokenMs", "durationMs", "tokensPerSec"):
+        assert field in js_content
+
+
+def test_messages_show_collapsible_stats_line():
+    """Chat and agent attach stats to messages and render them collapsibly."""
+    client = TestClient(make_app())
+    core_js = client.get("/docbuddy-static/core.js").text
+    assert "DocBuddy.renderLlmStats = renderLlmStats" in core_js
+    assert "'details'" in core_js
+
+    for name in ("chat", "agent"):
+        js_content = client.get(f"/docbuddy-static/{name}.js").text
+        assert "self._attachStats(streamMsgId, stats)" in js_content
+        assert "DB.renderLlmStats(React, msg._stats)" in js_content
+
+
+def test_settings_shows_session_usage_totals():
+    """The settings panel lists session totals and updates on new stats."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/settings.js").text
+
+    assert "Usage This Session" in js_content
+    assert "DB.getLlmSessionStats()" in js_content
+    assert "'docbuddy-llm-stats'" in js_content
+    assert "DB.resetLlmSessionStats()" in js_content
+
+
+# ── Network panel tests ───────────────────────────────────────────────────────
+
+
+def test_docs_page_loads_network_panel():
+    """network.js is loaded on demand; every page variant boots core.js + plugin.js."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+    assert "file: 'network.js', factory: 'NetworkPanelFactory'" in js_content
+
+    from pathlib import Path
+
+    root = Path(__file__).parent.parent
+    for page in (
+        root / "src" / "docbuddy" / "standalone.html",
+        root / "docs" / "index.html",
+    ):
+        assert "var scripts = ['core.js', 'plugin.js'];" in page.read_text()
+
+
+def test_outgoing_requests_are_logged_with_resource_timing():
+    """LLM, tool, model-probe and schema fetches go through trackedFetch."""
+    client = TestClient(make_app())
+    core_js = client.get("/docbuddy-static/core.js").text
+    assert "DocBuddy.trackedFetch = trackedFetch" in core_js
+    assert "observe({ type: 'resource', buffered: false })" in core_js
+    assert "'docbuddy-network'" in core_js
+    assert "signal: signal }, 'llm')" in core_js
+    assert "trackedFetch(req.url, req.options, 'tool')" in core_js
+    assert "trackedFetch(fetchUrl, {}, 'schema')" in core_js
+    # Model probes (Test Connection and discovery) go through probeEndpoint
+    assert "signal: controller.signal }, 'models')" in core_js
+
+    settings_js = client.get("/docbuddy-static/settings.js").text
+    assert "DB.probeEndpoint(" in settings_js
+
+
+def test_swagger_executions_captured_via_wrap_actions():
+    """Try-it-out requests are logged without a request interceptor."""
+    client = TestClient(make_app())
+    plugin_js = client.get("/docbuddy-static/plugin.js").text
+    assert "wrapActions" in plugin_js
+    assert "DB.recordSwaggerRequest(req)" in plugin_js
+    assert "DB.recordSwaggerResponse(path, method, res)" in plugin_js
+    assert 'NetworkPanel: lazyPanel("network")' in plugin_js
+    assert "requestInterceptor" not in client.get("/docs").text
+
+
+def test_network_panel_renders_waterfall_and_exports_har():
+    """The panel shows phase breakdowns and exports HAR 1.2."""
+    client = TestClient(make_app())
+    core_js = client.get("/docbuddy-static/core.js").text
+    assert "DocBuddy.buildHar = buildHar" in core_js
+    assert "version: '1.2'" in core_js
+    assert "DocBuddy.getNetworkPhases = getNetworkPhases" in core_js
+
+    network_js = client.get("/docbuddy-static/network.js").text
+    assert "_renderWaterfall(entry, range)" in network_js
+    assert "DB.buildHar(this._visibleEntries())" in network_js
+    for phase in ("'DNS'", "'Connect'", "'TTFB'", "'Download'"):
+        assert phase in network_js
+
+
+# ── Cassette record/replay tests ──────────────────────────────────────────────
+
+
+def test_cassette_recording_hooks_tracked_fetch():
+    """Recording captures request/response pairs, optionally with chunk timing."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "DocBuddy.startCassetteRecording = startCassetteRecording" in js_content
+    assert "DocBuddy.stopCassetteRecording = stopCassetteRecording" in js_content
+    assert "recordInteraction(kind, options.method, url, options.body" in js_content
+    assert "var reader = res.clone().body.getReader();" in js_content
+    assert "interaction.chunks.push({ t:" in js_content
+
+
+def test_cassette_replay_serves_responses_without_network():
+    """Replay serves LLM output in order and tool results by request."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "DocBuddy.startCassetteReplay = startCassetteReplay" in js_content
+    assert "pending = replayFetch(url, options, kind" in js_content
+    assert "if (kind === 'llm' || list[i].key === key)" in js_content
+    assert "opts.speed === 'fast' ? 'fast' : 'recorded'" in js_content
+    assert "statusText: 'Not in cassette'" in js_content
+
+
+def test_network_panel_has_cassette_controls():
+    """The network panel records, saves and replays cassettes."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/network.js").text
+
+    assert "_renderCassetteControls(btnStyle)" in js_content
+    replay = "DB.startCassetteReplay(cassette, { speed: self.state.replaySpeed })"
+    assert replay in js_content
+    assert "'docbuddy-cassette-'" in js_content
+    assert "'docbuddy-cassette'" in js_content
+
+
+# ── Capped tool response tests ────────────────────────────────────────────────
+
+
+def test_tool_responses_are_read_with_size_and_time_caps():
+    """Tool bodies stream through a byte cap and time budget, skipping binary."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "DocBuddy.readResponseCapped = readResponseCapped" in js_content
+    assert "return readResponseCapped(res, {" in js_content
+    assert "reader.cancel()" in js_content
+    assert "BINARY_CONTENT_TYPE_RE.test(contentType)" in js_content
+    assert "maxResponseKb: DEFAULT_TOOL_MAX_BYTES / 1024" in js_content
+
+
+def test_tool_messages_record_truncation_metadata():
+    """Chat, agent and workflow share one tool result format with truncation."""
+    client = TestClient(make_app())
+    core_js = client.get("/docbuddy-static/core.js").text
+    assert "DocBuddy.formatToolResult = formatToolResult" in core_js
+    assert "'Response truncated: kept '" in core_js
+
+    for name in ("chat.js", "agent.js"):
+        js_content = client.get(f"/docbuddy-static/{name}").text
+        assert "DB.formatToolResult(responseObj)" in js_content
+        assert "_truncation: truncation" in js_content
+    workflow_js = client.get("/docbuddy-static/workflow.js").text
+    assert "DB.formatToolResult(responseObj, 4000)" in workflow_js
+
+
+def test_settings_expose_tool_response_limits():
+    """The tool calling settings configure the size cap and time budget."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/settings.js").text
+
+    assert "Max Tool Response Size (KB)" in js_content
+    assert "Tool Response Time Budget (s)" in js_content
+    assert "maxResponseKb: this.state.maxResponseKb" in js_content
+
+
+# ── JSON compaction tests ─────────────────────────────────────────────────────
+
+
+def test_json_tool_responses_are_compacted_for_the_model():
+    """Homogeneous record arrays become columns/rows with a head sample."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "DocBuddy.compactJsonForModel = compactJsonForModel" in js_content
+    assert "replaced = { _table: table }" in js_content
+    assert "table.stats = stats" in js_content
+    assert "compactJsonForModel(read.text, {" in js_content
+
+
+def test_json_compaction_is_guided_by_response_schema():
+    """The operation's response schema picks the record array and columns."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "DocBuddy.findOperation = findOperation" in js_content
+    assert "DocBuddy.getResponseSchema = getResponseSchema" in js_content
+    assert "DocBuddy.resolveSchemaRef = resolveSchemaRef" in js_content
+    assert "getResponseSchema(root, operation, res.status)" in js_content
+
+
+def test_tool_messages_report_compaction_ratio():
+    """Chat and agent tool messages show the original/compacted size ratio."""
+    client = TestClient(make_app())
+    assert "meta.ratio = " in client.get("/docbuddy-static/core.js").text
+    for name in ("chat.js", "agent.js"):
+        js_content = client.get(f"/docbuddy-static/{name}").text
+        assert "DB.describeCompaction(responseObj.compaction)" in js_content
+        assert "_compaction: responseObj.compaction || null" in js_content
+    settings_js = client.get("/docbuddy-static/settings.js").text
+    assert "Compact JSON Responses" in settings_js
+
+
+def test_compacted_tool_body_only_goes_to_the_model():
+    """The tool-call panel keeps the raw response; the model gets the digest."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+    assert "result.modelBody = compacted.text;" in js_content
+    assert "result.body = compacted.text" not in js_content
+    assert "responseObj.modelBody != null ? responseObj.modelBody" in js_content
+
+
+# ── Tool argument validation tests ────────────────────────────────────────────
+
+
+def test_tool_arguments_are_validated_before_fetch():
+    """executeToolRequest rejects invalid arguments without calling the API."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "DocBuddy.validateToolArgs = validateToolArgs" in js_content
+    validate = "var invalid = validateToolArgs(DocBuddy._cachedOpenapiSchema, args);"
+    assert validate in js_content
+    assert validate in js_content.split("function executeToolRequest(")[1]
+    assert "statusText: 'Invalid Arguments'" in js_content
+    assert "error: 'invalid_arguments'" in js_content
+
+
+def test_operation_validators_are_compiled_once_per_schema():
+    """Validators are compiled from parameters and requestBody, then cached."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "function compileOperationValidator(root, match)" in js_content
+    assert "function compileJsonSchema(root, node, memo)" in js_content
+    assert "_validatorCache = { hash: hash, byOperation: {} }" in js_content
+    assert "if (ref && memo[ref]) return memo[ref];" in js_content
+
+
+def test_rejected_tool_calls_are_labelled_in_chat_and_agent():
+    """Rejected calls show how many arguments failed and that nothing was sent."""
+    client = TestClient(make_app())
+    for name in ("chat.js", "agent.js"):
+        js_content = client.get(f"/docbuddy-static/{name}").text
+        assert "responseObj.validationErrors.length" in js_content
+        assert "request not sent" in js_content
+
+
+# ── Route index tests ─────────────────────────────────────────────────────────
+
+
+def test_operations_resolve_through_a_segment_trie():
+    """Concrete and templated paths resolve via a per-schema route index."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "DocBuddy.buildRouteIndex = buildRouteIndex" in js_content
+    assert "DocBuddy.matchRoute = matchRoute" in js_content
+    assert "return matchRoute(getRouteIndex(schema), method, path);" in js_content
+    assert "_routeIndex = { hash: hash, root: buildRouteIndex(schema) }" in js_content
+
+
+def test_route_index_prefers_literal_segments():
+    """Literal segments are tried before {param} segments, with backtracking."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "var found = next ? lookupRoute(next, segs, i + 1, m) : null;" in js_content
+    assert "if (!found && node.param) found = lookupRoute(node.param" in js_content
+
+
+def test_route_index_benchmark_is_shipped():
+    """The trie is benchmarked against a naive regex scan on 2,000 paths."""
+    from pathlib import Path
+
+    bench = Path(__file__).parent.parent / "benchmarks" / "route_index.js"
+    content = bench.read_text()
+    assert "|| 2000;" in content
+    assert "function naiveMatch(table, method, p)" in content
+    assert "DB.matchRoute(index, 'GET', q)" in content
+
+
+# ── Typed tool tests ──────────────────────────────────────────────────────────
+
+
+def test_typed_tools_are_generated_per_operation():
+    """Each operation becomes a function with its real parameters and body."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "function buildTypedToolIndex(schema)" in js_content
+    assert "typedToolName(op.operationId, method, path, byName)" in js_content
+    assert "function inlineSchema(root, node, depth)" in js_content
+    assert "toolMode: 'generic'" in js_content
+
+
+def test_typed_tools_are_selected_top_k_per_turn():
+    """Only the k most relevant operations (plus a fallback) are sent."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+    assert "DocBuddy.selectTypedTools = selectTypedTools" in js_content
+    assert "DocBuddy.buildToolsForTurn = buildToolsForTurn" in js_content
+
+    for name in ("chat.js", "agent.js", "workflow.js"):
+        panel_js = client.get(f"/docbuddy-static/{name}").text
+        assert "DB.buildToolsForTurn(fullSchema, " in panel_js
+        assert "DB.buildApiRequestTool(fullSchema)" not in panel_js
+
+
+def test_typed_tool_calls_map_back_to_http_requests():
+    """Executors translate any tool call into api_request arguments."""
+    client = TestClient(make_app())
+    core_js = client.get("/docbuddy-static/core.js").text
+    assert "DocBuddy.toolCallToApiArgs = toolCallToApiArgs" in core_js
+    assert "DocBuddy.apiArgsToToolFunction = apiArgsToToolFunction" in core_js
+    assert "DocBuddy.recordToolCallOutcome = recordToolCallOutcome" in core_js
+
+    for name in ("chat.js", "agent.js", "workflow.js"):
+        panel_js = client.get(f"/docbuddy-static/{name}").text
+        assert "DB.toolCallToApiArgs(" in panel_js
+        assert "DB.recordToolCallOutcome(" in panel_js
+    settings_js = client.get("/docbuddy-static/settings.js").text
+    assert "Typed tool per operation" in settings_js
+    assert "Tool calls (typed)" in settings_js
+
+
+# ── Guided decoding tests ─────────────────────────────────────────────────────
+
+
+def test_providers_declare_a_guided_decoding_style():
+    """Each provider picks how a JSON schema constraint is sent."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "guidedDecoding: 'guided_json'" in js_content
+    assert "guidedDecoding: 'format'" in js_content
+    assert "guidedDecoding: 'json_schema'" in js_content
+    assert "DocBuddy.buildGuidedDecoding = buildGuidedDecoding" in js_content
+    assert "return { guided_json: schema };" in js_content
+
+
+def test_malformed_tool_arguments_are_repaired_before_hand_off():
+    """Tool calls with invalid JSON arguments are re-requested under a schema."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "DocBuddy.repairToolCallArguments = repairToolCallArguments" in js_content
+    assert "if (toolCallsList.every(hasValidToolArguments)) {" in js_content
+    assert "handOffToolCalls(toolCallsList);" in js_content
+    guided = "buildGuidedDecoding(settings.provider, schema, name)"
+    assert guided in js_content
+
+
+# ── Provider adapter tests ────────────────────────────────────────────────────
+
+
+def test_ollama_adapter_streams_native_api_chat():
+    """Ollama requests go to /api/chat with keep_alive and num_ctx."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "adapter: 'ollama'" in js_content
+    assert "+ '/api/chat'" in js_content
+    assert "keep_alive: settings.keepAlive || DEFAULT_KEEP_ALIVE" in js_content
+    assert "var options = { num_ctx: getContextWindow(modelSettings) };" in js_content
+    assert "toChunk: ollamaChunkToOpenAI" in js_content
+
+
+def test_llamacpp_adapter_enables_prompt_cache():
+    """llama.cpp is a provider whose requests set cache_prompt."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "llamacpp: { name: 'llama.cpp'" in js_content
+    assert "{ cache_prompt: true }" in js_content
+
+
+def test_stream_helper_dispatches_through_provider_adapter():
+    """streamLLMCompletion keeps one callback interface for SSE and NDJSON."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+    assert "var adapter = getProviderAdapter(settings);" in js_content
+    assert "adapter.toChunk(JSON.parse(payloadData), chunkState)" in js_content
+    assert "if (chunk.done) {" in js_content
+
+    settings_js = client.get("/docbuddy-static/settings.js").text
+    assert "Use native /api/chat" in settings_js
+    assert "keepAlive: this.state.keepAlive" in settings_js
+
+
+# ── Prompt layout tests ───────────────────────────────────────────────────────
+
+
+def test_static_system_prompt_is_memoized_in_core():
+    """The preset/schema/tool part of the system prompt is built once."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "function buildStaticSystemPrompt(" in js_content
+    assert "DocBuddy.withSessionNotes = withSessionNotes;" in js_content
+    assert "DocBuddy.withTurnNote = withTurnNote;" in js_content
+
+
+def test_panels_keep_per_turn_text_out_of_system_prompt():
+    """Panels use the static prompt; the agent counter rides on the last turn."""
+    client = TestClient(make_app())
+    for name in ("chat.js", "agent.js", "workflow.js"):
+        js_content = client.get(f"/docbuddy-static/{name}").text
+        assert "DB.buildStaticSystemPrompt(" in js_content
+        assert "## Tool Calling Instructions" not in js_content
+
+    agent_js = client.get("/docbuddy-static/agent.js").text
+    assert "Current iteration" not in agent_js
+    assert "DB.withTurnNote(" in agent_js
+
+
+def test_cached_prompt_tokens_are_tracked():
+    """cached_tokens from the usage block feed the session cache hit rate."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+    assert "prompt_tokens_details" in js_content
+    assert "cachedTokens" in js_content
+
+    settings_js = client.get("/docbuddy-static/settings.js").text
+    assert "Prompt cache hit rate" in settings_js
+
+
+# ── Endpoint pool tests ───────────────────────────────────────────────────────
+
+
+def test_endpoint_pool_routes_by_ttft_and_in_flight():
+    """Requests under baseUrl go to the best endpoint in the pool."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "DocBuddy.getEndpointPool = getEndpointPool;" in js_content
+    assert "function pickEndpoint(settings, url, tried)" in js_content
+    assert "score *= 1 + stats.inFlight;" in js_content
+    assert "TTFT_EWMA_ALPHA" in js_content
+
+
+def test_stream_fails_over_on_stall_or_server_error():
+    """Stalled streams and 429/5xx responses restart on another endpoint."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "armStallTimer(STREAM_STALL_TIMEOUT_MS);" in js_content
+    assert "err.stalled = true;" in js_content
+    assert "isRetryableLlmError(err)" in js_content
+    retry = "streamFromPool(url, payload, headers, signal, callbacks, nextTried);"
+    assert retry in js_content
+
+
+def test_settings_panel_has_fallback_endpoints():
+    """The pool is configured in settings and saved with the LLM settings."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/settings.js").text
+    assert "Fallback Endpoints (same model)" in js_content
+    assert "endpointPool: this.state.endpointPool" in js_content
+
+
+# ── Provider discovery tests ──────────────────────────────────────────────────
+
+
+def test_discovery_probes_known_providers_in_parallel():
+    """Every LLM_PROVIDERS default plus the user's endpoints is probed."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "DocBuddy.probeEndpoint = probeEndpoint;" in js_content
+    assert "function getDiscoveryTargets(settings)" in js_content
+    assert "var DISCOVERY_PROBE_TIMEOUT_MS = 2000;" in js_content
+    assert "return Promise.all(probes).then(" in js_content
+
+
+def test_discovery_cache_is_stale_while_revalidate():
+    """Cached results are served at once; entries past the TTL are re-probed."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "docbuddy-provider-discovery" in js_content
+    assert "stale: !hit || now - hit.checkedAt > DISCOVERY_TTL_MS" in js_content
+    assert "'docbuddy-discovery'" in js_content
+
+
+def test_settings_panel_shows_detected_providers():
+    """Settings renders the cached discovery list and refreshes it on mount."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/settings.js").text
+    assert "Detected Providers" in js_content
+    assert "DB.refreshDiscovery(DB.loadFromStorage());" in js_content
+    assert "timeoutMs: 10000 })" in js_content
+
+
+# ── Model routing tests ───────────────────────────────────────────────────────
+
+
+def test_model_roles_map_to_fast_and_strong_models():
+    """Tool steps and summaries use the fast model, plan/final the strong one."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "DocBuddy.modelForRole = modelForRole;" in js_content
+    assert "tool: 'fast'" in js_content
+    assert "final: 'strong'" in js_content
+    assert "model: modelForRole(settings, 'summary')" in js_content
+
+
+def test_agent_routes_steps_by_role():
+    """Agent steps pick a model by role and escalate prose answers."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/agent.js").text
+
+    assert "var role = forceRole || DB.classifyAgentStep(" in js_content
+    assert "model: model," in js_content
+    assert "selectedPreset, 'final');" in js_content
+
+
+def test_agent_holds_fast_model_prose_until_stream_ends():
+    """Fast-model prose is buffered; only a tool-less stream is rerun, with tools."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/agent.js").text
+    assert "if (holdContent) return;" in js_content
+    assert "controller.abort()" not in js_content
+    assert "tools = null" not in js_content
+
+    core_js = client.get("/docbuddy-static/core.js").text
+    rule = "if (budgetSpent && lastMessage && lastMessage.role === 'tool')"
+    assert rule in core_js
+
+
+def test_llm_stats_are_kept_per_role():
+    """Session stats are split by role and shown in the settings panel."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+    assert "s.byRole[stats.role]" in js_content
+
+    settings_js = client.get("/docbuddy-static/settings.js").text
+    assert "Fast Model (agent tool steps, summaries)" in settings_js
+    assert "st.byRole" in settings_js
+
+
+# ── Completion cache tests ────────────────────────────────────────────────────
+
+
+def test_completion_cache_key_is_normalized_hash():
+    """Keys hash model, messages, tools and temperature with stable ids."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "function completionCacheKey(payload, schemaHash)" in js_content
+    assert "if (!(id in ids)) ids[id] = 'call_' + (next++);" in js_content
+    assert "Number(payload.temperature) === 0;" in js_content
+
+
+def test_completion_cache_uses_indexeddb_with_lru_eviction():
+    """Entries persist in IndexedDB and are evicted by size and schema."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "indexedDB.open(COMPLETION_DB_NAME, 1)" in js_content
+    assert "store.index('usedAt').openCursor(null, 'prev')" in js_content
+    assert "entry.schemaHash !== schemaHash" in js_content
+
+
+def test_cached_completions_replay_through_stream_callbacks():
+    """Hits replay via onContent; settings expose the cache mode."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+    assert "replayCompletion(entry, payload, callbacks, signal," in js_content
+    assert "cachingCallbacks(callbacks, key, schemaHash, payload)" in js_content
+
+    settings_js = client.get("/docbuddy-static/settings.js").text
+    assert "Completion Cache" in settings_js
+    assert "DB.clearCompletionCache()" in settings_js
+
+
+# ── Cross-tab sharing tests ───────────────────────────────────────────────────
+
+
+def test_shared_worker_is_served_and_holds_schemas():
+    """The shared worker script is served and answers schema requests."""
+    client = TestClient(make_app())
+    response = client.get("/docbuddy-static/shared-worker.js")
+    assert response.status_code == 200
+    assert "self.onconnect" in response.text
+    assert 'case "get-schema":' in response.text
+
+
+def test_core_attaches_to_shared_schema_before_fetching():
+    """Tabs ask the worker or peer tabs for the schema, with a channel fallback."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+
+    assert "new SharedWorker(workerUrl.href, { name: 'docbuddy' })" in js_content
+    assert "new BroadcastChannel(TAB_CHANNEL_NAME)" in js_content
+    assert "requestSharedSchema(fetchUrl)" in js_content
+
+
+def test_settings_and_history_sync_as_deltas():
+    """Saves publish changed keys / history deltas that other tabs apply."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+    assert "publishTabDelta('settings', patch);" in js_content
+    assert "DocBuddy.diffHistory = diffHistory;" in js_content
+
+    chat_js = client.get("/docbuddy-static/chat.js").text
+    assert "'docbuddy-history-sync'" in chat_js
+
+
+# ── Settings store tests ──────────────────────────────────────────────────────
+
+
+def test_settings_are_read_through_in_memory_store():
+    """Settings, tool settings and the API base URL are parsed once into memory."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+    assert "return Object.assign({}, readStore(SETTINGS_STORAGE_KEY));" in js_content
+    assert "readStore(TOOL_SETTINGS_KEY)" in js_content
+    assert "return readStore(API_BASE_URL_KEY);" in js_content
+
+
+def test_settings_store_batches_writes():
+    """Writes are flushed together after a delay or when the page is hidden."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+    assert "setTimeout(flushStore, STORE_FLUSH_DELAY_MS)" in js_content
+    assert "window.addEventListener('pagehide', flushStore);" in js_content
+    assert "window.addEventListener('storage', function(e) {" in js_content
+
+
+def test_settings_store_follows_reducer_and_other_tabs():
+    """Reducer actions update the store; synced settings update the reducer."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+    assert "patchStoredSettings({ modelId: action.payload });" in js_content
+
+    plugin_js = client.get("/docbuddy-static/plugin.js").text
+    assert "REDUCER_SYNC_ACTIONS.forEach" in plugin_js
+
+
+def test_summary_and_discovery_caches_use_settings_store():
+    """Context summaries and provider discovery share the batched store."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+    assert "writeStore(CONTEXT_SUMMARY_KEY, all);" in js_content
+    assert "readStore(DISCOVERY_CACHE_KEY)" in js_content
+    assert "localStorage.getItem(CONTEXT_SUMMARY_KEY)" not in js_content
+    assert "localStorage.setItem(DISCOVERY_CACHE_KEY" not in js_content
+
+
+# ── Chat-first boot tests ─────────────────────────────────────────────────────
+
+
+def test_chat_first_boot_defers_swagger_bundle():
+    """Chat-first pages paint a chat shell and load scripts deferred, keeping SRI."""
+    resp = get_swagger_ui_html(
+        openapi_url="/api/openapi.json", title="T", boot_mode="chat-first"
+    )
+    html = resp.body.decode()
+    assert 'id="docbuddy-boot-shell"' in html
+    assert 'crossorigin="anonymous" defer></script>' in html
+    assert "document.addEventListener('DOMContentLoaded', bootSwaggerUI);" in html
+    assert 'window.DOCBUDDY_OPENAPI_URL = "/api/openapi.json";' in html
+
+
+def test_standard_boot_is_default_and_unknown_mode_rejected():
+    """The default page boots Swagger UI on load; unknown boot modes raise."""
+    import pytest
+
+    html = get_swagger_ui_html(openapi_url="/openapi.json", title="T").body.decode()
+    assert "docbuddy-boot-shell" not in html
+    assert "window.addEventListener('load', bootSwaggerUI);" in html
+
+    with pytest.raises(ValueError):
+        setup_docs(FastAPI(), boot_mode="api-last")
+
+
+def test_chat_first_hands_spec_to_api_tab_lazily():
+    """The API tab gets the chat's cached schema on first visit or when idle."""
+    client = TestClient(make_app())
+    plugin_js = client.get("/docbuddy-static/plugin.js").text
+    assert "function loadDeferredApiSpec(system)" in plugin_js
+    assert "system.specActions.updateSpec(JSON.stringify(schema));" in plugin_js
+
+    chat_js = client.get("/docbuddy-static/chat.js").text
+    assert "DB.markBoot('chat-interactive');" in chat_js
+
+
+# ── Lazy panel loading tests ──────────────────────────────────────────────────
+
+
+def test_only_core_and_plugin_scripts_load_with_the_page():
+    """Panel scripts are left off the page; core.js loads them per tab."""
+    client = TestClient(make_app())
+    html = client.get("/docs").text
+    assert "/docbuddy-static/core.js" in html
+    assert '<script src="/docbuddy-static/chat.js"' not in html
+    assert '<script src="/docbuddy-static/agent.js"' not in html
+
+    from pathlib import Path
+
+    index_html = (Path(__file__).parent.parent / "docs" / "index.html").read_text()
+    assert "var scripts = ['core.js', 'plugin.js'];" in index_html
+
+
+def test_panel_scripts_load_on_demand():
+    """core.js injects a panel's script once and prefetches the rest when idle."""
+    client = TestClient(make_app())
+    js_content = client.get("/docbuddy-static/core.js").text
+    assert "script.src = STATIC_BASE + '/' + entry.file;" in js_content
+    assert "chat: { file: 'chat.js', factory: 'ChatPanelFactory' }" in js_content
+    assert "DocBuddy.prefetchPanelScripts = prefetchPanelScripts;" in js_content
+
+
+def test_layout_mounts_panels_on_first_visit():
+    """Tabs show a placeholder until their panel loads, then stay mounted."""
+    client = TestClient(make_app())
+    plugin_js = client.get("/docbuddy-static/plugin.js").text
+    assert "DB.loadPanelScript(tab).then(function (factory) {" in plugin_js
+    assert "visited.chat ? React.createElement(" in plugin_js
+    assert "DB.prefetchPanelScripts();" in plugin_js